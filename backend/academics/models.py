@@ -299,13 +299,21 @@ class SubjectContent(models.Model):
             })
 
     def delete(self, *args, **kwargs):
-        """Override delete to remove all associated files from Cloudinary"""
-        # Explicitly delete all ContentFile objects and their files
-        for content_file in self.files.all():
-            if content_file.file:
-                content_file.file.delete(save=False)
-            content_file.delete()
-        super().delete(*args, **kwargs)
+        """Override delete to remove all associated files from storage"""
+        from django.db import transaction
+        from schooladmin.storage_purge import instance_keys, purge_after_commit
+
+        # The ContentFile and submission rows cascade; their files go in one batch once the delete commits
+        with transaction.atomic():
+            purge_after_commit(
+                instance_keys(content_file.file for content_file in self.files.all())
+                + instance_keys(
+                    submission_file.file
+                    for submission_file in SubmissionFile.objects.filter(submission__assignment=self)
+                ),
+                reason=f'Subject content {self.pk} deleted',
+            )
+            return super().delete(*args, **kwargs)
 
 
 class ContentFile(models.Model):
@@ -501,13 +509,17 @@ class AssignmentSubmission(models.Model):
         return self.submission_count < 2 and self.status != 'graded'
 
     def delete(self, *args, **kwargs):
-        """Override delete to remove all associated files from Cloudinary"""
-        # Explicitly delete all SubmissionFile objects and their files
-        for submission_file in self.files.all():
-            if submission_file.file:
-                submission_file.file.delete(save=False)
-            submission_file.delete()
-        super().delete(*args, **kwargs)
+        """Override delete to remove all associated files from storage"""
+        from django.db import transaction
+        from schooladmin.storage_purge import instance_keys, purge_after_commit
+
+        # The SubmissionFile rows cascade; their files go in one batch once the delete commits
+        with transaction.atomic():
+            purge_after_commit(
+                instance_keys(submission_file.file for submission_file in self.files.all()),
+                reason=f'Assignment submission {self.pk} deleted',
+            )
+            return super().delete(*args, **kwargs)
 
 
 class SubmissionFile(models.Model):
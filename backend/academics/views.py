@@ -2079,8 +2079,8 @@ class UnlockAllAssessmentsView(APIView):
         from .models import AssessmentAccess
         AssessmentAccess.objects.filter(assessment__in=assessments).delete()
 
-        # Now set is_released=True
-        assessments.update(is_released=True)
+        # Now set is_released=True (update() skips auto_now, so stamp updated_at too)
+        assessments.update(is_released=True, updated_at=timezone.now())
 
         return Response({
             'message': f'Successfully unlocked {count} assessment(s) for all students',
@@ -2,6 +2,8 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live notification stream (logs/sse.py) is served here directly; every
+other request goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from logs.sse import STREAM_PATHS, notification_stream  # noqa: E402  (needs Django set up)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] in STREAM_PATHS:
+        await notification_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
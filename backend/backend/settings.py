@@ -182,7 +182,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tenants.authentication.TenantJWTAuthentication',
     )
 }
 
@@ -231,6 +231,68 @@ CORS_ALLOW_METHODS = [
     'PUT',
 ]
 
+# Response headers the frontend needs to read on file downloads
+CORS_EXPOSE_HEADERS = [
+    'content-disposition',
+    'x-export-token',
+    'etag',  # notification badge counts (If-None-Match polling)
+]
+
+# Cache (per-process by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend such as Redis or Memcached so workers share cached tenants)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Resolved School/Subscription/Plan snapshots used by TenantMiddleware (tenants/tenant_cache.py)
+TENANT_CACHE_TTL = config('TENANT_CACHE_TTL', default=60, cast=int)
+TENANT_CACHE_LOCAL_TTL = config('TENANT_CACHE_LOCAL_TTL', default=5, cast=int)
+
+# Parsed XLSX import rows kept for the confirm step after validate (users/import_views.py). Only
+# helps across processes (the scheduler runs student imports) with a shared CACHE_BACKEND.
+IMPORT_ROWS_CACHE_SECONDS = config('IMPORT_ROWS_CACHE_SECONDS', default=900, cast=int)
+
+# Term analytics cube behind the proprietor performance views (tenants/term_analytics.py). Entries
+# are keyed on the term's latest grade write, so this only bounds how long stale keys linger.
+TERM_ANALYTICS_CACHE_SECONDS = config('TERM_ANALYTICS_CACHE_SECONDS', default=3600, cast=int)
+
+# Proprietor dashboard snapshots (tenants/dashboard_cache.py): retired by writes through a per-school
+# version; the TTL bounds staleness in other workers with a per-process CACHE_BACKEND. SERVE_STALE
+# answers with the previous snapshot while a background thread recomputes it.
+PROPRIETOR_SNAPSHOT_TTL = config('PROPRIETOR_SNAPSHOT_TTL', default=300, cast=int)
+PROPRIETOR_SNAPSHOT_SERVE_STALE = config('PROPRIETOR_SNAPSHOT_SERVE_STALE', default=False, cast=bool)
+
+# Processes used to render PDFs for bulk report card exports (default: min(4, CPU count))
+REPORT_CARD_EXPORT_WORKERS = config('REPORT_CARD_EXPORT_WORKERS', default=0, cast=int)
+
+# Portal database export (tenants/database_export.py): rows read per query, and
+# bytes kept in memory before the export file spills over to disk
+DATABASE_EXPORT_CHUNK_SIZE = config('DATABASE_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+DATABASE_EXPORT_SPOOL_BYTES = config('DATABASE_EXPORT_SPOOL_BYTES', default=16 * 1024 * 1024, cast=int)
+
+# Background jobs (schooladmin/jobs.py), run by run_scheduler or run_job_worker
+JOB_POLL_SECONDS = config('JOB_POLL_SECONDS', default=5, cast=int)
+JOB_SCHEDULER_THREADS = config('JOB_SCHEDULER_THREADS', default=2, cast=int)
+JOB_MAX_CONCURRENT_PER_SCHOOL = config('JOB_MAX_CONCURRENT_PER_SCHOOL', default=1, cast=int)
+JOB_RETRY_BACKOFF_SECONDS = config('JOB_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+JOB_STALE_AFTER_MINUTES = config('JOB_STALE_AFTER_MINUTES', default=60, cast=int)
+# Running jobs refresh their heartbeat this often, outside the handler's transaction
+JOB_HEARTBEAT_SECONDS = config('JOB_HEARTBEAT_SECONDS', default=60, cast=int)
+# Run jobs inside the request that queued them (local development without a worker)
+BACKGROUND_JOBS_EAGER = config('BACKGROUND_JOBS_EAGER', default=False, cast=bool)
+
+# Batched deletion of uploaded files (schooladmin/storage_purge.py): keys per S3 DeleteObjects
+# request (at most 1000), threads deleting batches in parallel, retries of failed keys
+STORAGE_PURGE_BATCH_SIZE = config('STORAGE_PURGE_BATCH_SIZE', default=1000, cast=int)
+STORAGE_PURGE_WORKERS = config('STORAGE_PURGE_WORKERS', default=8, cast=int)
+STORAGE_PURGE_RETRIES = config('STORAGE_PURGE_RETRIES', default=3, cast=int)
+
+# Bulk fee payment posting (schooladmin/fee_payments.py): most rows accepted in one batch
+FEE_BULK_PAYMENT_MAX_ROWS = config('FEE_BULK_PAYMENT_MAX_ROWS', default=10000, cast=int)
+
 # Email Configuration (Brevo HTTP API via django-anymail)
 # Uses HTTP instead of SMTP — works on Railway and all cloud platforms
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='anymail.backends.brevo.EmailBackend')
@@ -241,10 +303,35 @@ ANYMAIL = {
     'BREVO_API_KEY': config('BREVO_API_KEY', default=''),
 }
 
+# Email outbox (logs/email_outbox.py), drained by run_scheduler or drain_email_outbox
+EMAIL_OUTBOX_POLL_SECONDS = config('EMAIL_OUTBOX_POLL_SECONDS', default=5, cast=int)
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=100, cast=int)  # recipients per Brevo call
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS = config('EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS', default=30, cast=int)
+NOTIFICATION_DIGEST_MINUTES = config('NOTIFICATION_DIGEST_MINUTES', default=15, cast=int)  # content notification digest emails
+
+# Live notification stream (logs/sse.py, served by backend/asgi.py under an ASGI server such as
+# `gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker`). With several workers or the
+# scheduler publishing, use 'logs.live_events.DatabaseBroker' so events reach every worker.
+LIVE_EVENTS_BROKER = config('LIVE_EVENTS_BROKER', default='logs.live_events.LocalBroker')
+LIVE_EVENTS_HEARTBEAT_SECONDS = config('LIVE_EVENTS_HEARTBEAT_SECONDS', default=20, cast=int)
+LIVE_EVENTS_MAX_CONNECTIONS = config('LIVE_EVENTS_MAX_CONNECTIONS', default=5000, cast=int)  # per worker
+LIVE_EVENTS_POLL_SECONDS = config('LIVE_EVENTS_POLL_SECONDS', default=1, cast=float)  # DatabaseBroker
+
 # Automated Backup Settings
 BACKUP_EMAIL = config('BACKUP_EMAIL', default='admin@yourschool.com')
 BACKUP_INTERVAL_DAYS = config('BACKUP_INTERVAL_DAYS', default=5, cast=int)
 
+# Incremental snapshots (schooladmin/backups.py): a delta every BACKUP_SNAPSHOT_HOURS (0 disables),
+# a full snapshot every BACKUP_FULL_EVERY_DAYS, the last BACKUP_KEEP_FULL full chains kept.
+# Stored under BACKUP_STORAGE_PREFIX in the private bucket (MEDIA_ROOT without one).
+BACKUP_SNAPSHOT_HOURS = config('BACKUP_SNAPSHOT_HOURS', default=24, cast=int)
+BACKUP_FULL_EVERY_DAYS = config('BACKUP_FULL_EVERY_DAYS', default=7, cast=int)
+BACKUP_KEEP_FULL = config('BACKUP_KEEP_FULL', default=2, cast=int)
+BACKUP_BLOCK_SIZE = config('BACKUP_BLOCK_SIZE', default=1000, cast=int)  # key values per diffed block
+BACKUP_OVERLAP_SECONDS = config('BACKUP_OVERLAP_SECONDS', default=300, cast=int)
+BACKUP_STORAGE_PREFIX = config('BACKUP_STORAGE_PREFIX', default='backups')
+
 # APScheduler Settings
 SCHEDULER_DEFAULT = True
 
@@ -2,7 +2,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Count
-from .models import ActivityLog, NotificationStatus, NotificationPreference
+from .models import ActivityLog, NotificationStatus, NotificationPreference, EmailOutbox
+from .notification_counters import invalidate
 
 
 @admin.register(ActivityLog)
@@ -84,11 +85,14 @@ class NotificationStatusAdmin(admin.ModelAdmin):
             if not status.is_read:
                 status.mark_as_read()
                 updated += 1
+        invalidate(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'Marked {updated} notifications as read.')
     mark_as_read.short_description = 'Mark selected as read'
     
     def mark_as_unread(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
         updated = queryset.filter(is_read=True).update(is_read=False, read_at=None)
+        invalidate(user_ids)
         self.message_user(request, f'Marked {updated} notifications as unread.')
     mark_as_unread.short_description = 'Mark selected as unread'
     
@@ -113,4 +117,14 @@ class NotificationPreferenceAdmin(admin.ModelAdmin):
     user_full_name.short_description = 'User'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user')
\ No newline at end of file
+        return super().get_queryset(request).select_related('user')
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_email', 'subject', 'school', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['to_email', 'subject', 'school__name']
+    readonly_fields = ['claim_token', 'claimed_at', 'provider_message_id', 'created_at', 'sent_at']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
@@ -0,0 +1,454 @@
+"""
+Transactional email outbox.
+
+Code that wants to email someone inserts a rendered EmailOutbox row (in the
+same transaction as the Notification that caused it) and returns straight
+away. The drain worker - an interval job inside run_scheduler, or the
+drain_email_outbox command - claims pending rows, reserves the school's daily
+email quota for the whole claim in one statement (tenants/quota.py), and delivers them
+through Brevo's batch API (messageVersions, up to EMAIL_OUTBOX_BATCH_SIZE
+recipients per HTTP call) over a single reused HTTP session.
+
+Transient failures (network errors, 429, 5xx) are retried with exponential
+backoff up to max_attempts; the quota they reserved is given back so a retry
+can reserve it again. Rows that do not fit in today's quota are marked skipped.
+Bulk senders may reserve quota when queueing (reserve_quota=True) to learn
+straight away how many emails fit.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BREVO_SEND_URL = 'https://api.brevo.com/v3/smtp/email'
+QUOTA_SKIP_REASON = 'Daily email limit reached'
+
+_http_session = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def batch_size():
+    return max(1, _setting('EMAIL_OUTBOX_BATCH_SIZE', 100))
+
+
+def _session():
+    """One keep-alive HTTP session per process for all Brevo calls."""
+    global _http_session
+    if _http_session is None:
+        import requests
+        _http_session = requests.Session()
+        _http_session.headers.update({'accept': 'application/json', 'content-type': 'application/json'})
+    return _http_session
+
+
+def _brevo_api_key():
+    if 'anymail.backends.brevo' not in _setting('EMAIL_BACKEND', ''):
+        return ''
+    return _setting('ANYMAIL', {}).get('BREVO_API_KEY', '')
+
+
+# ============================================================================
+# QUEUEING
+# ============================================================================
+
+def queue_email(to_email, subject, html_body, sender, to_name='', school=None, recipient=None):
+    """
+    Insert one rendered email into the outbox.
+
+    sender is the dict returned by email_service._get_sender (name and email are used).
+    """
+    from .models import EmailOutbox
+
+    return EmailOutbox.objects.create(
+        school=school,
+        recipient=recipient,
+        to_email=to_email,
+        to_name=to_name or '',
+        sender_name=sender['name'],
+        sender_email=sender['email'],
+        subject=subject[:500],
+        html_body=html_body,
+        max_attempts=_setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+    )
+
+
+def queue_notification_emails(notifications, reserve_quota=False):
+    """
+    Queue the email for each Notification in one bulk insert (see queue_user_emails).
+
+    Returns {'queued', 'over_quota', 'no_email'} counts.
+    """
+    return queue_user_emails(
+        ((n.recipient, n.title, n.message, n.priority) for n in notifications),
+        reserve_quota=reserve_quota,
+    )
+
+
+def queue_user_emails(messages, reserve_quota=False):
+    """
+    Queue one notification-style email per (user, title, message, priority) in
+    one bulk insert. Sender details are looked up once per school.
+
+    With reserve_quota=True the daily quota for each school's batch is reserved
+    now, in one statement; emails beyond it are recorded as skipped.
+
+    Returns {'queued', 'over_quota', 'no_email'} counts.
+    """
+    from .email_service import render_notification_email
+
+    return _queue_rendered(
+        (
+            (user, lambda sender, t=title, m=message, p=priority: render_notification_email(sender, t, m, p))
+            for user, title, message, priority in messages
+        ),
+        reserve_quota=reserve_quota,
+    )
+
+
+def queue_verification_emails(users, reserve_quota=False):
+    """
+    Queue the welcome/verification email for each (user, verification_url) in
+    one bulk insert, e.g. for accounts created by an import.
+
+    Returns {'queued', 'over_quota', 'no_email'} counts.
+    """
+    from .email_service import render_verification_email
+
+    return _queue_rendered(
+        ((user, lambda sender, u=user, url=url: render_verification_email(sender, u, url)) for user, url in users),
+        reserve_quota=reserve_quota,
+    )
+
+
+def _queue_rendered(messages, reserve_quota):
+    """Bulk insert one email per (user, render) pair; render(sender) returns (subject, html_body)."""
+    from tenants.quota import reserve
+    from .email_service import _get_sender
+    from .models import EmailOutbox
+
+    senders = {}
+    max_attempts = _setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    rows = []
+    no_email = 0
+    for user, render in messages:
+        if not user.email:
+            no_email += 1
+            continue
+
+        school_id = user.school_id
+        if school_id not in senders:
+            senders[school_id] = _get_sender(user)
+        sender = senders[school_id]
+
+        subject, html_body = render(sender)
+        rows.append(EmailOutbox(
+            school_id=school_id,
+            recipient=user,
+            to_email=user.email,
+            to_name=f"{user.first_name} {user.last_name}".strip() or user.username,
+            sender_name=sender['name'],
+            sender_email=sender['email'],
+            subject=subject[:500],
+            html_body=html_body,
+            max_attempts=max_attempts,
+        ))
+
+    over_quota = 0
+    if reserve_quota:
+        by_school = defaultdict(list)
+        for row in rows:
+            by_school[row.school_id].append(row)
+        for school_id, school_rows in by_school.items():
+            granted = len(school_rows) if school_id is None else reserve(school_id, len(school_rows))
+            for row in school_rows[:granted]:
+                row.quota_reserved = True
+            for row in school_rows[granted:]:
+                row.status = EmailOutbox.STATUS_SKIPPED
+                row.last_error = QUOTA_SKIP_REASON
+            over_quota += len(school_rows) - granted
+
+    EmailOutbox.objects.bulk_create(rows, batch_size=500)
+    return {'queued': len(rows) - over_quota, 'over_quota': over_quota, 'no_email': no_email}
+
+
+# ============================================================================
+# DELIVERY
+# ============================================================================
+
+class DeliveryError(Exception):
+    """A send failed; `transient` failures are retried, the rest are final."""
+
+    def __init__(self, message, transient=True):
+        super().__init__(message)
+        self.transient = transient
+
+
+def _send_brevo_batch(rows, api_key):
+    """
+    One Brevo call for rows sharing a sender. Each recipient gets its own message
+    version (own subject and body). Returns the provider message ids in row order.
+    """
+    import requests
+
+    first = rows[0]
+    payload = {
+        'sender': {'name': first.sender_name, 'email': first.sender_email},
+        'subject': first.subject,
+        'htmlContent': first.html_body,
+    }
+    if len(rows) == 1:
+        payload['to'] = [{'email': first.to_email, 'name': first.to_name or first.to_email}]
+    else:
+        payload['messageVersions'] = [
+            {
+                'to': [{'email': row.to_email, 'name': row.to_name or row.to_email}],
+                'subject': row.subject,
+                'htmlContent': row.html_body,
+            }
+            for row in rows
+        ]
+
+    try:
+        response = _session().post(
+            BREVO_SEND_URL, json=payload, headers={'api-key': api_key},
+            timeout=_setting('EMAIL_OUTBOX_HTTP_TIMEOUT', 30),
+        )
+    except requests.RequestException as e:
+        raise DeliveryError(f'Brevo request failed: {e}')
+
+    if response.status_code == 429 or response.status_code >= 500:
+        raise DeliveryError(f'Brevo returned {response.status_code}: {response.text[:500]}')
+    if response.status_code >= 400:
+        raise DeliveryError(f'Brevo returned {response.status_code}: {response.text[:500]}', transient=False)
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    ids = body.get('messageIds') or ([body['messageId']] if body.get('messageId') else [])
+    return [ids[i] if i < len(ids) else '' for i in range(len(rows))]
+
+
+def _send_connection_batch(rows):
+    """Fallback when Brevo's API is not configured: one Django mail connection for the batch."""
+    from django.core.mail import EmailMessage, get_connection
+
+    messages = []
+    for row in rows:
+        message = EmailMessage(
+            subject=row.subject,
+            body=row.html_body,
+            from_email=f"{row.sender_name} <{row.sender_email}>",
+            to=[f"{row.to_name} <{row.to_email}>" if row.to_name else row.to_email],
+        )
+        message.content_subtype = 'html'
+        messages.append(message)
+
+    try:
+        get_connection(fail_silently=False).send_messages(messages)
+    except Exception as e:
+        raise DeliveryError(f'Email backend failed: {e}')
+    return [''] * len(rows)
+
+
+def _deliver(rows, api_key):
+    """
+    Send rows (same sender). Returns (sent, errors): sent is a list of
+    (row, message_id), errors a list of (row, DeliveryError).
+    """
+    try:
+        if api_key:
+            ids = _send_brevo_batch(rows, api_key)
+        else:
+            ids = _send_connection_batch(rows)
+        return list(zip(rows, ids)), []
+    except DeliveryError as e:
+        if e.transient or len(rows) == 1:
+            return [], [(row, e) for row in rows]
+
+    # Brevo rejected the batch (e.g. one malformed address): send one by one so
+    # only the offending recipients fail
+    sent, errors = [], []
+    for row in rows:
+        row_sent, row_errors = _deliver([row], api_key)
+        sent.extend(row_sent)
+        errors.extend(row_errors)
+    return sent, errors
+
+
+def _retry_delay(attempts):
+    base = _setting('EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS', 30)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), 3600))
+
+
+def claim_batch(limit):
+    """Atomically move up to `limit` due rows to 'sending' under a fresh claim token."""
+    from .models import EmailOutbox
+
+    now = timezone.now()
+    ids = list(
+        EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    EmailOutbox.objects.filter(id__in=ids, status=EmailOutbox.STATUS_PENDING).update(
+        status=EmailOutbox.STATUS_SENDING,
+        claim_token=token,
+        claimed_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(EmailOutbox.objects.filter(claim_token=token, status=EmailOutbox.STATUS_SENDING).order_by('id'))
+
+
+def _process_claim(rows, api_key, stats):
+    from tenants.quota import reserve, release
+    from .models import EmailOutbox
+
+    now = timezone.now()
+
+    # Reserve quota per school for everything claimed, skip what does not fit
+    by_school = defaultdict(list)
+    sendable = []
+    for row in rows:
+        if row.quota_reserved or row.school_id is None:
+            sendable.append(row)
+        else:
+            by_school[row.school_id].append(row)
+
+    reserved_ids, skipped_ids = [], []
+    for school_id, school_rows in by_school.items():
+        granted = reserve(school_id, len(school_rows))
+        for row in school_rows[:granted]:
+            row.quota_reserved = True
+            reserved_ids.append(row.id)
+        sendable.extend(school_rows[:granted])
+        skipped_ids.extend(row.id for row in school_rows[granted:])
+        if granted < len(school_rows):
+            logger.warning(f"Email limit reached for school {school_id}: skipping {len(school_rows) - granted} email(s)")
+
+    # Record the reservation before sending: rows recovered from a dead worker keep it
+    # and are not charged a second time
+    if reserved_ids:
+        EmailOutbox.objects.filter(id__in=reserved_ids).update(quota_reserved=True)
+
+    if skipped_ids:
+        EmailOutbox.objects.filter(id__in=skipped_ids).update(
+            status=EmailOutbox.STATUS_SKIPPED, last_error=QUOTA_SKIP_REASON, claim_token='',
+        )
+        stats['skipped'] += len(skipped_ids)
+
+    # Group by sender, send in batches
+    by_sender = defaultdict(list)
+    for row in sendable:
+        by_sender[(row.sender_name, row.sender_email)].append(row)
+
+    size = batch_size()
+    sent, errors = [], []
+    for sender_rows in by_sender.values():
+        for i in range(0, len(sender_rows), size):
+            chunk_sent, chunk_errors = _deliver(sender_rows[i:i + size], api_key)
+            sent.extend(chunk_sent)
+            errors.extend(chunk_errors)
+
+    sent_at = timezone.now()
+    for row, message_id in sent:
+        row.status = EmailOutbox.STATUS_SENT
+        row.sent_at = sent_at
+        row.provider_message_id = message_id or ''
+        row.claim_token = ''
+        row.last_error = ''
+    EmailOutbox.objects.bulk_update(
+        [row for row, _ in sent],
+        ['status', 'sent_at', 'provider_message_id', 'claim_token', 'last_error'],
+        batch_size=500,
+    )
+    stats['sent'] += len(sent)
+
+    # Undelivered rows give their quota back; retry or give up
+    unsent_per_school = defaultdict(int)
+    for row, error in errors:
+        unsent_per_school[row.school_id] += 1
+        row.last_error = str(error)[:2000]
+        row.claim_token = ''
+        row.quota_reserved = False
+        if error.transient and row.attempts < row.max_attempts:
+            row.status = EmailOutbox.STATUS_PENDING
+            row.next_attempt_at = now + _retry_delay(row.attempts)
+            stats['retrying'] += 1
+        else:
+            row.status = EmailOutbox.STATUS_FAILED
+            stats['failed'] += 1
+            logger.error(f"Giving up on email {row.id} to {row.to_email}: {error}")
+    EmailOutbox.objects.bulk_update(
+        [row for row, _ in errors],
+        ['status', 'next_attempt_at', 'last_error', 'claim_token', 'quota_reserved'],
+        batch_size=500,
+    )
+    for school_id, count in unsent_per_school.items():
+        if school_id is not None:
+            release(school_id, count)
+
+
+def recover_stale_emails():
+    """Return rows stuck in 'sending' (worker died mid-claim) to the queue."""
+    from .models import EmailOutbox
+
+    cutoff = timezone.now() - timedelta(minutes=_setting('EMAIL_OUTBOX_STALE_AFTER_MINUTES', 10))
+    return EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENDING, claimed_at__lt=cutoff).update(
+        status=EmailOutbox.STATUS_PENDING, claim_token='',
+    )
+
+
+def drain_outbox(max_messages=None):
+    """
+    Deliver due outbox rows until none are left (or max_messages were claimed).
+    Safe to run from several processes at once. Returns counts by outcome.
+    """
+    from django.db import close_old_connections
+
+    close_old_connections()
+    recover_stale_emails()
+
+    api_key = _brevo_api_key()
+    claim_size = batch_size() * 5
+    stats = {'claimed': 0, 'sent': 0, 'skipped': 0, 'retrying': 0, 'failed': 0}
+    try:
+        while max_messages is None or stats['claimed'] < max_messages:
+            limit = claim_size if max_messages is None else min(claim_size, max_messages - stats['claimed'])
+            rows = claim_batch(limit)
+            if not rows:
+                break
+            stats['claimed'] += len(rows)
+            _process_claim(rows, api_key, stats)
+    finally:
+        close_old_connections()
+
+    if stats['claimed']:
+        logger.info(f"Email outbox drained: {stats}")
+    return stats
+
+
+def delete_old_outbox_emails(days=30):
+    """Delete delivered, skipped and failed outbox rows older than `days`."""
+    from .models import EmailOutbox
+
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = EmailOutbox.objects.filter(
+        status__in=[EmailOutbox.STATUS_SENT, EmailOutbox.STATUS_SKIPPED, EmailOutbox.STATUS_FAILED],
+        created_at__lt=cutoff,
+    ).delete()
+    return deleted
@@ -35,28 +35,23 @@ def _get_sender(user=None):
     return info
 
 
-def _check_email_limit(user):
+def _check_email_limit(user, quota_reserved=False):
     """
-    Check if the user's school can send another email today.
-    If yes, increment the counter. If no, return False.
-    Returns True if email can be sent.
+    Reserve one email from the user's school daily quota (tenants/quota.py).
+    Returns True if email can be sent. Bulk senders that reserved their whole
+    batch up front pass quota_reserved=True.
     """
+    if quota_reserved:
+        return True
     if not user or not hasattr(user, 'school') or not user.school:
         return True  # No school context, allow (shouldn't happen in practice)
 
-    subscription = getattr(user.school, 'subscription', None)
-    if not subscription:
-        return True  # No subscription, allow
-
-    if not subscription.can_send_email():
-        logger.warning(
-            f"Email limit reached for {user.school.name}: "
-            f"{subscription.emails_sent_today}/{subscription.plan.max_daily_emails}"
-        )
-        return False
+    from tenants.quota import reserve
+    if reserve(user.school, 1):
+        return True
 
-    subscription.increment_email_count()
-    return True
+    logger.warning(f"Email limit reached for {user.school.name}")
+    return False
 
 
 def _send_email(subject, html_content, recipient_email, recipient_name, sender_info):
@@ -73,124 +68,121 @@ def _send_email(subject, html_content, recipient_email, recipient_name, sender_i
     return True
 
 
+def render_notification_email(sender, notification_title, notification_message, priority='medium'):
+    """Build the subject and HTML body of a notification email for the given sender info."""
+    sender_name = sender["name"]
+    accent = sender["accent_color"]
+    logo_url = sender["logo"]
+    subject = f"[{sender_name}] {notification_title}"
+
+    logo_html = f'<img src="{logo_url}" alt="{sender_name}" style="max-width:80px;height:auto;margin-bottom:10px;">' if logo_url else ''
+
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f9f9f9; }}
+            .header {{ background-color: {accent}; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
+            .content {{ background-color: white; padding: 30px; border-radius: 0 0 5px 5px; }}
+            .priority-high {{ border-left: 4px solid #f44336; padding-left: 15px; }}
+            .priority-medium {{ border-left: 4px solid #ff9800; padding-left: 15px; }}
+            .priority-low {{ border-left: 4px solid #2196F3; padding-left: 15px; }}
+            .footer {{ margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; font-size: 12px; color: #666; }}
+            .button {{ display: inline-block; padding: 12px 24px; background-color: {accent}; color: white; text-decoration: none; border-radius: 5px; margin-top: 15px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                {logo_html}
+                <h1>{sender_name} Notification</h1>
+            </div>
+            <div class="content">
+                <div class="priority-{priority}">
+                    <h2>{notification_title}</h2>
+                    <p>{notification_message.replace(chr(10), '<br>')}</p>
+                </div>
+                <p style="margin-top: 30px;">
+                    <a href="{settings.FRONTEND_URL}" class="button">View in Dashboard</a>
+                </p>
+            </div>
+            <div class="footer">
+                <p>This is an automated notification from {sender_name}.</p>
+                <p>Please do not reply to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return subject, html_content
+
+
 def send_notification_email(recipient_user, notification_title, notification_message, notification_type='general', priority='medium'):
     """
-    Send notification email via Brevo Transactional Email API
-    
+    Queue a notification email in the outbox (logs/email_outbox.py).
+
+    The outbox drain worker delivers it in a Brevo batch and applies the
+    school's daily email quota at send time.
+
     Args:
         recipient_user: User object to send email to
         notification_title: Title of the notification
         notification_message: Message content
         notification_type: Type of notification (announcement, assignment, etc.)
         priority: Priority level (low, medium, high)
-    
+
     Returns:
-        bool: True if email sent successfully, False otherwise
+        bool: True if the email was queued, False otherwise
     """
-    
+    from .email_outbox import queue_email
+
     if not recipient_user.email:
         logger.warning(f"User {recipient_user.username} has no email address")
         return False
 
-    if not _check_email_limit(recipient_user):
-        return False
-
     try:
         sender = _get_sender(recipient_user)
-        sender_name = sender["name"]
-        accent = sender["accent_color"]
-        logo_url = sender["logo"]
-        subject = f"[{sender_name}] {notification_title}"
-
-        logo_html = f'<img src="{logo_url}" alt="{sender_name}" style="max-width:80px;height:auto;margin-bottom:10px;">' if logo_url else ''
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f9f9f9; }}
-                .header {{ background-color: {accent}; color: white; padding: 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-                .content {{ background-color: white; padding: 30px; border-radius: 0 0 5px 5px; }}
-                .priority-high {{ border-left: 4px solid #f44336; padding-left: 15px; }}
-                .priority-medium {{ border-left: 4px solid #ff9800; padding-left: 15px; }}
-                .priority-low {{ border-left: 4px solid #2196F3; padding-left: 15px; }}
-                .footer {{ margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; font-size: 12px; color: #666; }}
-                .button {{ display: inline-block; padding: 12px 24px; background-color: {accent}; color: white; text-decoration: none; border-radius: 5px; margin-top: 15px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    {logo_html}
-                    <h1>{sender_name} Notification</h1>
-                </div>
-                <div class="content">
-                    <div class="priority-{priority}">
-                        <h2>{notification_title}</h2>
-                        <p>{notification_message.replace(chr(10), '<br>')}</p>
-                    </div>
-                    <p style="margin-top: 30px;">
-                        <a href="{settings.FRONTEND_URL}" class="button">View in Dashboard</a>
-                    </p>
-                </div>
-                <div class="footer">
-                    <p>This is an automated notification from {sender_name}.</p>
-                    <p>Please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        recipient_name = f"{recipient_user.first_name} {recipient_user.last_name}".strip() or recipient_user.username
-
-        logger.info(f"Sending email to {recipient_user.email}")
-
-        _send_email(subject, html_content, recipient_user.email, recipient_name, _get_sender(recipient_user))
-        logger.info(f"Email sent successfully to {recipient_user.email}")
+        subject, html_content = render_notification_email(sender, notification_title, notification_message, priority)
+        queue_email(
+            recipient_user.email,
+            subject,
+            html_content,
+            sender,
+            to_name=f"{recipient_user.first_name} {recipient_user.last_name}".strip() or recipient_user.username,
+            school=getattr(recipient_user, 'school', None),
+            recipient=recipient_user,
+        )
         return True
 
     except Exception as e:
-        logger.error(f"Failed to send email to {recipient_user.email}: {str(e)}")
+        logger.error(f"Failed to queue email to {recipient_user.email}: {str(e)}")
         return False
 
 
 def send_bulk_notification_emails(notifications):
     """
-    Send multiple notification emails via Brevo API
+    Queue notification emails for many Notification objects in one insert
     
     Args:
         notifications: QuerySet or list of Notification objects
     
     Returns:
-        dict: Statistics about emails sent
+        dict: Statistics about emails queued
     """
+    from .email_outbox import queue_notification_emails
+
+    notifications = list(notifications)
+    queued = queue_notification_emails(notifications, reserve_quota=True)
     stats = {
-        'total': 0,
-        'sent': 0,
-        'failed': 0,
-        'skipped': 0
+        'total': len(notifications),
+        'sent': queued['queued'],
+        'failed': queued['over_quota'],
+        'skipped': queued['no_email'],
     }
     
-    for notification in notifications:
-        stats['total'] += 1
-        
-        result = send_notification_email(
-            recipient_user=notification.recipient,
-            notification_title=notification.title,
-            notification_message=notification.message,
-            notification_type=notification.notification_type,
-            priority=notification.priority
-        )
-        
-        if result:
-            stats['sent'] += 1
-        else:
-            stats['failed'] += 1
-    
-    logger.info(f"Bulk email sending complete: {stats}")
+    logger.info(f"Bulk email queueing complete: {stats}")
     return stats
 
 
@@ -207,14 +199,8 @@ def check_email_cap_for_count(school, emails_needed):
     if not plan or plan.max_daily_emails == 0:
         return {'would_exceed': False, 'remaining': None, 'needed': emails_needed, 'daily_limit': None}
 
-    from django.utils import timezone
-    today = timezone.now().date()
-    if subscription.email_counter_reset_date != today:
-        emails_sent = 0
-    else:
-        emails_sent = subscription.emails_sent_today
-
-    remaining = max(0, plan.max_daily_emails - emails_sent)
+    from tenants.quota import remaining as quota_remaining
+    remaining = quota_remaining(subscription)
     return {
         'would_exceed': emails_needed > remaining,
         'remaining': remaining,
@@ -392,7 +378,84 @@ def send_assessment_locked_parent_email(parent, student_name, school_ref_user, a
         return False
 
 
-def send_verification_email(user, verification_url):
+def render_verification_email(sender, user, verification_url):
+    """Build the subject and HTML body of the welcome/verification email for the given sender info."""
+    sender_name = sender["name"]
+    accent = sender["accent_color"]
+    logo_url = sender["logo"]
+    subject = f"[{sender_name}] Verify Your Email - Welcome!"
+
+    logo_html = f'<img src="{logo_url}" alt="{sender_name}" style="max-width:80px;height:auto;margin-bottom:10px;">' if logo_url else ''
+
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f9f9f9; }}
+            .header {{ background-color: {accent}; color: white; padding: 30px 20px; text-align: center; border-radius: 5px 5px 0 0; }}
+            .content {{ background-color: white; padding: 30px; border-radius: 0 0 5px 5px; }}
+            .credentials-box {{ background-color: #f5f5f5; border-left: 4px solid {accent}; padding: 15px; margin: 20px 0; }}
+            .button {{ display: inline-block; padding: 15px 30px; background-color: {accent}; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; font-weight: bold; }}
+            .warning {{ background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0; }}
+            .footer {{ margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; font-size: 12px; color: #666; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                {logo_html}
+                <h1>Welcome to {sender_name}!</h1>
+            </div>
+            <div class="content">
+                <h2>Hello {user.first_name} {user.last_name},</h2>
+
+                <p>Your account has been created successfully. To activate your account and set your password, please verify your email address.</p>
+
+                <div class="credentials-box">
+                    <h3>Your Account Details:</h3>
+                    <p><strong>Username:</strong> {user.username}</p>
+                    <p><strong>Email:</strong> {user.email}</p>
+                    <p><strong>Role:</strong> {user.get_role_display()}</p>
+                </div>
+
+                <div class="warning">
+                    <p><strong>&#9888;&#65039; Important:</strong> You must verify your email and change your password before you can access the system.</p>
+                </div>
+
+                <p>Click the button below to verify your email and set your new password:</p>
+
+                <div style="text-align: center;">
+                    <a href="{verification_url}" class="button">Verify Email &amp; Change Password</a>
+                </div>
+
+                <p style="margin-top: 20px; font-size: 12px; color: #666;">
+                    Or copy and paste this link into your browser:<br>
+                    <a href="{verification_url}">{verification_url}</a>
+                </p>
+
+                <div class="warning" style="margin-top: 30px;">
+                    <p><strong>Security Notice:</strong></p>
+                    <ul style="margin: 5px 0; padding-left: 20px;">
+                        <li>This verification link will expire in 24 hours</li>
+                        <li>You must change your password after verification</li>
+                        <li>This email cannot be replied to</li>
+                    </ul>
+                </div>
+            </div>
+            <div class="footer">
+                <p><strong>This is an automated email from {sender_name}.</strong></p>
+                <p>Please do not reply to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return subject, html_content
+
+
+def send_verification_email(user, verification_url, quota_reserved=False):
     """
     Send email verification with password change link
 
@@ -408,88 +471,17 @@ def send_verification_email(user, verification_url):
         logger.warning(f"User {user.username} has no email address")
         return False
 
-    if not _check_email_limit(user):
+    if not _check_email_limit(user, quota_reserved):
         return False
 
     try:
         sender = _get_sender(user)
-        sender_name = sender["name"]
-        accent = sender["accent_color"]
-        logo_url = sender["logo"]
-        subject = f"[{sender_name}] Verify Your Email - Welcome!"
-
-        logo_html = f'<img src="{logo_url}" alt="{sender_name}" style="max-width:80px;height:auto;margin-bottom:10px;">' if logo_url else ''
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; background-color: #f9f9f9; }}
-                .header {{ background-color: {accent}; color: white; padding: 30px 20px; text-align: center; border-radius: 5px 5px 0 0; }}
-                .content {{ background-color: white; padding: 30px; border-radius: 0 0 5px 5px; }}
-                .credentials-box {{ background-color: #f5f5f5; border-left: 4px solid {accent}; padding: 15px; margin: 20px 0; }}
-                .button {{ display: inline-block; padding: 15px 30px; background-color: {accent}; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; font-weight: bold; }}
-                .warning {{ background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; margin: 20px 0; }}
-                .footer {{ margin-top: 20px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; font-size: 12px; color: #666; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    {logo_html}
-                    <h1>Welcome to {sender_name}!</h1>
-                </div>
-                <div class="content">
-                    <h2>Hello {user.first_name} {user.last_name},</h2>
-
-                    <p>Your account has been created successfully. To activate your account and set your password, please verify your email address.</p>
-
-                    <div class="credentials-box">
-                        <h3>Your Account Details:</h3>
-                        <p><strong>Username:</strong> {user.username}</p>
-                        <p><strong>Email:</strong> {user.email}</p>
-                        <p><strong>Role:</strong> {user.get_role_display()}</p>
-                    </div>
-
-                    <div class="warning">
-                        <p><strong>&#9888;&#65039; Important:</strong> You must verify your email and change your password before you can access the system.</p>
-                    </div>
-
-                    <p>Click the button below to verify your email and set your new password:</p>
-
-                    <div style="text-align: center;">
-                        <a href="{verification_url}" class="button">Verify Email &amp; Change Password</a>
-                    </div>
-
-                    <p style="margin-top: 20px; font-size: 12px; color: #666;">
-                        Or copy and paste this link into your browser:<br>
-                        <a href="{verification_url}">{verification_url}</a>
-                    </p>
-
-                    <div class="warning" style="margin-top: 30px;">
-                        <p><strong>Security Notice:</strong></p>
-                        <ul style="margin: 5px 0; padding-left: 20px;">
-                            <li>This verification link will expire in 24 hours</li>
-                            <li>You must change your password after verification</li>
-                            <li>This email cannot be replied to</li>
-                        </ul>
-                    </div>
-                </div>
-                <div class="footer">
-                    <p><strong>This is an automated email from {sender_name}.</strong></p>
-                    <p>Please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        subject, html_content = render_verification_email(sender, user, verification_url)
 
         recipient_name = f"{user.first_name} {user.last_name}".strip() or user.username
 
         logger.info(f"Sending verification email to {user.email}")
-        _send_email(subject, html_content, user.email, recipient_name, _get_sender(user))
+        _send_email(subject, html_content, user.email, recipient_name, sender)
         logger.info(f"Verification email sent successfully to {user.email}")
         return True
 
@@ -601,7 +593,7 @@ def send_password_reset_email(user, reset_url):
         return False
 
 
-def send_graduation_email_student(student, deactivation_date, login_url):
+def send_graduation_email_student(student, deactivation_date, login_url, quota_reserved=False):
     """
     Send a graduation congratulations email to a student with grace period notice.
 
@@ -617,7 +609,7 @@ def send_graduation_email_student(student, deactivation_date, login_url):
         logger.warning(f"Student {student.username} has no email address for graduation email")
         return False
 
-    if not _check_email_limit(student):
+    if not _check_email_limit(student, quota_reserved):
         logger.warning(f"Email limit reached — skipping graduation email to {student.email}")
         return False
 
@@ -706,7 +698,7 @@ def send_graduation_email_student(student, deactivation_date, login_url):
         return False
 
 
-def send_parent_all_children_graduated_email(parent, parent_deactivation_date, login_url):
+def send_parent_all_children_graduated_email(parent, parent_deactivation_date, login_url, quota_reserved=False):
     """
     Send a notice to a parent when ALL their children have graduated,
     informing them that their own account will be deactivated in 3 months.
@@ -723,7 +715,7 @@ def send_parent_all_children_graduated_email(parent, parent_deactivation_date, l
         logger.warning(f"Parent {parent.username} has no email address for all-children-graduated notice")
         return False
 
-    if not _check_email_limit(parent):
+    if not _check_email_limit(parent, quota_reserved):
         logger.warning(f"Email limit reached — skipping all-children-graduated email to {parent.email}")
         return False
 
@@ -813,7 +805,7 @@ def send_parent_all_children_graduated_email(parent, parent_deactivation_date, l
         return False
 
 
-def send_graduation_email_parent(parent, student, deactivation_date, login_url):
+def send_graduation_email_parent(parent, student, deactivation_date, login_url, quota_reserved=False):
     """
     Send a graduation notification email to a parent with grace period notice.
 
@@ -830,7 +822,7 @@ def send_graduation_email_parent(parent, student, deactivation_date, login_url):
         logger.warning(f"Parent {parent.username} has no email address for graduation email")
         return False
 
-    if not _check_email_limit(parent):
+    if not _check_email_limit(parent, quota_reserved):
         logger.warning(f"Email limit reached — skipping graduation email to parent {parent.email}")
         return False
 
@@ -0,0 +1,314 @@
+"""
+Live notification events for the server-sent event stream (logs/sse.py).
+
+Writers publish per-user events once their transaction commits:
+
+- 'notification': a new direct Notification (signals.py, and the bulk senders
+  after bulk_create);
+- 'popup': a new Notification whose popup has not been shown yet;
+- 'activity': a teacher content notification fanned out to the user
+  (notification_fanout.py);
+- 'counts': a change to the user's badge counters (notification_counters.py),
+  either {'delta': {...}}, {'counts': {...}} after a recount, or
+  {'stale': True} when the client should refetch /notifications/counts/.
+
+Delivery goes through a broker chosen by LIVE_EVENTS_BROKER:
+
+- LocalBroker (default) hands events straight to the streams connected to
+  this process. Enough for a single ASGI worker; events raised in another
+  process (the scheduler, other workers) do not reach it.
+- DatabaseBroker also writes each published event to the LiveEvent table,
+  and one poller thread per worker relays new rows to its own streams every
+  LIVE_EVENTS_POLL_SECONDS. It needs no extra service, so it is the stand-in
+  broker for multi-worker deployments.
+
+With LocalBroker, publishing costs one dict lookup when no stream is
+connected (e.g. under WSGI).
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def format_event(event, data):
+    """One server-sent event, encoded once however many streams receive it."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+STALE_EVENT = format_event('counts', {'stale': True})
+
+
+class Subscription:
+    """One open stream: encoded events waiting to be written, fed from any thread."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.pending = deque()
+        self.closed = False
+        self._waiter = None
+
+    def _put(self, body):
+        if len(self.pending) >= QUEUE_SIZE:
+            # A stalled client: drop its backlog and tell it to refetch
+            self.pending.clear()
+            body = STALE_EVENT
+        self.pending.append(body)
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self):
+        """Wake the stream up so it ends."""
+        def _end():
+            self.closed = True
+            self._wake()
+
+        try:
+            self.loop.call_soon_threadsafe(_end)
+        except RuntimeError:
+            pass  # Event loop already closed; the stream is gone
+
+    async def wait(self, timeout):
+        """
+        Wait up to timeout seconds for events and return their encoded bodies
+        (empty on timeout or close). A future and a timer, no task per wait.
+        """
+        if not self.pending and not self.closed:
+            self._waiter = self.loop.create_future()
+            timer = self.loop.call_later(timeout, self._wake)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        bodies = list(self.pending)
+        self.pending.clear()
+        return bodies
+
+
+def _deliver(targets):
+    for subscription, body in targets:
+        subscription._put(body)
+
+
+class LocalBroker:
+    """In-process pub/sub: publishes reach the streams connected to this process."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            streams = self._subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self._subscribers[subscription.user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(streams) for streams in self._subscribers.values())
+
+    def dispatch(self, messages):
+        """Hand (user_ids, event, data) messages to this process's streams."""
+        per_loop = defaultdict(list)
+        with self._lock:
+            for user_ids, event, data in messages:
+                body = None
+                for user_id in user_ids:
+                    for subscription in self._subscribers.get(user_id, ()):
+                        if body is None:
+                            body = format_event(event, data)
+                        per_loop[subscription.loop].append((subscription, body))
+        # One wake-up per event loop rather than one per stream
+        for loop, targets in per_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, targets)
+            except RuntimeError:
+                pass  # Event loop already closed; its streams are gone
+
+    def publish(self, messages):
+        self.dispatch(messages)
+
+
+class DatabaseBroker(LocalBroker):
+    """
+    Relays events between processes through the LiveEvent table: publish()
+    inserts the rows, a poller thread in each process with open streams
+    delivers them. Publishers and pollers prune rows older than
+    LIVE_EVENTS_RETENTION_SECONDS about once a minute.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+        self._last_id = None
+        self._last_prune = 0
+
+    def publish(self, messages):
+        from .models import LiveEvent
+
+        LiveEvent.objects.bulk_create(
+            [LiveEvent(user_ids=list(user_ids), event=event, data=data) for user_ids, event, data in messages],
+            batch_size=500,
+        )
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        from .models import LiveEvent
+
+        now = time.monotonic()
+        if now - self._last_prune > 60:
+            self._last_prune = now
+            retention = _setting('LIVE_EVENTS_RETENTION_SECONDS', 300)
+            LiveEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_forever, name='live-events-poller', daemon=True)
+                self._poller.start()
+        return subscription
+
+    def _poll_forever(self):
+        interval = _setting('LIVE_EVENTS_POLL_SECONDS', 1)
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Live event poller failed: {str(e)}")
+                close_old_connections()
+            time.sleep(interval)
+
+    def poll(self):
+        """Deliver LiveEvent rows written since the last poll (one query)."""
+        from django.db.models import Max
+        from .models import LiveEvent
+
+        if self._last_id is None:
+            self._last_id = LiveEvent.objects.aggregate(last=Max('id'))['last'] or 0
+            return
+
+        if self.connection_count():
+            rows = list(
+                LiveEvent.objects.filter(id__gt=self._last_id).order_by('id')
+                .values_list('id', 'user_ids', 'event', 'data')[:1000]
+            )
+            if rows:
+                self._last_id = rows[-1][0]
+                self.dispatch([(user_ids, event, data) for _, user_ids, event, data in rows])
+        else:
+            # Nobody to deliver to: skip ahead
+            self._last_id = LiveEvent.objects.aggregate(last=Max('id'))['last'] or self._last_id
+
+        self._maybe_prune()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(_setting('LIVE_EVENTS_BROKER', 'logs.live_events.LocalBroker'))()
+    return _broker
+
+
+def publish_many(messages):
+    """
+    Publish (user_ids, event, data) messages once the current transaction
+    commits (straight away outside one). Failures are logged, never raised.
+    """
+    messages = [(sorted(set(user_ids)), event, data) for user_ids, event, data in messages]
+    messages = [message for message in messages if message[0]]
+    if not messages:
+        return
+
+    def _send():
+        try:
+            get_broker().publish(messages)
+        except Exception as e:
+            logger.error(f"Failed to publish live events: {str(e)}")
+
+    transaction.on_commit(_send)
+
+
+def publish(user_ids, event, data):
+    publish_many([(user_ids, event, data)])
+
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def notification_payload(notification):
+    """Same fields as DirectNotificationsView returns for a notification."""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'priority': notification.priority,
+        'is_read': notification.is_read,
+        'is_popup_shown': notification.is_popup_shown,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        'read_at': notification.read_at.isoformat() if notification.read_at else None,
+        'extra_data': notification.extra_data,
+    }
+
+
+def publish_notifications(notifications):
+    """Push newly created direct notifications (and their popups) to the recipients' streams."""
+    messages = []
+    for notification in notifications:
+        messages.append(([notification.recipient_id], 'notification', notification_payload(notification)))
+        if not notification.is_popup_shown:
+            messages.append(([notification.recipient_id], 'popup', {'id': notification.id}))
+    publish_many(messages)
+
+
+def publish_activity(activity_log, user_ids):
+    """Push a fanned-out teacher content notification to its recipients' streams."""
+    subject = activity_log.subject
+    publish(user_ids, 'activity', {
+        'id': activity_log.id,
+        'activity_type': activity_log.activity_type,
+        'action': activity_log.action,
+        'content_type': activity_log.content_type,
+        'content_title': activity_log.content_title,
+        'content_id': activity_log.content_id,
+        'subject_id': subject.id if subject else None,
+        'subject_name': subject.name if subject else None,
+        'timestamp': activity_log.timestamp.isoformat() if activity_log.timestamp else None,
+    })
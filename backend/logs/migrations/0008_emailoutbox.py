@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-17 07:16
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0007_activitylog_school_notification_school_and_more'),
+        ('tenants', '0028_reportcardexport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to_email', models.EmailField(max_length=254)),
+                ('to_name', models.CharField(blank=True, max_length=200)),
+                ('sender_name', models.CharField(max_length=200)),
+                ('sender_email', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=500)),
+                ('html_body', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim_token', models.CharField(blank=True, max_length=64)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('provider_message_id', models.CharField(blank=True, max_length=255)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('recipient', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_emails', to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(blank=True, help_text='School whose daily email quota this message counts against', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_emails', to='tenants.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='logs_emailo_status_8020cb_idx'), models.Index(fields=['claim_token'], name='logs_emailo_claim_t_14bb6d_idx'), models.Index(fields=['school', 'created_at'], name='logs_emailo_school__0cccdc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0008_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='quota_reserved',
+            field=models.BooleanField(default=False, help_text='Daily quota was reserved when the email was queued'),
+        ),
+    ]
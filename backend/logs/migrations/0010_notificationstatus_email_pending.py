@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-17 07:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0009_emailoutbox_quota_reserved'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationstatus',
+            name='email_pending',
+            field=models.BooleanField(default=False, help_text="Waiting to be included in the recipient's next notification digest email"),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstatus',
+            index=models.Index(fields=['email_pending', 'user'], name='logs_notifi_email_p_341f88_idx'),
+        ),
+    ]
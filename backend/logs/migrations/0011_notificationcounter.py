@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 07:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0010_notificationstatus_email_pending'),
+        ('users', '0013_create_platform_admins'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_activity', models.PositiveIntegerField(default=0, help_text="Unread teacher content notifications (admins: today's)")),
+                ('unread_direct', models.PositiveIntegerField(default=0, help_text='Unread direct notifications')),
+                ('pending_popups', models.PositiveIntegerField(default=0, help_text='Direct notifications whose popup was not shown yet')),
+                ('activity_date', models.DateField(blank=True, help_text='Day unread_activity counts for admins and principals', null=True)),
+                ('version', models.BigIntegerField(default=0, help_text='Changes whenever a count changes (used for the ETag)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
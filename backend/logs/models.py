@@ -147,61 +147,10 @@ class ActivityLog(models.Model):
     def create_notification_status_records(self):
         """
         Create NotificationStatus records for users who should see this notification
-        Creates notifications for both students AND their parents
+        (students of the subject's class and their parents; see notification_fanout.py)
         """
-        if not self.is_notification or not self.subject:
-            return
-
-        from academics.models import StudentSession
-
-        # Get all students enrolled in this subject's class session
-        student_sessions = StudentSession.objects.filter(
-            class_session=self.subject.class_session,
-            is_active=True
-        ).select_related('student')
-
-        # Filter students by department for SS classes with specific departments
-        relevant_students = []
-        for student_session in student_sessions:
-            student = student_session.student
-
-            # If it's SS class and subject has specific department, filter by student department
-            if (self.subject.class_session.classroom and
-                self.subject.class_session.classroom.name.startswith('S.S.S.') and
-                self.subject.department != 'General' and
-                student.department != self.subject.department):
-                continue  # Skip students not in this department
-
-            relevant_students.append(student)
-
-        # Bulk create notification status records for students and their parents
-        notification_statuses = []
-        for student in relevant_students:
-            # Add notification for student
-            notification_statuses.append(
-                NotificationStatus(
-                    user=student,
-                    activity_log=self,
-                    is_read=False
-                )
-            )
-
-            # Add notifications for all parents of this student
-            parents = student.parents.all()
-            for parent in parents:
-                notification_statuses.append(
-                    NotificationStatus(
-                        user=parent,
-                        activity_log=self,
-                        is_read=False
-                    )
-                )
-
-        if notification_statuses:
-            NotificationStatus.objects.bulk_create(
-                notification_statuses,
-                ignore_conflicts=True  # Avoid duplicates
-            )
+        from .notification_fanout import fan_out
+        fan_out(self)
     
     def get_notification_status_for_user(self, user):
         """Get notification status for a specific user"""
@@ -220,6 +169,10 @@ class NotificationStatus(models.Model):
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    email_pending = models.BooleanField(
+        default=False,
+        help_text="Waiting to be included in the recipient's next notification digest email"
+    )
     
     class Meta:
         unique_together = ('user', 'activity_log')
@@ -227,6 +180,7 @@ class NotificationStatus(models.Model):
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['user', 'activity_log']),
             models.Index(fields=['activity_log', 'is_read']),
+            models.Index(fields=['email_pending', 'user']),
         ]
     
     def __str__(self):
@@ -321,12 +275,112 @@ class Notification(models.Model):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.is_read:
+            from .notification_counters import adjust
             self.is_read = True
             self.read_at = timezone.now()
             self.save(update_fields=['is_read', 'read_at'])
+            adjust([self.recipient_id], unread_direct=-1)
 
     def mark_popup_shown(self):
         """Mark popup as shown"""
         if not self.is_popup_shown:
+            from .notification_counters import adjust
             self.is_popup_shown = True
-            self.save(update_fields=['is_popup_shown'])
\ No newline at end of file
+            self.save(update_fields=['is_popup_shown'])
+            adjust([self.recipient_id], pending_popups=-1)
+
+
+class NotificationCounter(models.Model):
+    """
+    Precomputed notification badge counts for one user (see logs/notification_counters.py).
+    A missing row means "not counted yet"; it is rebuilt from the notification
+    tables on the next read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread_activity = models.PositiveIntegerField(default=0, help_text="Unread teacher content notifications (admins: today's)")
+    unread_direct = models.PositiveIntegerField(default=0, help_text="Unread direct notifications")
+    pending_popups = models.PositiveIntegerField(default=0, help_text="Direct notifications whose popup was not shown yet")
+    activity_date = models.DateField(null=True, blank=True, help_text="Day unread_activity counts for admins and principals")
+    version = models.BigIntegerField(default=0, help_text="Changes whenever a count changes (used for the ETag)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - activity {self.unread_activity}, direct {self.unread_direct}, popups {self.pending_popups}"
+
+
+class LiveEvent(models.Model):
+    """
+    A live notification event relayed between worker processes by
+    live_events.DatabaseBroker (only used when LIVE_EVENTS_BROKER selects it).
+    Rows live for a few minutes; every worker's poller delivers them to its
+    own SSE streams.
+    """
+    user_ids = models.JSONField(help_text="Recipients of the event")
+    event = models.CharField(max_length=30)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event} for {len(self.user_ids)} user(s) at {self.created_at}"
+
+
+class EmailOutbox(models.Model):
+    """
+    A rendered email waiting to be delivered by the outbox drain worker
+    (see logs/email_outbox.py). Requests only insert rows here, so sending
+    to hundreds of recipients never blocks on the email provider.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SKIPPED, 'Skipped'),
+    ]
+
+    school = models.ForeignKey(
+        School,
+        on_delete=models.CASCADE,
+        related_name='outbox_emails',
+        null=True,
+        blank=True,
+        help_text="School whose daily email quota this message counts against"
+    )
+    recipient = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_emails')
+    to_email = models.EmailField()
+    to_name = models.CharField(max_length=200, blank=True)
+    sender_name = models.CharField(max_length=200)
+    sender_email = models.EmailField()
+    subject = models.CharField(max_length=500)
+    html_body = models.TextField()
+
+    # Delivery state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    quota_reserved = models.BooleanField(default=False, help_text="Daily quota was reserved when the email was queued")
+    claim_token = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['claim_token']),
+            models.Index(fields=['school', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
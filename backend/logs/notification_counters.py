@@ -0,0 +1,215 @@
+"""
+Per-user notification badge counters.
+
+The bell badge polls for three numbers: unread teacher content notifications
+(for admins and principals: today's content notifications for their school),
+unread direct notifications and direct notifications whose popup has not been
+shown. Each user's counts are kept in one NotificationCounter row, so a poll
+is one primary-key query. The row is read on every poll rather than cached:
+with the default per-process cache, another worker or the scheduler could
+change the counts without this process seeing it, and a stale version would
+answer the poll with 304 and hide new popups.
+
+The counts are maintained where notifications are written:
+
+- fan-out of a content notification (notification_fanout.py) adds one to the
+  recipients' and the school admins' activity count with one UPDATE;
+- direct notifications add to the recipient's counts when created
+  (post_save signal, or record_direct_notifications() after bulk_create), and
+  subtract when read, popup-shown or deleted;
+- marking content notifications read (utils.mark_notifications_read) recounts
+  the user's row, since what a student can see depends on their enrolment.
+
+Changes that affect what a student can see (enrolment, department) simply
+drop the row (invalidate); it is recounted from the tables on the next read.
+version changes on every write and feeds the summary endpoint's ETag. Every
+change is also pushed to the user's live stream as a 'counts' event
+(live_events.py).
+"""
+
+import time
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .live_events import publish
+
+COUNTER_FIELDS = ('unread_activity', 'unread_direct', 'pending_popups')
+ADMIN_ROLES = ('admin', 'principal')
+ADMIN_ACTIVITY_TYPES = ['content_created', 'content_updated', 'content_deleted']
+
+_UPDATE_CHUNK = 500
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _today():
+    return timezone.now().date()
+
+
+def _snapshot(counter):
+    snapshot = {field: getattr(counter, field) for field in COUNTER_FIELDS}
+    snapshot['activity_date'] = counter.activity_date
+    snapshot['version'] = counter.version
+    return snapshot
+
+
+def admin_activity_today(school_id):
+    """Content notifications from a school's teachers since midnight (the admin 'unread' count)."""
+    from .models import ActivityLog
+
+    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return ActivityLog.objects.filter(
+        is_notification=True,
+        activity_type__in=ADMIN_ACTIVITY_TYPES,
+        user__school_id=school_id,
+        timestamp__gte=today_start,
+    ).count()
+
+
+def recount(user, notify=False):
+    """
+    Recompute a user's counters from the notification tables and store them.
+    With notify the new counts are pushed to the user's live stream.
+    """
+    from .models import Notification, NotificationCounter
+    from .utils import get_student_notifications_queryset, unread_notifications
+
+    if user.role == 'student':
+        unread_activity = unread_notifications(get_student_notifications_queryset(user), user).count()
+    elif user.role in ADMIN_ROLES and user.school_id:
+        unread_activity = admin_activity_today(user.school_id)
+    else:
+        unread_activity = 0
+
+    direct = Notification.objects.filter(recipient=user).aggregate(
+        unread=Count('id', filter=Q(is_read=False)),
+        popups=Count('id', filter=Q(is_popup_shown=False)),
+    )
+    counter, _ = NotificationCounter.objects.update_or_create(
+        user=user,
+        defaults={
+            'unread_activity': unread_activity,
+            'unread_direct': direct['unread'],
+            'pending_popups': direct['popups'],
+            'activity_date': _today(),
+            'version': _new_version(),
+        },
+    )
+    snapshot = _snapshot(counter)
+    if notify:
+        publish([user.id], 'counts', {'counts': {field: snapshot[field] for field in COUNTER_FIELDS}})
+    return snapshot
+
+
+def get_counters(user):
+    """
+    The user's badge counts: {'unread_activity', 'unread_direct', 'pending_popups', 'version'}.
+    Read from the user's counter row; counted from the tables only when the user has no row yet.
+    """
+    from .models import NotificationCounter
+
+    counter = NotificationCounter.objects.filter(user_id=user.id).first()
+    snapshot = _snapshot(counter) if counter is not None else recount(user)
+
+    counts = {field: snapshot[field] for field in COUNTER_FIELDS}
+    # An admin's activity count is "today's"; it starts again from zero at midnight
+    if user.role in ADMIN_ROLES and snapshot['activity_date'] != _today():
+        counts['unread_activity'] = 0
+    counts['version'] = snapshot['version']
+    return counts
+
+
+def adjust(user_ids, **deltas):
+    """
+    Add deltas (e.g. unread_direct=1, pending_popups=-1) to existing counter rows
+    with one UPDATE per chunk; counts never go below zero. Users without a row are
+    counted from the tables on their next read, which includes the change.
+    """
+    from .models import NotificationCounter
+
+    user_ids = list(set(user_ids))
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not user_ids or not deltas:
+        return
+    updates = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    for start in range(0, len(user_ids), _UPDATE_CHUNK):
+        NotificationCounter.objects.filter(user_id__in=user_ids[start:start + _UPDATE_CHUNK]).update(
+            version=_new_version(), updated_at=timezone.now(), **updates
+        )
+    publish(user_ids, 'counts', {'delta': deltas})
+
+
+def invalidate(user_ids):
+    """Drop counters that can no longer be adjusted incrementally; they are recounted on the next read."""
+    from .models import NotificationCounter
+
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return
+    for start in range(0, len(user_ids), _UPDATE_CHUNK):
+        NotificationCounter.objects.filter(user_id__in=user_ids[start:start + _UPDATE_CHUNK]).delete()
+    publish(user_ids, 'counts', {'stale': True})
+
+
+def record_content_notification(activity_log, student_ids):
+    """
+    Count a fanned-out content notification: one more unread for the students who
+    can see it, and one more of today's for the admins and principals of the school.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import NotificationCounter
+
+    if activity_log.activity_type in ('content_created', 'content_updated'):
+        adjust(student_ids, unread_activity=1)
+
+    school_id = activity_log.user.school_id if activity_log.user else None
+    if not school_id or activity_log.activity_type not in ADMIN_ACTIVITY_TYPES:
+        return
+    admin_ids = list(get_user_model().objects.filter(
+        school_id=school_id, role__in=ADMIN_ROLES
+    ).values_list('id', flat=True))
+    if not admin_ids:
+        return
+    today = _today()
+    NotificationCounter.objects.filter(user_id__in=admin_ids).update(
+        unread_activity=Case(When(activity_date=today, then=F('unread_activity') + 1), default=Value(1)),
+        activity_date=today,
+        version=_new_version(),
+        updated_at=timezone.now(),
+    )
+    publish(admin_ids, 'counts', {'delta': {'unread_activity': 1}})
+
+
+def record_direct_notifications(notifications):
+    """Count newly created direct notifications (call after bulk_create, which sends no signals)."""
+    per_user = defaultdict(lambda: [0, 0])
+    for notification in notifications:
+        counts = per_user[notification.recipient_id]
+        counts[0] += 0 if notification.is_read else 1
+        counts[1] += 0 if notification.is_popup_shown else 1
+
+    # Users receiving the same number of notifications share one UPDATE
+    groups = defaultdict(list)
+    for user_id, (unread, popups) in per_user.items():
+        groups[(unread, popups)].append(user_id)
+    for (unread, popups), user_ids in groups.items():
+        adjust(user_ids, unread_direct=unread, pending_popups=popups)
+
+
+def direct_notification_removed(notification):
+    """Take a deleted direct notification out of its recipient's counts."""
+    adjust(
+        [notification.recipient_id],
+        unread_direct=0 if notification.is_read else -1,
+        pending_popups=0 if notification.is_popup_shown else -1,
+    )
+
+
+def etag_for(user, counts):
+    """Strong ETag for a user's badge counts (the date covers an admin's midnight reset)."""
+    return f'"{user.id}-{counts["version"]}-{_today().isoformat()}"'
@@ -0,0 +1,181 @@
+"""
+Set-based fan-out of teacher content notifications.
+
+When a teacher uploads, updates or deletes content, fan_out() works out who
+should see it - the active students of the subject's class (only the subject's
+department in S.S.S. classes, unless the subject is General) and their parents -
+with two queries, and writes every NotificationStatus row in one bulk insert.
+
+The new rows are flagged email_pending. Emails are not sent per row: the
+digest job (queue_digest_emails, run by run_scheduler every
+NOTIFICATION_DIGEST_MINUTES) gathers everything pending for a user into one
+digest email and queues it in the email outbox (email_outbox.py).
+
+Read paths use the same department rule as a SQL filter (hidden_from_department)
+and never create status rows; a notification without a status row is unread.
+Badge counters (notification_counters.py) are bumped for the students and the
+school's admins in the same pass, and the recipients' live streams get an
+'activity' event (live_events.py).
+"""
+
+import logging
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from .live_events import publish_activity
+from .notification_counters import record_content_notification
+
+logger = logging.getLogger(__name__)
+
+# Senior secondary classes, where departmental subjects only reach that department
+SS_CLASS_PREFIX = 'S.S.S.'
+
+DIGEST_USERS_PER_BATCH = 500
+
+_DIGEST_VERBS = {
+    'content_created': 'New',
+    'content_updated': 'Updated',
+    'content_deleted': 'Removed',
+}
+
+
+def hidden_from_department(department):
+    """
+    Q over ActivityLog matching notifications a student of `department` must not
+    see: departmental subjects of S.S.S. classes outside their department.
+    """
+    return (
+        Q(subject__class_session__classroom__name__startswith=SS_CLASS_PREFIX)
+        & ~Q(subject__department='General')
+        & ~Q(subject__department=department)
+    )
+
+
+def student_recipients(activity_log):
+    """Active students of the subject's class session who should see the notification."""
+    from academics.models import StudentSession
+
+    subject = activity_log.subject
+    class_session = subject.class_session
+    sessions = StudentSession.objects.filter(class_session=class_session, is_active=True)
+
+    classroom = class_session.classroom
+    if classroom and classroom.name.startswith(SS_CLASS_PREFIX) and subject.department != 'General':
+        sessions = sessions.filter(student__department=subject.department)
+    return sessions.values_list('student_id', flat=True).distinct()
+
+
+def fan_out(activity_log, email=True):
+    """
+    Create the NotificationStatus rows for a content notification: one query
+    for the students, one for their parents, one bulk insert. Returns the
+    number of recipients. With email=False the rows are not queued for the
+    digest (backfills).
+    """
+    from .models import NotificationStatus
+
+    if not activity_log.is_notification or not activity_log.subject:
+        return 0
+
+    User = get_user_model()
+    student_ids = set(student_recipients(activity_log))
+    parent_ids = set(
+        User.objects.filter(children__id__in=student_ids).values_list('id', flat=True)
+    ) if student_ids else set()
+
+    recipients = student_ids | parent_ids
+    NotificationStatus.objects.bulk_create(
+        [
+            NotificationStatus(user_id=user_id, activity_log=activity_log, is_read=False, email_pending=email)
+            for user_id in recipients
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,  # Avoid duplicates
+    )
+    if email:
+        record_content_notification(activity_log, student_ids)
+        publish_activity(activity_log, recipients)
+    return len(recipients)
+
+
+# ============================================================================
+# DIGEST EMAILS
+# ============================================================================
+
+def _digest_entry(activity):
+    lines = [activity.action]
+    subject = activity.subject
+    if subject:
+        lines.append(f"Subject: {subject.name}")
+        class_session = subject.class_session
+        if class_session:
+            if class_session.classroom:
+                lines.append(f"Class: {class_session.classroom.name}")
+            lines.append(f"Academic Year: {class_session.academic_year}")
+            lines.append(f"Term: {class_session.term}")
+    return '\n'.join(lines)
+
+
+def render_digest(activities):
+    """Title and message of one user's digest email for a list of ActivityLogs (oldest first)."""
+    if len(activities) == 1:
+        activity = activities[0]
+        verb = _DIGEST_VERBS.get(activity.activity_type, 'New')
+        title = f"{verb} {activity.content_type or 'content'}: {activity.content_title}"
+    else:
+        title = f"{len(activities)} new updates in your classes"
+    message = '\n\n'.join(_digest_entry(activity) for activity in activities)
+    return title, message
+
+
+def queue_digest_emails():
+    """
+    Queue one digest email per user with pending content notifications and clear
+    the pending flag, in batches of DIGEST_USERS_PER_BATCH users. Each batch is
+    queued and cleared in one transaction. Returns outbox counts.
+    """
+    from .email_outbox import queue_user_emails
+    from .models import NotificationStatus
+
+    User = get_user_model()
+    stats = {'users': 0, 'queued': 0, 'no_email': 0}
+    user_ids = list(
+        NotificationStatus.objects.filter(email_pending=True)
+        .order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+
+    for start in range(0, len(user_ids), DIGEST_USERS_PER_BATCH):
+        batch_ids = user_ids[start:start + DIGEST_USERS_PER_BATCH]
+        with transaction.atomic():
+            pending = list(
+                NotificationStatus.objects.filter(email_pending=True, user_id__in=batch_ids)
+                .select_related('activity_log__subject__class_session__classroom')
+                .order_by('user_id', 'activity_log__timestamp', 'id')
+            )
+            users = User.objects.select_related('school').in_bulk(batch_ids)
+
+            by_user = defaultdict(list)
+            for notification_status in pending:
+                by_user[notification_status.user_id].append(notification_status.activity_log)
+
+            messages = []
+            for user_id, activities in by_user.items():
+                user = users.get(user_id)
+                if user is None:
+                    continue
+                title, message = render_digest(activities)
+                messages.append((user, title, message, 'medium'))
+
+            queued = queue_user_emails(messages)
+            NotificationStatus.objects.filter(id__in=[s.id for s in pending]).update(email_pending=False)
+
+        stats['users'] += len(by_user)
+        stats['queued'] += queued['queued']
+        stats['no_email'] += queued['no_email']
+
+    if stats['users']:
+        logger.info(f"Notification digests queued: {stats}")
+    return stats
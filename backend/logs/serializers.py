@@ -60,29 +60,8 @@ class AdminNotificationSerializer(ActivityLogSerializer):
         if not obj.subject or not obj.subject.class_session:
             return 0
         
-        from academics.models import StudentSession
-        
-        # Get all students in the class session
-        student_sessions = StudentSession.objects.filter(
-            class_session=obj.subject.class_session,
-            is_active=True
-        )
-        
-        # Filter by department for SS classes
-        count = 0
-        for student_session in student_sessions:
-            student = student_session.student
-            
-            # If it's SS class and subject has specific department, filter by student department
-            if (obj.subject.class_session.classroom and 
-                obj.subject.class_session.classroom.name.startswith('S.S.S.') and 
-                obj.subject.department != 'General' and 
-                student.department != obj.subject.department):
-                continue
-            
-            count += 1
-        
-        return count
+        from .notification_fanout import student_recipients
+        return student_recipients(obj).count()
 
 
 class StudentNotificationSerializer(ActivityLogSerializer):
@@ -95,44 +74,34 @@ class StudentNotificationSerializer(ActivityLogSerializer):
         model = ActivityLog
         fields = ActivityLogSerializer.Meta.fields + ['is_new', 'read_status', 'teacher_name']
     
-    def get_is_new(self, obj):
-        """Check if this notification is new for the current user"""
+    def _get_status(self, obj):
+        """The user's NotificationStatus, from the view's prefetched 'statuses' when given"""
+        statuses = self.context.get('statuses')
+        if statuses is not None:
+            return statuses.get(obj.id)
         request = self.context.get('request')
         if request and request.user:
-            try:
-                notification_status = NotificationStatus.objects.get(
-                    user=request.user,
-                    activity_log=obj
-                )
-                return not notification_status.is_read
-            except NotificationStatus.DoesNotExist:
-                return True  # If no status exists, it's new
-        return True
+            return NotificationStatus.objects.filter(user=request.user, activity_log=obj).first()
+        return None
+
+    def get_is_new(self, obj):
+        """Check if this notification is new for the current user"""
+        notification_status = self._get_status(obj)
+        return notification_status is None or not notification_status.is_read  # If no status exists, it's new
     
     def get_read_status(self, obj):
         """Get detailed read status for the current user"""
-        request = self.context.get('request')
-        if request and request.user:
-            try:
-                notification_status = NotificationStatus.objects.get(
-                    user=request.user,
-                    activity_log=obj
-                )
-                return {
-                    'is_read': notification_status.is_read,
-                    'read_at': notification_status.read_at,
-                    'created_at': notification_status.created_at
-                }
-            except NotificationStatus.DoesNotExist:
-                return {
-                    'is_read': False,
-                    'read_at': None,
-                    'created_at': None
-                }
+        notification_status = self._get_status(obj)
+        if notification_status is None:
+            return {
+                'is_read': False,
+                'read_at': None,
+                'created_at': None
+            }
         return {
-            'is_read': False,
-            'read_at': None,
-            'created_at': None
+            'is_read': notification_status.is_read,
+            'read_at': notification_status.read_at,
+            'created_at': notification_status.created_at
         }
     
     def get_teacher_name(self, obj):
@@ -0,0 +1,176 @@
+"""
+Server-sent event stream of live notifications (ASGI only).
+
+backend/asgi.py routes GET /api/logs/notifications/stream/ (and the legacy
+/logs/ prefix) here instead of through Django, so an idle connection holds no
+thread and no database connection, only a small buffer of pending events
+(live_events.py).
+
+Browsers' EventSource cannot send headers, so the JWT access token may be
+passed as ?token=... as well as in the Authorization header. The stream starts
+with a 'counts' event holding the user's badge counts, then relays the user's
+events as they are published. A comment line is sent every
+LIVE_EVENTS_HEARTBEAT_SECONDS to keep proxies from closing an idle connection,
+and the stream ends when the access token expires; EventSource reconnects on
+its own (the client should refresh the token first).
+"""
+
+import asyncio
+import logging
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .live_events import format_event, get_broker
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATHS = ('/api/logs/notifications/stream/', '/logs/notifications/stream/')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin-1')
+    if origin and origin in _setting('CORS_ALLOWED_ORIGINS', []):
+        return [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+    return []
+
+
+async def _respond(send, scope, status, body=b'', extra_headers=()):
+    headers = [(b'content-type', b'application/json')] + _cors_headers(scope) + list(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _token_from_scope(scope):
+    token = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token', [''])[0]
+    if not token:
+        authorization = dict(scope.get('headers', [])).get(b'authorization', b'').decode('latin-1')
+        if authorization.lower().startswith('bearer '):
+            token = authorization[7:].strip()
+    return token
+
+
+def _authenticate(token):
+    """(user, token expiry as a UNIX timestamp) for a valid access token, else (None, None)."""
+    from django.db import close_old_connections
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+    close_old_connections()
+    try:
+        authentication = JWTAuthentication()
+        validated = authentication.get_validated_token(token)
+        user = authentication.get_user(validated)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    finally:
+        close_old_connections()
+    return user, validated.get('exp')
+
+
+def _initial_counts(user):
+    from django.db import close_old_connections
+    from .notification_counters import get_counters
+
+    try:
+        counts = get_counters(user)
+    finally:
+        close_old_connections()
+    return {field: value for field, value in counts.items() if field != 'version'}
+
+
+async def stream(scope, receive, send, user, expires_at=None, initial_counts=None):
+    """
+    Serve an authenticated user's event stream until the client disconnects or
+    the token expires. initial_counts skips the counter lookup (load tests).
+    """
+    broker = get_broker()
+    subscription = broker.subscribe(user.id)
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                subscription.close()
+                return
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        if initial_counts is None:
+            initial_counts = await sync_to_async(_initial_counts)(user)
+        heartbeat = _setting('LIVE_EVENTS_HEARTBEAT_SECONDS', 20)
+        await send({
+            'type': 'http.response.body',
+            'body': f"retry: {_setting('LIVE_EVENTS_RETRY_MS', 5000)}\n\n".encode() + format_event('counts', {'counts': initial_counts}),
+            'more_body': True,
+        })
+
+        while True:
+            timeout = heartbeat
+            if expires_at is not None:
+                timeout = min(timeout, expires_at - time.time())
+                if timeout <= 0:
+                    break
+            bodies = await subscription.wait(timeout)
+            if subscription.closed:
+                break
+            # Events that arrived together go out in one write; none means a heartbeat
+            body = b''.join(bodies) if bodies else b': ping\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        if not watcher.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # Client went away mid-write
+    finally:
+        watcher.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def notification_stream(scope, receive, send):
+    """ASGI application for the notification event stream."""
+    if scope['method'] == 'OPTIONS':
+        await _respond(send, scope, 204, extra_headers=[
+            (b'access-control-allow-methods', b'GET, OPTIONS'),
+            (b'access-control-allow-headers', b'authorization, accept, cache-control, last-event-id'),
+        ])
+        return
+    if scope['method'] != 'GET':
+        await _respond(send, scope, 405, b'{"detail": "Method not allowed."}')
+        return
+
+    token = _token_from_scope(scope)
+    if not token:
+        await _respond(send, scope, 401, b'{"detail": "Authentication credentials were not provided."}')
+        return
+    user, expires_at = await sync_to_async(_authenticate)(token)
+    if user is None:
+        await _respond(send, scope, 401, b'{"detail": "Given token not valid for any token type"}')
+        return
+
+    if get_broker().connection_count() >= _setting('LIVE_EVENTS_MAX_CONNECTIONS', 5000):
+        logger.warning("Notification stream refused: worker at LIVE_EVENTS_MAX_CONNECTIONS")
+        await _respond(send, scope, 503, b'{"detail": "Too many open streams, retry later."}',
+                       extra_headers=[(b'retry-after', b'10')])
+        return
+
+    await stream(scope, receive, send, user, expires_at=expires_at)
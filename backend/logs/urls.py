@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
     ActivityLogListView, AdminNotificationsView, StudentNotificationsView,
-    NotificationSummaryView, MarkNotificationReadView, MarkAllNotificationsReadView,
+    NotificationSummaryView, NotificationCountsView, MarkNotificationReadView, MarkAllNotificationsReadView,
     StudentSubjectNotificationsView, NotificationPreferencesView,
     NotificationPreferenceDetailView, BulkMarkNotificationsReadView, NotificationDetailView,
     DirectNotificationsView, PendingPopupNotificationsView, MarkPopupShownView,
@@ -21,6 +21,7 @@ urlpatterns = [
 
     # Notification summary for current user
     path('notifications/summary/', NotificationSummaryView.as_view(), name='notification-summary'),
+    path('notifications/counts/', NotificationCountsView.as_view(), name='notification-counts'),
 
     # Notification detail view
     path('notifications/<int:notification_id>/detail/', NotificationDetailView.as_view(), name='notification-detail'),
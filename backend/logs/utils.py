@@ -1,8 +1,11 @@
 # utils.py
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q, Count, Exists, OuterRef
 from django.utils import timezone
 from datetime import timedelta
 from .models import ActivityLog, NotificationStatus
+from .notification_counters import get_counters, invalidate, recount
+from .notification_fanout import fan_out, hidden_from_department
 from academics.models import StudentSession
 
 
@@ -10,41 +13,78 @@ def get_student_notifications_queryset(student):
     """
     Get all notifications relevant to a specific student
     """
-    # Get all subjects the student is enrolled in (active sessions)
-    student_sessions = StudentSession.objects.filter(
+    # Class sessions the student is enrolled in (active sessions)
+    class_session_ids = StudentSession.objects.filter(
         student=student,
         is_active=True
-    ).select_related('class_session')
+    ).values('class_session_id')
 
-    # Get the class sessions this student is in
-    class_session_ids = student_sessions.values_list('class_session_id', flat=True)
-
-    # Get notifications for subjects in those class sessions
-    notifications = ActivityLog.objects.filter(
+    # Notifications for subjects in those class sessions, minus other departments' SS subjects
+    return ActivityLog.objects.filter(
         is_notification=True,
         activity_type__in=['content_created', 'content_updated'],
         subject__class_session_id__in=class_session_ids
-    ).select_related('user', 'subject__class_session__classroom')
-    
-    # Filter by department for SS classes
-    filtered_notifications = []
-    for notification in notifications:
-        subject = notification.subject
-        
-        # Check if student should see this notification based on department
-        if (subject and subject.class_session.classroom and 
-            subject.class_session.classroom.name.startswith('S.S.S.') and 
-            subject.department != 'General' and 
-            student.department != subject.department):
-            continue
-        
-        filtered_notifications.append(notification.id)
-    
-    return ActivityLog.objects.filter(
-        id__in=filtered_notifications
+    ).exclude(
+        hidden_from_department(student.department)
     ).order_by('-timestamp')
 
 
+def unread_notifications(queryset, user):
+    """
+    Notifications in queryset the user has not read. Status rows are written at
+    fan-out time, so a notification without one simply counts as unread.
+    """
+    return queryset.exclude(
+        Exists(NotificationStatus.objects.filter(user=user, activity_log=OuterRef('pk'), is_read=True))
+    )
+
+
+def get_notification_statuses(user, notifications):
+    """{activity_log_id: NotificationStatus} for a page of notifications, in one query"""
+    return {
+        notification_status.activity_log_id: notification_status
+        for notification_status in NotificationStatus.objects.filter(
+            user=user,
+            activity_log_id__in=[notification.id for notification in notifications]
+        )
+    }
+
+
+def mark_notifications_read(user, notifications):
+    """
+    Mark notifications (a queryset or list of ActivityLogs) as read for a user:
+    one update for existing status rows and one insert for missing ones. Read
+    notifications are dropped from the pending digest email and the user's
+    badge counters are recounted.
+
+    Returns:
+        int: Number of notifications that were unread
+    """
+    if hasattr(notifications, 'values_list'):
+        notification_ids = set(notifications.values_list('id', flat=True))
+    else:
+        notification_ids = {notification.id for notification in notifications}
+    if not notification_ids:
+        return 0
+
+    now = timezone.now()
+    statuses = NotificationStatus.objects.filter(user=user, activity_log_id__in=notification_ids)
+    with transaction.atomic():
+        existing = set(statuses.values_list('activity_log_id', flat=True))
+        updated = statuses.filter(is_read=False).update(is_read=True, read_at=now, email_pending=False)
+        missing = notification_ids - existing
+        NotificationStatus.objects.bulk_create(
+            [
+                NotificationStatus(user=user, activity_log_id=notification_id, is_read=True, read_at=now)
+                for notification_id in missing
+            ],
+            ignore_conflicts=True
+        )
+    if updated or missing:
+        recount(user, notify=True)
+    return updated + len(missing)
+
+
 def get_admin_notifications_queryset():
     """
     Get all notifications relevant to admins
@@ -64,26 +104,12 @@ def get_notification_summary_for_user(user):
     if user.role == 'admin':
         queryset = get_admin_notifications_queryset()
         
-        # For admins, consider notifications from today as "unread"
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        unread_count = queryset.filter(timestamp__gte=today_start).count()
+        # For admins, notifications from today count as "unread" (badge counter)
+        unread_count = get_counters(user)['unread_activity']
         
     elif user.role == 'student':
         queryset = get_student_notifications_queryset(user)
-        
-        # Ensure notification status records exist
-        for notification in queryset:
-            NotificationStatus.objects.get_or_create(
-                user=user,
-                activity_log=notification,
-                defaults={'is_read': False}
-            )
-        
-        unread_count = NotificationStatus.objects.filter(
-            user=user,
-            activity_log__in=queryset,
-            is_read=False
-        ).count()
+        unread_count = get_counters(user)['unread_activity']
         
     else:
         queryset = ActivityLog.objects.none()
@@ -130,21 +156,7 @@ def mark_notifications_as_read_for_user(user, notification_ids=None):
     if notification_ids:
         queryset = queryset.filter(id__in=notification_ids)
     
-    updated_count = 0
-    for notification in queryset:
-        notification_status, created = NotificationStatus.objects.get_or_create(
-            user=user,
-            activity_log=notification,
-            defaults={'is_read': True, 'read_at': timezone.now()}
-        )
-        
-        if not created and not notification_status.is_read:
-            notification_status.mark_as_read()
-            updated_count += 1
-        elif created:
-            updated_count += 1
-    
-    return updated_count
+    return mark_notifications_read(user, queryset)
 
 
 def get_notification_analytics():
@@ -231,6 +243,9 @@ def cleanup_old_notifications(days_to_keep=90):
     
     # Count before deletion
     notifications_count = old_notifications.count()
+    affected_users = set(NotificationStatus.objects.filter(
+        activity_log__in=old_notifications, is_read=False
+    ).values_list('user_id', flat=True))
     statuses_count = NotificationStatus.objects.filter(
         activity_log__in=old_notifications
     ).count()
@@ -242,6 +257,7 @@ def cleanup_old_notifications(days_to_keep=90):
     
     # Delete old notifications
     old_notifications.delete()
+    invalidate(affected_users)
     
     return {
         'deleted_notifications': notifications_count,
@@ -252,26 +268,18 @@ def cleanup_old_notifications(days_to_keep=90):
 
 def ensure_notification_status_records():
     """
-    Ensure all students have notification status records for relevant notifications
-    This is useful for migration or fixing missing records
+    Ensure all students and parents have notification status records for relevant notifications
+    This is useful for migration or fixing missing records (no digest emails are queued)
     """
-    from users.models import CustomUser
-    
-    students = CustomUser.objects.filter(role='student')
-    created_count = 0
-    
-    for student in students:
-        # Get all notifications relevant to this student
-        notifications = get_student_notifications_queryset(student)
-        
-        for notification in notifications:
-            status, created = NotificationStatus.objects.get_or_create(
-                user=student,
-                activity_log=notification,
-                defaults={'is_read': False}
-            )
-            
-            if created:
-                created_count += 1
-    
-    return created_count
\ No newline at end of file
+    from .models import NotificationStatus
+
+    before = NotificationStatus.objects.count()
+    notifications = ActivityLog.objects.filter(
+        is_notification=True,
+        subject__isnull=False
+    ).select_related('subject__class_session__classroom')
+
+    for notification in notifications.iterator():
+        fan_out(notification, email=False)
+
+    return NotificationStatus.objects.count() - before
@@ -10,6 +10,11 @@ from .serializers import (
     StudentNotificationSerializer, NotificationStatusSerializer,
     NotificationSummarySerializer, NotificationPreferenceSerializer
 )
+from .notification_counters import etag_for, get_counters
+from .utils import (
+    get_notification_statuses, get_student_notifications_queryset,
+    mark_notifications_read, unread_notifications
+)
 from academics.models import StudentSession
 
 
@@ -122,53 +127,13 @@ class StudentNotificationsView(generics.ListAPIView):
         if user.role != 'student':
             return ActivityLog.objects.none()
 
-        # Get all subjects the student is enrolled in (active sessions)
-        student_sessions = StudentSession.objects.filter(
-            student=user,
-            is_active=True
-        ).select_related('class_session')
-
-        # Get the class sessions this student is in
-        class_session_ids = student_sessions.values_list('class_session_id', flat=True)
-
-        # Get notifications for subjects in those class sessions
-        notifications = ActivityLog.objects.filter(
-            is_notification=True,
-            activity_type__in=['content_created', 'content_updated'],
-            subject__class_session_id__in=class_session_ids
-        ).select_related(
+        return get_student_notifications_queryset(user).select_related(
             'user', 'subject__class_session__classroom'
         )
-        
-        # Filter by department for SS classes
-        filtered_notifications = []
-        for notification in notifications:
-            subject = notification.subject
-            
-            # Check if student should see this notification based on department
-            if (subject and subject.class_session.classroom and 
-                subject.class_session.classroom.name.startswith('S.S.S.') and 
-                subject.department != 'General' and 
-                user.department != subject.department):
-                continue
-            
-            filtered_notifications.append(notification.id)
-        
-        return ActivityLog.objects.filter(
-            id__in=filtered_notifications
-        ).order_by('-timestamp')
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         
-        # Ensure notification status records exist for all notifications
-        for notification in queryset:
-            NotificationStatus.objects.get_or_create(
-                user=request.user,
-                activity_log=notification,
-                defaults={'is_read': False}
-            )
-        
         # Apply filters
         content_type = request.query_params.get('content_type')
         subject_id = request.query_params.get('subject')
@@ -180,28 +145,24 @@ class StudentNotificationsView(generics.ListAPIView):
             queryset = queryset.filter(subject_id=subject_id)
         if unread_only:
             # Filter for unread notifications only
-            unread_notification_ids = NotificationStatus.objects.filter(
-                user=request.user,
-                activity_log__in=queryset,
-                is_read=False
-            ).values_list('activity_log_id', flat=True)
-            queryset = queryset.filter(id__in=unread_notification_ids)
+            queryset = unread_notifications(queryset, request.user)
         
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True, context={'request': request})
+            serializer = self.get_serializer(page, many=True, context={
+                'request': request, 'statuses': get_notification_statuses(request.user, page)
+            })
             return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
+        notifications = list(queryset)
+        serializer = self.get_serializer(notifications, many=True, context={
+            'request': request, 'statuses': get_notification_statuses(request.user, notifications)
+        })
         
         # Add summary data
-        total_notifications = queryset.count()
-        unread_count = NotificationStatus.objects.filter(
-            user=request.user,
-            activity_log__in=queryset,
-            is_read=False
-        ).count()
+        total_notifications = len(notifications)
+        unread_count = unread_notifications(queryset, request.user).count()
         
         content_summary = queryset.values('content_type').annotate(
             count=Count('id')
@@ -230,59 +191,20 @@ class NotificationSummaryView(APIView):
         user = request.user
 
         if user.role in ['admin', 'principal']:
-            # Admin and Principal see all content notifications
+            # Admin and Principal see all content notifications from their school's teachers
             queryset = ActivityLog.objects.filter(
                 is_notification=True,
-                activity_type__in=['content_created', 'content_updated', 'content_deleted']
+                activity_type__in=['content_created', 'content_updated', 'content_deleted'],
+                user__school_id=user.school_id
             ).select_related('user', 'subject')
 
-            # For admins and principals, consider notifications from today as "unread"
-            today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            unread_count = queryset.filter(timestamp__gte=today_start).count()
+            # For admins and principals, notifications from today count as "unread" (badge counter)
+            unread_count = get_counters(user)['unread_activity']
             
         elif user.role == 'student':
             # Students see notifications for their subjects
-            student_sessions = StudentSession.objects.filter(
-                student=user,
-                is_active=True
-            ).select_related('class_session')
-
-            class_session_ids = student_sessions.values_list('class_session_id', flat=True)
-
-            queryset = ActivityLog.objects.filter(
-                is_notification=True,
-                activity_type__in=['content_created', 'content_updated'],
-                subject__class_session_id__in=class_session_ids
-            ).select_related('user', 'subject')
-            
-            # Filter by department for SS classes
-            filtered_notifications = []
-            for notification in queryset:
-                subject = notification.subject
-                
-                if (subject and subject.class_session.classroom and 
-                    subject.class_session.classroom.name.startswith('S.S.S.') and 
-                    subject.department != 'General' and 
-                    user.department != subject.department):
-                    continue
-                
-                filtered_notifications.append(notification.id)
-            
-            queryset = ActivityLog.objects.filter(id__in=filtered_notifications)
-            
-            # Ensure notification status records exist
-            for notification in queryset:
-                NotificationStatus.objects.get_or_create(
-                    user=user,
-                    activity_log=notification,
-                    defaults={'is_read': False}
-                )
-            
-            unread_count = NotificationStatus.objects.filter(
-                user=user,
-                activity_log__in=queryset,
-                is_read=False
-            ).count()
+            queryset = get_student_notifications_queryset(user).select_related('user', 'subject')
+            unread_count = get_counters(user)['unread_activity']
             
         elif user.role == 'teacher':
             # Teachers might see notifications about their own activities or grading-related ones
@@ -319,6 +241,30 @@ class NotificationSummaryView(APIView):
         return Response(summary_data)
 
 
+class NotificationCountsView(APIView):
+    """
+    Badge counts for the current user, for the dashboard's notification bell.
+    Served from the precomputed counters with an ETag: a poll sending the last
+    ETag in If-None-Match gets 304 Not Modified until a count changes.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        counts = get_counters(request.user)
+        etag = etag_for(request.user, counts)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response({
+            'unread_activity': counts['unread_activity'],
+            'unread_direct': counts['unread_direct'],
+            'pending_popups': counts['pending_popups'],
+            'total_unread': counts['unread_activity'] + counts['unread_direct'],
+        }, headers=headers)
+
+
 class MarkNotificationReadView(APIView):
     """Mark a notification as read for the current user"""
     permission_classes = [permissions.IsAuthenticated]
@@ -329,14 +275,7 @@ class MarkNotificationReadView(APIView):
             
             # Only students have notification status tracking
             if request.user.role == 'student':
-                notification_status, created = NotificationStatus.objects.get_or_create(
-                    user=request.user,
-                    activity_log=activity_log,
-                    defaults={'is_read': True, 'read_at': timezone.now()}
-                )
-                
-                if not created:
-                    notification_status.mark_as_read()
+                mark_notifications_read(request.user, [activity_log])
                 
                 return Response({'message': 'Notification marked as read'})
             else:
@@ -357,49 +296,8 @@ class MarkAllNotificationsReadView(APIView):
         user = request.user
         
         if user.role == 'student':
-            # Get all notifications for student's subjects
-            student_sessions = StudentSession.objects.filter(
-                student=user,
-                is_active=True
-            ).select_related('class_session')
-
-            class_session_ids = student_sessions.values_list('class_session_id', flat=True)
-
-            notifications = ActivityLog.objects.filter(
-                is_notification=True,
-                activity_type__in=['content_created', 'content_updated'],
-                subject__class_session_id__in=class_session_ids
-            )
-            
-            # Filter by department for SS classes
-            filtered_notifications = []
-            for notification in notifications:
-                subject = notification.subject
-                
-                if (subject and subject.class_session.classroom and 
-                    subject.class_session.classroom.name.startswith('S.S.S.') and 
-                    subject.department != 'General' and 
-                    user.department != subject.department):
-                    continue
-                
-                filtered_notifications.append(notification.id)
-            
-            notifications = ActivityLog.objects.filter(id__in=filtered_notifications)
-            
-            # Mark all as read
-            updated_count = 0
-            for notification in notifications:
-                notification_status, created = NotificationStatus.objects.get_or_create(
-                    user=user,
-                    activity_log=notification,
-                    defaults={'is_read': True, 'read_at': timezone.now()}
-                )
-                
-                if not created and not notification_status.is_read:
-                    notification_status.mark_as_read()
-                    updated_count += 1
-                elif created:
-                    updated_count += 1
+            # Mark every notification for the student's subjects as read
+            updated_count = mark_notifications_read(user, get_student_notifications_queryset(user))
             
             return Response({
                 'message': f'Marked {updated_count} notifications as read'
@@ -433,29 +331,10 @@ class StudentSubjectNotificationsView(generics.ListAPIView):
         if not student_sessions.exists():
             return ActivityLog.objects.none()
         
-        # Get notifications for this specific subject
-        notifications = ActivityLog.objects.filter(
-            is_notification=True,
-            activity_type__in=['content_created', 'content_updated'],
+        # Get notifications for this specific subject (department rules apply)
+        return get_student_notifications_queryset(user).filter(
             subject_id=subject_id
         ).select_related('user', 'subject__class_session__classroom')
-        
-        # Check department filtering for SS classes
-        filtered_notifications = []
-        for notification in notifications:
-            subject = notification.subject
-            
-            if (subject and subject.class_session.classroom and 
-                subject.class_session.classroom.name.startswith('S.S.S.') and 
-                subject.department != 'General' and 
-                user.department != subject.department):
-                continue
-            
-            filtered_notifications.append(notification.id)
-        
-        return ActivityLog.objects.filter(
-            id__in=filtered_notifications
-        ).order_by('-timestamp')
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -470,26 +349,17 @@ class StudentSubjectNotificationsView(generics.ListAPIView):
                 }
             })
         
-        # Ensure notification status records exist
-        for notification in queryset:
-            NotificationStatus.objects.get_or_create(
-                user=request.user,
-                activity_log=notification,
-                defaults={'is_read': False}
-            )
-        
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
+        notifications = list(queryset)
+        serializer = self.get_serializer(notifications, many=True, context={
+            'request': request, 'statuses': get_notification_statuses(request.user, notifications)
+        })
         
-        unread_count = NotificationStatus.objects.filter(
-            user=request.user,
-            activity_log__in=queryset,
-            is_read=False
-        ).count()
+        unread_count = unread_notifications(queryset, request.user).count()
         
         return Response({
             'notifications': serializer.data,
             'summary': {
-                'total_notifications': queryset.count(),
+                'total_notifications': len(notifications),
                 'unread_count': unread_count
             }
         })
@@ -540,19 +410,7 @@ class BulkMarkNotificationsReadView(APIView):
             is_notification=True
         )
         
-        updated_count = 0
-        for notification in notifications:
-            notification_status, created = NotificationStatus.objects.get_or_create(
-                user=request.user,
-                activity_log=notification,
-                defaults={'is_read': True, 'read_at': timezone.now()}
-            )
-            
-            if not created and not notification_status.is_read:
-                notification_status.mark_as_read()
-                updated_count += 1
-            elif created:
-                updated_count += 1
+        updated_count = mark_notifications_read(request.user, notifications)
         
         return Response({
             'message': f'Marked {updated_count} notifications as read'
@@ -706,14 +564,8 @@ class NotificationDetailView(APIView):
             
             # Mark as read for students
             if user.role == 'student':
-                notification_status, created = NotificationStatus.objects.get_or_create(
-                    user=user,
-                    activity_log=notification,
-                    defaults={'is_read': True, 'read_at': timezone.now()}
-                )
-                
-                if not created and not notification_status.is_read:
-                    notification_status.mark_as_read()
+                mark_notifications_read(user, [notification])
+                notification_status = NotificationStatus.objects.get(user=user, activity_log=notification)
                 
                 response_data['read_status'] = {
                     'is_read': True,
@@ -760,8 +612,8 @@ class DirectNotificationsView(APIView):
             recipient=request.user
         ).order_by('-created_at')
 
-        # Count unread before slicing
-        unread_count = all_notifications.filter(is_read=False).count()
+        # Unread count from the badge counters
+        unread_count = get_counters(request.user)['unread_direct']
 
         # Now slice for display
         notifications = all_notifications[:50]
@@ -794,6 +646,10 @@ class PendingPopupNotificationsView(APIView):
     def get(self, request):
         from .models import Notification
 
+        # Nothing to show: answer from the badge counters without touching the table
+        if not get_counters(request.user)['pending_popups']:
+            return Response({'notifications': [], 'count': 0})
+
         # Get notifications that haven't been shown as popup yet
         pending_popups = Notification.objects.filter(
             recipient=request.user,
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FeeReceipt, FeeStructure, StudentFeeRecord, FeePaymentHistory, Announcement
+from .models import FeeReceipt, FeeStructure, StudentFeeRecord, FeePaymentHistory, Announcement, BackgroundJob, StoragePurge
 
 # Register your models here.
 
@@ -39,3 +39,20 @@ class AnnouncementAdmin(admin.ModelAdmin):
     filter_horizontal = ['specific_users', 'specific_classes', 'read_by']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['job_type', 'school', 'status', 'attempts', 'progress_current', 'progress_total', 'created_at', 'finished_at']
+    list_filter = ['status', 'job_type', 'created_at']
+    search_fields = ['school__name', 'school__slug', 'requested_by__username']
+    readonly_fields = ['id', 'created_at', 'started_at', 'finished_at', 'heartbeat_at']
+    exclude = ['upload']
+    ordering = ['-created_at']
+
+@admin.register(StoragePurge)
+class StoragePurgeAdmin(admin.ModelAdmin):
+    list_display = ['reason', 'school', 'status', 'keys_total', 'keys_deleted', 'keys_failed', 'attempts', 'seconds', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['reason', 'school__name', 'school__slug']
+    readonly_fields = ['created_at', 'finished_at']
+    ordering = ['-created_at']
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SchooladminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schooladmin'
+
+    def ready(self):
+        import schooladmin.signals  # noqa
@@ -0,0 +1,154 @@
+"""
+Attendance aggregation over schooladmin.AttendanceRecord, shared by the admin
+sync (attendance_sync.py), the student and parent attendance reports
+(users/views.py) and the proprietor dashboards (tenants/proprietor_views.py).
+
+Every figure comes from grouped queries whose cost does not depend on the
+number of students:
+
+- attendance_counts(): present/total per (student, class session), one query;
+- term_attendance(): the same rows turned into per-student rates, per-class
+  averages and the at-risk list, plus one query for the students' names;
+- recorded_days(), daily_counts(), term_totals(): distinct recorded dates
+  per class session, present/total per date, and per term;
+- student_days(): one student's attended and absent days in a class session.
+
+Rates are percentages of the records a student has (present / total * 100),
+as the dashboards computed them per student before.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, Min, Q
+
+from .models import AttendanceRecord
+
+
+def _records(class_session_ids):
+    return AttendanceRecord.objects.filter(class_session_id__in=list(class_session_ids))
+
+
+def attendance_counts(class_session_ids):
+    """{(student_id, class_session_id): (present, total)} from one aggregate query."""
+    rows = (
+        _records(class_session_ids)
+        .values('student_id', 'class_session_id')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(is_present=True)))
+        .order_by()
+    )
+    return {(r['student_id'], r['class_session_id']): (r['present'], r['total']) for r in rows}
+
+
+def term_attendance(class_sessions, threshold=None):
+    """
+    Per-student and per-class attendance for the given ClassSessions (with
+    their classroom loaded), in the order given.
+
+    Returns a dict with:
+    - students: {student_id, name, class_session_id, class_name, rate,
+      present_days, total_days} for every student with records, by class
+      session then student id;
+    - classes: {class_session, rate, student_count} for every class session
+      with records, rate being the mean of its students' rates;
+    - at_risk: the students below threshold, lowest rate first (empty
+      without a threshold).
+    """
+    from users.models import CustomUser
+
+    class_sessions = list(class_sessions)
+    counts = attendance_counts(cs.id for cs in class_sessions)
+    names = {
+        student_id: f"{first_name} {last_name}"
+        for student_id, first_name, last_name in CustomUser.objects.filter(
+            id__in={student_id for student_id, _ in counts}
+        ).values_list('id', 'first_name', 'last_name')
+    }
+
+    by_session = defaultdict(list)
+    for (student_id, class_session_id), (present, total) in counts.items():
+        if total > 0:
+            by_session[class_session_id].append((student_id, present, total))
+
+    students, classes = [], []
+    for cs in class_sessions:
+        rows = sorted(by_session.get(cs.id, []))
+        if not rows:
+            continue
+        rates = []
+        for student_id, present, total in rows:
+            rate = (present / total) * 100
+            rates.append(rate)
+            students.append({
+                'student_id': student_id,
+                'name': names.get(student_id, ''),
+                'class_session_id': cs.id,
+                'class_name': cs.classroom.name,
+                'rate': rate,
+                'present_days': present,
+                'total_days': total,
+            })
+        classes.append({'class_session': cs, 'rate': sum(rates) / len(rates), 'student_count': len(rates)})
+
+    at_risk = []
+    if threshold is not None:
+        at_risk = sorted((s for s in students if s['rate'] < threshold), key=lambda s: s['rate'])
+    return {'students': students, 'classes': classes, 'at_risk': at_risk}
+
+
+def recorded_days(class_session_ids):
+    """{class_session_id: number of distinct dates with records}."""
+    return dict(
+        _records(class_session_ids)
+        .values('class_session_id')
+        .annotate(days=Count('date', distinct=True))
+        .order_by()
+        .values_list('class_session_id', 'days')
+    )
+
+
+def daily_counts(class_session_ids):
+    """{date: (present, total)} over the class sessions, in date order."""
+    rows = (
+        _records(class_session_ids)
+        .values('date')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(is_present=True)))
+        .order_by('date')
+    )
+    return {r['date']: (r['present'], r['total']) for r in rows}
+
+
+def term_totals(school):
+    """{(academic_year, term): (present, total)} over all of the school's records."""
+    rows = (
+        AttendanceRecord.objects.filter(class_session__classroom__school=school)
+        .values('class_session__academic_year', 'class_session__term')
+        .annotate(total=Count('id'), present=Count('id', filter=Q(is_present=True)))
+        .order_by()
+    )
+    return {
+        (r['class_session__academic_year'], r['class_session__term']): (r['present'], r['total'])
+        for r in rows
+    }
+
+
+def student_days(student, class_session):
+    """
+    One student's attendance in a class session: the number of dates marked
+    present and marked absent, and the absent dates with when the first
+    absence that day was recorded, in date order.
+    """
+    rows = list(
+        AttendanceRecord.objects.filter(student=student, class_session=class_session)
+        .values('date')
+        .annotate(
+            present=Count('id', filter=Q(is_present=True)),
+            absent=Count('id', filter=Q(is_present=False)),
+            absent_recorded_at=Min('recorded_at', filter=Q(is_present=False)),
+        )
+        .order_by('date')
+    )
+    return {
+        'days_attended': sum(1 for r in rows if r['present']),
+        'days_not_attended': sum(1 for r in rows if r['absent']),
+        'absences': [(r['date'], r['absent_recorded_at']) for r in rows if r['absent']],
+    }
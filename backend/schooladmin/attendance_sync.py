@@ -0,0 +1,168 @@
+"""
+Batch sync of attendance records into GradeSummary.attendance_score.
+
+sync_attendance() handles any number of class sessions in a fixed number of
+queries, whatever the number of students and subjects:
+
+- one aggregate over AttendanceRecord for present/total per (student, class_session)
+  (attendance_stats.attendance_counts);
+- one read each of the subjects, enrolments and existing grade summaries;
+- one bulk_create for missing summaries (update_conflicts, so a row created
+  concurrently is updated instead of failing) and one bulk_update for
+  changed ones.
+
+Letter grades come from a LetterGradeTable built once for the grading scale.
+Rows are written in bulk, which skips GradeSummary.save() and its signals, so
+class rankings and readiness for the affected students, and the school's
+proprietor snapshots, are refreshed explicitly. The ranking refresh is deferred when the caller runs inside
+deferred_ranking_refresh().
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance_stats import attendance_counts
+from .models import GradeSummary, LetterGradeTable
+from .rankings import refresh_rankings_for
+from .readiness import refresh_readiness_for
+
+# Subject departments that apply to every student
+GENERAL_DEPARTMENTS = ('general', 'all', 'none')
+
+_WRITE_FIELDS = ['attendance_score', 'total_score', 'letter_grade', 'last_calculated']
+
+
+def _subject_applies(subject_department, student_department):
+    """Same rule the per-student sync used: departmental subjects only count for that department."""
+    subject_dept = str(subject_department or '').strip().lower()
+    if not subject_dept or subject_dept in GENERAL_DEPARTMENTS:
+        return True
+    return student_department is not None and student_department.lower() == str(subject_department).lower()
+
+
+def _attendance_score(present, total, weight):
+    """Attendance percentage scaled to the attendance component's weight, to 2 dp."""
+    attendance_percentage = (present / total) * 100
+    return Decimal(str(round((attendance_percentage / 100) * weight, 2)))
+
+
+def sync_attendance(grading_config, class_session_ids, reset_missing=True, match_departments=True):
+    """
+    Recompute attendance scores for every enrolled student x subject in the class sessions.
+
+    Students with no attendance records get a score of 0 when reset_missing is set,
+    otherwise their score is left alone. With match_departments, departmental subjects
+    only cover students of that department. Summaries with attendance_finalized are skipped.
+    Returns counts: updated, skipped, no_attendance, created.
+    """
+    from academics.models import StudentSession, Subject
+    from tenants.dashboard_cache import bump_on_commit
+
+    class_session_ids = list(class_session_ids)
+    letter_grades = LetterGradeTable(grading_config.grading_scale)
+    weight = grading_config.attendance_percentage
+
+    counts = attendance_counts(class_session_ids)
+
+    subjects_by_session = defaultdict(list)
+    for subject in Subject.objects.filter(class_session_id__in=class_session_ids).values(
+        'id', 'class_session_id', 'department'
+    ):
+        subjects_by_session[subject['class_session_id']].append(subject)
+
+    enrolments = StudentSession.objects.filter(class_session_id__in=class_session_ids).values_list(
+        'student_id', 'class_session_id', 'student__department'
+    )
+
+    existing = {
+        (s.student_id, s.subject_id): s
+        for s in GradeSummary.objects.filter(
+            grading_config=grading_config,
+            subject__class_session_id__in=class_session_ids,
+        ).only(
+            'id', 'student_id', 'subject_id', 'grading_config_id', 'attendance_score', 'assignment_score',
+            'test_score', 'exam_score', 'total_score', 'letter_grade', 'attendance_finalized',
+        )
+    }
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    changed_students = defaultdict(set)  # class_session_id -> student ids
+    stats = {'updated': 0, 'skipped': 0, 'no_attendance': 0, 'created': 0}
+    seen = set()
+
+    for student_id, class_session_id, student_department in enrolments:
+        present, total = counts.get((student_id, class_session_id), (0, 0))
+
+        for subject in subjects_by_session[class_session_id]:
+            if match_departments and not _subject_applies(subject['department'], student_department):
+                continue
+            key = (student_id, subject['id'])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            summary = existing.get(key)
+            is_new = summary is None
+            if is_new:
+                summary = GradeSummary(
+                    student_id=student_id,
+                    subject_id=subject['id'],
+                    grading_config=grading_config,
+                    attendance_score=Decimal('0'),
+                    assignment_score=Decimal('0'),
+                    test_score=Decimal('0'),
+                    exam_score=Decimal('0'),
+                )
+            elif summary.attendance_finalized:
+                stats['skipped'] += 1
+                continue
+
+            if total > 0:
+                score = _attendance_score(present, total, weight)
+                stats['updated'] += 1
+            else:
+                stats['no_attendance'] += 1
+                if not is_new and not reset_missing:
+                    continue
+                score = Decimal('0')
+
+            old_total = None if is_new else Decimal(str(summary.total_score))
+            if not is_new and Decimal(str(summary.attendance_score)) == score:
+                continue
+
+            summary.attendance_score = score
+            summary.total_score = summary.sum_component_scores()
+            summary.letter_grade = letter_grades.letter(summary.total_score)
+            summary.last_calculated = now
+            if is_new:
+                to_create.append(summary)
+            else:
+                to_update.append(summary)
+            if summary.total_score != old_total:
+                changed_students[class_session_id].add(student_id)
+
+    with transaction.atomic():
+        if to_create:
+            GradeSummary.objects.bulk_create(
+                to_create,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['student', 'subject', 'grading_config'],
+                update_fields=_WRITE_FIELDS,
+            )
+        if to_update:
+            GradeSummary.objects.bulk_update(to_update, _WRITE_FIELDS, batch_size=500)
+
+        for class_session_id, student_ids in changed_students.items():
+            refresh_rankings_for(grading_config.id, class_session_id, student_ids)
+
+        refresh_readiness_for(grading_config.id, {summary.student_id for summary in to_create + to_update})
+        if to_create or to_update:
+            bump_on_commit(grading_config.school_id)
+
+    stats['created'] = len(to_create)
+    return stats
@@ -0,0 +1,681 @@
+"""
+Incremental, compressed database backups and single-school restore.
+
+`backup_database --incremental` writes a snapshot to the backup storage (the
+private Spaces bucket when configured, like job files; MEDIA_ROOT otherwise)
+under BACKUP_STORAGE_PREFIX/snapshots/<id>/: one gzipped JSON Lines file per
+table with rows to write, a state file used to compute the next delta, and a
+manifest.json written last (a snapshot without one is incomplete and ignored).
+
+A full snapshot holds every row. Until the next full one is due
+(BACKUP_FULL_EVERY_DAYS) each snapshot is a delta holding only what changed
+since the previous snapshot. Tables with an integer key are split into blocks
+of BACKUP_BLOCK_SIZE key values:
+
+- Tables with an auto_now timestamp (updated_at, last_calculated...) keep the
+  row count and key sum of every block, from one GROUP BY in the database.
+  Blocks whose count or sum moved (inserts, deletes) are written whole; other
+  rows are written when their timestamp is past the previous snapshot's start,
+  less BACKUP_OVERLAP_SECONDS for transactions still open at the time. Work
+  done here is proportional to the churn. update() and bulk_update() skip
+  auto_now, so writers using them on these models set the timestamp themselves.
+- Other tables are read (not written) in full and keep a digest per block;
+  changed blocks are written whole. A table with UUID keys is a single block.
+
+A block written whole replaces its entire key range on restore, which is how
+deletions are carried. Every row starts with the id of the school it belongs
+to, found by following foreign keys to School, so restore_backup can rebuild
+one school from the chain of snapshots.
+"""
+
+import base64
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+BACKUP_APPS = ['tenants', 'users', 'academics', 'schooladmin', 'attendance', 'logs']
+
+# Queues, caches and one-time codes: rebuilt or irrelevant after a restore
+EXCLUDED_MODELS = {
+    'logs.LiveEvent', 'logs.NotificationCounter', 'logs.EmailOutbox',
+    'schooladmin.BackgroundJob', 'tenants.EmailOTP',
+}
+
+INTEGER_KEYS = ('AutoField', 'BigAutoField', 'SmallAutoField')
+SCHOOL_COLUMN = 'backup_school_id'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def backup_storage():
+    from .jobs import result_storage
+    return result_storage()
+
+
+def _prefix():
+    return f"{_setting('BACKUP_STORAGE_PREFIX', 'backups')}/snapshots"
+
+
+class _Encoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping microseconds (it rounds times to milliseconds) and base64 for binary."""
+
+    def default(self, o):
+        if isinstance(o, (datetime, dt_time)):
+            return o.isoformat()
+        if isinstance(o, (bytes, memoryview)):
+            return base64.b64encode(bytes(o)).decode('ascii')
+        return super().default(o)
+
+
+def _dumps(value):
+    return json.dumps(value, cls=_Encoder, separators=(',', ':'), ensure_ascii=False)
+
+
+# ============================================================================
+# MODELS
+# ============================================================================
+
+def backup_models():
+    """Models included in snapshots, each after the models it points to."""
+    models = [
+        model
+        for label in BACKUP_APPS
+        for model in apps.get_app_config(label).get_models(include_auto_created=True)
+        if model._meta.label not in EXCLUDED_MODELS
+    ]
+    included = set(models)
+    ordered, done = [], set()
+
+    def visit(model, stack):
+        if model in done or model in stack:
+            return  # Cycles rely on deferred foreign key checks
+        stack.add(model)
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model in included and field.related_model is not model:
+                visit(field.related_model, stack)
+        stack.discard(model)
+        done.add(model)
+        ordered.append(model)
+
+    for model in sorted(models, key=lambda m: m._meta.label):
+        visit(model, set())
+    return ordered
+
+
+@lru_cache(maxsize=None)
+def school_path(model):
+    """
+    Lookup from a model to its school's id ('pk' for School itself), or None for
+    tables not owned by a school. Required foreign keys are preferred over
+    nullable ones, so Subject goes through its class session, not its teacher.
+    """
+    School = apps.get_model('tenants', 'School')
+    if model is School:
+        return 'pk'
+
+    counter = itertools.count()
+    queue = [(0, next(counter), model, '')]
+    seen = set()
+    while queue:
+        cost, _, current, path = heapq.heappop(queue)
+        if current is School:
+            return path[:-2]
+        if current in seen or path.count('__') >= 5:
+            continue
+        seen.add(current)
+        for field in current._meta.concrete_fields:
+            if field.is_relation and (field.many_to_one or field.one_to_one):
+                step = 10 if field.null else 1
+                heapq.heappush(queue, (cost + step, next(counter), field.related_model, f'{path}{field.name}__'))
+    return None
+
+
+def _tracked_field(model):
+    """The auto_now timestamp deltas diff on, for integer-keyed models that have one."""
+    if model._meta.pk.get_internal_type() not in INTEGER_KEYS:
+        return None
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False):
+            return field.attname
+    return None
+
+
+def _columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _school_queryset(model):
+    """(queryset selecting the school id first, then every column) and the column names."""
+    path = school_path(model)
+    queryset = model._base_manager.order_by()
+    columns = _columns(model)
+    if path:
+        queryset = queryset.annotate(**{SCHOOL_COLUMN: F(path)})
+        return queryset, [SCHOOL_COLUMN] + columns
+    return queryset, columns
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+class _TableFile:
+    """Gzipped JSON Lines for one table, spooled to a temp file and saved to storage if anything was written."""
+
+    def __init__(self, label, columns, has_school):
+        self.label = label
+        self.has_school = has_school
+        self.rows = 0
+        self._tmp = tempfile.TemporaryFile()
+        self._gz = gzip.GzipFile(fileobj=self._tmp, mode='wb', compresslevel=6)
+        self._write_line({'table': label, 'columns': columns})
+
+    def _write_line(self, value):
+        self._gz.write(_dumps(value).encode('utf-8') + b'\n')
+
+    def write(self, rows):
+        lines = [_dumps(row if self.has_school else [None] + list(row)) for row in rows]
+        if lines:
+            self._gz.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            self.rows += len(lines)
+
+    def discard(self):
+        self._gz.close()
+        self._tmp.close()
+
+    def save(self, storage, directory, keep_empty=False):
+        from django.core.files import File
+
+        self._gz.close()
+        try:
+            if not self.rows and not keep_empty:
+                return None
+            self._tmp.seek(0)
+            return storage.save(f'{directory}/tables/{self.label}.jsonl.gz', File(self._tmp))
+        finally:
+            self._tmp.close()
+
+
+def _block_digest(lines):
+    return hashlib.blake2b('\n'.join(lines).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _scan_blocks(queryset, columns, block_size, numeric):
+    """Yield (block, rows) over the whole table in key order, one block at a time."""
+    from tenants.database_export import iter_rows
+
+    pk_index = columns.index(queryset.model._meta.pk.attname)
+    current, rows = None, []
+    for chunk in iter_rows(queryset, columns):
+        for row in chunk:
+            block = row[pk_index] // block_size if numeric else 0
+            if rows and block != current:
+                yield current, rows
+                rows = []
+            current = block
+            rows.append(row)
+    if rows:
+        yield current, rows
+
+
+def _fingerprints(model, block_size):
+    """{block: [rows, key sum]} for an integer-keyed table, from one GROUP BY."""
+    pk = model._meta.pk.attname
+    blocks = model._base_manager.order_by().annotate(
+        backup_block=F(pk) / block_size
+    ).values('backup_block').annotate(n=Count(pk), s=Sum(pk))
+    return {str(row['backup_block']): [row['n'], int(row['s'])] for row in blocks}
+
+
+def _block_rows(queryset, columns, model, blocks, block_size):
+    """Rows of the given blocks, fetched 50 key ranges per query."""
+    from tenants.database_export import iter_rows
+
+    pk = model._meta.pk.attname
+    blocks = sorted(int(block) for block in blocks)
+    for start in range(0, len(blocks), 50):
+        condition = Q()
+        for block in blocks[start:start + 50]:
+            condition |= Q(**{f'{pk}__gte': block * block_size, f'{pk}__lt': (block + 1) * block_size})
+        for chunk in iter_rows(queryset.filter(condition), columns):
+            yield chunk
+
+
+def _snapshot_table(model, out, previous, since, block_size):
+    """Write a table's rows (all of them, or what changed since previous) to out; returns (replaced, state)."""
+    from tenants.database_export import iter_rows
+
+    columns = _columns(model)
+    if previous is not None and previous.get('columns') != columns:
+        previous = None  # Schema changed: copy the table in full
+    queryset, select = _school_queryset(model)
+    numeric = model._meta.pk.get_internal_type() in INTEGER_KEYS
+    tracked = _tracked_field(model)
+    state = {'columns': columns, 'mode': 'tracked' if tracked else 'digest'}
+
+    if tracked:
+        state['blocks'] = _fingerprints(model, block_size)
+        if previous is None or previous.get('mode') != 'tracked':
+            for chunk in iter_rows(queryset, select):
+                out.write(chunk)
+            return 'all', state
+
+        old = previous['blocks']
+        changed = {block for block in set(old) | set(state['blocks']) if old.get(block) != state['blocks'].get(block)}
+        for chunk in _block_rows(queryset, select, model, changed, block_size):
+            out.write(chunk)
+        pk_index = select.index(model._meta.pk.attname)
+        for chunk in iter_rows(queryset.filter(**{f'{tracked}__gte': since}), select):
+            out.write([row for row in chunk if str(row[pk_index] // block_size) not in changed])
+        return sorted(int(block) for block in changed), state
+
+    blocks = {}
+    replaced = []
+    old = previous['blocks'] if previous is not None and previous.get('mode') == 'digest' else None
+    for block, rows in _scan_blocks(queryset, select, block_size, numeric):
+        lines = [_dumps(row) for row in rows]
+        digest = _block_digest(lines)
+        blocks[str(block)] = digest
+        if old is None or old.get(str(block)) != digest:
+            out.write(rows)
+            replaced.append(block)
+    state['blocks'] = blocks
+    if old is None or not numeric:
+        return ('all' if old is None or replaced or set(old) != set(blocks) else []), state
+    replaced.extend(int(block) for block in set(old) - set(blocks))  # Emptied blocks
+    return sorted(replaced), state
+
+
+def _read_json(storage, name, compressed=False):
+    with storage.open(name, 'rb') as handle:
+        data = handle.read()
+    return json.loads(gzip.decompress(data) if compressed else data)
+
+
+def list_manifests(storage=None):
+    """Manifests of complete snapshots, oldest first."""
+    storage = storage or backup_storage()
+    try:
+        directories, _ = storage.listdir(_prefix())
+    except (FileNotFoundError, OSError):
+        return []
+    manifests = []
+    for directory in sorted(directories):
+        name = f'{_prefix()}/{directory}/manifest.json'
+        if storage.exists(name):
+            manifests.append(_read_json(storage, name))
+    return manifests
+
+
+def _full_due(previous):
+    base_started = parse_datetime(previous['base_started_at'])
+    return timezone.now() - base_started >= timedelta(days=_setting('BACKUP_FULL_EVERY_DAYS', 7))
+
+
+def _snapshot_tables(storage, directory, manifest, state, previous_state, since, block_size, log):
+    for model in backup_models():
+        label = model._meta.label
+        table_started = time.monotonic()
+
+        previous_table = previous_state['tables'].get(label) if previous_state is not None else None
+        out = _TableFile(label, _columns(model), school_path(model) is not None)
+        try:
+            replaced, table_state = _snapshot_table(model, out, previous_table, since, block_size)
+        except Exception:
+            out.discard()
+            raise
+        state['tables'][label] = table_state
+        if not out.rows and not replaced:
+            out.discard()
+            continue
+        name = out.save(storage, directory, keep_empty=True)
+        manifest['tables'][label] = {
+            'file': name,
+            'rows': out.rows,
+            'replaced': replaced,
+            'seconds': round(time.monotonic() - table_started, 3),
+        }
+        log(f'  {label:<45} {out.rows:>9} rows  {time.monotonic() - table_started:.2f}s')
+
+
+def take_snapshot(full=False, log=None):
+    """
+    Write a snapshot - a delta unless full is set, there is no previous snapshot
+    or a full one is due - and return its manifest.
+    """
+    log = log or logger.info
+    storage = backup_storage()
+    manifests = list_manifests(storage)
+    previous = manifests[-1] if manifests else None
+    previous_state = None
+    if previous is not None and not full and not _full_due(previous):
+        try:
+            previous_state = _read_json(storage, f"{_prefix()}/{previous['id']}/state.json.gz", compressed=True)
+        except Exception as e:
+            log(f'Previous snapshot state unreadable ({e}); taking a full snapshot')
+
+    started_at = timezone.now()
+    snapshot_id = started_at.strftime('%Y%m%dT%H%M%S%fZ')
+    directory = f'{_prefix()}/{snapshot_id}'
+    block_size = _setting('BACKUP_BLOCK_SIZE', 1000)
+    if previous_state is not None and previous_state.get('block_size') != block_size:
+        previous_state = None
+    kind = 'delta' if previous_state is not None else 'full'
+    since = None
+    if kind == 'delta':
+        since = parse_datetime(previous['started_at']) - timedelta(seconds=_setting('BACKUP_OVERLAP_SECONDS', 300))
+
+    manifest = {
+        'id': snapshot_id,
+        'kind': kind,
+        'parent': previous['id'] if kind == 'delta' else None,
+        'base': previous['base'] if kind == 'delta' else snapshot_id,
+        'base_started_at': previous['base_started_at'] if kind == 'delta' else started_at.isoformat(),
+        'started_at': started_at.isoformat(),
+        'block_size': block_size,
+        'tables': {},
+    }
+    state = {'block_size': block_size, 'tables': {}}
+    started = time.monotonic()
+    log(f'Taking {kind} snapshot {snapshot_id}')
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Every table read as of the same moment
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+        _snapshot_tables(storage, directory, manifest, state, previous_state, since, block_size, log)
+
+    state_file = tempfile.TemporaryFile()
+    with state_file:
+        state_file.write(gzip.compress(_dumps(state).encode('utf-8')))
+        state_file.seek(0)
+        from django.core.files import File
+        storage.save(f'{directory}/state.json.gz', File(state_file))
+
+    manifest['finished_at'] = timezone.now().isoformat()
+    manifest['seconds'] = round(time.monotonic() - started, 1)
+    manifest['rows'] = sum(table['rows'] for table in manifest['tables'].values())
+    from django.core.files.base import ContentFile
+    storage.save(f'{directory}/manifest.json', ContentFile(json.dumps(manifest, indent=2).encode('utf-8')))
+    log(f"Snapshot {snapshot_id} ({kind}): {manifest['rows']} rows from {len(manifest['tables'])} tables in {manifest['seconds']}s")
+
+    prune_snapshots(storage, log=log)
+    return manifest
+
+
+def _delete_snapshot(storage, snapshot_id):
+    directory = f'{_prefix()}/{snapshot_id}'
+    _, table_files = storage.listdir(f'{directory}/tables') if storage.exists(f'{directory}/tables') else ([], [])
+    for name in table_files:
+        storage.delete(f'{directory}/tables/{name}')
+    _, files = storage.listdir(directory)
+    for name in files:
+        storage.delete(f'{directory}/{name}')
+
+
+def prune_snapshots(storage=None, log=None):
+    """Keep the newest BACKUP_KEEP_FULL full snapshots and their deltas; delete older ones."""
+    storage = storage or backup_storage()
+    log = log or logger.info
+    manifests = list_manifests(storage)
+    bases = [m['id'] for m in manifests if m['kind'] == 'full']
+    keep = set(bases[-max(_setting('BACKUP_KEEP_FULL', 2), 1):])
+    for manifest in manifests:
+        if manifest['base'] not in keep:
+            _delete_snapshot(storage, manifest['id'])
+            log(f"Deleted old snapshot {manifest['id']}")
+
+
+# ============================================================================
+# RESTORE
+# ============================================================================
+
+def snapshot_chain(snapshot_id=None, storage=None):
+    """The full snapshot and the deltas leading to snapshot_id (default: the latest), oldest first."""
+    storage = storage or backup_storage()
+    manifests = {m['id']: m for m in list_manifests(storage)}
+    if not manifests:
+        raise ValueError('No snapshots found')
+    if snapshot_id is None:
+        snapshot_id = max(manifests)
+    if snapshot_id not in manifests:
+        raise ValueError(f'Snapshot {snapshot_id} not found')
+
+    chain = []
+    manifest = manifests[snapshot_id]
+    while True:
+        chain.append(manifest)
+        if manifest['kind'] == 'full':
+            return list(reversed(chain))
+        parent = manifests.get(manifest['parent'])
+        if parent is None:
+            raise ValueError(f"Snapshot {manifest['id']} is missing its parent {manifest['parent']}")
+        manifest = parent
+
+
+def _read_table(storage, name):
+    """(columns, iterator of rows) of a snapshot table file."""
+    handle = storage.open(name, 'rb')
+    lines = gzip.GzipFile(fileobj=handle, mode='rb')
+    header = json.loads(lines.readline())
+
+    def rows():
+        try:
+            for line in lines:
+                yield json.loads(line)
+        finally:
+            lines.close()
+            handle.close()
+
+    return header['columns'], rows()
+
+
+def _find_school_id(storage, chain, slug):
+    label = apps.get_model('tenants', 'School')._meta.label
+    slugs = {}
+    for manifest in chain:
+        entry = manifest['tables'].get(label)
+        if not entry or not entry['file']:
+            continue
+        columns, rows = _read_table(storage, entry['file'])
+        for row in rows:
+            record = dict(zip(columns, row[1:]))
+            slugs[record['id']] = record['slug']
+    for school_id, school_slug in slugs.items():
+        if school_slug == slug:
+            return school_id
+    return None
+
+
+def _replay(storage, chain, school_id, scratch, models):
+    """Apply the chain to a scratch SQLite table holding the school's final rows."""
+    scratch.execute('CREATE TABLE rows (tbl TEXT, pk TEXT, pkn INTEGER, data TEXT, PRIMARY KEY (tbl, pk))')
+    for manifest in chain:
+        block_size = manifest['block_size']
+        for label, entry in manifest['tables'].items():
+            model = models.get(label)
+            if model is None or school_path(model) is None:
+                continue
+            if entry['replaced'] == 'all':
+                scratch.execute('DELETE FROM rows WHERE tbl = ?', (label,))
+            else:
+                for block in entry['replaced']:
+                    scratch.execute(
+                        'DELETE FROM rows WHERE tbl = ? AND pkn >= ? AND pkn < ?',
+                        (label, block * block_size, (block + 1) * block_size),
+                    )
+            if not entry['file']:
+                continue
+
+            columns, rows = _read_table(storage, entry['file'])
+            pk_index = columns.index(model._meta.pk.attname) + 1
+            inserts, moved = [], []
+            for row in rows:
+                pk = row[pk_index]
+                key = json.dumps(pk)
+                if str(row[0]) == str(school_id):
+                    data = json.dumps(dict(zip(columns, row[1:])))
+                    inserts.append((label, key, pk if isinstance(pk, int) else None, data))
+                else:
+                    moved.append((label, key))  # Belongs to another school (now)
+                if len(inserts) + len(moved) >= 2000:
+                    scratch.executemany('INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)', inserts)
+                    scratch.executemany('DELETE FROM rows WHERE tbl = ? AND pk = ?', moved)
+                    inserts, moved = [], []
+            scratch.executemany('INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)', inserts)
+            scratch.executemany('DELETE FROM rows WHERE tbl = ? AND pk = ?', moved)
+
+
+def _instances(model, records):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return [
+        model(**{name: fields[name].to_python(value) for name, value in record.items() if name in fields})
+        for record in records
+    ]
+
+
+def restore_school(slug, snapshot_id=None, preview=False, log=None):
+    """
+    Rebuild one school's rows as they were at a snapshot: rows the snapshot has
+    are inserted or overwritten, the school's rows it does not have are deleted.
+    Runs in one transaction. Returns [{'table', 'restored', 'deleted'}].
+    """
+    log = log or logger.info
+    storage = backup_storage()
+    chain = snapshot_chain(snapshot_id, storage)
+    school_id = _find_school_id(storage, chain, slug)
+    if school_id is None:
+        raise ValueError(f"School '{slug}' is not in snapshot {chain[-1]['id']}")
+    log(f"Restoring {slug} from {chain[-1]['id']} ({len(chain)} snapshot(s) from full {chain[0]['id']})")
+
+    models = backup_models()
+    by_label = {model._meta.label: model for model in models}
+    scratch_file = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    scratch_file.close()
+    scratch = sqlite3.connect(scratch_file.name)
+    try:
+        _replay(storage, chain, school_id, scratch, by_label)
+
+        # The school's live keys go next to the snapshot's, so the rows to
+        # delete come out of a query rather than a set held in memory
+        scratch.execute('CREATE TABLE live (pk TEXT PRIMARY KEY)')
+        plan = []
+        for model in models:
+            path = school_path(model)
+            if path is None:
+                continue
+            label = model._meta.label
+            scratch.execute('DELETE FROM live')
+            live = model._base_manager.filter(**{path: school_id}).values_list('pk', flat=True)
+            keys = (json.dumps(_key(pk)) for pk in live.iterator(chunk_size=5000))
+            while True:
+                batch = [(key,) for key in itertools.islice(keys, 5000)]
+                if not batch:
+                    break
+                scratch.executemany('INSERT OR IGNORE INTO live VALUES (?)', batch)
+            extra = [json.loads(pk) for (pk,) in scratch.execute(
+                'SELECT pk FROM live WHERE pk NOT IN (SELECT pk FROM rows WHERE tbl = ?)', (label,)
+            )]
+            (restored,) = scratch.execute('SELECT COUNT(*) FROM rows WHERE tbl = ?', (label,)).fetchone()
+            plan.append((model, restored, extra))
+
+        summary = [{'table': model._meta.label, 'restored': restored, 'deleted': len(extra)} for model, restored, extra in plan]
+        if preview:
+            return summary
+
+        with transaction.atomic():
+            # Rows created since the snapshot go first, children before parents
+            for model, _, extra in reversed(plan):
+                for start in range(0, len(extra), 500):
+                    model._base_manager.filter(pk__in=extra[start:start + 500]).delete()
+
+            for model, restored, _ in plan:
+                if not restored:
+                    continue
+                pk_name = model._meta.pk.name
+                update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+                cursor = scratch.execute('SELECT data FROM rows WHERE tbl = ? ORDER BY pkn, pk', (model._meta.label,))
+                with _raw_timestamps(model):
+                    while True:
+                        batch = cursor.fetchmany(500)
+                        if not batch:
+                            break
+                        model._base_manager.bulk_create(
+                            _instances(model, [json.loads(data) for (data,) in batch]),
+                            update_conflicts=True, unique_fields=[pk_name], update_fields=update_fields,
+                        )
+
+            _reset_sequences([model for model, restored, _ in plan if restored])
+            transaction.on_commit(lambda: _after_restore(school_id, slug))
+    finally:
+        scratch.close()
+        os.unlink(scratch_file.name)
+
+    log(f"Restored {sum(s['restored'] for s in summary)} rows, deleted {sum(s['deleted'] for s in summary)}")
+    return summary
+
+
+@contextmanager
+def _raw_timestamps(model):
+    """Keep the snapshot's created/updated times: bulk_create would stamp auto_now(_add) fields with now."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _key(pk):
+    """A live primary key in the form the snapshot stores it (UUIDs as strings)."""
+    return pk if isinstance(pk, int) else str(pk)
+
+
+def _reset_sequences(models):
+    """Move key sequences past restored ids (matters when restoring into an emptier database)."""
+    from django.core.management.color import no_style
+
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def _after_restore(school_id, slug):
+    """Drop caches built from the rows restore just replaced (bulk_create sends no signals)."""
+    from django.contrib.auth import get_user_model
+    from logs.notification_counters import invalidate
+    from tenants.tenant_cache import invalidate_school
+
+    invalidate_school(school_id, slug)
+    invalidate(get_user_model().objects.filter(school_id=school_id).values_list('id', flat=True))
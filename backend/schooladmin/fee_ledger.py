@@ -0,0 +1,217 @@
+"""
+The fee ledger: one StudentFeeRecord per student and fee structure they owe,
+written when fee structures or enrolments change rather than when fees are
+read.
+
+A student owes a fee structure when they are enrolled (StudentSession) in one
+of its classes in its academic year and term, or when their current class is
+one of its classes. materialise() inserts the missing records of the given
+fee structures or students with one bulk_create(ignore_conflicts=True); the
+unique (student, fee_structure) constraint settles concurrent writers. It is
+called by:
+- the FeeStructure.classes, StudentSession and student signals (signals.py);
+- the bulk writers that send no signals: the rollover (rollover.py) and the
+  student import (users/bulk_import.py);
+- manage.py sync_fee_records, to backfill or repair.
+
+Reads do not write. current_status() derives PAID / PARTIAL / UNPAID from
+amount_paid and the fee amount in SQL, the rule update_fee_payment stores,
+so a fee amount changed after payments shows without rewriting the records.
+fee_dashboard() and fee_students() serve the admin fee pages from one query
+each, with per-class paid and outstanding totals.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db.models import Case, CharField, F, Value, When
+
+from .models import FeeStructure, StudentFeeRecord
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def current_status():
+    """PAID / PARTIAL / UNPAID of a StudentFeeRecord row, as an SQL expression."""
+    return Case(
+        When(amount_paid__gte=F('fee_structure__amount'), then=Value('PAID')),
+        When(amount_paid__gt=0, then=Value('PARTIAL')),
+        default=Value('UNPAID'),
+        output_field=CharField(),
+    )
+
+
+def with_status(records):
+    """Annotate StudentFeeRecords with current_status."""
+    return records.annotate(current_status=current_status())
+
+
+def _owed(fee_ids=None, student_ids=None):
+    """The (student_id, fee_structure_id) pairs owed, limited to the given fees and/or students."""
+    from academics.models import StudentSession
+    from users.models import CustomUser
+
+    # Conditions on the fee structures go in one filter() so they apply to the same fee
+    enrolled = {
+        'class_session__classroom__fee_structures__academic_year': F('class_session__academic_year'),
+        'class_session__classroom__fee_structures__term': F('class_session__term'),
+    }
+    member = {'role': 'student', 'classroom__fee_structures__isnull': False}
+    if fee_ids is not None:
+        enrolled['class_session__classroom__fee_structures__in'] = fee_ids
+        member['classroom__fee_structures__in'] = fee_ids
+    if student_ids is not None:
+        enrolled['student_id__in'] = student_ids
+        member['id__in'] = student_ids
+    enrolments = StudentSession.objects.filter(**enrolled)
+    members = CustomUser.objects.filter(**member)
+
+    owed = set(enrolments.values_list('student_id', 'class_session__classroom__fee_structures').order_by())
+    owed.update(members.values_list('id', 'classroom__fee_structures').order_by())
+    return owed
+
+
+def materialise(fee_ids=None, student_ids=None):
+    """
+    Create the missing fee records of the given fee structures and/or students
+    (ids), UNPAID, and return how many were written.
+    """
+    from tenants.dashboard_cache import bump_on_commit
+
+    from .readiness import refresh_readiness_for_fees
+
+    if fee_ids is None and student_ids is None:
+        raise ValueError('materialise() needs fee_ids or student_ids')
+    fee_ids = None if fee_ids is None else list(fee_ids)
+    student_ids = None if student_ids is None else list(student_ids)
+    if fee_ids == [] or student_ids == []:
+        return 0
+
+    existing = StudentFeeRecord.objects.all()
+    if fee_ids is not None:
+        existing = existing.filter(fee_structure_id__in=fee_ids)
+    if student_ids is not None:
+        existing = existing.filter(student_id__in=student_ids)
+    missing = _owed(fee_ids, student_ids) - set(existing.values_list('student_id', 'fee_structure_id'))
+    if not missing:
+        return 0
+
+    StudentFeeRecord.objects.bulk_create(
+        [
+            StudentFeeRecord(student_id=student_id, fee_structure_id=fee_id, amount_paid=0, payment_status='UNPAID')
+            for student_id, fee_id in sorted(missing)
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+    # bulk_create sends no signals: what the StudentFeeRecord post_save receivers did, once per school and year
+    years, schools = {}, set()
+    fees = FeeStructure.objects.filter(id__in={fee_id for _, fee_id in missing})
+    for fee_id, school_id, academic_year in fees.values_list('id', 'school_id', 'academic_year'):
+        schools.add(school_id)
+        years.setdefault((school_id, academic_year), set()).update(
+            student_id for student_id, missing_fee_id in missing if missing_fee_id == fee_id
+        )
+    for (school_id, academic_year), students in years.items():
+        refresh_readiness_for_fees(school_id, academic_year, students)
+    for school_id in schools:
+        bump_on_commit(school_id)
+
+    logger.debug(f'Fee ledger: {len(missing)} fee record(s) materialised')
+    return len(missing)
+
+
+def _group(rows, class_id, class_name, extra):
+    """Group fee record rows by class with paid / outstanding totals, in row order."""
+    grouped = {}
+    for row in rows:
+        cid = row[class_id]
+        if cid not in grouped:
+            grouped[cid] = {
+                'classId': cid,
+                'className': row[class_name],
+                **extra(row),
+                'students': [],
+                'paid': Decimal('0'),
+                'outstanding': Decimal('0'),
+            }
+        group = grouped[cid]
+        outstanding = row['fee_structure__amount'] - row['amount_paid']
+        group['students'].append({
+            'record_id': row['id'],
+            'student_id': row['student_id'],
+            'full_name': f"{row['student__first_name']} {row['student__last_name']}",
+            'username': row['student__username'],
+            'academic_year': row['academic_year'],
+            'fee_name': row['fee_structure__name'],
+            'fee_amount': row['fee_structure__amount'],
+            'amount_paid': row['amount_paid'],
+            'outstanding': outstanding,
+            'payment_status': row['current_status'],
+        })
+        group['paid'] += row['amount_paid']
+        group['outstanding'] += outstanding
+    return list(grouped.values())
+
+
+_ROW_FIELDS = (
+    'id', 'student_id', 'student__first_name', 'student__last_name', 'student__username',
+    'fee_structure_id', 'fee_structure__name', 'fee_structure__amount', 'amount_paid', 'current_status',
+)
+
+
+def fee_dashboard(school, academic_year, term):
+    """
+    The school's fee records for a term, one group per fee structure and class
+    the students were enrolled in that term, from one query.
+    """
+    enrolled_in = 'student__student_sessions__class_session'
+    rows = (
+        with_status(StudentFeeRecord.objects.filter(
+            fee_structure__school=school,
+            fee_structure__academic_year=academic_year,
+            fee_structure__term=term,
+            **{
+                f'{enrolled_in}__academic_year': academic_year,
+                f'{enrolled_in}__term': term,
+                f'{enrolled_in}__classroom': F('fee_structure__classes'),
+            },
+        ))
+        .annotate(
+            class_id=F(f'{enrolled_in}__classroom_id'),
+            class_name=F(f'{enrolled_in}__classroom__name'),
+            academic_year=F('fee_structure__academic_year'),
+        )
+        .values(*_ROW_FIELDS, 'class_id', 'class_name', 'academic_year')
+        .order_by('fee_structure_id', 'class_name', 'student__first_name', 'student__last_name', 'id')
+    )
+
+    groups, by_fee = [], {}
+    for row in rows:
+        by_fee.setdefault(row['fee_structure_id'], []).append(row)
+    for fee_rows in by_fee.values():
+        groups.extend(_group(fee_rows, 'class_id', 'class_name', lambda row: {'fee_structure_id': row['fee_structure_id']}))
+    return groups
+
+
+def fee_students(fee, school):
+    """A fee structure's records for the school's students now in its classes, grouped by class, from one query."""
+    rows = (
+        with_status(StudentFeeRecord.objects.filter(
+            fee_structure=fee,
+            student__role='student',
+            student__school=school,
+            student__classroom__in=fee.classes.all(),
+        ))
+        .annotate(
+            class_id=F('student__classroom_id'),
+            class_name=F('student__classroom__name'),
+            academic_year=F('student__academic_year'),
+        )
+        .values(*_ROW_FIELDS, 'class_id', 'class_name', 'academic_year')
+        .order_by('class_name', 'student__first_name', 'student__last_name', 'id')
+    )
+    return _group(rows, 'class_id', 'class_name', lambda row: {})
@@ -0,0 +1,373 @@
+"""
+Bulk posting of fee payments, for bank reconciliations that used to be keyed
+in one update_fee_payment call at a time.
+
+A batch is a list of (student, fee_structure, amount, reference) rows, sent
+as JSON or uploaded as CSV/XLSX (parse_payment_file). post_payments():
+
+- resolves students (username, or id) and the school's fee structures with a
+  few IN queries, and rejects rows without a fee record, a positive amount
+  that fits the amount columns, or a reference that fits its column;
+- dedupes by reference: the first row with a reference wins within the
+  batch, and references already in FeePaymentHistory for the school are
+  skipped, so posting the same file twice posts it once;
+- applies the rest in one transaction: the affected StudentFeeRecords are
+  locked with select_for_update (in id order), the references are claimed
+  in FeePaymentReference, whose unique (school, reference) constraint
+  decides between concurrent posts, the history rows are written with
+  bulk_create carrying running balances per record, and amount_paid is
+  raised with F() expressions, one UPDATE per batch of records;
+- refreshes readiness once per student and retires the proprietor
+  snapshots once, after commit, instead of per payment (bulk writes send no
+  signals), and returns each student's term totals for receipts.
+"""
+
+import csv
+import io
+import logging
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, Sum, Value, When
+from django.utils import timezone
+
+from .models import FeePaymentHistory, FeePaymentReference, FeeStructure, StudentFeeRecord
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('student', 'fee_structure', 'amount', 'reference')
+OPTIONAL_COLUMNS = ('payment_method', 'remarks')
+
+# Values per IN query and records per UPDATE statement
+BATCH_SIZE = 500
+
+# amount_paid and the history amounts are DecimalField(max_digits=10, decimal_places=2)
+MAX_AMOUNT = Decimal('100000000')
+_field = FeePaymentHistory._meta.get_field
+MAX_REFERENCE_LENGTH = _field('transaction_reference').max_length
+MAX_PAYMENT_METHOD_LENGTH = _field('payment_method').max_length
+
+
+def max_rows():
+    return getattr(settings, 'FEE_BULK_PAYMENT_MAX_ROWS', 10000)
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _clean(value):
+    return '' if value is None else str(value).strip()
+
+
+def _rows_from(records):
+    """Row dicts with the known columns and their 1-based row number."""
+    rows = []
+    for number, record in records:
+        row = {column: _clean(record.get(column)) for column in COLUMNS + OPTIONAL_COLUMNS}
+        if any(row.values()):
+            row['row'] = number
+            rows.append(row)
+    return rows
+
+
+def parse_payment_file(file):
+    """Rows of an uploaded CSV or XLSX file; headers are matched case-insensitively."""
+    name = (getattr(file, 'name', '') or '').lower()
+    if name.endswith('.xlsx'):
+        import openpyxl
+
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheet = wb.active.iter_rows(values_only=True)
+            headers = [_clean(h).lower() for h in next(sheet, None) or ()]
+            records = [
+                (number, dict(zip(headers, values)))
+                for number, values in enumerate(sheet, start=2)
+            ]
+        finally:
+            wb.close()
+    elif name.endswith('.csv'):
+        text = io.StringIO(file.read().decode('utf-8-sig'))
+        reader = csv.DictReader(text)
+        reader.fieldnames = [_clean(h).lower() for h in reader.fieldnames or ()]
+        records = list(enumerate(reader, start=2))
+    else:
+        raise ValueError('File must be a CSV or XLSX file')
+    return _rows_from(records)
+
+
+def rows_from_json(payments):
+    """Rows of a JSON batch: a list of objects with the same keys as the file columns."""
+    if not isinstance(payments, list) or not all(isinstance(p, dict) for p in payments):
+        raise ValueError('payments must be a list of objects')
+    return _rows_from(enumerate(payments, start=1))
+
+
+def _resolve(school, rows, payment_method):
+    """Attach student_id, fee_record_id and the amount as value to each row, or an error."""
+    from users.models import CustomUser
+
+    names = {row['student'] for row in rows if row['student']}
+    students = {}
+    for chunk in _chunks(names):
+        students.update(CustomUser.objects.filter(
+            school=school, role='student', username__in=chunk,
+        ).values_list('username', 'id'))
+    numeric = {int(name) for name in names - set(students) if name.isdigit()}
+    for chunk in _chunks(numeric):
+        students.update(
+            (str(student_id), student_id)
+            for student_id in CustomUser.objects.filter(
+                school=school, role='student', id__in=chunk,
+            ).values_list('id', flat=True)
+        )
+
+    fee_ids = {int(row['fee_structure']) for row in rows if row['fee_structure'].isdigit()}
+    fees = set(FeeStructure.objects.filter(school=school, id__in=fee_ids).values_list('id', flat=True))
+
+    records = {}
+    student_ids = set(students.values())
+    for chunk in _chunks(student_ids):
+        for record_id, student_id, fee_id in StudentFeeRecord.objects.filter(
+            student_id__in=chunk, fee_structure_id__in=fees,
+        ).values_list('id', 'student_id', 'fee_structure_id'):
+            records[(student_id, fee_id)] = record_id
+
+    for row in rows:
+        student_id = students.get(row['student'])
+        method = row['payment_method'] or payment_method
+        fee_id = int(row['fee_structure']) if row['fee_structure'].isdigit() else None
+        try:
+            value = Decimal(row['amount'].replace(',', ''))
+        except InvalidOperation:
+            value = None
+
+        if student_id is None:
+            row['error'] = f"Student '{row['student']}' not found"
+        elif fee_id not in fees:
+            row['error'] = f"Fee structure '{row['fee_structure']}' not found"
+        elif (student_id, fee_id) not in records:
+            row['error'] = 'The student does not owe this fee'
+        elif value is None or not value.is_finite() or value <= 0:
+            row['error'] = 'amount must be a positive number'
+        elif value >= MAX_AMOUNT:
+            row['error'] = f'amount must be less than {MAX_AMOUNT:,}'
+        elif value != value.quantize(Decimal('0.01')):
+            row['error'] = 'amount has more than 2 decimal places'
+        elif not row['reference']:
+            row['error'] = 'reference is required'
+        elif len(row['reference']) > MAX_REFERENCE_LENGTH:
+            row['error'] = f'reference is longer than {MAX_REFERENCE_LENGTH} characters'
+        elif not isinstance(method, str):
+            row['error'] = 'payment_method must be text'
+        elif len(method) > MAX_PAYMENT_METHOD_LENGTH:
+            row['error'] = f'payment_method is longer than {MAX_PAYMENT_METHOD_LENGTH} characters'
+        else:
+            row.update(student_id=student_id, fee_record_id=records[(student_id, fee_id)], value=value)
+
+
+def _posted_references(school, references):
+    posted = set()
+    for chunk in _chunks(references):
+        posted.update(FeePaymentHistory.objects.filter(
+            fee_record__fee_structure__school=school, transaction_reference__in=chunk,
+        ).values_list('transaction_reference', flat=True))
+    return posted
+
+
+def _claim_references(school, references):
+    """
+    Claim references for this batch and return the ones it got. A reference
+    another post has claimed - committed, or still in flight, which the insert
+    waits for - is skipped by the unique (school, reference) constraint
+    instead of raising IntegrityError.
+    """
+    batch = uuid.uuid4()
+    FeePaymentReference.objects.bulk_create(
+        [FeePaymentReference(school=school, reference=reference, batch=batch) for reference in references],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    claimed = set()
+    for chunk in _chunks(references):
+        claimed.update(FeePaymentReference.objects.filter(
+            school=school, batch=batch, reference__in=chunk,
+        ).values_list('reference', flat=True))
+    return claimed
+
+
+def _status(amount_paid, fee_amount):
+    return 'PAID' if amount_paid >= fee_amount else ('PARTIAL' if amount_paid > 0 else 'UNPAID')
+
+
+def _apply(school, rows, user, payment_method):
+    """Lock the records, skip posted references and write the payments; returns the rows posted."""
+    record_ids = sorted({row['fee_record_id'] for row in rows})
+    balances = {}
+    for chunk in _chunks(record_ids):
+        for record_id, amount_paid, fee_amount in StudentFeeRecord.objects.select_for_update(of=('self',)).filter(
+            id__in=chunk,
+        ).order_by('id').values_list('id', 'amount_paid', 'fee_structure__amount'):
+            balances[record_id] = (amount_paid, fee_amount)
+
+    # References posted one at a time (update_fee_payment) or before the claims existed
+    posted = _posted_references(school, {row['reference'] for row in rows})
+    claimed = _claim_references(school, [row['reference'] for row in rows if row['reference'] not in posted])
+    history, applied, overflowed = [], [], []
+    for row in rows:
+        if row['reference'] not in claimed:
+            row['status'] = 'duplicate'
+            continue
+        amount_paid, fee_amount = balances[row['fee_record_id']]
+        new_total = amount_paid + row['value']
+        if new_total >= MAX_AMOUNT:
+            row['status'] = 'error'
+            row['error'] = f'amount paid would reach {MAX_AMOUNT:,} or more'
+            overflowed.append(row['reference'])
+            continue
+        history.append(FeePaymentHistory(
+            fee_record_id=row['fee_record_id'],
+            transaction_type='payment',
+            amount=row['value'],
+            previous_total=amount_paid,
+            new_total=new_total,
+            balance_before=fee_amount - amount_paid,
+            balance_after=fee_amount - new_total,
+            payment_method=row['payment_method'] or payment_method,
+            transaction_reference=row['reference'],
+            remarks=row['remarks'],
+            recorded_by=user,
+        ))
+        balances[row['fee_record_id']] = (new_total, fee_amount)
+        row['status'] = 'posted'
+        row['new_total'] = new_total
+        applied.append(row)
+    FeePaymentHistory.objects.bulk_create(history, batch_size=BATCH_SIZE)
+    # Rows not posted give their references back, so a corrected row can be sent again
+    for chunk in _chunks(overflowed):
+        FeePaymentReference.objects.filter(school=school, reference__in=chunk).delete()
+
+    paid = {}
+    for row in applied:
+        paid[row['fee_record_id']] = paid.get(row['fee_record_id'], Decimal('0')) + row['value']
+    now = timezone.now()
+    for chunk in _chunks(sorted(paid)):
+        StudentFeeRecord.objects.filter(id__in=chunk).update(
+            amount_paid=F('amount_paid') + Case(*[
+                When(id=record_id, then=Value(paid[record_id])) for record_id in chunk
+            ]),
+            payment_status=Case(*[
+                When(id=record_id, then=Value(_status(*balances[record_id]))) for record_id in chunk
+            ], output_field=CharField()),
+            date_paid=now,
+        )
+    return applied
+
+
+def _refresh_after(school, applied):
+    """
+    What the StudentFeeRecord and FeePaymentHistory signals did per payment,
+    once per student; both apply when the transaction commits.
+    """
+    from tenants.dashboard_cache import bump_on_commit
+
+    from .readiness import refresh_readiness_for_fees
+
+    years = {}
+    for student_id, academic_year in StudentFeeRecord.objects.filter(
+        id__in={row['fee_record_id'] for row in applied},
+    ).values_list('student_id', 'fee_structure__academic_year').distinct():
+        years.setdefault(academic_year, set()).add(student_id)
+    for academic_year, student_ids in years.items():
+        refresh_readiness_for_fees(school.id, academic_year, student_ids)
+    bump_on_commit(school.id)
+
+
+def receipt_totals(school, student_ids):
+    """Per student and term: the fees, amount paid and balance a receipt is issued for."""
+    totals = []
+    for chunk in _chunks(sorted(student_ids)):
+        totals.extend(
+            {
+                'student_id': r['student_id'],
+                'academic_year': r['fee_structure__academic_year'],
+                'term': r['fee_structure__term'],
+                'total_fees': r['total_fees'],
+                'amount_paid': r['amount_paid'],
+                'balance': r['total_fees'] - r['amount_paid'],
+            }
+            for r in StudentFeeRecord.objects.filter(
+                fee_structure__school=school, student_id__in=chunk,
+            ).values('student_id', 'fee_structure__academic_year', 'fee_structure__term').annotate(
+                total_fees=Sum('fee_structure__amount'), amount_paid=Sum('amount_paid'),
+            ).order_by('student_id', 'fee_structure__academic_year', 'fee_structure__term')
+        )
+    return totals
+
+
+def post_payments(school, rows, user, payment_method='', dry_run=False):
+    """
+    Post a batch of payment rows (parse_payment_file / rows_from_json) for the
+    school. Every row comes back with a status - posted, duplicate or error -
+    and with dry_run nothing is written (duplicates of earlier posts are
+    still reported).
+    """
+    started = time.monotonic()
+    _resolve(school, rows, payment_method)
+
+    seen, valid = set(), []
+    for row in rows:
+        if row.get('error'):
+            row['status'] = 'error'
+        elif row['reference'] in seen:
+            row['status'] = 'duplicate'
+        else:
+            seen.add(row['reference'])
+            valid.append(row)
+
+    applied = []
+    if dry_run:
+        posted = _posted_references(school, seen)
+        for row in valid:
+            row['status'] = 'duplicate' if row['reference'] in posted else 'valid'
+    elif valid:
+        with transaction.atomic():
+            applied = _apply(school, valid, user, payment_method)
+            if applied:
+                _refresh_after(school, applied)
+
+    results = [
+        {
+            'row': row['row'],
+            'student': row['student'],
+            'fee_structure': row['fee_structure'],
+            'amount': row['amount'],
+            'reference': row['reference'],
+            'status': row['status'],
+            'error': row.get('error'),
+            'new_total': row.get('new_total'),
+        }
+        for row in rows
+    ]
+    seconds = round(time.monotonic() - started, 3)
+    logger.info(
+        f'Bulk fee payments for {school.slug}: {len(applied)} posted of {len(rows)} row(s) '
+        f'in {seconds}s{" (dry run)" if dry_run else ""}'
+    )
+    return {
+        'dry_run': dry_run,
+        'total': len(rows),
+        'posted': len(applied),
+        'duplicates': sum(1 for row in rows if row['status'] == 'duplicate'),
+        'errors': sum(1 for row in rows if row['status'] == 'error'),
+        'amount_posted': sum((row['value'] for row in applied), Decimal('0')),
+        'results': results,
+        'receipts': receipt_totals(school, {row['student_id'] for row in applied}),
+        'seconds': seconds,
+    }
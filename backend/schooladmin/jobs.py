@@ -0,0 +1,478 @@
+"""
+Database-backed background jobs for long-running admin operations.
+
+Endpoints such as move_to_next_session or confirm_import enqueue a BackgroundJob
+and return its id straight away (202); the job worker - an interval job inside
+run_scheduler, or the dedicated run_job_worker command - claims queued jobs and
+runs them. Clients poll the job status endpoint for progress and the result.
+
+Handlers receive a JobRequest, a stand-in for the original DRF request carrying
+the same school, user, data and uploaded file, so a view body can move into a
+handler unchanged. A handler returns either a Response (its data and status
+become the job result; 4xx/5xx mark the job failed) or a plain dict.
+
+Unexpected exceptions are retried with exponential backoff up to max_attempts.
+At most JOB_MAX_CONCURRENT_PER_SCHOOL jobs run at once for any one school.
+
+While a handler runs, a thread refreshes the job's heartbeat on a connection
+of its own, and progress is written the same way, so neither waits for the
+handler's transaction to commit. A job whose heartbeat stops is requeued by
+recover_stale_jobs(); the outcome is recorded only by the worker that still
+holds the job (locked_by), so a worker that lost it cannot overwrite it.
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# job_type -> (handler path, max attempts)
+JOB_HANDLERS = {
+    # Not idempotent (a second run rolls over again or re-sends every email): never retried
+    'move_to_next_term': ('schooladmin.views.run_move_to_next_term', 1),
+    'move_to_next_session': ('schooladmin.views.run_move_to_next_session', 1),
+    'purge_term_files': ('schooladmin.rollover.run_purge_term_files', 3),
+    'send_report_sheets': ('schooladmin.views.run_send_report_sheets', 1),
+    'sync_attendance_to_grades': ('schooladmin.views.run_sync_attendance_to_grades', 3),
+    'confirm_import': ('users.import_views.run_confirm_import', 1),
+    'database_export': ('tenants.database_export.run_database_export', 3),
+    'report_card_export': ('tenants.report_card_export.run_report_card_export', 2),
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def max_concurrent_per_school():
+    return _setting('JOB_MAX_CONCURRENT_PER_SCHOOL', 1)
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class JobRequest:
+    """Request-like object handed to job handlers."""
+
+    def __init__(self, job):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.job = job
+        self.school = job.school
+        self.user = job.requested_by
+        self.portal_user = job.portal_user
+        self.data = job.params
+        self.query_params = job.params
+        self.FILES = {}
+        if job.upload is not None:
+            self.FILES['file'] = SimpleUploadedFile(job.upload_name or 'upload', bytes(job.upload))
+
+    def set_progress(self, current, total=None, message=None):
+        set_progress(self.job, current, total, message)
+
+
+def _request_params(request):
+    data = request.data
+    if hasattr(data, 'dict'):
+        # QueryDict from a multipart/form request
+        data = data.dict()
+    return {k: v for k, v in data.items() if not hasattr(v, 'read')}
+
+
+def enqueue_job(job_type, school, params=None, user=None, portal_user=None, upload=None):
+    """
+    Queue a job. upload is an optional uploaded file whose bytes are stored with
+    the job so whichever process runs it can read it.
+    """
+    from .models import BackgroundJob
+
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {job_type}')
+
+    job = BackgroundJob.objects.create(
+        school=school,
+        job_type=job_type,
+        requested_by=user,
+        portal_user=portal_user,
+        params=params or {},
+        upload=upload.read() if upload is not None else None,
+        upload_name=getattr(upload, 'name', '') or '',
+        max_attempts=JOB_HANDLERS[job_type][1],
+        run_after=timezone.now(),
+    )
+    logger.info(f'Queued {job_type} job {job.id} for {school.slug}')
+
+    if _setting('BACKGROUND_JOBS_EAGER', False):
+        # Local development without a worker: run in the request
+        if claim_job(job.id, worker_id()):
+            job.refresh_from_db()
+            run_job(job)
+            job.refresh_from_db()
+    return job
+
+
+def enqueue_request_job(request, job_type):
+    """Queue a job replaying a school-scoped request (school, user, body and uploaded file)."""
+    school = getattr(request, 'school', None) or getattr(request.user, 'school', None)
+    return enqueue_job(
+        job_type,
+        school,
+        params=_request_params(request),
+        user=request.user,
+        upload=request.FILES.get('file'),
+    )
+
+
+def job_status_url(job):
+    if job.portal_user_id and not job.requested_by_id:
+        return f'/api/portal/jobs/{job.id}/'
+    return f'/api/{job.school.slug}/schooladmin/jobs/{job.id}/'
+
+
+def job_accepted_payload(job):
+    return {
+        'job_id': str(job.id),
+        'job_type': job.job_type,
+        'status': job.status,
+        'status_url': job_status_url(job),
+    }
+
+
+def serialize_job(job):
+    """Status payload for the polling endpoints."""
+    percent = None
+    if job.progress_total:
+        percent = round(job.progress_current * 100 / job.progress_total, 1)
+    payload = {
+        'job_id': str(job.id),
+        'job_type': job.job_type,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {
+            'current': job.progress_current,
+            'total': job.progress_total,
+            'percent': percent,
+            'message': job.progress_message,
+        },
+        'result': job.result,
+        'result_status': job.result_status,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'next_attempt_at': job.run_after if job.status == job.STATUS_QUEUED and job.attempts else None,
+    }
+    if job.result_file:
+        payload['download_url'] = f'{job_status_url(job)}download/'
+        payload['filename'] = job.result_filename
+    return payload
+
+
+def set_progress(job, current, total=None, message=None):
+    """Record progress (and a heartbeat) for a running job."""
+    from .models import BackgroundJob
+
+    fields = {'progress_current': current, 'heartbeat_at': timezone.now()}
+    job.progress_current = current
+    if total is not None:
+        fields['progress_total'] = total
+        job.progress_total = total
+    if message is not None:
+        fields['progress_message'] = message[:255]
+        job.progress_message = message[:255]
+    _outside_transaction(lambda: BackgroundJob.objects.filter(id=job.id).update(**fields))
+
+
+def _outside_transaction(write):
+    """
+    Run a small write to the job row so other processes see it straight away:
+    on a connection of its own when the handler holds a transaction open,
+    whose writes would only show at commit. SQLite has a single writer, so
+    there it runs on the handler's connection.
+    """
+    connection = connections['default']
+    if not connection.in_atomic_block or connection.vendor == 'sqlite':
+        write()
+        return
+
+    def run():
+        try:
+            write()
+        except Exception as e:
+            logger.warning(f'Could not update a running job: {e}')
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name='job-progress', daemon=True)
+    thread.start()
+    thread.join()
+
+
+class _Heartbeat:
+    """Refresh a running job's heartbeat every JOB_HEARTBEAT_SECONDS from a thread of its own."""
+
+    def __init__(self, job):
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _beat(self):
+        from .models import BackgroundJob
+
+        interval = _setting('JOB_HEARTBEAT_SECONDS', 60)
+        try:
+            while not self._stop.wait(interval):
+                try:
+                    BackgroundJob.objects.filter(id=self.job.id, locked_by=self.job.locked_by).update(
+                        heartbeat_at=timezone.now(),
+                    )
+                except Exception as e:
+                    logger.warning(f'Heartbeat for job {self.job.id} failed: {e}')
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        # SQLite's single writer would block the beats behind the handler's transaction
+        if connections['default'].vendor != 'sqlite':
+            self._thread = threading.Thread(target=self._beat, name=f'job-heartbeat-{self.job.id}', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def result_storage():
+    """Storage for job output files; private when backed by Spaces/S3."""
+    from django.core.files.storage import default_storage
+    try:
+        from storages.backends.s3boto3 import S3Boto3Storage
+    except ImportError:
+        return default_storage
+    if isinstance(default_storage, S3Boto3Storage):
+        return S3Boto3Storage(default_acl='private', querystring_auth=True, file_overwrite=True)
+    return default_storage
+
+
+def store_result_file(job, filename, content, content_type='application/octet-stream'):
+    """Save a job's output file (bytes or a file object) for the download endpoint."""
+    from django.core.files import File
+    from django.core.files.base import ContentFile
+    from .models import BackgroundJob
+
+    if isinstance(content, (bytes, bytearray)):
+        content = ContentFile(content)
+    elif not hasattr(content, 'chunks'):
+        content = File(content)
+
+    name = result_storage().save(f'jobs/{job.school.slug}/{job.id}/{filename}', content)
+    job.result_file = name
+    job.result_filename = filename
+    job.result_content_type = content_type
+    BackgroundJob.objects.filter(id=job.id).update(
+        result_file=name, result_filename=filename, result_content_type=content_type,
+    )
+    return name
+
+
+def open_result_file(job):
+    return result_storage().open(job.result_file, 'rb')
+
+
+def _busy_school_ids():
+    from .models import BackgroundJob
+    return list(
+        BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING)
+        .values('school_id')
+        .annotate(running=Count('id'))
+        .filter(running__gte=max_concurrent_per_school())
+        .values_list('school_id', flat=True)
+    )
+
+
+def claim_job(job_id, worker):
+    """Atomically move one queued job to running. Returns True if this worker got it."""
+    from .models import BackgroundJob
+
+    now = timezone.now()
+    return BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.STATUS_QUEUED).update(
+        status=BackgroundJob.STATUS_RUNNING,
+        locked_by=worker,
+        started_at=now,
+        heartbeat_at=now,
+        attempts=F('attempts') + 1,
+    ) == 1
+
+
+def claim_next_job(worker):
+    """
+    Claim the oldest runnable job from a school below its concurrency limit.
+    The claim is a conditional UPDATE, so concurrent workers never run the same job.
+    """
+    from .models import BackgroundJob
+
+    candidates = (
+        BackgroundJob.objects.filter(status=BackgroundJob.STATUS_QUEUED, run_after__lte=timezone.now())
+        .exclude(school_id__in=_busy_school_ids())
+        .order_by('run_after', 'created_at')
+        .values_list('id', 'school_id')[:20]
+    )
+    for job_id, school_id in candidates:
+        if not claim_job(job_id, worker):
+            continue
+
+        # Another worker may have started a job for the same school in the meantime
+        running = BackgroundJob.objects.filter(school_id=school_id, status=BackgroundJob.STATUS_RUNNING).count()
+        if running > max_concurrent_per_school():
+            BackgroundJob.objects.filter(id=job_id, locked_by=worker).update(
+                status=BackgroundJob.STATUS_QUEUED, locked_by='', attempts=F('attempts') - 1,
+            )
+            continue
+
+        return BackgroundJob.objects.select_related(
+            'school', 'requested_by', 'portal_user'
+        ).get(id=job_id)
+    return None
+
+
+def _retry_delay(attempts):
+    base = _setting('JOB_RETRY_BACKOFF_SECONDS', 30)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), 3600))
+
+
+def _holding(job):
+    """The job's row while the worker that claimed it still holds it."""
+    from .models import BackgroundJob
+
+    return BackgroundJob.objects.filter(id=job.id, status=BackgroundJob.STATUS_RUNNING, locked_by=job.locked_by)
+
+
+def _finish(job, status, **fields):
+    """Record the outcome; False (and nothing written) when the job was requeued away from this worker."""
+    fields.update(status=status, finished_at=timezone.now(), locked_by='')
+    if not _holding(job).update(**fields):
+        logger.warning(f'{job.job_type} job {job.id} is no longer held by {job.locked_by}: outcome {status} discarded')
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def _fail_attempt(job, error):
+    """Requeue with backoff, or fail for good once max_attempts is used up."""
+    from .models import BackgroundJob
+
+    if job.attempts < job.max_attempts:
+        delay = _retry_delay(job.attempts)
+        if not _holding(job).update(
+            status=BackgroundJob.STATUS_QUEUED,
+            run_after=timezone.now() + delay,
+            locked_by='',
+            error=error,
+        ):
+            logger.warning(f'{job.job_type} job {job.id} is no longer held by {job.locked_by}: failure discarded')
+            return
+        logger.warning(
+            f'{job.job_type} job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), '
+            f'retrying in {int(delay.total_seconds())}s'
+        )
+    elif _finish(job, BackgroundJob.STATUS_FAILED, error=error):
+        logger.error(f'{job.job_type} job {job.id} failed after {job.attempts} attempt(s): {error}')
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome."""
+    from .models import BackgroundJob
+
+    handler_path, _ = JOB_HANDLERS[job.job_type]
+    try:
+        handler = import_string(handler_path)
+        with _Heartbeat(job):
+            outcome = handler(JobRequest(job))
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        _fail_attempt(job, f'{type(e).__name__}: {e}')
+        return job
+
+    if hasattr(outcome, 'status_code'):
+        result, result_status = outcome.data, outcome.status_code
+    else:
+        result, result_status = outcome, 200
+
+    if result_status >= 400:
+        # The operation refused the request (validation, missing config...): not retryable
+        error = ''
+        if isinstance(result, dict):
+            error = str(result.get('detail') or result.get('error') or '')
+        _finish(job, BackgroundJob.STATUS_FAILED, result=result, result_status=result_status, error=error)
+    else:
+        _finish(
+            job, BackgroundJob.STATUS_COMPLETED,
+            result=result, result_status=result_status, error='',
+            progress_current=job.progress_total,
+        )
+    logger.info(f'{job.job_type} job {job.id} {job.status} ({result_status})')
+    return job
+
+
+def recover_stale_jobs():
+    """Treat running jobs whose worker stopped sending heartbeats as failed attempts."""
+    from .models import BackgroundJob
+
+    cutoff = timezone.now() - timedelta(minutes=_setting('JOB_STALE_AFTER_MINUTES', 60))
+    stale = BackgroundJob.objects.filter(status=BackgroundJob.STATUS_RUNNING, heartbeat_at__lt=cutoff)
+    for job in stale:
+        _fail_attempt(job, 'Worker stopped responding')
+    return len(stale)
+
+
+def run_pending_jobs(max_jobs=None):
+    """Claim and run queued jobs until none are runnable (or max_jobs ran). Returns the count."""
+    close_old_connections()
+    worker = worker_id()
+    recover_stale_jobs()
+
+    ran = 0
+    try:
+        while max_jobs is None or ran < max_jobs:
+            job = claim_next_job(worker)
+            if job is None:
+                break
+            run_job(job)
+            ran += 1
+    finally:
+        close_old_connections()
+    return ran
+
+
+def delete_old_jobs(days=7):
+    """Delete finished jobs (and their output files) older than the given number of days."""
+    from .models import BackgroundJob
+
+    cutoff = timezone.now() - timedelta(days=days)
+    old = BackgroundJob.objects.filter(
+        status__in=[BackgroundJob.STATUS_COMPLETED, BackgroundJob.STATUS_FAILED],
+        finished_at__lt=cutoff,
+    )
+    storage = result_storage()
+    for name in old.exclude(result_file='').values_list('result_file', flat=True):
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f'Could not delete job file {name}: {e}')
+    deleted, _ = old.delete()
+    return deleted
@@ -5,6 +5,11 @@ Exports all tables to Excel and creates a ZIP archive
 Usage:
     python manage.py backup_database
     python manage.py backup_database --email user@example.com
+    python manage.py backup_database --incremental         # Compressed snapshot (delta when possible)
+    python manage.py backup_database --incremental --full  # Force a full snapshot
+
+Incremental snapshots (schooladmin/backups.py) go to the backup storage and are
+restored one school at a time with restore_backup.
 """
 
 from django.core.management.base import BaseCommand
@@ -35,8 +40,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip creating ZIP file',
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Write a compressed snapshot holding only changes since the last one',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='With --incremental, write a full snapshot even if one is not due',
+        )
 
     def handle(self, *args, **options):
+        if options['incremental']:
+            from schooladmin.backups import take_snapshot
+            manifest = take_snapshot(full=options['full'], log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(
+                f"{manifest['kind'].title()} snapshot {manifest['id']}: {manifest['rows']} rows "
+                f"from {len(manifest['tables'])} tables in {manifest['seconds']}s"
+            ))
+            return
+
         self.stdout.write(self.style.SUCCESS('=' * 70))
         self.stdout.write(self.style.SUCCESS('DATABASE BACKUP STARTED'))
         self.stdout.write(self.style.SUCCESS('=' * 70))
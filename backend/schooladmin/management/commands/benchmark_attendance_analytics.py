@@ -0,0 +1,162 @@
+"""
+Benchmark of the attendance analytics behind the proprietor dashboards.
+
+Builds a throwaway school (default 2,000 students x 60 school days) inside a
+transaction that is rolled back, then times the previous per-class,
+per-student queries against schooladmin/attendance_stats.py: per-student
+rates, class averages, the at-risk list and recorded days per class session.
+Both are checked to give the same rates.
+
+Usage:
+    python manage.py benchmark_attendance_analytics
+    python manage.py benchmark_attendance_analytics --students 5000 --days 90 --classes 40
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+BATCH_SIZE = 5000
+SLUG = 'attendance-benchmark'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _previous_analytics(class_sessions, threshold):
+    """What proprietor_attendance_analytics and proprietor_data_quality queried per class and student."""
+    from schooladmin.models import AttendanceRecord
+
+    rates, at_risk, days = {}, [], {}
+    for cs in class_sessions:
+        records = AttendanceRecord.objects.filter(class_session=cs)
+        if not records.exists():
+            continue
+        days[cs.id] = records.values('date').distinct().count()
+        for student_id in set(records.values_list('student_id', flat=True).distinct()):
+            student_records = records.filter(student_id=student_id)
+            total_days = student_records.count()
+            present_days = student_records.filter(is_present=True).count()
+            if total_days > 0:
+                rate = (present_days / total_days) * 100
+                rates[student_id] = rate
+                if rate < threshold:
+                    student = student_records.first().student
+                    at_risk.append((student.id, rate))
+    return rates, at_risk, days
+
+
+def _current_analytics(class_sessions, threshold):
+    from schooladmin.attendance_stats import recorded_days, term_attendance
+
+    attendance = term_attendance(class_sessions, threshold=threshold)
+    days = recorded_days(cs.id for cs in class_sessions)
+    rates = {s['student_id']: s['rate'] for s in attendance['students']}
+    return rates, [(s['student_id'], s['rate']) for s in attendance['at_risk']], days
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-student attendance queries against the grouped attendance aggregation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=60, help='School days with attendance marked')
+        parser.add_argument('--classes', type=int, default=20)
+        parser.add_argument('--threshold', type=float, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            class_sessions = self._build(options)
+            self._run('before: queries per class and student', _previous_analytics, class_sessions, options)
+            self._run('after: grouped aggregation', _current_analytics, class_sessions, options)
+            before = _previous_analytics(class_sessions, options['threshold'])
+            after = _current_analytics(class_sessions, options['threshold'])
+            same = before[0] == after[0] and sorted(before[1]) == sorted(after[1]) and before[2] == after[2]
+            self.stdout.write(f'results match: {same}')
+            transaction.set_rollback(True)
+
+    def _run(self, label, func, class_sessions, options):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            func(class_sessions, options['threshold'])
+        seconds = time.perf_counter() - started
+        self.stdout.write(f'{label:<42} {seconds:8.3f}s {counter.count:7d} queries')
+
+    def _build(self, options):
+        from academics.models import Class, ClassSession, StudentSession
+        from schooladmin.models import AttendanceRecord
+        from tenants.models import School
+        from users.models import CustomUser
+
+        started = time.perf_counter()
+        rnd = random.Random(options['seed'])
+        n_students, n_days, n_classes = options['students'], options['days'], max(1, options['classes'])
+
+        School.objects.filter(slug=SLUG).delete()
+        school = School.objects.create(
+            name='Attendance Benchmark', slug=SLUG, email='benchmark@example.com',
+            current_academic_year='2025/2026', current_term='First Term',
+        )
+        recorder = CustomUser.objects.create(username=f'{SLUG}-admin', role='admin', school=school)
+        classes = Class.objects.bulk_create([Class(school=school, name=f'Class {i + 1}') for i in range(n_classes)])
+        ClassSession.objects.bulk_create([
+            ClassSession(classroom=cls, academic_year='2025/2026', term='First Term') for cls in classes
+        ])
+        class_sessions = list(ClassSession.objects.filter(
+            classroom__school=school, academic_year='2025/2026', term='First Term',
+        ).select_related('classroom'))
+
+        students = []
+        for i in range(n_students):
+            student = CustomUser(
+                username=f'{SLUG}-{i}', role='student', school=school,
+                first_name='Student', last_name=str(i), classroom=classes[i % n_classes],
+            )
+            student.set_unusable_password()
+            students.append(student)
+        CustomUser.objects.bulk_create(students, batch_size=BATCH_SIZE)
+        students = list(CustomUser.objects.filter(school=school, role='student').order_by('id'))
+
+        session_of = {cs.classroom_id: cs for cs in class_sessions}
+        StudentSession.objects.bulk_create([
+            StudentSession(student=student, class_session=session_of[student.classroom_id], is_active=True)
+            for student in students
+        ], batch_size=BATCH_SIZE)
+
+        school_days, day = [], date(2025, 9, 8)
+        while len(school_days) < n_days:
+            if day.weekday() < 5:
+                school_days.append(day)
+            day += timedelta(days=1)
+
+        # Each student attends with their own likelihood, so some fall below the threshold
+        records = []
+        for student in students:
+            likelihood = rnd.uniform(0.3, 1.0)
+            cs = session_of[student.classroom_id]
+            for school_day in school_days:
+                records.append(AttendanceRecord(
+                    student=student, class_session=cs, date=school_day,
+                    is_present=rnd.random() < likelihood, recorded_by=recorder,
+                ))
+                if len(records) >= BATCH_SIZE:
+                    AttendanceRecord.objects.bulk_create(records)
+                    records = []
+        AttendanceRecord.objects.bulk_create(records)
+
+        self.stdout.write(
+            f'{n_students} students x {n_days} days in {n_classes} classes '
+            f'({n_students * n_days} records) built in {time.perf_counter() - started:.1f}s'
+        )
+        return class_sessions
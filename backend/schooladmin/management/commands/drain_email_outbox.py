@@ -0,0 +1,61 @@
+"""
+Django management command to deliver queued emails (see logs/email_outbox.py).
+
+run_scheduler already drains the outbox every few seconds; run this as a
+separate process to deliver large announcements without waiting on other
+scheduler jobs.
+
+Usage:
+    python manage.py drain_email_outbox
+    python manage.py drain_email_outbox --once
+    python manage.py drain_email_outbox --poll-interval 2
+"""
+
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued emails from the email outbox in Brevo batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver every email that is currently due, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'EMAIL_OUTBOX_POLL_SECONDS', 5),
+            help='Seconds to wait between polls when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        from logs.email_outbox import drain_outbox
+
+        if options['once']:
+            stats = drain_outbox()
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {stats['sent']}, skipped {stats['skipped']}, "
+                f"retrying {stats['retrying']}, failed {stats['failed']}."
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Email outbox worker started.'))
+        self.stdout.write(self.style.WARNING('Press Ctrl+C to exit'))
+        try:
+            while True:
+                try:
+                    claimed = drain_outbox()['claimed']
+                except Exception as e:
+                    logger.error(f'Email outbox drain failed: {e}')
+                    claimed = 0
+                if not claimed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Email outbox worker stopped.'))
@@ -0,0 +1,146 @@
+"""
+Django management command to load-test the live notification stream (logs/sse.py)
+inside one process, i.e. what a single ASGI worker can hold.
+
+It opens N streams through the real stream coroutine and an in-process
+LocalBroker (no sockets, no database), keeps them idle with heartbeats, then
+publishes events from a worker thread the way a sync Django view would, and
+reports memory per connection, event-loop lag while idle and fan-out latency.
+
+Usage:
+    python manage.py loadtest_notification_stream
+    python manage.py loadtest_notification_stream --connections 10000 --users 5000 --idle 10
+"""
+
+import asyncio
+import logging
+import resource
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeClient:
+    """ASGI receive/send pair for one stream; remembers when each event arrived."""
+
+    pending = 0
+    all_arrived = None
+
+    def __init__(self):
+        self.disconnected = asyncio.Event()
+        self.bytes_sent = 0
+        self.heartbeats = 0
+        self.arrivals = {}
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        body = message.get('body', b'')
+        self.bytes_sent += len(body)
+        if body == b': ping\n\n':
+            self.heartbeats += 1
+        elif b'event: activity' in body:
+            marker = body.split(b'event: activity', 1)[1].split(b'"id":', 1)[1].split(b',', 1)[0]
+            self.arrivals[int(marker)] = time.perf_counter()
+            _FakeClient.pending -= 1
+            if not _FakeClient.pending:
+                _FakeClient.all_arrived.set()
+
+
+class Command(BaseCommand):
+    help = 'Holds many idle notification streams in one process and measures memory, loop lag and fan-out latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000, help='Streams to open (default 2000)')
+        parser.add_argument('--users', type=int, default=0, help='Distinct users across the streams (default: one per stream)')
+        parser.add_argument('--idle', type=float, default=5.0, help='Seconds to stay idle (default 5)')
+        parser.add_argument('--heartbeat', type=int, default=1, help='Heartbeat interval during the test, seconds (default 1)')
+        parser.add_argument('--broadcasts', type=int, default=3, help='Events published to every user (default 3)')
+
+    def handle(self, *args, **options):
+        with override_settings(LIVE_EVENTS_HEARTBEAT_SECONDS=options['heartbeat']):
+            results = asyncio.run(self._run(
+                options['connections'], options['users'] or options['connections'],
+                options['idle'], options['broadcasts'],
+            ))
+
+        for label, value in results:
+            self.stdout.write(f'{label:<38} {value}')
+        logger.info(f'loadtest_notification_stream: {dict(results)}')
+
+    async def _run(self, connections, users, idle, broadcasts):
+        from logs import live_events, sse
+
+        broker = live_events.LocalBroker()
+        previous_broker, live_events._broker = live_events._broker, broker
+        scope = {'type': 'http', 'method': 'GET', 'path': sse.STREAM_PATHS[0], 'headers': [], 'query_string': b''}
+        counts = {'unread_activity': 0, 'unread_direct': 0, 'pending_popups': 0}
+        results = []
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        clients, tasks = [], []
+        started = time.perf_counter()
+        try:
+            for i in range(connections):
+                client = _FakeClient()
+                user = SimpleNamespace(id=i % users)
+                clients.append(client)
+                tasks.append(asyncio.ensure_future(
+                    sse.stream(scope, client.receive, client.send, user, initial_counts=counts)
+                ))
+            while broker.connection_count() < connections:
+                await asyncio.sleep(0.01)
+            results.append(('Streams open', broker.connection_count()))
+            results.append(('Time to open all (s)', f'{time.perf_counter() - started:.2f}'))
+
+            current, _ = tracemalloc.get_traced_memory()
+            results.append(('Python heap per stream (KiB)', f'{(current - baseline) / connections / 1024:.2f}'))
+
+            # Idle: how late does a 50 ms timer fire while every stream heartbeats?
+            lags = []
+            idle_until = time.perf_counter() + idle
+            while time.perf_counter() < idle_until:
+                before = time.perf_counter()
+                await asyncio.sleep(0.05)
+                lags.append(time.perf_counter() - before - 0.05)
+            results.append(('Heartbeats sent while idle', sum(client.heartbeats for client in clients)))
+            results.append(('Event loop lag idle, max (ms)', f'{max(lags) * 1000:.1f}'))
+
+            # Fan-out: publish from another thread, as a sync view does
+            user_ids = list(range(users))
+            latencies = []
+            for event_id in range(1, broadcasts + 1):
+                _FakeClient.pending, _FakeClient.all_arrived = connections, asyncio.Event()
+                published = time.perf_counter()
+                thread = threading.Thread(target=broker.publish, args=(
+                    [(user_ids, 'activity', {'id': event_id, 'content_title': 'Load test'})],
+                ))
+                thread.start()
+                await _FakeClient.all_arrived.wait()
+                thread.join()
+                latencies.append(max(client.arrivals[event_id] for client in clients) - published)
+            if latencies:
+                results.append(('Broadcast to all streams, worst (ms)', f'{max(latencies) * 1000:.1f}'))
+                results.append(('Broadcast to all streams, best (ms)', f'{min(latencies) * 1000:.1f}'))
+
+            for client in clients:
+                client.disconnected.set()
+            await asyncio.gather(*tasks)
+            results.append(('Streams left after disconnect', broker.connection_count()))
+            results.append(('Bytes sent per stream', sum(client.bytes_sent for client in clients) // connections))
+            results.append(('Process max RSS (MiB)', f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}'))
+        finally:
+            tracemalloc.stop()
+            for task in tasks:
+                task.cancel()
+            live_events._broker = previous_broker
+        return results
@@ -0,0 +1,107 @@
+"""
+Django management command to rebuild the materialised ClassRanking table and
+check it against the live report-sheet computation.
+
+Usage:
+    python manage.py rebuild_class_rankings
+    python manage.py rebuild_class_rankings --school <slug> --academic-year 2024/2025 --term "First Term"
+    python manage.py rebuild_class_rankings --check-only
+"""
+
+import logging
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds class rankings from GradeSummary rows and verifies every stored '
+        'average and position against the live report-sheet computation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help='Only rebuild this school (slug)')
+        parser.add_argument('--academic-year', help='Only rebuild this academic year (e.g. 2024/2025)')
+        parser.add_argument('--term', help='Only rebuild this term (e.g. "First Term")')
+        parser.add_argument(
+            '--check-only',
+            action='store_true',
+            help='Do not rebuild; only compare the stored rankings with the live computation',
+        )
+
+    def handle(self, *args, **options):
+        from academics.models import ClassSession
+        from schooladmin.models import ClassRanking, GradingConfiguration
+        from schooladmin.rankings import rebuild_class_rankings
+        from schooladmin.report_engine import build_class_report
+
+        configs = GradingConfiguration.objects.select_related('school')
+        if options['school']:
+            configs = configs.filter(school__slug=options['school'])
+            if not configs.exists():
+                raise CommandError(f"No grading configurations found for school '{options['school']}'")
+        if options['academic_year']:
+            configs = configs.filter(academic_year=options['academic_year'])
+        if options['term']:
+            configs = configs.filter(term=options['term'])
+
+        classes_checked = 0
+        mismatches = 0
+
+        for config in configs:
+            class_sessions = ClassSession.objects.filter(
+                classroom__school=config.school,
+                academic_year=config.academic_year,
+                term=config.term,
+            ).select_related('classroom')
+
+            for class_session in class_sessions:
+                if not options['check_only']:
+                    rebuild_class_rankings(config, class_session)
+
+                live = build_class_report(class_session, config)
+                stored = {
+                    r.student_id: r
+                    for r in ClassRanking.objects.filter(grading_config=config, class_session=class_session)
+                }
+                classes_checked += 1
+
+                for student_id, report in live.students.items():
+                    ranking = stored.pop(student_id, None)
+                    if report.subjects_entered == 0:
+                        if ranking is not None:
+                            mismatches += 1
+                            self.stdout.write(self.style.WARNING(
+                                f'{class_session}: student {student_id} has a ranking but no grades'
+                            ))
+                        continue
+
+                    if ranking is None:
+                        mismatches += 1
+                        self.stdout.write(self.style.WARNING(
+                            f'{class_session}: student {student_id} missing from rankings'
+                        ))
+                        continue
+
+                    average_drift = abs(float(ranking.average) - report.ranking_average)
+                    if ranking.position != report.position or average_drift > 0.01:
+                        mismatches += 1
+                        self.stdout.write(self.style.WARNING(
+                            f'{class_session}: student {student_id} stored #{ranking.position} '
+                            f'({ranking.average}) vs live #{report.position} ({report.ranking_average:.2f})'
+                        ))
+
+                for student_id in stored:
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'{class_session}: student {student_id} ranked but not enrolled in the class'
+                    ))
+
+        action = 'Checked' if options['check_only'] else 'Rebuilt and checked'
+        summary = f'{action} {classes_checked} class ranking(s): {mismatches} mismatch(es).'
+        logger.info(f'rebuild_class_rankings: {summary}')
+        if mismatches:
+            self.stdout.write(self.style.ERROR(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
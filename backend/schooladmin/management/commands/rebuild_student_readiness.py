@@ -0,0 +1,47 @@
+"""
+Django management command to rebuild the materialised StudentReadiness table
+(fee and grade completeness per student and term) from the source rows.
+
+Usage:
+    python manage.py rebuild_student_readiness
+    python manage.py rebuild_student_readiness --school <slug> --academic-year 2024/2025 --term "First Term"
+"""
+
+import logging
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds report-sheet readiness rows from fee records, grade summaries and enrolments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help='Only rebuild this school (slug)')
+        parser.add_argument('--academic-year', help='Only rebuild this academic year (e.g. 2024/2025)')
+        parser.add_argument('--term', help='Only rebuild this term (e.g. "First Term")')
+
+    def handle(self, *args, **options):
+        from schooladmin.models import GradingConfiguration, StudentReadiness
+        from schooladmin.readiness import refresh_students
+
+        configs = GradingConfiguration.objects.select_related('school')
+        if options['school']:
+            configs = configs.filter(school__slug=options['school'])
+            if not configs.exists():
+                raise CommandError(f"No grading configurations found for school '{options['school']}'")
+        if options['academic_year']:
+            configs = configs.filter(academic_year=options['academic_year'])
+        if options['term']:
+            configs = configs.filter(term=options['term'])
+
+        configs_rebuilt = 0
+        students = 0
+        for config in configs:
+            refresh_students(config)
+            configs_rebuilt += 1
+            students += StudentReadiness.objects.filter(grading_config=config).count()
+
+        summary = f'Rebuilt readiness for {students} student(s) across {configs_rebuilt} grading configuration(s).'
+        logger.info(f'rebuild_student_readiness: {summary}')
+        self.stdout.write(self.style.SUCCESS(summary))
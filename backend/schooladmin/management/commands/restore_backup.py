@@ -0,0 +1,96 @@
+"""
+Django management command to restore one school from the incremental snapshots
+written by backup_database --incremental (schooladmin/backups.py)
+
+Usage:
+    python manage.py restore_backup --list                                # Available snapshots
+    python manage.py restore_backup --school <slug> --preview             # See what would change
+    python manage.py restore_backup --school <slug>                       # Restore from the latest snapshot
+    python manage.py restore_backup --school <slug> --snapshot <id>       # Restore as of an older snapshot
+
+Rows the snapshot has are written back, the school's rows created since are
+deleted. Other schools are not touched. Uploaded files are not part of snapshots.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Restore one school from incremental backup snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List available snapshots',
+        )
+        parser.add_argument(
+            '--school',
+            type=str,
+            help='Slug of the school to restore',
+        )
+        parser.add_argument(
+            '--snapshot',
+            type=str,
+            help='Snapshot id to restore to (default: the latest)',
+        )
+        parser.add_argument(
+            '--preview',
+            action='store_true',
+            help='Show what would be restored and deleted without changing anything',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Skip confirmation prompt',
+        )
+
+    def handle(self, *args, **options):
+        from schooladmin.backups import list_manifests, restore_school
+
+        if options['list']:
+            manifests = list_manifests()
+            if not manifests:
+                self.stdout.write('No snapshots found.')
+            for manifest in manifests:
+                self.stdout.write(
+                    f"{manifest['id']}  {manifest['kind']:<5}  {manifest['rows']:>10} rows  "
+                    f"{len(manifest['tables']):>3} tables  {manifest['seconds']:>7}s"
+                )
+            return
+
+        slug = options['school']
+        if not slug:
+            raise CommandError('Pass --school <slug> (or --list)')
+
+        try:
+            plan = restore_school(slug, options['snapshot'], preview=True, log=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.show_plan(plan)
+
+        if options['preview']:
+            self.stdout.write(self.style.SUCCESS('\nPREVIEW COMPLETE - No data was changed'))
+            return
+
+        if not options['force']:
+            self.stdout.write(self.style.WARNING(f"\nThis will overwrite {slug}'s data with the snapshot."))
+            confirmation = input(f'\nType "{slug}" to confirm: ')
+            if confirmation != slug:
+                self.stdout.write(self.style.ERROR('\n✗ Restore cancelled.'))
+                return
+
+        try:
+            summary = restore_school(slug, options['snapshot'], log=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ Restored {slug}: {sum(t['restored'] for t in summary)} rows written, "
+            f"{sum(t['deleted'] for t in summary)} deleted"
+        ))
+
+    def show_plan(self, plan):
+        self.stdout.write(f"\n{'Table':<45} {'Restore':>10} {'Delete':>10}")
+        for table in plan:
+            if table['restored'] or table['deleted']:
+                self.stdout.write(f"{table['table']:<45} {table['restored']:>10} {table['deleted']:>10}")
@@ -0,0 +1,57 @@
+"""
+Django management command to run background jobs (see schooladmin/jobs.py).
+
+run_scheduler already drains the job queue every few seconds; run this as a
+separate process when jobs should not share the scheduler's threads.
+
+Usage:
+    python manage.py run_job_worker
+    python manage.py run_job_worker --once
+    python manage.py run_job_worker --poll-interval 2
+"""
+
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (session rollover, report sending, imports, exports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every currently runnable job, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'JOB_POLL_SECONDS', 5),
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        from schooladmin.jobs import run_pending_jobs
+
+        if options['once']:
+            ran = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f'Ran {ran} job(s).'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Job worker started.'))
+        self.stdout.write(self.style.WARNING('Press Ctrl+C to exit'))
+        try:
+            while True:
+                try:
+                    ran = run_pending_jobs()
+                except Exception as e:
+                    logger.error(f'Job worker poll failed: {e}')
+                    ran = 0
+                if not ran:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Job worker stopped.'))
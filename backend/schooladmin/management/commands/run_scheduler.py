@@ -36,6 +36,78 @@ def send_scheduled_backup():
         logger.error(f"Error in scheduled backup: {str(e)}")
 
 
+def take_incremental_backup():
+    """
+    Job function that writes a compressed snapshot (schooladmin/backups.py):
+    a delta since the previous one, or a full snapshot when one is due.
+    """
+    from schooladmin.backups import take_snapshot
+    try:
+        take_snapshot()
+    except Exception as e:
+        logger.error(f"Error taking incremental backup: {str(e)}")
+
+
+def run_background_jobs():
+    """
+    Job function that drains the background job queue (schooladmin/jobs.py).
+    Several instances may overlap, so jobs from different schools run side by side.
+    """
+    from schooladmin.jobs import run_pending_jobs
+    try:
+        run_pending_jobs()
+    except Exception as e:
+        logger.error(f"Error running background jobs: {str(e)}")
+
+
+def drain_email_outbox():
+    """
+    Job function that delivers queued emails (logs/email_outbox.py) in Brevo batches.
+    """
+    from logs.email_outbox import drain_outbox
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.error(f"Error draining email outbox: {str(e)}")
+
+
+def queue_notification_digests():
+    """
+    Job function that queues one digest email per user for new class content
+    (logs/notification_fanout.py).
+    """
+    from logs.notification_fanout import queue_digest_emails
+    try:
+        queue_digest_emails()
+    except Exception as e:
+        logger.error(f"Error queueing notification digests: {str(e)}")
+
+
+@util.close_old_connections
+def delete_old_outbox_emails():
+    """Delete delivered, skipped and failed outbox emails older than 30 days"""
+    from logs.email_outbox import delete_old_outbox_emails as delete_old
+    delete_old(days=30)
+
+
+@util.close_old_connections
+def retry_storage_purges():
+    """Delete stored files that earlier purges (schooladmin/storage_purge.py) could not"""
+    from datetime import timedelta
+    from schooladmin.storage_purge import retry_pending_purges
+    try:
+        retry_pending_purges(older_than=timedelta(hours=1), max_attempts=10)
+    except Exception as e:
+        logger.error(f"Error retrying storage purges: {str(e)}")
+
+
+@util.close_old_connections
+def delete_old_background_jobs():
+    """Delete finished background jobs (and their files) older than 7 days"""
+    from schooladmin.jobs import delete_old_jobs
+    delete_old_jobs(days=7)
+
+
 @util.close_old_connections
 def delete_old_job_executions(max_age=604_800):
     """
@@ -70,6 +142,21 @@ class Command(BaseCommand):
             )
         )
 
+        # Add incremental snapshot job (0 hours disables it)
+        snapshot_hours = getattr(settings, 'BACKUP_SNAPSHOT_HOURS', 24)
+        if snapshot_hours:
+            scheduler.add_job(
+                take_incremental_backup,
+                trigger=IntervalTrigger(hours=snapshot_hours),
+                id='incremental_backup',
+                name='Take incremental backup snapshot every {} hours'.format(snapshot_hours),
+                replace_existing=True,
+                max_instances=1,
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Added job: Take incremental backup snapshot every {snapshot_hours} hours')
+            )
+
         # Add subscription expiry check job (runs hourly)
         scheduler.add_job(
             lambda: call_command('check_subscription_expiry'),
@@ -103,6 +190,78 @@ class Command(BaseCommand):
         )
         self.stdout.write(self.style.SUCCESS('Added job: Send deferred graduation emails (daily)'))
 
+        # Drain the background job queue (session rollover, report sending, imports, exports)
+        job_poll_seconds = getattr(settings, 'JOB_POLL_SECONDS', 5)
+        scheduler.add_job(
+            run_background_jobs,
+            trigger=IntervalTrigger(seconds=job_poll_seconds),
+            id='run_background_jobs',
+            name='Run queued background jobs',
+            replace_existing=True,
+            max_instances=getattr(settings, 'JOB_SCHEDULER_THREADS', 2),
+            coalesce=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Added job: Run queued background jobs (every {job_poll_seconds}s)'))
+
+        # Deliver queued emails (announcements, notifications) in Brevo batches
+        outbox_poll_seconds = getattr(settings, 'EMAIL_OUTBOX_POLL_SECONDS', 5)
+        scheduler.add_job(
+            drain_email_outbox,
+            trigger=IntervalTrigger(seconds=outbox_poll_seconds),
+            id='drain_email_outbox',
+            name='Deliver queued emails',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Added job: Deliver queued emails (every {outbox_poll_seconds}s)'))
+
+        # Queue digest emails for new class content notifications
+        digest_minutes = getattr(settings, 'NOTIFICATION_DIGEST_MINUTES', 15)
+        scheduler.add_job(
+            queue_notification_digests,
+            trigger=IntervalTrigger(minutes=digest_minutes),
+            id='queue_notification_digests',
+            name='Queue class content notification digests',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Added job: Queue notification digests (every {digest_minutes} min)'))
+
+        # Add job to delete old outbox emails (runs daily)
+        scheduler.add_job(
+            delete_old_outbox_emails,
+            trigger=IntervalTrigger(days=1),
+            id='delete_old_outbox_emails',
+            name='Delete outbox emails older than 30 days',
+            replace_existing=True,
+            max_instances=1,
+        )
+        self.stdout.write(self.style.SUCCESS('Added job: Delete old outbox emails (daily)'))
+
+        # Add job to retry file deletions left over by storage purges (runs daily)
+        scheduler.add_job(
+            retry_storage_purges,
+            trigger=IntervalTrigger(days=1),
+            id='retry_storage_purges',
+            name='Retry unfinished storage purges',
+            replace_existing=True,
+            max_instances=1,
+        )
+        self.stdout.write(self.style.SUCCESS('Added job: Retry storage purges (daily)'))
+
+        # Add job to delete finished background jobs (runs daily)
+        scheduler.add_job(
+            delete_old_background_jobs,
+            trigger=IntervalTrigger(days=1),
+            id='delete_old_background_jobs',
+            name='Delete finished background jobs older than 7 days',
+            replace_existing=True,
+            max_instances=1,
+        )
+        self.stdout.write(self.style.SUCCESS('Added job: Delete old background jobs (daily)'))
+
         # Add job to delete old job executions (runs daily)
         scheduler.add_job(
             delete_old_job_executions,
@@ -27,6 +27,7 @@ class Command(BaseCommand):
             send_parent_all_children_graduated_email,
         )
         from logs.models import Notification
+        from tenants.quota import reserve, release
 
         pending = DeferredGraduationEmail.objects.filter(is_sent=False).select_related(
             'school', 'recipient', 'student', 'school__subscription', 'school__subscription__plan'
@@ -43,29 +44,20 @@ class Command(BaseCommand):
         # Group by school so we respect per-school quota
         from itertools import groupby
         for school, school_emails_iter in groupby(pending, key=lambda e: e.school):
-            subscription = getattr(school, 'subscription', None)
-            plan = getattr(subscription, 'plan', None)
-            max_daily = getattr(plan, 'max_daily_emails', 0) if plan else 0
-            is_unlimited = (max_daily == 0)
-
-            if not is_unlimited and subscription:
-                # Reset counter if it's a new day
-                today = timezone.now().date()
-                if subscription.email_counter_reset_date < today:
-                    subscription.emails_sent_today = 0
-                    subscription.email_counter_reset_date = today
-                    subscription.save(update_fields=['emails_sent_today', 'email_counter_reset_date'])
-                quota_left = max_daily - subscription.emails_sent_today
-            else:
-                quota_left = -1  # unlimited
+            school_emails = list(school_emails_iter)
+
+            # Claim the quota for the school's whole batch in one statement
+            quota_left = reserve(school, len(school_emails))
+            unused_quota = 0
 
             school_sent = 0
             school_still_deferred = 0
 
-            for deferred in school_emails_iter:
-                if not is_unlimited and quota_left <= 0:
+            for deferred in school_emails:
+                if quota_left <= 0:
                     school_still_deferred += 1
                     continue
+                quota_left -= 1
 
                 try:
                     email_type = deferred.email_type
@@ -74,30 +66,30 @@ class Command(BaseCommand):
                     deactivation_date = deferred.deactivation_date
                     login_url = deferred.login_url
 
+                    sent = False
                     if email_type == DeferredGraduationEmail.EMAIL_TYPE_STUDENT:
-                        send_graduation_email_student(recipient, deactivation_date, login_url)
+                        sent = send_graduation_email_student(recipient, deactivation_date, login_url, quota_reserved=True)
                     elif email_type == DeferredGraduationEmail.EMAIL_TYPE_PARENT_PER_CHILD:
                         if student:
-                            send_graduation_email_parent(recipient, student, deactivation_date, login_url)
+                            sent = send_graduation_email_parent(recipient, student, deactivation_date, login_url, quota_reserved=True)
                     elif email_type == DeferredGraduationEmail.EMAIL_TYPE_PARENT_ALL_GRADUATED:
-                        send_parent_all_children_graduated_email(recipient, deactivation_date, login_url)
+                        sent = send_parent_all_children_graduated_email(recipient, deactivation_date, login_url, quota_reserved=True)
+                    if not sent:
+                        unused_quota += 1
 
                     deferred.is_sent = True
                     deferred.sent_at = timezone.now()
                     deferred.save(update_fields=['is_sent', 'sent_at'])
                     school_sent += 1
 
-                    if not is_unlimited:
-                        quota_left -= 1
-                        if subscription:
-                            subscription.increment_email_count()
-
                 except Exception as exc:
+                    unused_quota += 1
                     logger.error(
                         f'send_deferred_graduation_emails: failed for deferred id={deferred.id} '
                         f'recipient={deferred.recipient_id}: {exc}'
                     )
 
+            release(school, unused_quota)
             sent_total += school_sent
             still_deferred_total += school_still_deferred
 
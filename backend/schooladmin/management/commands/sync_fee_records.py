@@ -0,0 +1,51 @@
+"""
+Django management command to write the fee records the fee ledger
+(schooladmin/fee_ledger.py) is missing: one per student and fee structure
+they owe, created UNPAID. Existing records are left as they are.
+
+Records are written when fee structures and enrolments change; this repairs
+schools whose rows were changed without the signals, e.g. by raw SQL or a
+restore.
+
+Usage:
+    python manage.py sync_fee_records
+    python manage.py sync_fee_records --school <slug> --academic-year 2024/2025 --term "First Term"
+"""
+
+import logging
+from django.core.management.base import BaseCommand, CommandError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Creates the missing fee records of every student for the fee structures they owe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', help='Only sync this school (slug)')
+        parser.add_argument('--academic-year', help='Only sync fee structures of this academic year (e.g. 2024/2025)')
+        parser.add_argument('--term', help='Only sync fee structures of this term (e.g. "First Term")')
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+
+        from schooladmin.fee_ledger import materialise
+        from schooladmin.models import FeeStructure
+
+        fees = FeeStructure.objects.all()
+        if options['school']:
+            fees = fees.filter(school__slug=options['school'])
+            if not fees.exists():
+                raise CommandError(f"No fee structures found for school '{options['school']}'")
+        if options['academic_year']:
+            fees = fees.filter(academic_year=options['academic_year'])
+        if options['term']:
+            fees = fees.filter(term=options['term'])
+
+        fee_ids = list(fees.values_list('id', flat=True))
+        with transaction.atomic():
+            created = materialise(fee_ids=fee_ids)
+
+        summary = f'Created {created} fee record(s) across {len(fee_ids)} fee structure(s).'
+        logger.info(f'sync_fee_records: {summary}')
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 06:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0028_assessment_unlock_strategy'),
+        ('schooladmin', '0017_fix_gradingconfiguration_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subjects_count', models.PositiveIntegerField(default=0, help_text='Subjects with a grade summary')),
+                ('grand_total', models.DecimalField(decimal_places=2, default=0, help_text='Sum of GradeSummary totals', max_digits=8)),
+                ('average', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('position', models.PositiveIntegerField(default=0, help_text='Dense rank within the class (1 = best)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='academics.classsession')),
+                ('grading_config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='schooladmin.gradingconfiguration')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['grading_config', 'class_session', 'position'], name='schooladmin_grading_ddbf09_idx')],
+                'unique_together': {('grading_config', 'class_session', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-17 07:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0028_assessment_unlock_strategy'),
+        ('schooladmin', '0019_backgroundjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentReadiness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fees_complete', models.BooleanField(default=False, help_text='Has fee records for the year and all are paid')),
+                ('fee_balance', models.DecimalField(decimal_places=2, default=0, help_text='Owed on unpaid fee records', max_digits=12)),
+                ('grades_complete', models.BooleanField(default=False, help_text='Has subjects and every component is entered')),
+                ('subjects_count', models.PositiveIntegerField(default=0)),
+                ('incomplete_subjects', models.PositiveIntegerField(default=0)),
+                ('missing_components', models.PositiveIntegerField(default=0, help_text='Missing Test 1/Test 2/Exam/Total entries')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readiness', to='academics.classsession')),
+                ('grading_config', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readiness', to='schooladmin.gradingconfiguration')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='readiness', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['grading_config', 'class_session', 'fees_complete', 'grades_complete'], name='schooladmin_grading_0030ee_idx')],
+                'unique_together': {('student', 'grading_config')},
+            },
+        ),
+    ]
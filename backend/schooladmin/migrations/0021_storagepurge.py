@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-17 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schooladmin', '0020_studentreadiness'),
+        ('tenants', '0028_reportcardexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoragePurge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('keys_total', models.PositiveIntegerField(default=0)),
+                ('keys_deleted', models.PositiveIntegerField(default=0)),
+                ('keys_failed', models.PositiveIntegerField(default=0)),
+                ('seconds', models.FloatField(default=0, help_text='Time spent deleting, over all attempts')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='storage_purges', to='tenants.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StoragePurgeKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('storage', models.CharField(help_text='File field whose storage holds the key, e.g. academics.ContentFile.file', max_length=150)),
+                ('name', models.CharField(max_length=500)),
+                ('deleted', models.BooleanField(default=False)),
+                ('error', models.CharField(blank=True, max_length=500)),
+                ('purge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='keys', to='schooladmin.storagepurge')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='storagepurge',
+            index=models.Index(fields=['status', 'created_at'], name='schooladmin_status_74a0eb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storagepurgekey',
+            index=models.Index(fields=['purge', 'deleted'], name='schooladmin_purge_i_732899_idx'),
+        ),
+    ]
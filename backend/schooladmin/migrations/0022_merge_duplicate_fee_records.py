@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 12:10
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Keep one fee record per student and fee before the unique constraint: the
+    one with the most paid (the oldest on a tie). It takes the payments of the
+    others, their amount_paid summed into its own and their payment history
+    moved to it, and its payment_status is worked out again from the total.
+    """
+    StudentFeeRecord = apps.get_model('schooladmin', 'StudentFeeRecord')
+    FeePaymentHistory = apps.get_model('schooladmin', 'FeePaymentHistory')
+    FeeStructure = apps.get_model('schooladmin', 'FeeStructure')
+
+    duplicated = (
+        StudentFeeRecord.objects.values('student_id', 'fee_structure_id')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+        .order_by()
+    )
+    for pair in duplicated:
+        copies = StudentFeeRecord.objects.filter(
+            student_id=pair['student_id'], fee_structure_id=pair['fee_structure_id'],
+        )
+        ids = list(copies.order_by('-amount_paid', 'id').values_list('id', flat=True))
+        keep, others = ids[0], ids[1:]
+        amount_paid = copies.aggregate(total=Sum('amount_paid'))['total'] or 0
+        fee_amount = FeeStructure.objects.get(id=pair['fee_structure_id']).amount
+        if amount_paid >= fee_amount:
+            payment_status = 'PAID'
+        elif amount_paid > 0:
+            payment_status = 'PARTIAL'
+        else:
+            payment_status = 'UNPAID'
+
+        FeePaymentHistory.objects.filter(fee_record_id__in=others).update(fee_record_id=keep)
+        StudentFeeRecord.objects.filter(id__in=others).delete()
+        StudentFeeRecord.objects.filter(id=keep).update(amount_paid=amount_paid, payment_status=payment_status)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schooladmin', '0021_storagepurge'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 12:10
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_fee_records(apps, schema_editor):
+    """
+    Fee records used to be created when the fee pages were read; they are now
+    written when fees and enrolments change (fee_ledger.py). Create the ones
+    no page has read yet, as the ledger would.
+    """
+    StudentFeeRecord = apps.get_model('schooladmin', 'StudentFeeRecord')
+    StudentSession = apps.get_model('academics', 'StudentSession')
+    CustomUser = apps.get_model('users', 'CustomUser')
+
+    owed = set(StudentSession.objects.filter(
+        class_session__classroom__fee_structures__academic_year=F('class_session__academic_year'),
+        class_session__classroom__fee_structures__term=F('class_session__term'),
+    ).values_list('student_id', 'class_session__classroom__fee_structures').order_by())
+    owed.update(CustomUser.objects.filter(
+        role='student', classroom__fee_structures__isnull=False,
+    ).values_list('id', 'classroom__fee_structures').order_by())
+    owed -= set(StudentFeeRecord.objects.values_list('student_id', 'fee_structure_id'))
+
+    StudentFeeRecord.objects.bulk_create(
+        [
+            StudentFeeRecord(student_id=student_id, fee_structure_id=fee_id, amount_paid=0, payment_status='UNPAID')
+            for student_id, fee_id in sorted(owed)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0028_assessment_unlock_strategy'),
+        ('schooladmin', '0022_merge_duplicate_fee_records'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='studentfeerecord',
+            unique_together={('student', 'fee_structure')},
+        ),
+        migrations.RunPython(backfill_fee_records, migrations.RunPython.noop),
+    ]
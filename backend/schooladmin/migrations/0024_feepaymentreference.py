@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 09:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schooladmin', '0023_studentfeerecord_unique'),
+        ('tenants', '0028_reportcardexport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeePaymentReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=100)),
+                ('batch', models.UUIDField()),
+                ('posted_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_payment_references', to='tenants.school')),
+            ],
+            options={
+                'unique_together': {('school', 'reference')},
+            },
+        ),
+    ]
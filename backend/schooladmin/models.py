@@ -4,6 +4,9 @@ from django.core.exceptions import ValidationError
 from academics.models import Class, ClassSession
 from tenants.models import School
 from decimal import Decimal
+from bisect import bisect_right
+from collections import defaultdict
+import uuid
 
 
 class FeeStructure(models.Model):
@@ -44,6 +47,10 @@ class StudentFeeRecord(models.Model):
     date_paid = models.DateTimeField(auto_now=True)
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='UNPAID')
 
+    class Meta:
+        # One ledger row per student and fee (fee_ledger.py)
+        unique_together = ('student', 'fee_structure')
+
     def __str__(self):
         return f"{self.student.username} - {self.fee_structure.name} - {self.payment_status}"
 
@@ -90,6 +97,28 @@ class FeePaymentHistory(models.Model):
         return f"{self.fee_record.student.username} - {self.transaction_type} - ₦{self.amount}"
 
 
+class FeePaymentReference(models.Model):
+    """
+    References of the payments posted in bulk (fee_payments.py), one per school:
+    a batch claims its references here before writing history, and the unique
+    constraint lets only one of two concurrent posts claim each.
+    """
+    school = models.ForeignKey(
+        School,
+        on_delete=models.CASCADE,
+        related_name='fee_payment_references'
+    )
+    reference = models.CharField(max_length=100)
+    batch = models.UUIDField()
+    posted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('school', 'reference')
+
+    def __str__(self):
+        return f"{self.school.name} - {self.reference}"
+
+
 class FeeReceipt(models.Model):
     """
     Fee receipts sent to parents for fee payments
@@ -173,6 +202,26 @@ class FeeReceipt(models.Model):
         super().save(*args, **kwargs)
 
 
+class LetterGradeTable:
+    """
+    A GradingScale's boundaries as an ascending array, so a letter grade is a
+    bisect with no queries. Build one per scale and reuse it for a whole batch.
+    """
+    __slots__ = ('_mins', '_letters')
+
+    def __init__(self, scale):
+        # Stable sort keeps D, C, B, A order on equal minimums, so ties resolve to the higher letter
+        bounds = sorted(
+            [(scale.d_min_score, 'D'), (scale.c_min_score, 'C'), (scale.b_min_score, 'B'), (scale.a_min_score, 'A')],
+            key=lambda bound: bound[0],
+        )
+        self._mins = [float(minimum) for minimum, _ in bounds]
+        self._letters = ['F'] + [letter for _, letter in bounds]
+
+    def letter(self, score):
+        return self._letters[bisect_right(self._mins, float(score))]
+
+
 class GradingScale(models.Model):
     """
     Defines letter grade boundaries (A, B, C, D, F) for a school
@@ -235,19 +284,7 @@ class GradingScale(models.Model):
     
     def get_letter_grade(self, score):
         """Get letter grade for a given score"""
-        # Convert score to float for comparison
-        score = float(score)
-        
-        if score >= self.a_min_score:
-            return 'A'
-        elif score >= self.b_min_score:
-            return 'B'
-        elif score >= self.c_min_score:
-            return 'C'
-        elif score >= self.d_min_score:
-            return 'D'
-        else:
-            return 'F'
+        return LetterGradeTable(self).letter(score)
     
     def save(self, *args, **kwargs):
         self.clean()
@@ -366,6 +403,7 @@ class GradingConfiguration(models.Model):
         """
         # Check if a configuration already exists for this academic year and term
         existing_config = GradingConfiguration.objects.filter(
+            school=self.school,
             academic_year=target_academic_year,
             term=target_term,
             is_active=True
@@ -378,6 +416,7 @@ class GradingConfiguration(models.Model):
             existing_config.save()
 
         new_config = GradingConfiguration.objects.create(
+            school=self.school,
             academic_year=target_academic_year,
             term=target_term,
             attendance_percentage=self.attendance_percentage,
@@ -551,6 +590,74 @@ class AttendanceRecord(models.Model):
         return f"{self.student.username} - {self.date} - {status}"
 
 
+class GradeSummaryQuerySet(models.QuerySet):
+    def recalculate(self, summaries=None, fields=(), batch_size=500):
+        """
+        Recalculate total_score and letter_grade for many summaries and save them with bulk_update.
+
+        With no summaries, recalculates every row in the queryset. Otherwise pass instances
+        already changed in memory, plus the names of the fields that were changed. Each
+        grading scale is loaded once. bulk_update skips save() and its signals, so class
+        rankings (for totals that changed), readiness and the proprietor snapshots are
+        refreshed here. Returns the number of rows written.
+        """
+        from django.utils import timezone
+        from academics.models import Subject
+        from tenants.dashboard_cache import bump_on_commit
+        from .rankings import refresh_rankings_for
+        from .readiness import refresh_readiness_for
+
+        summaries = list(self if summaries is None else summaries)
+        if not summaries:
+            return 0
+
+        config_ids = {summary.grading_config_id for summary in summaries}
+        tables = {}
+        letter_tables = {}
+        school_ids = set()
+        for config in GradingConfiguration.objects.filter(id__in=config_ids).select_related('grading_scale'):
+            school_ids.add(config.school_id)
+            if config.grading_scale_id not in tables:
+                tables[config.grading_scale_id] = LetterGradeTable(config.grading_scale)
+            letter_tables[config.id] = tables[config.grading_scale_id]
+
+        now = timezone.now()
+        changed = defaultdict(set)  # (grading_config_id, subject_id) -> student ids
+        written = defaultdict(set)  # grading_config_id -> student ids
+        for summary in summaries:
+            written[summary.grading_config_id].add(summary.student_id)
+            summary.total_score = summary.sum_component_scores()
+            summary.letter_grade = letter_tables[summary.grading_config_id].letter(summary.total_score)
+            summary.last_calculated = now
+            if summary.total_score != getattr(summary, '_loaded_total_score', None):
+                changed[(summary.grading_config_id, summary.subject_id)].add(summary.student_id)
+
+        update_fields = ['total_score', 'letter_grade', 'last_calculated']
+        update_fields += [field for field in fields if field not in update_fields]
+        self.model.objects.bulk_update(summaries, update_fields, batch_size=batch_size)
+
+        for summary in summaries:
+            summary._loaded_total_score = summary.total_score
+
+        if changed:
+            class_sessions = dict(
+                Subject.objects.filter(id__in={subject_id for _, subject_id in changed})
+                .values_list('id', 'class_session_id')
+            )
+            by_class = defaultdict(set)
+            for (config_id, subject_id), student_ids in changed.items():
+                by_class[(config_id, class_sessions[subject_id])].update(student_ids)
+            for (config_id, class_session_id), student_ids in by_class.items():
+                refresh_rankings_for(config_id, class_session_id, student_ids)
+
+        for config_id, student_ids in written.items():
+            refresh_readiness_for(config_id, student_ids)
+        for school_id in school_ids:
+            bump_on_commit(school_id)
+
+        return len(summaries)
+
+
 class GradeSummary(models.Model):
     """
     Calculated final grades for each student per subject
@@ -598,6 +705,8 @@ class GradeSummary(models.Model):
     # Metadata
     last_calculated = models.DateTimeField(auto_now=True)
     is_final = models.BooleanField(default=False)
+
+    objects = GradeSummaryQuerySet.as_manager()
     
     class Meta:
         unique_together = ('student', 'subject', 'grading_config')
@@ -617,6 +726,13 @@ class GradeSummary(models.Model):
         worth 10% and a student scores 95%, the assignment_score is already 9.5.
         Therefore, we just sum them directly without re-applying weights.
         """
+        self.total_score = self.sum_component_scores()
+        self.letter_grade = self.calculate_letter_grade()
+
+        return self.total_score
+
+    def sum_component_scores(self):
+        """Sum of the already-weighted component scores (see recalculate_total_score)"""
         # Convert all scores to Decimal to avoid type mismatch
         attendance_score = Decimal(str(self.attendance_score))
         assignment_score = Decimal(str(self.assignment_score))
@@ -624,20 +740,113 @@ class GradeSummary(models.Model):
         exam_score = Decimal(str(self.exam_score))
 
         # Sum the already-weighted scores
-        self.total_score = attendance_score + assignment_score + test_score + exam_score
-        self.letter_grade = self.calculate_letter_grade()
-
-        return self.total_score
+        return attendance_score + assignment_score + test_score + exam_score
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored total so save() can tell whether class rankings need refreshing
+        instance._loaded_total_score = instance.__dict__.get('total_score')
+        return instance
+
     def save(self, *args, **kwargs):
         # Auto-calculate letter grade on save
         self.letter_grade = self.calculate_letter_grade()
+        is_new = self._state.adding
         super().save(*args, **kwargs)
+
+        # Keep the materialised class ranking in step with total_score changes
+        if is_new or self.total_score != getattr(self, '_loaded_total_score', None):
+            from .rankings import refresh_student_ranking
+            refresh_student_ranking(self)
+            self._loaded_total_score = self.total_score
     
     def __str__(self):
         return f"{self.student.username} - {self.subject.name} - {self.total_score}% ({self.letter_grade})"
 
 
+class ClassRanking(models.Model):
+    """
+    Materialised class position for each student per grading configuration.
+    Refreshed incrementally whenever a GradeSummary total changes (see rankings.py),
+    so position lookups are a single indexed read.
+    """
+    grading_config = models.ForeignKey(
+        GradingConfiguration,
+        on_delete=models.CASCADE,
+        related_name='class_rankings'
+    )
+    class_session = models.ForeignKey(
+        'academics.ClassSession',
+        on_delete=models.CASCADE,
+        related_name='class_rankings'
+    )
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'student'},
+        related_name='class_rankings'
+    )
+
+    subjects_count = models.PositiveIntegerField(default=0, help_text="Subjects with a grade summary")
+    grand_total = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text="Sum of GradeSummary totals")
+    average = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    position = models.PositiveIntegerField(default=0, help_text="Dense rank within the class (1 = best)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('grading_config', 'class_session', 'student')
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['grading_config', 'class_session', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.class_session} - #{self.position}"
+
+
+class StudentReadiness(models.Model):
+    """
+    Materialised report-sheet readiness for each student per grading configuration:
+    are the year's fees fully paid, and is every grade component entered for every
+    subject? Maintained incrementally by readiness.py, so the readiness screens are
+    one indexed query grouped by class.
+    """
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'student'},
+        related_name='readiness'
+    )
+    grading_config = models.ForeignKey(
+        GradingConfiguration,
+        on_delete=models.CASCADE,
+        related_name='readiness'
+    )
+    class_session = models.ForeignKey(
+        'academics.ClassSession',
+        on_delete=models.CASCADE,
+        related_name='readiness'
+    )
+
+    fees_complete = models.BooleanField(default=False, help_text="Has fee records for the year and all are paid")
+    fee_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Owed on unpaid fee records")
+    grades_complete = models.BooleanField(default=False, help_text="Has subjects and every component is entered")
+    subjects_count = models.PositiveIntegerField(default=0)
+    incomplete_subjects = models.PositiveIntegerField(default=0)
+    missing_components = models.PositiveIntegerField(default=0, help_text="Missing Test 1/Test 2/Exam/Total entries")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'grading_config')
+        indexes = [
+            models.Index(fields=['grading_config', 'class_session', 'fees_complete', 'grades_complete']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.grading_config} - fees {self.fees_complete}, grades {self.grades_complete}"
+
+
 class ConfigurationTemplate(models.Model):
     """
     Save commonly used configurations as templates for easy copying
@@ -1154,8 +1363,8 @@ class Announcement(models.Model):
     def send_announcement(self):
         """
         Send the announcement to recipients
-        FIXED: Manually sends emails immediately after bulk_create
-        (bulk_create doesn't trigger post_save signals!)
+        Creates the notifications in bulk and queues their emails in the
+        outbox (bulk_create doesn't trigger post_save signals!)
         """
         from logs.models import Notification
         from users.models import CustomUser
@@ -1201,63 +1410,28 @@ class Announcement(models.Model):
         # Bulk create (fast, but doesn't trigger signals!)
         created_notifications = Notification.objects.bulk_create(notifications_to_create, batch_size=500)
         notifications_created = len(created_notifications)
+
+        from logs.live_events import publish_notifications
+        from logs.notification_counters import record_direct_notifications
+        record_direct_notifications(created_notifications)
+        publish_notifications(created_notifications)
         
         logger.info(f"✅ Created {notifications_created} notifications in database")
 
         # ============================================================================
-        # SEND EMAILS IMMEDIATELY (manually, since bulk_create doesn't trigger signals)
+        # QUEUE EMAILS (bulk_create doesn't trigger signals; the outbox worker
+        # delivers them in Brevo batches)
         # ============================================================================
-        logger.info(f"📧 Attempting to send emails")
-        
-        try:
-            from logs.email_service import send_notification_email
-            logger.info("✅ Email service imported")
-        except ImportError as e:
-            logger.error(f"❌ Failed to import email_service: {e}")
-            # Update status and return without emails
-            self.send_status = 'sent'
-            self.sent_at = timezone.now()
-            self.is_active = True
-            if self.is_recurring and self.recurrence_days:
-                self.last_sent_date = timezone.now().date()
-                self.next_send_date = self.last_sent_date + timedelta(days=self.recurrence_days)
-                self.send_status = 'scheduled'
-            self.save()
-            return {
-                'notifications_created': notifications_created,
-                'emails_sent': 0,
-                'emails_failed': 0,
-                'emails_skipped': notifications_created,
-            }
+        from logs.email_outbox import queue_notification_emails
 
-        emails_sent = 0
-        emails_failed = 0
-        emails_skipped = 0
-        
-        for notification in created_notifications:
-            if not notification.recipient.email:
-                emails_skipped += 1
-                continue
-            
-            try:
-                result = send_notification_email(
-                    recipient_user=notification.recipient,
-                    notification_title=notification.title,
-                    notification_message=notification.message,
-                    notification_type=notification.notification_type,
-                    priority=notification.priority
-                )
-                
-                if result:
-                    emails_sent += 1
-                else:
-                    emails_failed += 1
-                    
-            except Exception as e:
-                logger.error(f"❌ Failed to send email to {notification.recipient.email}: {str(e)}")
-                emails_failed += 1
-        
-        logger.info(f"📊 Email Summary: {emails_sent} sent, {emails_failed} failed, {emails_skipped} skipped")
+        # The whole batch's quota is reserved up front, so the counts are final
+        queued = queue_notification_emails(created_notifications, reserve_quota=True)
+        emails_queued = queued['queued']
+        emails_sent = queued['queued']
+        emails_failed = queued['over_quota']
+        emails_skipped = queued['no_email']
+
+        logger.info(f"📊 Email Summary: {emails_sent} queued, {emails_failed} over daily limit, {emails_skipped} without email")
 
         # Update send status and timing
         self.send_status = 'sent'
@@ -1274,6 +1448,7 @@ class Announcement(models.Model):
 
         return {
             'notifications_created': notifications_created,
+            'emails_queued': emails_queued,
             'emails_sent': emails_sent,
             'emails_failed': emails_failed,
             'emails_skipped': emails_skipped,
@@ -1621,4 +1796,150 @@ class LessonNote(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"LessonNote({self.topic}, {self.teacher.username}, {self.status})"
\ No newline at end of file
+        return f"LessonNote({self.topic}, {self.teacher.username}, {self.status})"
+
+
+class BackgroundJob(models.Model):
+    """
+    A long-running admin operation queued from a request and executed by the
+    job worker (run_scheduler or run_job_worker). See schooladmin/jobs.py.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    school = models.ForeignKey(
+        School,
+        on_delete=models.CASCADE,
+        related_name='background_jobs'
+    )
+    job_type = models.CharField(max_length=50)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+    portal_user = models.ForeignKey(
+        'tenants.PortalUser',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+
+    # Request payload replayed by the handler
+    params = models.JSONField(default=dict, blank=True)
+    upload = models.BinaryField(null=True, blank=True, help_text="Uploaded file the job needs (e.g. an import XLSX)")
+    upload_name = models.CharField(max_length=255, blank=True)
+
+    # Scheduling and retries
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(help_text="Earliest time the job may (re)start")
+    locked_by = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # Progress
+    progress_current = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+
+    # Outcome
+    result = models.JSONField(null=True, blank=True)
+    result_status = models.PositiveSmallIntegerField(null=True, blank=True, help_text="HTTP status the endpoint would have returned")
+    result_file = models.CharField(max_length=500, blank=True)
+    result_filename = models.CharField(max_length=255, blank=True)
+    result_content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['school', 'status']),
+        ]
+
+    def __str__(self):
+        return f"BackgroundJob({self.job_type}, {self.school.name}, {self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
+
+
+class StoragePurge(models.Model):
+    """
+    Ledger of one deletion of uploaded files from storage (e.g. a retiring
+    term's files). Keys are recorded with the database deletes and removed
+    from storage in batches afterwards; keys that could not be deleted stay
+    pending for a retry. See schooladmin/storage_purge.py.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    school = models.ForeignKey(
+        School,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='storage_purges'
+    )
+    reason = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    keys_total = models.PositiveIntegerField(default=0)
+    keys_deleted = models.PositiveIntegerField(default=0)
+    keys_failed = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0, help_text="Time spent deleting, over all attempts")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"StoragePurge({self.reason}, {self.keys_deleted}/{self.keys_total}, {self.status})"
+
+
+class StoragePurgeKey(models.Model):
+    """One stored file of a StoragePurge."""
+    purge = models.ForeignKey(StoragePurge, on_delete=models.CASCADE, related_name='keys')
+    storage = models.CharField(max_length=150, help_text="File field whose storage holds the key, e.g. academics.ContentFile.file")
+    name = models.CharField(max_length=500)
+    deleted = models.BooleanField(default=False)
+    error = models.CharField(max_length=500, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['purge', 'deleted']),
+        ]
+
+    def __str__(self):
+        return f"{self.storage}: {self.name}"
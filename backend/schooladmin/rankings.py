@@ -0,0 +1,215 @@
+"""
+Materialised class rankings.
+
+ClassRanking holds each student's grand total, average and dense class position
+per (grading_config, class_session). GradeSummary.save() calls
+refresh_student_ranking() whenever total_score changes; that recomputes the
+student's aggregate with one query and re-ranks the class in memory, so
+position lookups are a single indexed read instead of a class-wide recomputation.
+
+Bulk grade writers wrap their loop in deferred_ranking_refresh() so each
+affected class is refreshed once at the end rather than once per saved row.
+Changes that alter what counts without touching a total (deleted subjects or
+grades, enrolments, a student's department) are picked up by the signals in
+signals.py.
+"""
+
+import threading
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import ClassRanking, GradeSummary
+
+_state = threading.local()
+
+TWO_PLACES = Decimal('0.01')
+
+
+def _pending():
+    return getattr(_state, 'pending', None)
+
+
+@contextmanager
+def deferred_ranking_refresh():
+    """
+    Collect ranking refreshes raised while the block runs and apply them once,
+    grouped by class, when it exits. Nested blocks flush with the outermost one.
+    """
+    if _pending() is not None:
+        yield
+        return
+
+    _state.pending = {}
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+
+    for (grading_config_id, class_session_id), student_ids in pending.items():
+        refresh_students(grading_config_id, class_session_id, student_ids)
+
+
+def refresh_student_ranking(grade_summary):
+    """Refresh the ClassRanking row (and class positions) affected by a GradeSummary write."""
+    refresh_rankings_for(
+        grade_summary.grading_config_id,
+        grade_summary.subject.class_session_id,
+        [grade_summary.student_id],
+    )
+
+
+def refresh_rankings_for(grading_config_id, class_session_id, student_ids):
+    """
+    Refresh ranking rows for students whose GradeSummary rows were written in bulk
+    (bulk_create/bulk_update skip GradeSummary.save()). Deferred like single saves.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+
+    pending = _pending()
+    if pending is not None:
+        pending.setdefault((grading_config_id, class_session_id), set()).update(student_ids)
+        return
+
+    refresh_students(grading_config_id, class_session_id, student_ids)
+
+
+def _class_summaries(grading_config_id, class_session_id):
+    """
+    GradeSummary rows that count towards class position: those of students enrolled
+    in the class, where students with a department only count their department's
+    subjects plus General ones (same rules as the report sheet).
+    """
+    from academics.models import StudentSession
+
+    enrolled = StudentSession.objects.filter(student_id=OuterRef('student_id'), class_session_id=class_session_id)
+    return GradeSummary.objects.filter(Exists(enrolled)).filter(
+        grading_config_id=grading_config_id,
+        subject__class_session_id=class_session_id,
+    ).filter(
+        Q(student__department__isnull=True)
+        | Q(student__department='')
+        | Q(subject__department='General')
+        | Q(subject__department=F('student__department'))
+    )
+
+
+def refresh_students(grading_config_id, class_session_id, student_ids=None):
+    """
+    Recompute the ranking rows for the given students (all students when None)
+    with one aggregate query, upsert them and re-rank the class.
+    """
+    summaries = _class_summaries(grading_config_id, class_session_id)
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        summaries = summaries.filter(student_id__in=student_ids)
+
+    aggregates = summaries.values('student_id').annotate(
+        grand_total=Sum('total_score'),
+        subjects_count=Count('id'),
+    )
+
+    rows = []
+    for agg in aggregates:
+        grand_total = agg['grand_total'] or Decimal('0')
+        count = agg['subjects_count']
+        average = (grand_total / count).quantize(TWO_PLACES, rounding=ROUND_HALF_UP) if count else Decimal('0')
+        rows.append(ClassRanking(
+            grading_config_id=grading_config_id,
+            class_session_id=class_session_id,
+            student_id=agg['student_id'],
+            subjects_count=count,
+            grand_total=grand_total,
+            average=average,
+        ))
+
+    if rows:
+        ClassRanking.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['grading_config', 'class_session', 'student'],
+            update_fields=['subjects_count', 'grand_total', 'average', 'updated_at'],
+        )
+
+    # Students who no longer have any grade summary drop out of the ranking
+    stale = ClassRanking.objects.filter(grading_config_id=grading_config_id, class_session_id=class_session_id)
+    ranked_ids = [r.student_id for r in rows]
+    if student_ids is not None:
+        stale = stale.filter(student_id__in=student_ids)
+    stale.exclude(student_id__in=ranked_ids).delete()
+
+    rerank_class(grading_config_id, class_session_id)
+
+
+def rerank_class(grading_config_id, class_session_id):
+    """Recompute dense positions for a class from the stored averages; writes only changed rows."""
+    rankings = list(
+        ClassRanking.objects.filter(
+            grading_config_id=grading_config_id,
+            class_session_id=class_session_id,
+        ).only('id', 'average', 'position').order_by('-average', 'id')
+    )
+
+    changed = []
+    position = 0
+    previous = None
+    now = timezone.now()
+    for ranking in rankings:
+        if ranking.average != previous:
+            position += 1
+            previous = ranking.average
+        if ranking.position != position:
+            ranking.position = position
+            ranking.updated_at = now
+            changed.append(ranking)
+
+    if changed:
+        # bulk_update skips auto_now; updated_at is what incremental backups diff on
+        ClassRanking.objects.bulk_update(changed, ['position', 'updated_at'], batch_size=500)
+
+
+def rebuild_class_rankings(grading_config, class_session):
+    """Rebuild every ranking row for one class from scratch."""
+    refresh_students(grading_config.id, class_session.id)
+
+
+def get_class_ranking(grading_config, class_session, student):
+    """
+    Return (ClassRanking or None, number of ranked students) for a student.
+    Classes that have never been materialised are built on first access.
+    """
+    rankings = ClassRanking.objects.filter(grading_config=grading_config, class_session=class_session)
+    ranking = rankings.filter(student=student).first()
+
+    if ranking is None and not rankings.exists():
+        if _class_summaries(grading_config.id, class_session.id).exists():
+            rebuild_class_rankings(grading_config, class_session)
+            ranking = rankings.filter(student=student).first()
+
+    return ranking, rankings.count()
+
+
+def get_report_position(grading_config, class_session, student):
+    """
+    Return (position, total_students) as the report sheet shows them: every
+    student enrolled in the class counts, and students with no grades yet share
+    the position after the last graded average above zero.
+    """
+    from academics.models import StudentSession
+
+    ranking, _ = get_class_ranking(grading_config, class_session, student)
+    total_students = StudentSession.objects.filter(class_session=class_session).count()
+    if ranking is not None:
+        return ranking.position, total_students
+
+    last = ClassRanking.objects.filter(
+        grading_config=grading_config,
+        class_session=class_session,
+        average__gt=0,
+    ).aggregate(last=Max('position'))['last']
+    return (last or 0) + 1, total_students
@@ -0,0 +1,243 @@
+"""
+Materialised report-sheet readiness.
+
+StudentReadiness holds, per (student, grading_config), the two facts the report
+sheet screens filter on:
+
+- fees_complete: the student has fee records for the academic year and every one
+  is PAID as fee_ledger.current_status() derives it (fee_balance is what is
+  still owed on the unpaid ones);
+- grades_complete: the student's class has subjects for them and every subject
+  has a grade summary with Test 1, Test 2, Exam and Total entered
+  (missing_components counts the gaps, a missing summary counting all four).
+
+Writes to GradeSummary, StudentFeeRecord, FeePaymentHistory, StudentSession and
+Subject mark the affected students stale (signals.py); bulk grade writers call
+refresh_readiness_for() themselves. Inside a transaction the refreshes are
+collected and applied once on commit, so a batch recomputes each student once
+with a handful of queries. A configuration that has never been materialised is
+built on first read by ensure_readiness().
+"""
+
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from .fee_ledger import with_status
+from .models import GradeSummary, GradingConfiguration, StudentFeeRecord, StudentReadiness
+
+_state = threading.local()
+
+GRADE_COMPONENTS = ['Test 1', 'Test 2', 'Exam', 'Total']
+
+
+def missing_components(grade_summary, grading_config):
+    """Which of Test 1, Test 2, Exam and Total are not entered yet for a grade summary."""
+    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
+    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
+    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
+    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
+    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
+
+    # Test 1 (attendance + assignment) counts as entered when the school disabled both components
+    config_test1_max = grading_config.attendance_percentage + grading_config.assignment_percentage
+
+    missing = []
+    if not (config_test1_max == 0 or (attendance_score + assignment_score) != 0):
+        missing.append('Test 1')
+    if not test_score > 0:
+        missing.append('Test 2')
+    if not exam_score > 0:
+        missing.append('Exam')
+    if not total_score > 0:
+        missing.append('Total')
+    return missing
+
+
+def subject_gaps(grading_config, enrolments):
+    """
+    Per-subject gaps for many students with two queries.
+
+    enrolments is an iterable of (student_id, class_session_id, department). Students
+    with a department take that department's subjects plus General ones (same rule as
+    the report sheet). Returns {student_id: [(subject_name, missing), ...]} in subject
+    order for every subject the student takes, where missing is a list of component
+    labels (empty when complete) or None when there is no grade summary at all.
+    """
+    from academics.models import Subject
+
+    enrolments = list(enrolments)
+    subjects_by_session = defaultdict(list)
+    for subject in Subject.objects.filter(
+        class_session_id__in={class_session_id for _, class_session_id, _ in enrolments}
+    ).only('id', 'name', 'class_session_id', 'department'):
+        subjects_by_session[subject.class_session_id].append(subject)
+
+    summaries = {
+        (summary.student_id, summary.subject_id): summary
+        for summary in GradeSummary.objects.filter(
+            grading_config=grading_config,
+            student_id__in={student_id for student_id, _, _ in enrolments},
+        ).only('student_id', 'subject_id', 'attendance_score', 'assignment_score', 'test_score', 'exam_score', 'total_score')
+    }
+
+    gaps = {}
+    for student_id, class_session_id, department in enrolments:
+        subjects = subjects_by_session[class_session_id]
+        if department:
+            subjects = [subject for subject in subjects if subject.department in (department, 'General')]
+
+        entries = []
+        for subject in subjects:
+            summary = summaries.get((student_id, subject.id))
+            missing = None if summary is None else missing_components(summary, grading_config)
+            entries.append((subject.name, missing))
+        gaps[student_id] = entries
+    return gaps
+
+
+def _fee_status(student_ids, academic_year):
+    """{student_id: (fees_complete, balance)} for students with fee records in the academic year."""
+    status = {}
+    for student_id, payment_status, amount, amount_paid in with_status(StudentFeeRecord.objects.filter(
+        student_id__in=student_ids,
+        fee_structure__academic_year=academic_year,
+    )).values_list('student_id', 'current_status', 'fee_structure__amount', 'amount_paid'):
+        complete, balance = status.get(student_id, (True, Decimal('0')))
+        if payment_status != 'PAID':
+            complete = False
+            balance += amount - amount_paid
+        status[student_id] = (complete, balance)
+    return status
+
+
+def refresh_students(grading_config, student_ids=None):
+    """
+    Recompute readiness rows for the given students (every enrolled student when None)
+    and upsert them. Students no longer enrolled in the term lose their row.
+    """
+    from academics.models import StudentSession
+
+    sessions = StudentSession.objects.filter(
+        class_session__classroom__school_id=grading_config.school_id,
+        class_session__academic_year=grading_config.academic_year,
+        class_session__term=grading_config.term,
+    )
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        sessions = sessions.filter(student_id__in=student_ids)
+
+    # One class per student and term; prefer the active enrolment
+    enrolments = {}
+    for student_id, class_session_id, department in sessions.order_by('is_active', 'id').values_list(
+        'student_id', 'class_session_id', 'student__department'
+    ):
+        enrolments[student_id] = (student_id, class_session_id, department)
+
+    gaps = subject_gaps(grading_config, enrolments.values())
+    fees = _fee_status(list(enrolments), grading_config.academic_year)
+
+    rows = []
+    for student_id, class_session_id, _ in enrolments.values():
+        entries = gaps[student_id]
+        incomplete = [missing for _, missing in entries if missing != []]
+        fees_complete, balance = fees.get(student_id, (False, Decimal('0')))
+        rows.append(StudentReadiness(
+            student_id=student_id,
+            grading_config=grading_config,
+            class_session_id=class_session_id,
+            fees_complete=fees_complete,
+            fee_balance=balance,
+            grades_complete=bool(entries) and not incomplete,
+            subjects_count=len(entries),
+            incomplete_subjects=len(incomplete),
+            missing_components=sum(len(GRADE_COMPONENTS) if missing is None else len(missing) for missing in incomplete),
+        ))
+
+    if rows:
+        StudentReadiness.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'grading_config'],
+            update_fields=[
+                'class_session', 'fees_complete', 'fee_balance', 'grades_complete',
+                'subjects_count', 'incomplete_subjects', 'missing_components', 'updated_at',
+            ],
+        )
+
+    stale = StudentReadiness.objects.filter(grading_config=grading_config)
+    if student_ids is not None:
+        stale = stale.filter(student_id__in=student_ids)
+    stale.exclude(student_id__in=list(enrolments)).delete()
+
+
+def ensure_readiness(grading_config):
+    """Build a configuration's readiness rows on first use (configs created before the table existed)."""
+    if not StudentReadiness.objects.filter(grading_config=grading_config).exists():
+        refresh_students(grading_config)
+
+
+# ---------------------------------------------------------------------------
+# Scheduling: refreshes raised inside a transaction are applied once on commit
+# ---------------------------------------------------------------------------
+
+def _transaction_pending():
+    pending = getattr(_state, 'pending', None)
+    if pending is None:
+        pending = _state.pending = {'configs': {}, 'years': {}}
+    # Register the flush once per transaction (a rollback discards the registration)
+    if not any(callback[1] is _flush for callback in connection.run_on_commit):
+        transaction.on_commit(_flush)
+    return pending
+
+
+def _add(bucket, key, student_ids):
+    if student_ids is None:
+        bucket[key] = None
+    elif bucket.get(key, set()) is not None:
+        bucket.setdefault(key, set()).update(student_ids)
+
+
+def _flush():
+    pending = getattr(_state, 'pending', None)
+    _state.pending = None
+    if pending:
+        _apply(pending['configs'], pending['years'])
+
+
+def _apply(configs, years):
+    configs = dict(configs)
+    for (school_id, academic_year), student_ids in years.items():
+        for config_id in GradingConfiguration.objects.filter(
+            school_id=school_id, academic_year=academic_year,
+        ).values_list('id', flat=True):
+            _add(configs, config_id, student_ids)
+
+    for config in GradingConfiguration.objects.filter(id__in=list(configs)):
+        refresh_students(config, configs[config.id])
+
+
+def refresh_readiness_for(grading_config_id, student_ids=None):
+    """Refresh readiness after grade writes (student_ids None: the whole configuration)."""
+    if student_ids is not None:
+        student_ids = set(student_ids)
+        if not student_ids:
+            return
+    if connection.in_atomic_block:
+        _add(_transaction_pending()['configs'], grading_config_id, student_ids)
+    else:
+        _apply({grading_config_id: student_ids}, {})
+
+
+def refresh_readiness_for_fees(school_id, academic_year, student_ids):
+    """Refresh readiness in every term of an academic year after fee writes."""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    if connection.in_atomic_block:
+        _add(_transaction_pending()['years'], (school_id, academic_year), student_ids)
+    else:
+        _apply({}, {(school_id, academic_year): student_ids})
@@ -0,0 +1,284 @@
+"""
+Report sheet computation engine.
+
+Loads every GradeSummary for a (class_session, grading_config) pair in one
+query and works out each student's report rows, grand total, average and
+class position in memory. A whole class costs three queries (subjects,
+enrolments, grade summaries) no matter how many students or subjects it has,
+so every report endpoint and the PDF builder share it instead of looping over
+StudentSession with a GradeSummary lookup per subject.
+
+A single student's report sheet only needs that student's rows:
+build_student_report() loads them in two queries and leaves the class
+position to the materialised ClassRanking table (see rankings.py).
+"""
+
+# Report sheet uses a standardised layout: 1st Test / 2nd Test / Exam
+FIRST_TEST_MAX = 20
+SECOND_TEST_MAX = 20
+EXAM_MAX = 60
+TOTAL_MAX = 100
+
+REPORT_GRADING_CONFIG = {
+    'first_test_max': FIRST_TEST_MAX,
+    'second_test_max': SECOND_TEST_MAX,
+    'exam_max': EXAM_MAX,
+    'total_max': TOTAL_MAX,
+}
+
+_SUMMARY_FIELDS = (
+    'student_id', 'subject_id', 'attendance_score', 'assignment_score',
+    'test_score', 'exam_score', 'total_score',
+)
+
+
+def get_report_grade(score):
+    """Return grade based on custom report sheet scale"""
+    if score >= 75:
+        return 'A1'
+    elif score >= 70:
+        return 'B2'
+    elif score >= 65:
+        return 'B3'
+    elif score >= 60:
+        return 'C4'
+    elif score >= 55:
+        return 'C5'
+    elif score >= 50:
+        return 'C6'
+    elif score >= 45:
+        return 'D7'
+    elif score >= 40:
+        return 'E8'
+    else:
+        return 'F9'
+
+
+def subjects_for_department(subjects, department):
+    """
+    Filter a list of Subject objects the same way the report endpoints do:
+    students with a department see their department's subjects plus General ones.
+    """
+    if not department:
+        return list(subjects)
+    return [s for s in subjects if s.department in (department, 'General')]
+
+
+def _empty_subject_row(subject_name):
+    return {
+        'subject_name': subject_name,
+        'first_test_score': 0,
+        'second_test_score': 0,
+        'exam_score': 0,
+        'total_score': 0,
+        'letter_grade': 'F9',
+    }
+
+
+class ReportScaler:
+    """
+    Converts GradeSummary component scores into report sheet columns.
+
+    GradeSummary scores are already weighted percentages. With scaled=True they
+    are rescaled to the 20/20/60 report layout using the grading configuration
+    percentages; with scaled=False they are shown as stored (student/parent views).
+    """
+
+    def __init__(self, grading_config, scaled=True):
+        self.scaled = scaled
+        test1_max = grading_config.attendance_percentage + grading_config.assignment_percentage
+        test_percent = grading_config.test_percentage
+        exam_percent = grading_config.exam_percentage
+        self.test1_factor = FIRST_TEST_MAX / test1_max if test1_max > 0 else 0
+        self.test2_factor = SECOND_TEST_MAX / test_percent if test_percent > 0 else 0
+        self.exam_factor = EXAM_MAX / exam_percent if exam_percent > 0 else 0
+
+    def subject_row(self, subject_name, summary):
+        """Build one report row from a GradeSummary values() dict (or None)."""
+        if summary is None:
+            return _empty_subject_row(subject_name)
+
+        first_test = float(summary['attendance_score']) + float(summary['assignment_score'])
+        second_test = float(summary['test_score'])
+        exam = float(summary['exam_score'])
+
+        if self.scaled:
+            first_test *= self.test1_factor
+            second_test *= self.test2_factor
+            exam *= self.exam_factor
+            total = first_test + second_test + exam
+        else:
+            total = float(summary['total_score'])
+
+        return {
+            'subject_name': subject_name,
+            'first_test_score': round(first_test, 2),
+            'second_test_score': round(second_test, 2),
+            'exam_score': round(exam, 2),
+            'total_score': round(total, 2),
+            'letter_grade': get_report_grade(total),
+        }
+
+
+def _summary_is_complete(summary):
+    """Test 1, Test 2, Exam and Total must all be filled in (> 0)."""
+    if summary is None:
+        return False
+    return (
+        float(summary['attendance_score'] or 0) + float(summary['assignment_score'] or 0) > 0
+        and float(summary['test_score'] or 0) > 0
+        and float(summary['exam_score'] or 0) > 0
+        and float(summary['total_score'] or 0) > 0
+    )
+
+
+class StudentReport:
+    """Computed report sheet data for one student in a class."""
+
+    def __init__(self, student, student_session, subjects_data, ranking_average, subjects_entered, grades_complete):
+        self.student = student
+        self.student_session = student_session
+        self.subjects = subjects_data
+        self.grades_complete = grades_complete
+        # Average of raw GradeSummary totals over entered subjects - the basis for class position
+        self.ranking_average = ranking_average
+        self.subjects_entered = subjects_entered
+        self.grand_total = sum(s['total_score'] for s in subjects_data)
+        self.average = round(self.grand_total / len(subjects_data), 2) if subjects_data else 0
+        self.position = None
+
+    def summary(self, total_students):
+        return {
+            'grand_total': round(self.grand_total, 2),
+            'average': self.average,
+            'position': self.position,
+            'total_students': total_students,
+        }
+
+
+class ClassReport:
+    """
+    Report sheet results for every student enrolled in a class session.
+
+    Use build_class_report() to create one.
+    """
+
+    def __init__(self, class_session, grading_config, students, total_students):
+        self.class_session = class_session
+        self.grading_config = grading_config
+        self.students = students
+        self.total_students = total_students
+
+    def get(self, student_id):
+        return self.students.get(student_id)
+
+    def summary_for(self, student_id):
+        student_report = self.students.get(student_id)
+        if student_report is None:
+            return None
+        return student_report.summary(self.total_students)
+
+    def ranked(self):
+        """Students that take part in ranking, best first."""
+        ranked = [r for r in self.students.values() if r.position is not None]
+        ranked.sort(key=lambda r: r.position)
+        return ranked
+
+
+def _assign_dense_positions(student_reports):
+    """Dense rank by ranking average: equal averages share a position, no gaps."""
+    ordered = sorted(student_reports, key=lambda r: r.ranking_average, reverse=True)
+    position = 0
+    previous = None
+    for report in ordered:
+        key = round(report.ranking_average, 2)
+        if key != previous:
+            position += 1
+            previous = key
+        report.position = position
+
+
+def _student_report(student_session, subjects, summaries, scaler):
+    """Build the StudentReport of one enrolment from its class subjects and GradeSummary rows."""
+    student = student_session.student
+    subjects_data = []
+    entered_total = 0.0
+    entered_count = 0
+    grades_complete = True
+    for subject in subjects_for_department(subjects, student.department):
+        summary = summaries.get((student.id, subject.id))
+        subjects_data.append(scaler.subject_row(subject.name, summary))
+        if summary is not None:
+            entered_total += float(summary['total_score'])
+            entered_count += 1
+        if grades_complete and not _summary_is_complete(summary):
+            grades_complete = False
+
+    ranking_average = entered_total / entered_count if entered_count else 0
+    return StudentReport(student, student_session, subjects_data, ranking_average, entered_count, grades_complete)
+
+
+def build_student_report(student_session, grading_config, scaled=True):
+    """
+    Compute one student's report rows in two queries (subjects, the student's
+    grade summaries). position is left as None: read it from the ClassRanking
+    table with rankings.get_report_position().
+    """
+    from academics.models import Subject
+    from schooladmin.models import GradeSummary
+
+    class_session = student_session.class_session
+    subjects = list(Subject.objects.filter(class_session=class_session))
+    summaries = {
+        (row['student_id'], row['subject_id']): row
+        for row in GradeSummary.objects.filter(
+            grading_config=grading_config,
+            subject__class_session=class_session,
+            student_id=student_session.student_id,
+        ).values(*_SUMMARY_FIELDS)
+    }
+    return _student_report(student_session, subjects, summaries, ReportScaler(grading_config, scaled=scaled))
+
+
+def build_class_report(class_session, grading_config, active_only=False, scaled=True):
+    """
+    Compute report sheets for a whole class session in three queries.
+
+    Args:
+        class_session: ClassSession whose students are reported on
+        grading_config: GradingConfiguration for the same academic year/term
+        active_only: Only rank students whose StudentSession is active
+            (student/parent portals). Inactive students still get rows, but no position.
+        scaled: Rescale component scores to the 20/20/60 report layout
+
+    Returns:
+        ClassReport
+    """
+    from academics.models import Subject, StudentSession
+    from schooladmin.models import GradeSummary
+
+    subjects = list(Subject.objects.filter(class_session=class_session))
+    student_sessions = list(
+        StudentSession.objects.filter(class_session=class_session).select_related('student')
+    )
+
+    summaries = {}
+    for row in GradeSummary.objects.filter(
+        grading_config=grading_config,
+        subject__class_session=class_session,
+    ).values(*_SUMMARY_FIELDS):
+        summaries[(row['student_id'], row['subject_id'])] = row
+
+    scaler = ReportScaler(grading_config, scaled=scaled)
+    students = {}
+    ranking_pool = []
+
+    for ss in student_sessions:
+        report = _student_report(ss, subjects, summaries, scaler)
+        students[ss.student_id] = report
+        if ss.is_active or not active_only:
+            ranking_pool.append(report)
+
+    _assign_dense_positions(ranking_pool)
+
+    return ClassReport(class_session, grading_config, students, len(ranking_pool))
@@ -0,0 +1,315 @@
+"""
+Table copies behind move_to_next_term and move_to_next_session (views.py).
+
+Each table is cloned set-based instead of row by row: the retiring term's rows
+are read once and their copies written with one bulk_create, the new class
+sessions are found again through their natural key (classroom, year, term) to
+build the old -> new id map every later table is remapped with, and the fee
+class links are copied as through rows. bulk_create sends no signals; what the
+StudentSession, Subject and fee class signals did per row is done once instead:
+readiness is refreshed for the whole new configuration when it is activated
+(its post_save), the moved students' notification counters are dropped after
+commit, and the fee ledger writes the new term's fee records in one batch.
+
+Uploaded files of the retiring term are not deleted in the rollover
+transaction any more: a purge_term_files job is queued once it commits and
+deletes them in batches (storage_purge.py).
+
+plan_rollover() counts what a rollover would write, for dry runs, with a
+duration estimated from the throughput of earlier rollovers.
+"""
+
+import logging
+import time
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+ROLLOVER_JOB_TYPES = ('move_to_next_term', 'move_to_next_session')
+
+# Rows per second assumed until a completed rollover has been measured
+DEFAULT_ROWS_PER_SECOND = 2000
+
+
+class RolloverTimer:
+    """Rows written and wall time of a rollover, stored with the job result."""
+
+    def __init__(self):
+        self.rows = {}
+        self._started = time.monotonic()
+
+    def add(self, table, count):
+        self.rows[table] = self.rows.get(table, 0) + count
+
+    def report(self):
+        return {
+            'rows_copied': sum(self.rows.values()),
+            'rows': self.rows,
+            'seconds': round(time.monotonic() - self._started, 3),
+        }
+
+
+def _term_sessions(school, academic_year, term):
+    from academics.models import ClassSession
+
+    return ClassSession.objects.filter(classroom__school=school, academic_year=academic_year, term=term)
+
+
+def clone_grade_components(old_config, new_config):
+    """Copy the component weights, skipping types the new configuration already has."""
+    from .models import GradeComponent
+
+    existing = set(GradeComponent.objects.filter(grading_config=new_config).values_list('component_type', flat=True))
+    components = GradeComponent.objects.bulk_create([
+        GradeComponent(
+            grading_config=new_config,
+            component_type=component.component_type,
+            percentage_weight=component.percentage_weight,
+            max_score=component.max_score,
+            description=component.description,
+        )
+        for component in GradeComponent.objects.filter(grading_config=old_config)
+        if component.component_type not in existing
+    ])
+    return len(components)
+
+
+def clone_class_sessions(school, academic_year, term, next_year, next_term):
+    """
+    Give every class with a session this term one in the next, and return the
+    old -> new class session id map. Sessions that already exist are reused.
+    """
+    from academics.models import ClassSession
+
+    old = dict(_term_sessions(school, academic_year, term).values_list('classroom_id', 'id'))
+    ClassSession.objects.bulk_create(
+        [ClassSession(classroom_id=classroom_id, academic_year=next_year, term=next_term) for classroom_id in old],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    new = dict(_term_sessions(school, next_year, next_term).values_list('classroom_id', 'id'))
+    return {old_id: new[classroom_id] for classroom_id, old_id in old.items()}
+
+
+def clone_subjects(session_map, copy_teachers):
+    """Copy the subjects into the new sessions, skipping names a new session already has."""
+    from academics.models import Subject
+
+    existing = set(Subject.objects.filter(
+        class_session_id__in=session_map.values(),
+    ).values_list('class_session_id', 'name'))
+    subjects = Subject.objects.bulk_create([
+        Subject(
+            name=name,
+            class_session_id=session_map[class_session_id],
+            teacher_id=teacher_id if copy_teachers else None,
+            department=department,
+        )
+        for class_session_id, name, teacher_id, department in Subject.objects.filter(
+            class_session_id__in=session_map,
+        ).values_list('class_session_id', 'name', 'teacher_id', 'department').order_by('id')
+        if (session_map[class_session_id], name) not in existing
+    ], batch_size=BATCH_SIZE)
+    return len(subjects)
+
+
+def promotion_targets(session_map):
+    """
+    Where the students of each retiring class session go next session: the
+    session of the class's next class, or the same class when no progression
+    is set up. Final classes graduate and are returned separately.
+    """
+    from academics.models import ClassSession
+
+    rows = list(ClassSession.objects.filter(id__in=session_map).values_list(
+        'id', 'classroom_id', 'classroom__next_class_id', 'classroom__is_final_class',
+    ))
+    by_classroom = {classroom_id: session_map[session_id] for session_id, classroom_id, _, _ in rows}
+    targets, final = {}, []
+    for session_id, classroom_id, next_class_id, is_final in rows:
+        if is_final:
+            final.append(session_id)
+        else:
+            targets[session_id] = by_classroom.get(next_class_id) or by_classroom[classroom_id]
+    return targets, final
+
+
+def carry_enrolments(targets):
+    """
+    Enrol the active students of each old class session in its target session.
+    Returns the ids of the students moved.
+    """
+    from academics.models import StudentSession
+
+    from .fee_ledger import materialise
+
+    rows = list(StudentSession.objects.filter(
+        class_session_id__in=targets, is_active=True,
+    ).values_list('student_id', 'class_session_id'))
+    StudentSession.objects.bulk_create(
+        [StudentSession(student_id=student_id, class_session_id=targets[old_id], is_active=True) for student_id, old_id in rows],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    student_ids = [student_id for student_id, _ in rows]
+    # Fees the next term already has are owed by the students enrolled in it
+    materialise(student_ids=student_ids)
+    return student_ids
+
+
+def retire_enrolments(school, academic_year, term):
+    """Deactivate the school's enrolments of the retiring term; returns the student ids."""
+    from academics.models import StudentSession
+
+    from tenants.dashboard_cache import bump_on_commit
+
+    enrolments = StudentSession.objects.filter(
+        class_session__in=_term_sessions(school, academic_year, term), is_active=True,
+    )
+    student_ids = list(enrolments.values_list('student_id', flat=True))
+    enrolments.update(is_active=False)
+    # Every rollover ends here; its bulk writes sent no signals to retire the proprietor snapshots
+    bump_on_commit(school.id)
+    return student_ids
+
+
+def clone_fees(school, academic_year, term, next_year, next_term):
+    """Copy the school's fee structures and their class links; returns (fees, links) written."""
+    from .fee_ledger import materialise
+    from .models import FeeStructure
+
+    Link = FeeStructure.classes.through
+    fees = list(FeeStructure.objects.filter(school=school, academic_year=academic_year, term=term).order_by('id'))
+    if not fees:
+        return 0, 0
+
+    copies = [
+        FeeStructure(school=school, name=fee.name, amount=fee.amount, academic_year=next_year, term=next_term)
+        for fee in fees
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        FeeStructure.objects.bulk_create(copies, batch_size=BATCH_SIZE)
+    else:
+        for copy in copies:
+            copy.save()
+    fee_map = {fee.id: copy.id for fee, copy in zip(fees, copies)}
+
+    links = Link.objects.bulk_create([
+        Link(feestructure_id=fee_map[fee_id], class_id=class_id)
+        for fee_id, class_id in Link.objects.filter(feestructure_id__in=fee_map).values_list('feestructure_id', 'class_id')
+    ], batch_size=BATCH_SIZE)
+    # The through rows sent no m2m_changed: write the copies' fee records as the signal would
+    materialise(fee_ids=fee_map.values())
+    return len(copies), len(links)
+
+
+def invalidate_counters_on_commit(student_ids):
+    """Enrolment decides which content notifications a student sees: recount their badges after commit."""
+    from logs.notification_counters import invalidate
+
+    student_ids = list(set(student_ids))
+    if student_ids:
+        transaction.on_commit(lambda: invalidate(student_ids))
+
+
+def queue_term_file_purge(school, class_session_ids, user=None):
+    """Queue deletion of the retiring term's uploaded files for after the rollover commits."""
+    from .jobs import enqueue_job
+
+    class_session_ids = list(class_session_ids)
+    if school and class_session_ids:
+        transaction.on_commit(lambda: enqueue_job(
+            'purge_term_files', school, params={'class_session_ids': class_session_ids}, user=user,
+        ))
+
+
+def run_purge_term_files(request):
+    """Job handler for purge_term_files; request is a schooladmin.jobs.JobRequest."""
+    from .storage_purge import retry_pending_purges
+    from .views import _cleanup_term_files
+
+    class_session_ids = request.data.get('class_session_ids') or []
+    purge = _cleanup_term_files(request.school, class_session_ids)
+    # A retried job finds the records gone: finish the files its first attempt left
+    purges = [purge] if purge else retry_pending_purges(school=request.school)
+    failed = sum(p.keys_failed for p in purges)
+    if failed:
+        # Raising retries the job with backoff; the ledger keeps the keys left
+        raise RuntimeError(f'{failed} stored file(s) could not be deleted')
+    return {
+        'class_sessions': len(class_session_ids),
+        'files_deleted': sum(p.keys_deleted for p in purges),
+        'seconds': round(sum(p.seconds for p in purges), 3),
+    }
+
+
+def rows_per_second():
+    """Throughput of the most recent completed rollovers, or the default before there are any."""
+    from .models import BackgroundJob
+
+    rows = seconds = 0
+    for result in BackgroundJob.objects.filter(
+        job_type__in=ROLLOVER_JOB_TYPES, status=BackgroundJob.STATUS_COMPLETED,
+    ).order_by('-finished_at').values_list('result', flat=True)[:20]:
+        timing = (result or {}).get('timing') or {}
+        if timing.get('rows_copied') and timing.get('seconds'):
+            rows += timing['rows_copied']
+            seconds += timing['seconds']
+    return rows / seconds if seconds else DEFAULT_ROWS_PER_SECOND
+
+
+def plan_rollover(school, current_config, next_year, next_term, options, promote):
+    """
+    Rows a rollover with these options would write, without writing anything.
+    promote is True for a new session (students move up a class, final
+    classes graduate).
+    """
+    from academics.models import AssignmentSubmission, ContentFile, Question, StudentSession, Subject
+
+    from .models import FeeStructure, GradeComponent, LessonNote
+
+    academic_year, term = current_config.academic_year, current_config.term
+    sessions = _term_sessions(school, academic_year, term)
+    session_ids = list(sessions.values_list('id', flat=True))
+    enrolments = StudentSession.objects.filter(class_session_id__in=session_ids, is_active=True)
+
+    rows = {'class_sessions': len(session_ids) - _term_sessions(school, next_year, next_term).count()}
+    if options['copy_grading_config']:
+        rows['grade_components'] = GradeComponent.objects.filter(grading_config=current_config).count()
+    if options['copy_subjects']:
+        rows['subjects'] = Subject.objects.filter(class_session_id__in=session_ids).count()
+    graduating = 0
+    if options['copy_students']:
+        if promote:
+            graduating = enrolments.filter(class_session__classroom__is_final_class=True).count()
+        rows['student_sessions'] = enrolments.count() - graduating
+    if options['copy_fees']:
+        fees = FeeStructure.objects.filter(school=school, academic_year=academic_year, term=term)
+        rows['fee_structures'] = fees.count()
+        rows['fee_class_links'] = FeeStructure.classes.through.objects.filter(feestructure__in=fees).count()
+    rows['retired_enrolments'] = enrolments.count()
+
+    files = {
+        'lesson_notes': LessonNote.objects.filter(school=school, class_session_id__in=session_ids).count(),
+        'assignment_submissions': AssignmentSubmission.objects.filter(
+            assignment__subject__class_session_id__in=session_ids,
+        ).count(),
+        'content_files': ContentFile.objects.filter(content__subject__class_session_id__in=session_ids).count(),
+        'question_images': Question.objects.filter(
+            assessment__subject__class_session_id__in=session_ids, image__isnull=False,
+        ).exclude(image='').count(),
+    }
+
+    total = sum(rows.values())
+    return {
+        'dry_run': True,
+        'from': {'academic_year': academic_year, 'term': term},
+        'to': {'academic_year': next_year, 'term': next_term},
+        'rows': rows,
+        'total_rows': total,
+        'graduating_students': graduating,
+        'files_to_purge': files,
+        'expected_seconds': round(total / rows_per_second(), 1),
+    }
@@ -24,25 +24,9 @@ class FeeStructureSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         classes = validated_data.pop('classes')
         fee = FeeStructure.objects.create(**validated_data)
+        # The classes' students get their fee records from the ledger (fee_ledger.py)
         fee.classes.set(classes)
 
-        for class_obj in classes:
-            # Ensure class_obj is a real Class instance
-            if isinstance(class_obj, int):
-                class_obj = Class.objects.get(pk=class_obj)
-
-            students = CustomUser.objects.filter(
-                role='student',
-                classroom=class_obj,
-                academic_year=fee.academic_year
-            )
-            for student in students:
-                StudentFeeRecord.objects.create(
-                    student=student,
-                    fee_structure=fee,
-                    payment_status='UNPAID',
-                )
-
         return fee
 
     def update(self, instance, validated_data):
@@ -58,6 +42,7 @@ class FeeStructureSerializer(serializers.ModelSerializer):
 class StudentFeeRecordSerializer(serializers.ModelSerializer):
     student_name = serializers.SerializerMethodField()
     fee_name = serializers.CharField(source='fee_structure.name', read_only=True)
+    payment_status = serializers.SerializerMethodField()
 
     class Meta:
         model = StudentFeeRecord
@@ -75,6 +60,10 @@ class StudentFeeRecordSerializer(serializers.ModelSerializer):
     def get_student_name(self, obj):
         return f"{obj.student.first_name} {obj.student.last_name}"
 
+    def get_payment_status(self, obj):
+        # Derived in SQL where the queryset was annotated (fee_ledger.with_status)
+        return getattr(obj, 'current_status', obj.payment_status)
+
 
 class FeeStudentSerializer(serializers.Serializer):
     student_id = serializers.IntegerField()
@@ -0,0 +1,139 @@
+"""
+Signals keeping the materialised StudentReadiness table (readiness.py), the
+ClassRanking table (rankings.py) and the fee ledger (fee_ledger.py) in step with
+the rows they are computed from.
+"""
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from academics.models import ClassSession, StudentSession, Subject
+from tenants.models import School
+from users.models import CustomUser
+
+from .fee_ledger import materialise
+from .models import FeePaymentHistory, FeeStructure, GradeSummary, GradingConfiguration, StudentFeeRecord
+from .rankings import refresh_rankings_for
+from .readiness import refresh_readiness_for, refresh_readiness_for_fees
+
+
+def _cascading_from_owner(kwargs, owner_models):
+    """True when a delete cascades from a row that takes the readiness rows with it."""
+    return isinstance(kwargs.get('origin'), (School, CustomUser) + owner_models)
+
+
+@receiver(post_save, sender=GradeSummary)
+@receiver(post_delete, sender=GradeSummary)
+def grade_summary_changed(sender, instance, **kwargs):
+    if _cascading_from_owner(kwargs, (GradingConfiguration,)):
+        return
+    refresh_readiness_for(instance.grading_config_id, [instance.student_id])
+
+
+@receiver(post_delete, sender=GradeSummary)
+def grade_summary_deleted(sender, instance, **kwargs):
+    # GradeSummary.save() refreshes rankings; deletes do not go through it. A deleted
+    # subject re-ranks its whole class once instead (subject_changed).
+    if _cascading_from_owner(kwargs, (GradingConfiguration, ClassSession, Subject)):
+        return
+    refresh_rankings_for(instance.grading_config_id, instance.subject.class_session_id, [instance.student_id])
+
+
+@receiver(post_save, sender=StudentFeeRecord)
+@receiver(post_delete, sender=StudentFeeRecord)
+def fee_record_changed(sender, instance, **kwargs):
+    if _cascading_from_owner(kwargs, ()):
+        return
+    fee_structure = instance.fee_structure
+    refresh_readiness_for_fees(fee_structure.school_id, fee_structure.academic_year, [instance.student_id])
+
+
+@receiver(post_save, sender=FeePaymentHistory)
+def fee_payment_recorded(sender, instance, created, **kwargs):
+    if created:
+        fee_record_changed(StudentFeeRecord, instance.fee_record)
+
+
+@receiver(post_save, sender=GradingConfiguration)
+def grading_config_changed(sender, instance, created, **kwargs):
+    # Component percentages decide whether Test 1 counts as entered
+    if not created:
+        refresh_readiness_for(instance.id)
+
+
+def _term_configs(class_session):
+    return GradingConfiguration.objects.filter(
+        school_id=class_session.classroom.school_id,
+        academic_year=class_session.academic_year,
+        term=class_session.term,
+    ).values_list('id', flat=True)
+
+
+@receiver(post_save, sender=StudentSession)
+@receiver(post_delete, sender=StudentSession)
+def student_session_changed(sender, instance, update_fields=None, **kwargs):
+    if _cascading_from_owner(kwargs, (ClassSession,)):
+        return
+    # Report-sent bookkeeping does not change readiness
+    if update_fields is not None and not {'student', 'class_session', 'is_active'} & set(update_fields):
+        return
+    for config_id in _term_configs(instance.class_session):
+        refresh_readiness_for(config_id, [instance.student_id])
+        # Only enrolled students are ranked: a departed student's row goes and the class re-ranks
+        refresh_rankings_for(config_id, instance.class_session_id, [instance.student_id])
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_changed(sender, instance, **kwargs):
+    if _cascading_from_owner(kwargs, (ClassSession,)):
+        return
+    student_ids = list(StudentSession.objects.filter(
+        class_session_id=instance.class_session_id
+    ).values_list('student_id', flat=True))
+    for config_id in _term_configs(instance.class_session):
+        refresh_readiness_for(config_id, student_ids)
+        # A deleted subject takes its grades with it; a department change moves them in or out
+        refresh_rankings_for(config_id, instance.class_session_id, student_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def student_department_changed(sender, instance, created, update_fields=None, **kwargs):
+    # The department decides which subjects count; saves that cannot change it are skipped
+    if created or instance.role != 'student':
+        return
+    if update_fields is not None and 'department' not in update_fields:
+        return
+    for config_id in GradingConfiguration.objects.filter(
+        school_id=instance.school_id,
+        academic_year__in=StudentSession.objects.filter(student=instance).values('class_session__academic_year'),
+    ).values_list('id', flat=True):
+        refresh_readiness_for(config_id, [instance.id])
+    for student_session in StudentSession.objects.filter(student=instance).select_related('class_session__classroom'):
+        for config_id in _term_configs(student_session.class_session):
+            refresh_rankings_for(config_id, student_session.class_session_id, [instance.id])
+
+
+@receiver(m2m_changed, sender=FeeStructure.classes.through)
+def fee_classes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Students of a class added to a fee owe it; removing a class keeps the records paid so far
+    if action != 'post_add' or not pk_set:
+        return
+    materialise(fee_ids=pk_set if reverse else [instance.id])
+
+
+@receiver(post_save, sender=StudentSession)
+def student_enrolled(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not {'student', 'class_session'} & set(update_fields):
+        return
+    materialise(student_ids=[instance.student_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def student_class_changed(sender, instance, update_fields=None, **kwargs):
+    # The current class decides which fees a student owes; saves that cannot change it are skipped
+    if instance.role != 'student' or not instance.classroom_id:
+        return
+    if update_fields is not None and 'classroom' not in update_fields:
+        return
+    materialise(student_ids=[instance.id])
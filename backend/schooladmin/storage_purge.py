@@ -0,0 +1,217 @@
+"""
+Batched deletion of uploaded files from storage, with a ledger.
+
+Deleting through FieldFile.delete() costs one DeleteObject round trip to
+Spaces per file, one after another. Here the keys to delete are first
+recorded in a StoragePurge ledger entry - in the same transaction that
+deletes the rows pointing at them, so a rollback keeps both - and removed
+afterwards by run_purge():
+
+- keys are grouped by the storage holding them and split into batches of
+  STORAGE_PURGE_BATCH_SIZE (at most 1,000, the S3 DeleteObjects limit);
+- batches run on a pool of STORAGE_PURGE_WORKERS threads; an S3 storage
+  deletes a batch with a single DeleteObjects request, any other storage
+  (FileSystemStorage locally and in tests) deletes key by key;
+- keys that fail are retried STORAGE_PURGE_RETRIES times with backoff and
+  are left pending in the ledger with their error otherwise, to be retried
+  by retry_pending_purges() (run_scheduler, daily).
+
+Worker threads only talk to storage; every database write happens on the
+calling thread.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+S3_MAX_KEYS_PER_REQUEST = 1000
+RETRY_BACKOFF_SECONDS = 0.5
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def field_label(field):
+    return f'{field.model._meta.label}.{field.name}'
+
+
+def file_keys(queryset, field_name):
+    """(storage label, key) of every stored file in field_name of the queryset's rows."""
+    label = field_label(queryset.model._meta.get_field(field_name))
+    return [
+        (label, name)
+        for name in queryset.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''}).values_list(field_name, flat=True)
+    ]
+
+
+def instance_keys(field_files):
+    """(storage label, key) of the given FieldFiles that hold a file."""
+    return [(field_label(f.field), f.name) for f in field_files if f]
+
+
+def _storage(label):
+    app_label, model_name, field_name = label.rsplit('.', 2)
+    return apps.get_model(app_label, model_name)._meta.get_field(field_name).storage
+
+
+def record_purge(keys, school=None, reason=''):
+    """Record the (storage label, key) pairs to delete in a new ledger entry; None when there are none."""
+    from .models import StoragePurge, StoragePurgeKey
+
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return None
+    purge = StoragePurge.objects.create(school=school, reason=reason[:255], keys_total=len(keys))
+    StoragePurgeKey.objects.bulk_create(
+        [StoragePurgeKey(purge=purge, storage=label, name=name) for label, name in keys],
+        batch_size=S3_MAX_KEYS_PER_REQUEST,
+    )
+    return purge
+
+
+def purge_after_commit(keys, school=None, reason=''):
+    """Record the keys now and delete them once the current transaction commits."""
+    purge = record_purge(keys, school, reason)
+    if purge:
+        transaction.on_commit(lambda: run_purge(purge))
+    return purge
+
+
+def _is_s3(storage):
+    try:
+        from storages.backends.s3boto3 import S3Boto3Storage
+    except ImportError:
+        return False
+    return isinstance(storage, S3Boto3Storage)
+
+
+def _delete_s3(storage, names):
+    """One DeleteObjects request; returns {name: error} for the keys it could not delete."""
+    from storages.utils import clean_name
+
+    keys = {storage._normalize_name(clean_name(name)): name for name in names}
+    try:
+        response = storage.connection.meta.client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+        )
+    except Exception as e:
+        return {name: f'{type(e).__name__}: {e}' for name in names}
+    return {
+        keys.get(error.get('Key'), error.get('Key')): f"{error.get('Code')}: {error.get('Message')}"
+        for error in response.get('Errors', [])
+    }
+
+
+def _delete_each(storage, names):
+    errors = {}
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            errors[name] = f'{type(e).__name__}: {e}'
+    return errors
+
+
+def _delete_batch(storage, names, retries):
+    """Delete a batch, retrying the keys that failed; returns {name: error} of those still failing."""
+    delete = _delete_s3 if _is_s3(storage) else _delete_each
+    errors = {}
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        errors = delete(storage, names)
+        names = [name for name in names if name in errors]
+        if not names:
+            break
+    return errors
+
+
+def run_purge(purge):
+    """Delete the ledger entry's pending keys from storage and record the outcome."""
+    from .models import StoragePurge, StoragePurgeKey
+
+    started = time.monotonic()
+    batch_size = max(1, min(_setting('STORAGE_PURGE_BATCH_SIZE', S3_MAX_KEYS_PER_REQUEST), S3_MAX_KEYS_PER_REQUEST))
+    retries = _setting('STORAGE_PURGE_RETRIES', 3)
+
+    by_storage = defaultdict(dict)
+    for key_id, label, name in purge.keys.filter(deleted=False).values_list('id', 'storage', 'name'):
+        by_storage[label][name] = key_id
+    batches = []
+    for label, ids in by_storage.items():
+        names = list(ids)
+        try:
+            storage = _storage(label)
+        except (LookupError, ValueError) as e:
+            logger.error(f'Storage purge {purge.id}: cannot resolve {label}: {e}')
+            continue
+        batches.extend((label, storage, names[i:i + batch_size]) for i in range(0, len(names), batch_size))
+
+    failed = {}
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(_setting('STORAGE_PURGE_WORKERS', 8), len(batches))) as pool:
+            outcomes = pool.map(lambda batch: (batch, _delete_batch(batch[1], batch[2], retries)), batches)
+            for (label, _, names), errors in outcomes:
+                for name, error in errors.items():
+                    if name in by_storage[label]:
+                        failed[by_storage[label][name]] = error[:500]
+
+    attempted = (by_storage[label][name] for label, _, names in batches for name in names)
+    deleted = [key_id for key_id in attempted if key_id not in failed]
+    for start in range(0, len(deleted), S3_MAX_KEYS_PER_REQUEST):
+        StoragePurgeKey.objects.filter(id__in=deleted[start:start + S3_MAX_KEYS_PER_REQUEST]).update(deleted=True, error='')
+    by_error = defaultdict(list)
+    for key_id, error in failed.items():
+        by_error[error].append(key_id)
+    for error, key_ids in by_error.items():
+        for start in range(0, len(key_ids), S3_MAX_KEYS_PER_REQUEST):
+            StoragePurgeKey.objects.filter(id__in=key_ids[start:start + S3_MAX_KEYS_PER_REQUEST]).update(error=error)
+
+    keys_deleted = purge.keys.filter(deleted=True).count()
+    keys_failed = purge.keys_total - keys_deleted
+    status = StoragePurge.STATUS_COMPLETED if not keys_failed else StoragePurge.STATUS_FAILED
+    seconds = time.monotonic() - started
+    StoragePurge.objects.filter(id=purge.id).update(
+        status=status,
+        attempts=F('attempts') + 1,
+        keys_deleted=keys_deleted,
+        keys_failed=keys_failed,
+        seconds=F('seconds') + seconds,
+        finished_at=timezone.now(),
+    )
+    purge.refresh_from_db()
+    log = logger.info if not keys_failed else logger.warning
+    log(
+        f'Storage purge {purge.id} ({purge.reason}): {keys_deleted}/{purge.keys_total} deleted, '
+        f'{keys_failed} failed, {len(batches)} batch(es) in {seconds:.1f}s'
+    )
+    return purge
+
+
+def retry_pending_purges(school=None, older_than=None, max_attempts=None):
+    """
+    Run ledger entries with keys left to delete; returns the entries run.
+    older_than (a timedelta) leaves alone entries whose own run may still be
+    about to start.
+    """
+    from .models import StoragePurge
+
+    purges = StoragePurge.objects.exclude(status=StoragePurge.STATUS_COMPLETED).order_by('created_at')
+    if school is not None:
+        purges = purges.filter(school=school)
+    if older_than is not None:
+        purges = purges.filter(created_at__lt=timezone.now() - older_than)
+    if max_attempts is not None:
+        purges = purges.filter(attempts__lt=max_attempts)
+    return [run_purge(purge) for purge in purges]
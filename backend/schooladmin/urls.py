@@ -10,7 +10,7 @@ from .views import (
     # Fee Structure Views
     CreateFeeStructureView, ListFeeStructuresView, UpdateFeeStructureView,
     DeleteFeeStructureView, ListStudentFeeRecordsView, FeeStudentsView,
-    update_fee_payment, fee_dashboard_view, get_fee_payment_history, generate_fee_receipt,
+    update_fee_payment, fee_dashboard_view, get_fee_payment_history, generate_fee_receipt, post_fee_payments,
     get_admin_fee_receipts, download_admin_fee_receipt,
     
     # Grading Scale Views
@@ -112,6 +112,11 @@ from .views import (
     get_current_session_info,
     get_all_available_sessions,
     graduation_email_preview,
+
+    # Background Job Views
+    list_background_jobs,
+    get_background_job,
+    download_background_job_file,
     teacher_lesson_notes,
     teacher_lesson_note_detail,
     admin_lesson_notes_list,
@@ -143,6 +148,7 @@ urlpatterns = [
     path('fee-records/<int:record_id>/update/', update_fee_payment, name='update-fee-payment'),
     path('fee-records/<int:record_id>/payment-history/', get_fee_payment_history, name='fee-payment-history'),
     path('fee-records/<int:record_id>/generate-receipt/', generate_fee_receipt, name='generate-fee-receipt'),
+    path('fee-records/bulk-payments/', post_fee_payments, name='post-fee-payments'),
     path('fees/dashboard/', fee_dashboard_view, name='fee-dashboard'),
     path('admin/fee-receipts/', get_admin_fee_receipts, name='admin-fee-receipts'),
     path('admin/fee-receipts/<int:receipt_id>/download/', download_admin_fee_receipt, name='admin-download-fee-receipt'),
@@ -321,6 +327,13 @@ urlpatterns = [
     path('session/info/', get_current_session_info, name='get-current-session-info'),
     path('session/all/', get_all_available_sessions, name='get-all-available-sessions'),
 
+    # ============================================================================
+    # BACKGROUND JOB URLS
+    # ============================================================================
+    path('jobs/', list_background_jobs, name='background-jobs'),
+    path('jobs/<uuid:job_id>/', get_background_job, name='background-job-detail'),
+    path('jobs/<uuid:job_id>/download/', download_background_job_file, name='background-job-download'),
+
     # ============================================================================
     # STAFF MANAGEMENT URLS
     # ============================================================================
@@ -365,4 +378,4 @@ urlpatterns = [
     path('staff/book-off/', book_off, name='staff-book-off'),
     path('staff/my-schedule/', my_schedule, name='staff-my-schedule'),
     path('staff/my-records/', my_records, name='staff-my-records'),
-]
\ No newline at end of file
+]
\ No newline at end of file
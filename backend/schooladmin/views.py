@@ -1,4 +1,5 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import generics, status, permissions
@@ -10,6 +11,11 @@ from .models import (
     FeeStructure, StudentFeeRecord, GradingScale, GradingConfiguration, 
     GradeComponent, StudentGrade, AttendanceRecord, GradeSummary, ConfigurationTemplate
 )
+from .report_engine import build_student_report, REPORT_GRADING_CONFIG
+from .rankings import deferred_ranking_refresh, get_class_ranking, get_report_position
+from .jobs import enqueue_request_job, job_accepted_payload
+from .attendance_sync import sync_attendance
+from . import fee_ledger
 from .serializers import (
     FeeStructureSerializer, StudentFeeRecordSerializer, GradingScaleSerializer,
     GradingConfigurationSerializer, StudentGradeSerializer,
@@ -119,7 +125,7 @@ class ListStudentFeeRecordsView(generics.ListAPIView):
         fee_id = self.request.query_params.get('fee_id')
         if fee_id:
             queryset = queryset.filter(fee_structure_id=fee_id)
-        return queryset
+        return fee_ledger.with_status(queryset.select_related('student', 'fee_structure'))
 
 
 class FeeStudentsView(APIView):
@@ -138,62 +144,8 @@ class FeeStudentsView(APIView):
             return Response({"detail": "Fee structure not found."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        students_query = CustomUser.objects.filter(
-            role='student',
-            school=school,
-            classroom__in=fee.classes.all()
-        )
-
-        students = students_query
-
-        grouped = {}
-        for student in students:
-            cls = student.classroom
-            if not cls:
-                continue
-
-            cid = cls.id
-            cname = cls.name
-
-            rec, _ = StudentFeeRecord.objects.get_or_create(
-                student=student,
-                fee_structure=fee,
-                defaults={"amount_paid": 0, "payment_status": "UNPAID"}
-            )
-
-            paid_amt = rec.amount_paid
-            outstanding = fee.amount - paid_amt
-
-            if paid_amt >= fee.amount and rec.payment_status != 'PAID':
-                rec.payment_status = 'PAID'
-                rec.save(update_fields=['payment_status'])
-
-            if cid not in grouped:
-                grouped[cid] = {
-                    "classId": cid,
-                    "className": cname,
-                    "students": [],
-                    "paid": 0,
-                    "outstanding": 0,
-                }
-
-            grouped[cid]["students"].append({
-                "record_id": rec.id,
-                "student_id": student.id,
-                "full_name": f"{student.first_name} {student.last_name}",
-                "username": student.username,
-                "academic_year": student.academic_year,
-                "fee_name": fee.name,
-                "fee_amount": fee.amount,
-                "amount_paid": paid_amt,
-                "outstanding": outstanding,
-                "payment_status": rec.payment_status,
-            })
-
-            grouped[cid]["paid"] += paid_amt
-            grouped[cid]["outstanding"] += outstanding
-
-        return Response(list(grouped.values()))
+        # Records are written by the fee ledger when fees and enrolments change, not here
+        return Response(fee_ledger.fee_students(fee, school))
 
 
 @api_view(['PATCH'])
@@ -301,6 +253,47 @@ def get_fee_payment_history(request, record_id):
     })
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsPrincipalOrAdmin])
+@parser_classes([JSONParser, MultiPartParser])
+def post_fee_payments(request):
+    """
+    POST /api/<school_slug>/schooladmin/fee-records/bulk-payments/
+    Post a batch of fee payments, e.g. from a bank statement: a CSV/XLSX
+    upload ('file') or JSON 'payments', with columns/keys student (username or
+    id), fee_structure (id), amount and reference, and optionally
+    payment_method and remarks. References already posted are skipped, so a
+    batch can be sent again safely. dry_run validates without posting.
+    """
+    from .fee_payments import max_rows, parse_payment_file, post_payments, rows_from_json
+
+    school = getattr(request, 'school', None)
+    if not school:
+        return Response({"detail": "School not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        file = request.FILES.get('file')
+        rows = parse_payment_file(file) if file else rows_from_json(request.data.get('payments'))
+    except Exception as e:
+        return Response({"detail": f"Could not read the payments: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not rows:
+        return Response({"detail": "No payment rows found."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > max_rows():
+        return Response(
+            {"detail": f"A batch can have at most {max_rows()} payments; this one has {len(rows)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    result = post_payments(
+        school, rows, request.user,
+        payment_method=request.data.get('payment_method', '') or '',
+        dry_run=dry_run,
+    )
+    return Response(result, status=status.HTTP_200_OK if dry_run or not result['posted'] else status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsPrincipalOrAdmin])
 def generate_fee_receipt(request, record_id):
@@ -385,69 +378,12 @@ def fee_dashboard_view(request):
     if not academic_year or not term:
         return Response({"detail": "Missing academic_year or term."}, status=400)
 
-    fees = FeeStructure.objects.filter(academic_year=academic_year, term=term)
-    response_data = []
-
-    for fee in fees:
-        # Get all student sessions for the classes in this fee structure
-        # and the specified academic year and term (including historic data)
-        student_sessions = StudentSession.objects.filter(
-            class_session__classroom__in=fee.classes.all(),
-            class_session__academic_year=academic_year,
-            class_session__term=term
-        ).select_related('student', 'class_session__classroom')
-
-        grouped = {}
-
-        for student_session in student_sessions:
-            student = student_session.student
-            cls = student_session.class_session.classroom
-
-            cid = cls.id
-            cname = cls.name
-
-            rec, _ = StudentFeeRecord.objects.get_or_create(
-                student=student,
-                fee_structure=fee,
-                defaults={"amount_paid": 0, "payment_status": "UNPAID"}
-            )
-
-            paid_amt = rec.amount_paid
-            outstanding = fee.amount - paid_amt
-
-            if paid_amt >= fee.amount and rec.payment_status != 'PAID':
-                rec.payment_status = 'PAID'
-                rec.save(update_fields=['payment_status'])
-
-            if cid not in grouped:
-                grouped[cid] = {
-                    "classId": cid,
-                    "className": cname,
-                    "fee_structure_id": fee.id,
-                    "students": [],
-                    "paid": 0,
-                    "outstanding": 0,
-                }
-
-            grouped[cid]["students"].append({
-                "record_id": rec.id,
-                "student_id": student.id,
-                "full_name": f"{student.first_name} {student.last_name}",
-                "username": student.username,
-                "academic_year": academic_year,
-                "fee_name": fee.name,
-                "fee_amount": fee.amount,
-                "amount_paid": paid_amt,
-                "outstanding": outstanding,
-                "payment_status": rec.payment_status,
-            })
-
-            grouped[cid]["paid"] += paid_amt
-            grouped[cid]["outstanding"] += outstanding
-
-        response_data.extend(grouped.values())
+    # Filter by school for multi-tenancy data isolation
+    school = getattr(request, 'school', None)
+    if not school:
+        return Response([])
 
-    return Response(response_data)
+    return Response(fee_ledger.fee_dashboard(school, academic_year, term))
 
 
 # ============================================================================
@@ -1324,6 +1260,7 @@ def update_student_grade(request, grade_summary_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminRole])
+@deferred_ranking_refresh()
 def bulk_update_grades(request):
     """
     Update multiple students' grades at once
@@ -1346,15 +1283,31 @@ def bulk_update_grades(request):
 
     updated_count = 0
     errors = []
+    changed_summaries = {}
+    changed_fields = set()
+
+    requested_ids = {
+        str(grade_data.get('grade_summary_id')) for grade_data in grades_data
+        if str(grade_data.get('grade_summary_id')).isdigit()
+    }
 
     with transaction.atomic():
+        # One query for every summary in the batch
+        summaries = {
+            str(pk): summary for pk, summary in GradeSummary.objects.select_related(
+                'grading_config', 'subject', 'student'
+            ).in_bulk(requested_ids).items()
+        }
+
         for grade_data in grades_data:
             grade_summary_id = grade_data.get('grade_summary_id')
             component_type = grade_data.get('component_type')
             score = grade_data.get('score')
 
             try:
-                grade_summary = GradeSummary.objects.select_related('grading_config', 'subject', 'student').get(id=grade_summary_id)
+                grade_summary = summaries.get(str(grade_summary_id))
+                if grade_summary is None:
+                    raise GradeSummary.DoesNotExist
                 grading_config = grade_summary.grading_config
 
                 # Validate
@@ -1369,14 +1322,15 @@ def bulk_update_grades(request):
                     errors.append(f"Score {score} exceeds maximum {max_percentage}% for {component_type}")
                     continue
 
-                # Update
+                # Update (totals and letter grades are recalculated in bulk below)
                 setattr(grade_summary, f'{component_type}_score', score)
+                changed_fields.add(f'{component_type}_score')
 
                 if component_type == 'attendance':
                     grade_summary.attendance_finalized = True
+                    changed_fields.add('attendance_finalized')
 
-                grade_summary.recalculate_total_score()
-                grade_summary.save()
+                changed_summaries[grade_summary.pk] = grade_summary
                 updated_count += 1
 
                 # SYNC TEST SCORES TO ASSESSMENT SUBMISSION
@@ -1433,6 +1387,8 @@ def bulk_update_grades(request):
             except Exception as e:
                 errors.append(f"Error updating grade_summary {grade_summary_id}: {str(e)}")
 
+        GradeSummary.objects.recalculate(changed_summaries.values(), fields=sorted(changed_fields))
+
     return Response({
         'message': f'Successfully updated {updated_count} grades',
         'updated_count': updated_count,
@@ -1450,7 +1406,16 @@ def sync_attendance_to_grades(request):
     """
     Calculate attendance percentages from schooladmin.AttendanceRecord and update grade summaries
     This syncs attendance marked via the dashboard to the grading system
+
+    Runs as a background job: responds 202 with a job id to poll for progress and the result.
     """
+    job = enqueue_request_job(request, 'sync_attendance_to_grades')
+    return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
+
+
+@deferred_ranking_refresh()
+def run_sync_attendance_to_grades(request):
+    """Job handler for sync_attendance_to_grades; request is a schooladmin.jobs.JobRequest."""
     academic_year = request.data.get('academic_year')
     term = request.data.get('term')
     
@@ -1499,100 +1464,13 @@ def sync_attendance_to_grades(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    updated_count = 0
-    skipped_count = 0
-    no_attendance_count = 0
-    errors_list = []
-    
-    # Process each class session
-    for class_session in class_sessions:
-        
-        # Get all subjects for this class session
-        subjects = Subject.objects.filter(class_session=class_session)
-        
-        # Get all students in this class session
-        student_sessions = StudentSession.objects.filter(
-            class_session=class_session,
-        ).select_related('student')
-        
-        
-        for subject in subjects:
-            
-            # Filter students by department if subject has one
-            filtered_students = student_sessions
-            
-            if hasattr(subject, 'department') and subject.department:
-                subject_dept = str(subject.department).strip().lower()
-                if subject_dept and subject_dept not in ['general', 'all', 'none']:
-                    filtered_students = filtered_students.filter(
-                        student__department__iexact=subject.department
-                    )
-            
-            for student_session in filtered_students:
-                student = student_session.student
-                
-                # Get or create grade summary
-                grade_summary, created = GradeSummary.objects.get_or_create(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config,
-                    defaults={
-                        'attendance_score': 0,
-                        'assignment_score': 0,
-                        'test_score': 0,
-                        'exam_score': 0,
-                    }
-                )
-                
-                if created:
-                    pass
-                
-                # Skip if attendance is already finalized (manually set by admin)
-                if grade_summary.attendance_finalized:
-                    skipped_count += 1
-                    continue
-                
-                try:
-                    # Get attendance records from schooladmin.AttendanceRecord
-                    # This is where attendance is actually stored when marked via dashboard
-                    student_attendance = AttendanceRecord.objects.filter(
-                        student=student,
-                        class_session=class_session
-                    )
-                    
-                    total_days = student_attendance.count()
-                    present_days = student_attendance.filter(is_present=True).count()
-                    
-                    
-                    if total_days > 0:
-                        # Calculate percentage
-                        attendance_percentage = (present_days / total_days) * 100
-                        
-                        # Scale to the attendance component's weight
-                        max_attendance_score = grading_config.attendance_percentage
-                        attendance_score = (attendance_percentage / 100) * max_attendance_score
-                        
-                        # Update grade summary
-                        old_score = grade_summary.attendance_score
-                        grade_summary.attendance_score = round(attendance_score, 2)
-                        grade_summary.recalculate_total_score()
-                        grade_summary.save()
-                        
-                        updated_count += 1
-                    else:
-                        # No attendance records for this student
-                        no_attendance_count += 1
-                        if grade_summary.attendance_score != 0:
-                            grade_summary.attendance_score = 0
-                            grade_summary.recalculate_total_score()
-                            grade_summary.save()
-                        
-                except Exception as e:
-                    error_msg = f"Error for student {student.username} in subject {subject.name}: {str(e)}"
-                    errors_list.append(error_msg)
-                    continue
-    
-    
+    request.set_progress(0, 1, f'Syncing {class_sessions.count()} classes')
+    stats = sync_attendance(grading_config, class_sessions.values_list('id', flat=True))
+    request.set_progress(1, 1, 'Attendance synced')
+    updated_count = stats['updated']
+    skipped_count = stats['skipped']
+    no_attendance_count = stats['no_attendance']
+
     response_data = {
         'message': f'Successfully synced attendance grades for {academic_year} - {term}',
         'updated_count': updated_count,
@@ -1600,14 +1478,12 @@ def sync_attendance_to_grades(request):
         'no_attendance_count': no_attendance_count,
         'note': f'{skipped_count} students skipped (attendance finalized). {no_attendance_count} students have no attendance records.'
     }
-    
-    if errors_list:
-        response_data['errors'] = errors_list
-    
+
     return Response(response_data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminRole])
+@deferred_ranking_refresh()
 def sync_class_attendance_to_grades(request):
     """
     Sync attendance for a specific class session
@@ -1641,62 +1517,13 @@ def sync_class_attendance_to_grades(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get all subjects for this class session
-    subjects = Subject.objects.filter(class_session=class_session)
-    
-    # Get all students
-    student_sessions = StudentSession.objects.filter(
-        class_session=class_session,
-    ).select_related('student')
-    
-    updated_count = 0
-    skipped_count = 0
-    
-    for subject in subjects:
-        for student_session in student_sessions:
-            student = student_session.student
-            
-            # Get or create grade summary
-            grade_summary, created = GradeSummary.objects.get_or_create(
-                student=student,
-                subject=subject,
-                grading_config=grading_config,
-                defaults={
-                    'attendance_score': 0,
-                    'assignment_score': 0,
-                    'test_score': 0,
-                    'exam_score': 0,
-                }
-            )
-            
-            # Skip if finalized
-            if grade_summary.attendance_finalized:
-                skipped_count += 1
-                continue
-            
-            # Calculate attendance
-            try:
-                student_attendance = AttendanceRecord.objects.filter(
-                    student=student,
-                    class_session=class_session
-                )
-                
-                total_days = student_attendance.count()
-                present_days = student_attendance.filter(is_present=True).count()
-                
-                if total_days > 0:
-                    attendance_percentage = (present_days / total_days) * 100
-                    max_attendance_score = grading_config.attendance_percentage
-                    attendance_score = (attendance_percentage / 100) * max_attendance_score
-                    
-                    grade_summary.attendance_score = round(attendance_score, 2)
-                    grade_summary.recalculate_total_score()
-                    grade_summary.save()
-                    updated_count += 1
-                    
-            except Exception as e:
-                continue
-    
+    # Students without attendance records keep their current score here
+    stats = sync_attendance(
+        grading_config, [class_session.id], reset_missing=False, match_departments=False,
+    )
+    updated_count = stats['updated']
+    skipped_count = stats['skipped']
+
     return Response({
         'message': f'Successfully synced attendance for {class_session.classroom.name}',
         'updated_count': updated_count,
@@ -1705,6 +1532,7 @@ def sync_class_attendance_to_grades(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminRole])
+@deferred_ranking_refresh()
 def calculate_grade_summaries(request):
     """Recalculate grade summaries"""
     academic_year = request.data.get('academic_year')
@@ -1728,58 +1556,77 @@ def calculate_grade_summaries(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    subjects = Subject.objects.filter(
+    from collections import defaultdict
+
+    subject_sessions = dict(Subject.objects.filter(
         class_session__academic_year=academic_year,
-        class_session__term=term
-    )
-    
-    updated_count = 0
-    for subject in subjects:
-        student_sessions = StudentSession.objects.filter(
-            class_session=subject.class_session,
-            is_active=True
-        )
-        
-        for student_session in student_sessions:
-            student = student_session.student
-            
-            summary, created = GradeSummary.objects.get_or_create(
-                student=student,
-                subject=subject,
+        class_session__term=term,
+        class_session__classroom__school=getattr(request, 'school', None)
+    ).values_list('id', 'class_session_id'))
+
+    students_by_session = defaultdict(set)
+    for student_id, class_session_id in StudentSession.objects.filter(
+        class_session_id__in=set(subject_sessions.values()),
+        is_active=True
+    ).values_list('student_id', 'class_session_id'):
+        students_by_session[class_session_id].add(student_id)
+
+    pairs = {
+        (student_id, subject_id)
+        for subject_id, class_session_id in subject_sessions.items()
+        for student_id in students_by_session[class_session_id]
+    }
+
+    # Average percentage per (student, subject, component type), from one query
+    component_types = dict(grading_config.components.values_list('id', 'component_type'))
+    percentages = defaultdict(list)
+    for student_id, subject_id, component_id, score, max_possible_score in StudentGrade.objects.filter(
+        subject_id__in=subject_sessions.keys(),
+        component_id__in=component_types.keys()
+    ).values_list('student_id', 'subject_id', 'component_id', 'score', 'max_possible_score'):
+        percentage = (score / max_possible_score) * 100 if max_possible_score else 0
+        percentages[(student_id, subject_id, component_types[component_id])].append(percentage)
+
+    with transaction.atomic():
+        existing = set(GradeSummary.objects.filter(
+            grading_config=grading_config,
+            subject_id__in=subject_sessions.keys()
+        ).values_list('student_id', 'subject_id'))
+        missing = pairs - existing
+        GradeSummary.objects.bulk_create([
+            GradeSummary(
+                student_id=student_id,
+                subject_id=subject_id,
                 grading_config=grading_config,
-                defaults={
-                    'attendance_score': 0,
-                    'assignment_score': 0,
-                    'test_score': 0,
-                    'exam_score': 0,
-                }
+                attendance_score=0,
+                assignment_score=0,
+                test_score=0,
+                exam_score=0,
             )
-            
-            components = grading_config.components.all()
-            
-            for component in components:
-                grades = StudentGrade.objects.filter(
-                    student=student,
-                    subject=subject,
-                    component=component
-                )
-                
-                if grades.exists():
-                    total_percentage = sum(grade.percentage_score for grade in grades)
-                    avg_percentage = total_percentage / grades.count()
-                    
-                    if component.component_type == 'attendance':
-                        summary.attendance_score = avg_percentage
-                    elif component.component_type == 'assignment':
-                        summary.assignment_score = avg_percentage
-                    elif component.component_type == 'test':
-                        summary.test_score = avg_percentage
-                    elif component.component_type == 'exam':
-                        summary.exam_score = avg_percentage
-            
-            summary.recalculate_total_score()
-            summary.save()
-            updated_count += 1
+            for student_id, subject_id in missing
+        ], batch_size=500, ignore_conflicts=True)
+
+        summaries = [
+            summary for summary in GradeSummary.objects.filter(
+                grading_config=grading_config,
+                subject_id__in=subject_sessions.keys()
+            )
+            if (summary.student_id, summary.subject_id) in pairs
+        ]
+
+        for summary in summaries:
+            if (summary.student_id, summary.subject_id) in missing:
+                # New rows always count towards the class ranking
+                summary._loaded_total_score = None
+            for component_type in component_types.values():
+                grades = percentages.get((summary.student_id, summary.subject_id, component_type))
+                if grades:
+                    setattr(summary, f'{component_type}_score', sum(grades) / len(grades))
+
+        updated_count = GradeSummary.objects.recalculate(
+            summaries,
+            fields=['attendance_score', 'assignment_score', 'test_score', 'exam_score']
+        )
     
     return Response({
         'message': f'Recalculated {updated_count} grade summaries for {academic_year} - {term}',
@@ -2349,6 +2196,7 @@ def get_students_for_manual_grading(request, subject_id):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsTeacherOrAdmin])
+@deferred_ranking_refresh()
 def save_manual_grades(request, subject_id):
     """
     Save manual test/exam grades for students
@@ -2423,19 +2271,37 @@ def save_manual_grades(request, subject_id):
 
     school = getattr(request, 'school', None) or request.user.school
 
+    requested_ids = {str(grade_data.get('student_id')) for grade_data in grades}
+    requested_ids = [student_id for student_id in requested_ids if student_id.isdigit()]
+
     with transaction.atomic():
+        # One query each for the students and their summaries in this subject
+        students = {
+            str(student.id): student
+            for student in CustomUser.objects.filter(id__in=requested_ids, role='student', school=school)
+        }
+        summaries = {
+            summary.student_id: summary
+            for summary in GradeSummary.objects.filter(
+                student_id__in=[student.id for student in students.values()],
+                subject=subject,
+                grading_config=grading_config
+            )
+        }
+        changed_summaries = {}
+
         for grade_data in grades:
             student_id = grade_data.get('student_id')
             score = grade_data.get('score')
 
             try:
-                student = CustomUser.objects.get(id=student_id, role='student', school=school)
+                student = students.get(str(student_id))
+                if student is None:
+                    raise CustomUser.DoesNotExist
 
-                grade_summary = GradeSummary.objects.get(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config
-                )
+                grade_summary = summaries.get(student.id)
+                if grade_summary is None:
+                    raise GradeSummary.DoesNotExist
 
                 # Check if already manually entered
                 if grade_type == 'test' and grade_summary.test_manual_entry:
@@ -2460,8 +2326,7 @@ def save_manual_grades(request, subject_id):
                     grade_summary.exam_score = score_decimal
                     grade_summary.exam_manual_entry = True
 
-                grade_summary.recalculate_total_score()
-                grade_summary.save()
+                changed_summaries[grade_summary.pk] = grade_summary
                 updated_count += 1
 
             except CustomUser.DoesNotExist:
@@ -2471,6 +2336,11 @@ def save_manual_grades(request, subject_id):
             except Exception as e:
                 errors.append(f"Error for student ID {student_id}: {str(e)}")
 
+        GradeSummary.objects.recalculate(
+            changed_summaries.values(),
+            fields=[f'{grade_type}_score', f'{grade_type}_manual_entry']
+        )
+
     return Response({
         'message': f'Successfully updated {updated_count} {grade_type} grades',
         'updated_count': updated_count,
@@ -2495,6 +2365,70 @@ def _test1_is_entered(grade_summary, attendance_score, assignment_score):
     return config_test1_max == 0 or (attendance_score + assignment_score) != 0
 
 
+def _readiness_rows(grading_config, **session_filters):
+    """
+    StudentReadiness rows for a grading configuration (see readiness.py), built on
+    first use. session_filters (e.g. is_active=True, report_sent=False) limit the
+    rows to students whose enrolment in that class matches.
+    """
+    from django.db.models import Exists, OuterRef
+    from .models import StudentReadiness
+    from .readiness import ensure_readiness
+
+    ensure_readiness(grading_config)
+    rows = StudentReadiness.objects.filter(grading_config=grading_config)
+    if session_filters:
+        rows = rows.filter(Exists(StudentSession.objects.filter(
+            student_id=OuterRef('student_id'),
+            class_session_id=OuterRef('class_session_id'),
+            **session_filters
+        )))
+    return rows
+
+
+def _with_student_session_id(rows):
+    """Annotate readiness rows with the id of the matching StudentSession."""
+    from django.db.models import OuterRef, Subquery
+
+    return rows.annotate(student_session_id=Subquery(StudentSession.objects.filter(
+        student_id=OuterRef('student_id'),
+        class_session_id=OuterRef('class_session_id')
+    ).values('id')[:1]))
+
+
+def _readiness_counts_by_class(rows):
+    """Readiness rows counted per class, in one grouped query ordered by class name."""
+    return rows.values('class_session_id', 'class_session__classroom__name').annotate(
+        count=Count('id')
+    ).order_by('class_session__classroom__name')
+
+
+def _incomplete_subjects(grading_config, rows, no_summary_missing):
+    """
+    {student_id: [{'name': ..., 'missing': [...]}]} for readiness rows (with student
+    loaded), from two queries. no_summary_missing is reported for subjects that have
+    no grade summary at all.
+    """
+    from .readiness import subject_gaps
+
+    gaps = subject_gaps(
+        grading_config,
+        [(row.student_id, row.class_session_id, row.student.department) for row in rows]
+    )
+    incomplete = {}
+    for row in rows:
+        entries = gaps[row.student_id]
+        if not entries:
+            incomplete[row.student_id] = [{'name': 'No subjects assigned', 'missing': ['All']}]
+            continue
+        incomplete[row.student_id] = [
+            {'name': name, 'missing': no_summary_missing if missing is None else missing}
+            for name, missing in entries
+            if missing != []
+        ]
+    return incomplete
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_test_completion_stats(request):
@@ -3288,7 +3222,8 @@ def unlock_test_scores(request):
             assessments = assessments.filter(subject__class_session__term=term)
 
         count = assessments.count()
-        assessments.update(is_released=True)
+        from django.utils import timezone
+        assessments.update(is_released=True, updated_at=timezone.now())
 
         return Response({
             'message': f'Successfully unlocked test scores for {count} assessment(s)',
@@ -3402,28 +3337,6 @@ def get_students_for_report(request):
         )
 
 
-def get_report_grade(score):
-    """Return grade based on custom report sheet scale"""
-    if score >= 75:
-        return 'A1'
-    elif score >= 70:
-        return 'B2'
-    elif score >= 65:
-        return 'B3'
-    elif score >= 60:
-        return 'C4'
-    elif score >= 55:
-        return 'C5'
-    elif score >= 50:
-        return 'C6'
-    elif score >= 45:
-        return 'D7'
-    elif score >= 40:
-        return 'E8'
-    else:
-        return 'F9'
-
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminRole])
 def get_report_sheet(request, student_id):
@@ -3446,7 +3359,6 @@ def get_report_sheet(request, student_id):
     - All subjects with scores from GradeSummary
     - Grand total, average, and class position
     """
-    from academics.models import Subject
     from django.contrib.auth import get_user_model
 
     User = get_user_model()
@@ -3524,127 +3436,19 @@ def get_report_sheet(request, student_id):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get all subjects for this student
-        subjects = Subject.objects.filter(
-            class_session=class_session
-        ).select_related('teacher')
-
-        # Filter by department if student has one
-        if student_session.student.department:
-            subjects = subjects.filter(
-                Q(department=student_session.student.department) |
-                Q(department='General')
-            )
-
-        subjects_data = []
-
-        for subject in subjects:
-            # Get GradeSummary for this student and subject
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config
-                )
-
-                # Get the grading configuration percentages
-                attendance_percent = grading_config.attendance_percentage
-                assignment_percent = grading_config.assignment_percentage
-                test_percent = grading_config.test_percentage
-                exam_percent = grading_config.exam_percentage
+        # The student's own rows; class position is a read from the ClassRanking table
+        student_report = build_student_report(student_session, grading_config)
+        student_report.position, total_students = get_report_position(grading_config, class_session, student)
+        subjects_data = student_report.subjects
 
-                # The scores in GradeSummary are already weighted percentages
-                # Scale them to report sheet format:
-                # TEST 1 (20 marks) = Attendance + Assignment scaled to 20
-                # TEST 2 (20 marks) = Test score scaled to 20
-                # EXAM (60 marks) = Exam score scaled to 60
-
-                # Calculate what TEST 1 should be out of (attendance_percent + assignment_percent)
-                test1_max = attendance_percent + assignment_percent
-
-                # Scale scores to report sheet format (Test1=20, Test2=20, Exam=60)
-                first_test_score = (float(grade_summary.attendance_score) + float(grade_summary.assignment_score)) * (20 / test1_max) if test1_max > 0 else 0
-                second_test_score = float(grade_summary.test_score) * (20 / test_percent) if test_percent > 0 else 0
-                exam_score = float(grade_summary.exam_score) * (60 / exam_percent) if exam_percent > 0 else 0
-
-                # Calculate total from scaled scores (should equal 100)
-                total_score = first_test_score + second_test_score + exam_score
+        # Student photo URL - build absolute URL
+        photo_url = None
+        if hasattr(student, 'profile_picture') and student.profile_picture:
+            photo_url = request.build_absolute_uri(student.profile_picture.url)
 
-                # Get report sheet grade
-                letter_grade = get_report_grade(total_score)
-
-                subjects_data.append({
-                    'subject_name': subject.name,
-                    'first_test_score': round(first_test_score, 2),  # Attendance + Assignment scaled to 20
-                    'second_test_score': round(second_test_score, 2),  # Test scaled to 20
-                    'exam_score': round(exam_score, 2),  # Exam scaled to 60
-                    'total_score': round(total_score, 2),  # Sum of scaled scores
-                    'letter_grade': letter_grade
-                })
-
-            except GradeSummary.DoesNotExist:
-                # If no grade summary exists, show zeros
-                subjects_data.append({
-                    'subject_name': subject.name,
-                    'first_test_score': 0,
-                    'second_test_score': 0,
-                    'exam_score': 0,
-                    'total_score': 0,
-                    'letter_grade': 'F9'
-                })
-
-        # Calculate grand total and average
-        grand_total = sum(s['total_score'] for s in subjects_data)
-        average = round(grand_total / len(subjects_data), 2) if subjects_data else 0
-
-        # Calculate class position
-        # Get all students in this class and calculate their averages
-        all_students = StudentSession.objects.filter(
-            class_session=class_session,
-        ).select_related('student')
-
-        student_averages = []
-        for ss in all_students:
-            student_subjects = Subject.objects.filter(class_session=class_session)
-            if ss.student.department:
-                student_subjects = student_subjects.filter(
-                    Q(department=ss.student.department) |
-                    Q(department='General')
-                )
-
-            total = 0
-            count = 0
-            for subj in student_subjects:
-                # Get GradeSummary for this student and subject
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=ss.student,
-                        subject=subj,
-                        grading_config=grading_config
-                    )
-                    total += float(grade_summary.total_score)
-                    count += 1
-                except GradeSummary.DoesNotExist:
-                    pass
-
-            student_avg = total / count if count > 0 else 0
-            student_averages.append({
-                'student_id': ss.student.id,
-                'average': student_avg
-            })
-
-        # Sort by average descending and find position
-        student_averages.sort(key=lambda x: x['average'], reverse=True)
-        position = next((i + 1 for i, s in enumerate(student_averages) if s['student_id'] == student_id), None)
-
-        # Student photo URL - build absolute URL
-        photo_url = None
-        if hasattr(student, 'profile_picture') and student.profile_picture:
-            photo_url = request.build_absolute_uri(student.profile_picture.url)
-
-        school_logo_url = None
-        if school.logo:
-            school_logo_url = request.build_absolute_uri(school.logo.url)
+        school_logo_url = None
+        if school.logo:
+            school_logo_url = request.build_absolute_uri(school.logo.url)
 
         return Response({
             'school_name': school.name,
@@ -3661,20 +3465,10 @@ def get_report_sheet(request, student_id):
                 'academic_year': academic_year,
                 'term': term
             },
-            'grading_config': {
-                # Report sheet uses standardized format: 20/20/60
-                'first_test_max': 20,  # 1st Test (Attendance + Assignment)
-                'second_test_max': 20,  # 2nd Test
-                'exam_max': 60,  # Exam
-                'total_max': 100
-            },
+            # Report sheet uses standardized format: 20/20/60
+            'grading_config': dict(REPORT_GRADING_CONFIG),
             'subjects': subjects_data,
-            'summary': {
-                'grand_total': round(grand_total, 2),
-                'average': average,
-                'position': position,
-                'total_students': len(student_averages)
-            }
+            'summary': student_report.summary(total_students)
         })
 
     except User.DoesNotExist:
@@ -3751,114 +3545,10 @@ def download_report_sheet(request, student_id):
 
     class_session = student_session.class_session
 
-    # Get all subjects for this student
-    from academics.models import Subject
-    subjects = Subject.objects.filter(
-        class_session=class_session
-    ).select_related('teacher')
-
-    # Filter by department if student has one
-    if student_session.student.department:
-        subjects = subjects.filter(
-            Q(department=student_session.student.department) |
-            Q(department='General')
-        )
-
-    subjects_data = []
-
-    for subject in subjects:
-        # Get GradeSummary for this student and subject
-        try:
-            grade_summary = GradeSummary.objects.get(
-                student=student,
-                subject=subject,
-                grading_config=grading_config
-            )
-
-            # Get the grading configuration percentages
-            attendance_percent = grading_config.attendance_percentage
-            assignment_percent = grading_config.assignment_percentage
-            test_percent = grading_config.test_percentage
-            exam_percent = grading_config.exam_percentage
-
-            # The scores in GradeSummary are already weighted percentages
-            # Scale them to report sheet format:
-            # TEST 1 (20 marks) = Attendance + Assignment scaled to 20
-            # TEST 2 (20 marks) = Test score scaled to 20
-            # EXAM (60 marks) = Exam score scaled to 60
-
-            # Calculate what TEST 1 should be out of (attendance_percent + assignment_percent)
-            test1_max = attendance_percent + assignment_percent
-
-            # Scale scores to report sheet format (Test1=20, Test2=20, Exam=60)
-            first_test_score = (float(grade_summary.attendance_score) + float(grade_summary.assignment_score)) * (20 / test1_max) if test1_max > 0 else 0
-            second_test_score = float(grade_summary.test_score) * (20 / test_percent) if test_percent > 0 else 0
-            exam_score = float(grade_summary.exam_score) * (60 / exam_percent) if exam_percent > 0 else 0
-
-            # Calculate total from scaled scores (should equal 100)
-            total_score = first_test_score + second_test_score + exam_score
-            letter_grade = get_report_grade(total_score)
-
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': round(first_test_score, 2),
-                'second_test_score': round(second_test_score, 2),
-                'exam_score': round(exam_score, 2),
-                'total_score': round(total_score, 2),
-                'letter_grade': letter_grade
-            })
-
-        except GradeSummary.DoesNotExist:
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': 0,
-                'second_test_score': 0,
-                'exam_score': 0,
-                'total_score': 0,
-                'letter_grade': 'F9'
-            })
-
-    # Calculate grand total and average
-    grand_total = sum(s['total_score'] for s in subjects_data)
-    average = round(grand_total / len(subjects_data), 2) if subjects_data else 0
-
-    # Calculate class position
-    all_students = StudentSession.objects.filter(
-        class_session=class_session,
-    ).select_related('student')
-
-    student_averages = []
-    for ss in all_students:
-        student_subjects = Subject.objects.filter(class_session=class_session)
-        if ss.student.department:
-            student_subjects = student_subjects.filter(
-                Q(department=ss.student.department) |
-                Q(department='General')
-            )
-
-        total = 0
-        count = 0
-        for subj in student_subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=ss.student,
-                    subject=subj,
-                    grading_config=grading_config
-                )
-                total += float(grade_summary.total_score)
-                count += 1
-            except GradeSummary.DoesNotExist:
-                pass
-
-        student_avg = total / count if count > 0 else 0
-        student_averages.append({
-            'student_id': ss.student.id,
-            'average': student_avg
-        })
-
-    # Sort by average descending and find position
-    student_averages.sort(key=lambda x: x['average'], reverse=True)
-    position = next((i + 1 for i, s in enumerate(student_averages) if s['student_id'] == student_id), None)
+    # The student's own rows; class position is a read from the ClassRanking table
+    student_report = build_student_report(student_session, grading_config)
+    student_report.position, total_students = get_report_position(grading_config, class_session, student)
+    subjects_data = student_report.subjects
 
     # Student photo URL - convert to base64 for PDF embedding
     photo_url = None
@@ -3917,19 +3607,9 @@ def download_report_sheet(request, student_id):
             'term': term
         },
         'term_text': term_text,
-        'grading_config': {
-            'first_test_max': 20,
-            'second_test_max': 20,
-            'exam_max': 60,
-            'total_max': 100
-        },
+        'grading_config': dict(REPORT_GRADING_CONFIG),
         'subjects': subjects_data,
-        'summary': {
-            'grand_total': round(grand_total, 2),
-            'average': average,
-            'position': position,
-            'total_students': len(student_averages)
-        },
+        'summary': student_report.summary(total_students),
         'logo_url': logo_url,
         'generated_date': datetime.now().strftime('%m/%d/%Y, %H:%M:%S')
     }
@@ -4652,7 +4332,7 @@ def get_report_access_stats(request):
     4. Fees unpaid, Grades incomplete
     """
     from academics.models import StudentSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
+    from schooladmin.models import GradingConfiguration
     
     # Get current or selected academic year and term
     academic_year = request.query_params.get('academic_year')
@@ -4695,116 +4375,26 @@ def get_report_access_stats(request):
         class_session__academic_year=academic_year,
         class_session__term=term,
         student__school=school
-    ).select_related('student', 'class_session__classroom')
+    )
 
-    # Initialize counters
-    complete_fees_complete_grades = 0
-    complete_fees_incomplete_grades = 0
-    incomplete_fees_complete_grades = 0
-    incomplete_fees_incomplete_grades = 0
-    
     total_students = student_sessions.count()
-    
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee payment status
-        # Get all fee records for this student in the current academic year
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            # Check if all fees are paid
-            # Fees are complete if ALL fee records have payment_status == 'PAID'
-            all_paid = True
-            for fee_record in fee_records:
-                if fee_record.payment_status != 'PAID':
-                    all_paid = False
-                    break
-            fees_complete = all_paid
-        else:
-            # If no fee records exist, consider fees as INCOMPLETE
-            # (fees haven't been set up/assigned for this student yet)
-            fees_complete = False
-
-        # Check grade completion status
-        # Get all subjects for this student's class
-        from academics.models import Subject
-        from django.db.models import Q
-
-        subjects = Subject.objects.filter(
-            class_session=student_session.class_session
-        )
-
-        # Filter by department if student has one
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        grades_complete = False
-        if subjects.exists():
-            # Check if ALL subjects have COMPLETE grades
-            # Complete means: Test 1 (attendance + assignment), Test 2 (test), Exam, and Total are all filled
-            all_graded = True
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-
-                    # Get all score components
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    # Test 1 = attendance + assignment (must be > 0)
-                    test1_complete = _test1_is_entered(grade_summary, attendance_score, assignment_score)
-
-                    # Test 2 = test score (must be > 0)
-                    test2_complete = test_score > 0
-
-                    # Exam (must be > 0)
-                    exam_complete = exam_score > 0
-
-                    # Total (must be > 0)
-                    total_complete = total_score > 0
-
-                    # Grades are complete only if ALL components are filled
-                    if not (test1_complete and test2_complete and exam_complete and total_complete):
-                        all_graded = False
-                        break
 
-                except GradeSummary.DoesNotExist:
-                    # No grade summary = grades incomplete
-                    all_graded = False
-                    break
+    # Categorize students from the readiness table (see readiness.py)
+    readiness = _readiness_rows(grading_config)
+    counts = readiness.aggregate(
+        fees_paid_grades_incomplete=Count('id', filter=Q(fees_complete=True, grades_complete=False)),
+        fees_unpaid_grades_complete=Count('id', filter=Q(fees_complete=False, grades_complete=True)),
+        fees_unpaid_grades_incomplete=Count('id', filter=Q(fees_complete=False, grades_complete=False)),
+    )
+    # Section 1: Only count students who haven't received their report yet
+    complete_fees_complete_grades = _readiness_rows(grading_config, report_sent=False).filter(
+        fees_complete=True,
+        grades_complete=True
+    ).count()
+    complete_fees_incomplete_grades = counts['fees_paid_grades_incomplete']
+    incomplete_fees_complete_grades = counts['fees_unpaid_grades_complete']
+    incomplete_fees_incomplete_grades = counts['fees_unpaid_grades_incomplete']
 
-            grades_complete = all_graded
-        else:
-            # If no subjects, consider grades as incomplete (students must have subjects)
-            grades_complete = False
-        
-        # Categorize the student
-        # Section 1: Only count students who haven't received their report yet
-        if fees_complete and grades_complete:
-            # Only count if report hasn't been sent yet
-            if not student_session.report_sent:
-                complete_fees_complete_grades += 1
-        elif fees_complete and not grades_complete:
-            complete_fees_incomplete_grades += 1
-        elif not fees_complete and grades_complete:
-            incomplete_fees_complete_grades += 1
-        else:  # not fees_complete and not grades_complete
-            incomplete_fees_incomplete_grades += 1
-    
     # Calculate percentages
     complete_percentage = round((complete_fees_complete_grades / total_students) * 100, 1) if total_students > 0 else 0
     fees_paid_grades_incomplete_percentage = round((complete_fees_incomplete_grades / total_students) * 100, 1) if total_students > 0 else 0
@@ -4849,13 +4439,9 @@ def send_report_sheets(request):
     Creates notifications for both student and parent.
 
     This is a one-time send - once sent, reports won't be sent again to the same students.
-    """
-    from academics.models import StudentSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from logs.models import Notification
-    from django.db.models import Q
-    from django.utils import timezone
 
+    Runs as a background job: responds 202 with a job id to poll for progress and the result.
+    """
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -4863,6 +4449,17 @@ def send_report_sheets(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
+    job = enqueue_request_job(request, 'send_report_sheets')
+    return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
+
+
+def run_send_report_sheets(request):
+    """Job handler for send_report_sheets; request is a schooladmin.jobs.JobRequest."""
+    from academics.models import StudentSession
+    from schooladmin.models import GradingConfiguration
+    from logs.models import Notification
+    from django.utils import timezone
+
     # Get current or selected academic year and term
     academic_year = request.data.get('academic_year')
     term = request.data.get('term')
@@ -4890,82 +4487,21 @@ def send_report_sheets(request):
         academic_year = grading_config.academic_year
         term = grading_config.term
 
-    # Get all student sessions for this academic year and term (school-scoped)
-    # Filter to only get students who haven't received their reports yet
+    # Students who haven't received their reports yet, with fees and grades complete
+    # (school-scoped; readiness is maintained in readiness.py)
+    from django.db.models import Exists, OuterRef
+
     school = getattr(request, 'school', None) or request.user.school
-    student_sessions = StudentSession.objects.filter(
+    request.set_progress(0, 1, 'Checking fees and grades')
+    eligible = _readiness_rows(grading_config).filter(fees_complete=True, incomplete_subjects=0)
+    eligible_sessions = list(StudentSession.objects.filter(
         class_session__academic_year=academic_year,
         class_session__term=term,
         report_sent=False,  # Only get students who haven't received reports
         student__school=school
-    ).select_related('student', 'class_session__classroom')
-
-    from academics.models import Subject
-
-    # Track eligible students (complete fees + grades, not yet sent)
-    eligible_sessions = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee payment status
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            all_paid = all(fee_record.payment_status == 'PAID' for fee_record in fee_records)
-            fees_complete = all_paid
-
-        if not fees_complete:
-            continue  # Skip if fees not complete
-
-        # Check grade completion status
-        subjects = Subject.objects.filter(
-            class_session=student_session.class_session
-        )
-
-        # Filter by department if student has one
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        grades_complete = True
-        for subject in subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config
-                )
-
-                # Get all score components
-                attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                # Check all components are filled
-                test1_complete = _test1_is_entered(grade_summary, attendance_score, assignment_score)
-                test2_complete = test_score > 0
-                exam_complete = exam_score > 0
-                total_complete = total_score > 0
-
-                if not (test1_complete and test2_complete and exam_complete and total_complete):
-                    grades_complete = False
-                    break
-
-            except GradeSummary.DoesNotExist:
-                grades_complete = False
-                break
-
-        # Only include if both fees and grades are complete
-        if fees_complete and grades_complete:
-            eligible_sessions.append(student_session)
+    ).filter(
+        Exists(eligible.filter(student_id=OuterRef('student_id'), class_session_id=OuterRef('class_session_id')))
+    ).select_related('student', 'class_session__classroom'))
 
     if not eligible_sessions:
         return Response(
@@ -4978,12 +4514,14 @@ def send_report_sheets(request):
     student_notifications_created = 0
     parent_notifications_created = 0
 
-    for student_session in eligible_sessions:
+    for index, student_session in enumerate(eligible_sessions):
+        if index % 25 == 0:
+            request.set_progress(index, len(eligible_sessions), 'Sending report sheets')
         # Mark report as sent
         student_session.report_sent = True
         student_session.report_sent_date = timezone.now()
         student_session.report_sent_by = request.user
-        student_session.save()
+        student_session.save(update_fields=['report_sent', 'report_sent_date', 'report_sent_by'])
 
         # Create notification for student
         Notification.objects.create(
@@ -5027,10 +4565,6 @@ def get_eligible_classes_for_reports(request):
     """
     Get classes that have students with complete fees and grades who haven't received reports yet.
     """
-    from academics.models import StudentSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     # Get current grading configuration
     grading_config = _school_grading_configs(request).filter(is_active=True).first()
     if not grading_config:
@@ -5042,109 +4576,50 @@ def get_eligible_classes_for_reports(request):
     academic_year = grading_config.academic_year
     term = grading_config.term
 
-    # Get all student sessions for this term that haven't received reports
-    student_sessions = StudentSession.objects.filter(
-        class_session__academic_year=academic_year,
-        class_session__term=term,
-        is_active=True,
-        report_sent=False
-    ).select_related('student', 'class_session__classroom')
+    # Students with fees paid and no incomplete subject who haven't received reports, per class
+    eligible = _readiness_rows(grading_config, is_active=True, report_sent=False).filter(
+        fees_complete=True,
+        incomplete_subjects=0
+    )
+    classes_list = [
+        {
+            'id': row['class_session_id'],
+            'name': row['class_session__classroom__name'],
+            'academic_year': academic_year,
+            'term': term,
+            'eligible_count': row['count']
+        }
+        for row in _readiness_counts_by_class(eligible)
+    ]
 
-    # Group by class and count eligible students
-    class_data = {}
+    return Response({
+        'classes': classes_list,
+        'academic_year': academic_year,
+        'term': term
+    })
 
-    for student_session in student_sessions:
-        student = student_session.student
-        class_session = student_session.class_session
 
-        # Check fee completion
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_eligible_students_in_class(request, class_session_id):
+    """
+    Get students in a specific class who have complete fees and grades but haven't received reports yet.
+    """
+    # Get the class session
+    try:
+        class_session = ClassSession.objects.get(id=class_session_id)
+    except ClassSession.DoesNotExist:
+        return Response(
+            {"detail": "Class session not found"},
+            status=status.HTTP_404_NOT_FOUND
         )
 
-        fees_complete = False
-        if fee_records.exists():
-            fees_complete = all(fr.payment_status == 'PAID' for fr in fee_records)
-
-        if not fees_complete:
-            continue
-
-        # Check grade completion
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        grades_complete = True
-        for subject in subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config
-                )
-                attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                    grades_complete = False
-                    break
-            except GradeSummary.DoesNotExist:
-                grades_complete = False
-                break
-
-        if grades_complete:
-            class_id = class_session.id
-            if class_id not in class_data:
-                class_data[class_id] = {
-                    'id': class_id,
-                    'name': class_session.classroom.name,
-                    'academic_year': academic_year,
-                    'term': term,
-                    'eligible_count': 0
-                }
-            class_data[class_id]['eligible_count'] += 1
-
-    # Sort by class name
-    classes_list = sorted(class_data.values(), key=lambda x: x['name'])
-
-    return Response({
-        'classes': classes_list,
-        'academic_year': academic_year,
-        'term': term
-    })
-
-
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_eligible_students_in_class(request, class_session_id):
-    """
-    Get students in a specific class who have complete fees and grades but haven't received reports yet.
-    """
-    from academics.models import StudentSession, Subject, ClassSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
-    # Get the class session
-    try:
-        class_session = ClassSession.objects.get(id=class_session_id)
-    except ClassSession.DoesNotExist:
-        return Response(
-            {"detail": "Class session not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
-    # Get grading configuration
-    grading_config = _school_grading_configs(request).filter(
-        academic_year=class_session.academic_year,
-        term=class_session.term,
-        is_active=True
-    ).first()
+    # Get grading configuration
+    grading_config = _school_grading_configs(request).filter(
+        academic_year=class_session.academic_year,
+        term=class_session.term,
+        is_active=True
+    ).first()
 
     if not grading_config:
         return Response(
@@ -5152,66 +4627,22 @@ def get_eligible_students_in_class(request, class_session_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # Get all student sessions for this class that haven't received reports
-    student_sessions = StudentSession.objects.filter(
+    eligible = _with_student_session_id(_readiness_rows(grading_config, report_sent=False).filter(
         class_session=class_session,
-        report_sent=False
-    ).select_related('student')
-
-    eligible_students = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee completion
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=class_session.academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            fees_complete = all(fr.payment_status == 'PAID' for fr in fee_records)
-
-        if not fees_complete:
-            continue
-
-        # Check grade completion
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        grades_complete = True
-        for subject in subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=student,
-                    subject=subject,
-                    grading_config=grading_config
-                )
-                attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                    grades_complete = False
-                    break
-            except GradeSummary.DoesNotExist:
-                grades_complete = False
-                break
+        fees_complete=True,
+        incomplete_subjects=0
+    )).select_related('student')
 
-        if grades_complete:
-            eligible_students.append({
-                'id': student.id,
-                'student_session_id': student_session.id,
-                'username': student.username,
-                'full_name': student.get_full_name(),
-                'department': student.department or 'General'
-            })
+    eligible_students = [
+        {
+            'id': row.student.id,
+            'student_session_id': row.student_session_id,
+            'username': row.student.username,
+            'full_name': row.student.get_full_name(),
+            'department': row.student.department or 'General'
+        }
+        for row in eligible
+    ]
 
     # Sort by name
     eligible_students.sort(key=lambda x: x['full_name'])
@@ -5230,10 +4661,6 @@ def get_incomplete_grades_classes(request):
     """
     Get classes that have students with fees paid but incomplete grades.
     """
-    from academics.models import StudentSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     # Get current grading configuration
     grading_config = _school_grading_configs(request).filter(is_active=True).first()
     if not grading_config:
@@ -5245,82 +4672,21 @@ def get_incomplete_grades_classes(request):
     academic_year = grading_config.academic_year
     term = grading_config.term
 
-    school = getattr(request, 'school', None) or request.user.school
-
-    # Get all student sessions for this term
-    student_sessions = StudentSession.objects.filter(
-        class_session__academic_year=academic_year,
-        class_session__term=term,
-        is_active=True,
-        student__school=school
-    ).select_related('student', 'class_session__classroom')
-
-    # Group by class and count students with incomplete grades
-    class_data = {}
-
-    for student_session in student_sessions:
-        student = student_session.student
-        class_session = student_session.class_session
-
-        # Check fee completion
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            fees_complete = all(fr.payment_status == 'PAID' for fr in fee_records)
-
-        if not fees_complete:
-            continue  # Only include students with fees paid
-
-        # Check grade completion
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        if not subjects.exists():
-            grades_complete = False
-        else:
-            grades_complete = True
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                        grades_complete = False
-                        break
-                except GradeSummary.DoesNotExist:
-                    grades_complete = False
-                    break
-
-        # Only count students with fees paid but incomplete grades
-        if not grades_complete:
-            class_id = class_session.id
-            if class_id not in class_data:
-                class_data[class_id] = {
-                    'id': class_id,
-                    'name': class_session.classroom.name,
-                    'academic_year': academic_year,
-                    'term': term,
-                    'affected_count': 0
-                }
-            class_data[class_id]['affected_count'] += 1
-
-    # Sort by class name
-    classes_list = sorted(class_data.values(), key=lambda x: x['name'])
+    # Students with fees paid but incomplete grades, per class
+    affected = _readiness_rows(grading_config, is_active=True).filter(
+        fees_complete=True,
+        grades_complete=False
+    )
+    classes_list = [
+        {
+            'id': row['class_session_id'],
+            'name': row['class_session__classroom__name'],
+            'academic_year': academic_year,
+            'term': term,
+            'affected_count': row['count']
+        }
+        for row in _readiness_counts_by_class(affected)
+    ]
 
     return Response({
         'classes': classes_list,
@@ -5336,10 +4702,6 @@ def get_incomplete_grades_students(request, class_session_id):
     Get students in a specific class who have fees paid but incomplete grades.
     Returns the list of incomplete subjects for each student.
     """
-    from academics.models import StudentSession, Subject, ClassSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     school = getattr(request, 'school', None) or request.user.school
 
     # Get the class session
@@ -5364,89 +4726,24 @@ def get_incomplete_grades_students(request, class_session_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # Get all student sessions for this class
-    student_sessions = StudentSession.objects.filter(
+    affected = list(_with_student_session_id(_readiness_rows(grading_config).filter(
         class_session=class_session,
-    ).select_related('student')
-
-    affected_students = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee completion
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=class_session.academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            fees_complete = all(fr.payment_status == 'PAID' for fr in fee_records)
-
-        if not fees_complete:
-            continue  # Only include students with fees paid
-
-        # Check grade completion and collect incomplete subjects
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        incomplete_subjects = []
+        fees_complete=True,
+        grades_complete=False
+    )).select_related('student'))
+    incomplete = _incomplete_subjects(grading_config, affected, ['All scores'])
 
-        if not subjects.exists():
-            incomplete_subjects.append({
-                'name': 'No subjects assigned',
-                'missing': ['All']
-            })
-        else:
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    # Determine which components are missing
-                    missing_components = []
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score)):
-                        missing_components.append('Test 1')
-                    if not (test_score > 0):
-                        missing_components.append('Test 2')
-                    if not (exam_score > 0):
-                        missing_components.append('Exam')
-                    if not (total_score > 0):
-                        missing_components.append('Total')
-
-                    if missing_components:
-                        incomplete_subjects.append({
-                            'name': subject.name,
-                            'missing': missing_components
-                        })
-                except GradeSummary.DoesNotExist:
-                    incomplete_subjects.append({
-                        'name': subject.name,
-                        'missing': ['All scores']
-                    })
-
-        # Only include students with incomplete grades
-        if incomplete_subjects:
-            affected_students.append({
-                'id': student.id,
-                'student_session_id': student_session.id,
-                'username': student.username,
-                'full_name': student.get_full_name(),
-                'department': student.department or 'General',
-                'incomplete_subjects': incomplete_subjects
-            })
+    affected_students = [
+        {
+            'id': row.student.id,
+            'student_session_id': row.student_session_id,
+            'username': row.student.username,
+            'full_name': row.student.get_full_name(),
+            'department': row.student.department or 'General',
+            'incomplete_subjects': incomplete[row.student_id]
+        }
+        for row in affected
+    ]
 
     # Sort by name
     affected_students.sort(key=lambda x: x['full_name'])
@@ -5465,10 +4762,6 @@ def search_incomplete_grades_students(request):
     """
     Search for students with fees paid but incomplete grades across all classes.
     """
-    from academics.models import StudentSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     query = request.query_params.get('q', '').strip()
     if not query:
         return Response({'students': []})
@@ -5484,100 +4777,29 @@ def search_incomplete_grades_students(request):
     academic_year = grading_config.academic_year
     term = grading_config.term
 
-    school = getattr(request, 'school', None) or request.user.school
-
-    # Search for students matching the query
-    student_sessions = StudentSession.objects.filter(
-        class_session__academic_year=academic_year,
-        class_session__term=term,
-        is_active=True,
-        student__school=school
+    # Search students with fees paid but incomplete grades matching the query
+    affected = list(_with_student_session_id(_readiness_rows(grading_config, is_active=True).filter(
+        fees_complete=True,
+        grades_complete=False
     ).filter(
         Q(student__username__icontains=query) |
         Q(student__first_name__icontains=query) |
         Q(student__last_name__icontains=query)
-    ).select_related('student', 'class_session__classroom')[:20]
+    )).select_related('student', 'class_session__classroom')[:20])
+    incomplete = _incomplete_subjects(grading_config, affected, ['All scores'])
 
-    matching_students = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-        class_session = student_session.class_session
-
-        # Check fee completion
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_complete = False
-        if fee_records.exists():
-            fees_complete = all(fr.payment_status == 'PAID' for fr in fee_records)
-
-        if not fees_complete:
-            continue  # Only include students with fees paid
-
-        # Check grade completion and collect incomplete subjects
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        incomplete_subjects = []
-
-        if not subjects.exists():
-            incomplete_subjects.append({
-                'name': 'No subjects assigned',
-                'missing': ['All']
-            })
-        else:
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    # Determine which components are missing
-                    missing_components = []
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score)):
-                        missing_components.append('Test 1')
-                    if not (test_score > 0):
-                        missing_components.append('Test 2')
-                    if not (exam_score > 0):
-                        missing_components.append('Exam')
-                    if not (total_score > 0):
-                        missing_components.append('Total')
-
-                    if missing_components:
-                        incomplete_subjects.append({
-                            'name': subject.name,
-                            'missing': missing_components
-                        })
-                except GradeSummary.DoesNotExist:
-                    incomplete_subjects.append({
-                        'name': subject.name,
-                        'missing': ['All scores']
-                    })
-
-        # Only include students with incomplete grades
-        if incomplete_subjects:
-            matching_students.append({
-                'id': student.id,
-                'student_session_id': student_session.id,
-                'username': student.username,
-                'full_name': student.get_full_name(),
-                'department': student.department or 'General',
-                'class_name': class_session.classroom.name,
-                'incomplete_subjects': incomplete_subjects
-            })
+    matching_students = [
+        {
+            'id': row.student.id,
+            'student_session_id': row.student_session_id,
+            'username': row.student.username,
+            'full_name': row.student.get_full_name(),
+            'department': row.student.department or 'General',
+            'class_name': row.class_session.classroom.name,
+            'incomplete_subjects': incomplete[row.student_id]
+        }
+        for row in affected
+    ]
 
     return Response({
         'students': matching_students,
@@ -5909,10 +5131,6 @@ def get_unpaid_fees_classes(request):
     """
     Get list of classes with students who have unpaid fees but complete grades.
     """
-    from academics.models import StudentSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q, Sum
-
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -5931,84 +5149,16 @@ def get_unpaid_fees_classes(request):
     academic_year = grading_config.academic_year
     term = grading_config.term
 
-    school = getattr(request, 'school', None) or request.user.school
-
-    # Get all class sessions for this term
-    from academics.models import ClassSession
-    class_sessions = ClassSession.objects.filter(
-        academic_year=academic_year,
-        term=term,
-        classroom__school=school
-    ).select_related('classroom')
-
-    classes_data = []
-
-    for class_session in class_sessions:
-        # Get students in this class
-        student_sessions = StudentSession.objects.filter(
-            class_session=class_session,
-        ).select_related('student')
-
-        affected_students = 0
-
-        for student_session in student_sessions:
-            student = student_session.student
-
-            # Check fee completion - must have unpaid fees
-            fee_records = StudentFeeRecord.objects.filter(
-                student=student,
-                fee_structure__academic_year=academic_year
-            )
-
-            fees_incomplete = False
-            if fee_records.exists():
-                fees_incomplete = any(fr.payment_status != 'PAID' for fr in fee_records)
-            else:
-                fees_incomplete = True  # No fee records means unpaid
-
-            if not fees_incomplete:
-                continue  # Skip students with complete fees
-
-            # Check grade completion - must have complete grades
-            subjects = Subject.objects.filter(class_session=class_session)
-            if student.department:
-                subjects = subjects.filter(
-                    Q(department=student.department) | Q(department='General')
-                )
-
-            if not subjects.exists():
-                grades_complete = False
-            else:
-                grades_complete = True
-                for subject in subjects:
-                    try:
-                        grade_summary = GradeSummary.objects.get(
-                            student=student,
-                            subject=subject,
-                            grading_config=grading_config
-                        )
-                        attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                        assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                        test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                        exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                        total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                        if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                            grades_complete = False
-                            break
-                    except GradeSummary.DoesNotExist:
-                        grades_complete = False
-                        break
-
-            if grades_complete:
-                affected_students += 1
-
-        if affected_students > 0:
-            classes_data.append({
-                'class_session_id': class_session.id,
-                'class_name': class_session.classroom.name,
-                'affected_count': affected_students
-            })
+    # Students with unpaid fees (or no fee records) but complete grades, per class
+    affected = _readiness_rows(grading_config).filter(fees_complete=False, grades_complete=True)
+    classes_data = [
+        {
+            'class_session_id': row['class_session_id'],
+            'class_name': row['class_session__classroom__name'],
+            'affected_count': row['count']
+        }
+        for row in _readiness_counts_by_class(affected)
+    ]
 
     return Response({
         'classes': classes_data,
@@ -6024,10 +5174,6 @@ def get_unpaid_fees_students(request, class_session_id):
     """
     Get students in a class who have unpaid fees but complete grades with their balance.
     """
-    from academics.models import StudentSession, Subject, ClassSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q, Sum
-
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -6047,83 +5193,27 @@ def get_unpaid_fees_students(request, class_session_id):
 
     try:
         class_session = ClassSession.objects.get(id=class_session_id, classroom__school=school)
-    except ClassSession.DoesNotExist:
-        return Response(
-            {"detail": "Class session not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
-    academic_year = grading_config.academic_year
-    term = grading_config.term
-
-    # Get students in this class
-    student_sessions = StudentSession.objects.filter(
-        class_session=class_session,
-    ).select_related('student')
-
-    students_data = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee completion and calculate balance
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_incomplete = False
-        total_balance = 0
-
-        if fee_records.exists():
-            for fr in fee_records:
-                if fr.payment_status != 'PAID':
-                    fees_incomplete = True
-                    total_balance += float(fr.fee_structure.amount - fr.amount_paid)
-        else:
-            fees_incomplete = True  # No fee records means unpaid
-
-        if not fees_incomplete:
-            continue  # Skip students with complete fees
-
-        # Check grade completion
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        if not subjects.exists():
-            grades_complete = False
-        else:
-            grades_complete = True
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
+    except ClassSession.DoesNotExist:
+        return Response(
+            {"detail": "Class session not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                        grades_complete = False
-                        break
-                except GradeSummary.DoesNotExist:
-                    grades_complete = False
-                    break
+    affected = _readiness_rows(grading_config).filter(
+        class_session=class_session,
+        fees_complete=False,
+        grades_complete=True
+    ).select_related('student')
 
-        if grades_complete:
-            students_data.append({
-                'student_id': student.id,
-                'student_name': student.get_full_name(),
-                'username': student.username,
-                'balance': total_balance
-            })
+    students_data = [
+        {
+            'student_id': row.student.id,
+            'student_name': row.student.get_full_name(),
+            'username': row.student.username,
+            'balance': float(row.fee_balance)
+        }
+        for row in affected
+    ]
 
     return Response({
         'students': students_data,
@@ -6138,10 +5228,6 @@ def search_unpaid_fees_students(request):
     """
     Search for students with unpaid fees but complete grades across all classes.
     """
-    from academics.models import StudentSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -6161,99 +5247,26 @@ def search_unpaid_fees_students(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    academic_year = grading_config.academic_year
-    term = grading_config.term
-
-    # Search for students by name
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-
-    school = getattr(request, 'school', None) or request.user.school
-
-    matching_students = User.objects.filter(
-        role='student',
-        school=school
+    # Search students with unpaid fees but complete grades matching the query
+    affected = _readiness_rows(grading_config, is_active=True).filter(
+        fees_complete=False,
+        grades_complete=True
     ).filter(
-        Q(first_name__icontains=search_query) |
-        Q(last_name__icontains=search_query) |
-        Q(username__icontains=search_query)
-    )[:50]
-
-    students_data = []
-
-    for student in matching_students:
-        # Get student's current class session
-        student_session = StudentSession.objects.filter(
-            student=student,
-            class_session__academic_year=academic_year,
-            class_session__term=term,
-            is_active=True
-        ).select_related('class_session__classroom').first()
-
-        if not student_session:
-            continue
-
-        class_session = student_session.class_session
-
-        # Check fee completion and calculate balance
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_incomplete = False
-        total_balance = 0
-
-        if fee_records.exists():
-            for fr in fee_records:
-                if fr.payment_status != 'PAID':
-                    fees_incomplete = True
-                    total_balance += float(fr.fee_structure.amount - fr.amount_paid)
-        else:
-            fees_incomplete = True
-
-        if not fees_incomplete:
-            continue
+        Q(student__first_name__icontains=search_query) |
+        Q(student__last_name__icontains=search_query) |
+        Q(student__username__icontains=search_query)
+    ).select_related('student', 'class_session__classroom')[:50]
 
-        # Check grade completion
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        if not subjects.exists():
-            grades_complete = False
-        else:
-            grades_complete = True
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                        grades_complete = False
-                        break
-                except GradeSummary.DoesNotExist:
-                    grades_complete = False
-                    break
-
-        if grades_complete:
-            students_data.append({
-                'student_id': student.id,
-                'student_name': student.get_full_name(),
-                'username': student.username,
-                'class_name': class_session.classroom.name,
-                'balance': total_balance
-            })
+    students_data = [
+        {
+            'student_id': row.student.id,
+            'student_name': row.student.get_full_name(),
+            'username': row.student.username,
+            'class_name': row.class_session.classroom.name,
+            'balance': float(row.fee_balance)
+        }
+        for row in affected
+    ]
 
     return Response({
         'students': students_data,
@@ -6426,6 +5439,7 @@ def send_bulk_unpaid_fee_notifications(request):
     ).select_related('student', 'class_session__classroom')
 
     notifications_sent = 0
+    notifications = []
 
     for student_session in student_sessions:
         student = student_session.student
@@ -6492,7 +5506,8 @@ def send_bulk_unpaid_fee_notifications(request):
             message += "Kindly visit the school's bursary department or make payment through the approved channels."
 
             # Create notification for student
-            Notification.objects.create(
+            notifications.append(Notification(
+                school=school,
                 recipient=student,
                 title="Fee Payment Reminder",
                 message=message,
@@ -6504,7 +5519,7 @@ def send_bulk_unpaid_fee_notifications(request):
                     'academic_year': academic_year,
                     'term': term
                 }
-            )
+            ))
 
             # Create notifications for parents
             parent_message = f"Your child {student.get_full_name()} has an outstanding fee balance of ₦{total_balance:,.2f}.\n\n"
@@ -6514,7 +5529,8 @@ def send_bulk_unpaid_fee_notifications(request):
 
             parents = student.parents.all()
             for parent in parents:
-                Notification.objects.create(
+                notifications.append(Notification(
+                    school=school,
                     recipient=parent,
                     title=f"Fee Payment Reminder - {student.get_full_name()}",
                     message=parent_message,
@@ -6528,7 +5544,7 @@ def send_bulk_unpaid_fee_notifications(request):
                         'academic_year': academic_year,
                         'term': term
                     }
-                )
+                ))
 
             notifications_sent += 1
 
@@ -6538,9 +5554,20 @@ def send_bulk_unpaid_fee_notifications(request):
             status=status.HTTP_200_OK
         )
 
+    # One insert for the notifications, one quota reservation for all their emails
+    from logs.email_outbox import queue_notification_emails
+    from logs.live_events import publish_notifications
+    from logs.notification_counters import record_direct_notifications
+    created = Notification.objects.bulk_create(notifications, batch_size=500)
+    record_direct_notifications(created)
+    publish_notifications(created)
+    queued = queue_notification_emails(created, reserve_quota=True)
+
     return Response({
         "message": f"Notifications sent successfully to {notifications_sent} student(s)",
         "notifications_sent": notifications_sent,
+        "emails_queued": queued['queued'],
+        "emails_over_quota": queued['over_quota'],
         "academic_year": academic_year,
         "term": term
     }, status=status.HTTP_200_OK)
@@ -6638,10 +5665,6 @@ def get_both_issues_classes(request):
     """
     Get all classes with students who have BOTH unpaid fees AND incomplete grades.
     """
-    from academics.models import StudentSession, ClassSession, Subject
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -6660,88 +5683,16 @@ def get_both_issues_classes(request):
     academic_year = grading_config.academic_year
     term = grading_config.term
 
-    school = getattr(request, 'school', None) or request.user.school
-
-    # Get all class sessions for current academic year and term
-    class_sessions = ClassSession.objects.filter(
-        academic_year=academic_year,
-        term=term,
-        classroom__school=school
-    ).select_related('classroom')
-
-    classes_data = []
-
-    for class_session in class_sessions:
-        # Get students in this class
-        student_sessions = StudentSession.objects.filter(
-            class_session=class_session,
-        ).select_related('student')
-
-        students_with_both_issues = 0
-
-        for student_session in student_sessions:
-            student = student_session.student
-
-            # Check fee completion
-            fee_records = StudentFeeRecord.objects.filter(
-                student=student,
-                fee_structure__academic_year=academic_year
-            )
-
-            fees_incomplete = False
-            if fee_records.exists():
-                for fr in fee_records:
-                    if fr.payment_status != 'PAID':
-                        fees_incomplete = True
-                        break
-            else:
-                fees_incomplete = True
-
-            if not fees_incomplete:
-                continue  # Skip if fees are complete
-
-            # Check grade completion
-            subjects = Subject.objects.filter(class_session=class_session)
-            if student.department:
-                subjects = subjects.filter(
-                    Q(department=student.department) | Q(department='General')
-                )
-
-            if not subjects.exists():
-                # No subjects = grades incomplete (matches stats endpoint)
-                students_with_both_issues += 1
-                continue
-
-            grades_incomplete = False
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    if not (_test1_is_entered(grade_summary, attendance_score, assignment_score) and test_score > 0 and exam_score > 0 and total_score > 0):
-                        grades_incomplete = True
-                        break
-                except GradeSummary.DoesNotExist:
-                    grades_incomplete = True
-                    break
-
-            if grades_incomplete:
-                students_with_both_issues += 1
-
-        if students_with_both_issues > 0:
-            classes_data.append({
-                'class_session_id': class_session.id,
-                'class_name': class_session.classroom.name,
-                'students_count': students_with_both_issues
-            })
+    # Students with unpaid fees and incomplete grades (no subjects counts as incomplete), per class
+    affected = _readiness_rows(grading_config).filter(fees_complete=False, grades_complete=False)
+    classes_data = [
+        {
+            'class_session_id': row['class_session_id'],
+            'class_name': row['class_session__classroom__name'],
+            'students_count': row['count']
+        }
+        for row in _readiness_counts_by_class(affected)
+    ]
 
     # Sort by number of students (highest first)
     classes_data.sort(key=lambda x: x['students_count'], reverse=True)
@@ -6760,10 +5711,6 @@ def get_both_issues_students(request, class_session_id):
     Get students in a class who have BOTH unpaid fees AND incomplete grades.
     Returns what they owe and count of incomplete subjects.
     """
-    from academics.models import StudentSession, Subject, ClassSession
-    from schooladmin.models import StudentFeeRecord, GradeSummary, GradingConfiguration
-    from django.db.models import Q
-
     # Verify user is admin
     if request.user.role != 'admin':
         return Response(
@@ -6771,115 +5718,42 @@ def get_both_issues_students(request, class_session_id):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    school = getattr(request, 'school', None) or request.user.school
-
-    # Get current grading configuration
-    grading_config = _school_grading_configs(request).filter(is_active=True).first()
-    if not grading_config:
-        return Response(
-            {"detail": "No active grading configuration found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
-    try:
-        class_session = ClassSession.objects.get(id=class_session_id, classroom__school=school)
-    except ClassSession.DoesNotExist:
-        return Response(
-            {"detail": "Class session not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
-    academic_year = grading_config.academic_year
-
-    # Get students in this class
-    student_sessions = StudentSession.objects.filter(
-        class_session=class_session,
-    ).select_related('student')
-
-    students_data = []
-
-    for student_session in student_sessions:
-        student = student_session.student
-
-        # Check fee completion and calculate balance
-        fee_records = StudentFeeRecord.objects.filter(
-            student=student,
-            fee_structure__academic_year=academic_year
-        )
-
-        fees_incomplete = False
-        total_balance = 0
-
-        if fee_records.exists():
-            for fr in fee_records:
-                if fr.payment_status != 'PAID':
-                    fees_incomplete = True
-                    total_balance += float(fr.fee_structure.amount - fr.amount_paid)
-        else:
-            fees_incomplete = True
-
-        if not fees_incomplete:
-            continue  # Skip students with complete fees
-
-        # Check grade completion and count incomplete subjects
-        subjects = Subject.objects.filter(class_session=class_session)
-        if student.department:
-            subjects = subjects.filter(
-                Q(department=student.department) | Q(department='General')
-            )
-
-        incomplete_subjects = []
-
-        if not subjects.exists():
-            # No subjects = grades incomplete
-            incomplete_subjects.append({
-                'name': 'No subjects assigned',
-                'missing': ['All']
-            })
-        else:
-            for subject in subjects:
-                try:
-                    grade_summary = GradeSummary.objects.get(
-                        student=student,
-                        subject=subject,
-                        grading_config=grading_config
-                    )
-                    attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-                    assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-                    test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-                    exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-                    total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-                    missing = []
-                    if not _test1_is_entered(grade_summary, attendance_score, assignment_score):
-                        missing.append('Test 1')
-                    if not test_score > 0:
-                        missing.append('Test 2')
-                    if not exam_score > 0:
-                        missing.append('Exam')
-                    if not total_score > 0:
-                        missing.append('Total')
-
-                    if missing:
-                        incomplete_subjects.append({
-                            'name': subject.name,
-                            'missing': missing
-                        })
-                except GradeSummary.DoesNotExist:
-                    incomplete_subjects.append({
-                        'name': subject.name,
-                        'missing': ['Test 1', 'Test 2', 'Exam', 'Total']
-                    })
+    school = getattr(request, 'school', None) or request.user.school
 
-        if len(incomplete_subjects) > 0:
-            students_data.append({
-                'student_id': student.id,
-                'student_name': student.get_full_name(),
-                'username': student.username,
-                'balance': total_balance,
-                'incomplete_subjects_count': len(incomplete_subjects),
-                'incomplete_subjects': incomplete_subjects
-            })
+    # Get current grading configuration
+    grading_config = _school_grading_configs(request).filter(is_active=True).first()
+    if not grading_config:
+        return Response(
+            {"detail": "No active grading configuration found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        class_session = ClassSession.objects.get(id=class_session_id, classroom__school=school)
+    except ClassSession.DoesNotExist:
+        return Response(
+            {"detail": "Class session not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    affected = list(_readiness_rows(grading_config).filter(
+        class_session=class_session,
+        fees_complete=False,
+        grades_complete=False
+    ).select_related('student'))
+    incomplete = _incomplete_subjects(grading_config, affected, ['Test 1', 'Test 2', 'Exam', 'Total'])
+
+    students_data = [
+        {
+            'student_id': row.student.id,
+            'student_name': row.student.get_full_name(),
+            'username': row.student.username,
+            'balance': float(row.fee_balance),
+            'incomplete_subjects_count': len(incomplete[row.student_id]),
+            'incomplete_subjects': incomplete[row.student_id]
+        }
+        for row in affected
+    ]
 
     # Sort by balance (highest first)
     students_data.sort(key=lambda x: x['balance'], reverse=True)
@@ -7351,10 +6225,12 @@ def get_email_quota(request):
     if not subscription:
         return Response({'emails_sent_today': 0, 'max_daily_emails': 0, 'emails_remaining': 0})
 
-    subscription.can_send_email()  # triggers daily counter reset if needed
+    from tenants.quota import sent_today, remaining as quota_remaining
     max_emails = subscription.plan.max_daily_emails
-    sent = subscription.emails_sent_today
-    remaining = -1 if max_emails == 0 else max(0, max_emails - sent)
+    sent = sent_today(subscription)
+    remaining = quota_remaining(subscription)
+    if remaining is None:
+        remaining = -1
 
     return Response({
         'emails_sent_today': sent,
@@ -8380,29 +7256,10 @@ def get_child_academic_position(request, child_id):
                 'message': 'No grading configuration found'
             })
 
-        # Get all students in the same class
-        class_students = StudentSession.objects.filter(
-            class_session=class_session
-        ).values_list('student_id', flat=True)
-
-        # Get grade summaries for all students in the class
-        grade_summaries = GradeSummary.objects.filter(
-            student_id__in=class_students,
-            grading_config=grading_config
-        ).values('student_id').annotate(
-            avg_total=Avg('total_score')
-        ).order_by('-avg_total')
-
-        # Find child's position
-        position = 0
-        child_average = 0
-        total_students = len(grade_summaries)
-
-        for idx, summary in enumerate(grade_summaries, 1):
-            if summary['student_id'] == child_id:
-                position = idx
-                child_average = float(summary['avg_total']) if summary['avg_total'] else 0
-                break
+        # Class position is materialised in ClassRanking - a single indexed read
+        ranking, total_students = get_class_ranking(grading_config, class_session, child)
+        position = ranking.position if ranking else 0
+        child_average = float(ranking.average) if ranking else 0
 
         # Determine grade letter based on grading scale
         grade_letter = 'F'
@@ -9687,11 +8544,11 @@ def manage_announcements(request):
                 if failed > 0:
                     message_text = (
                         f'Announcement sent to {total} recipient(s). '
-                        f'{sent} email(s) delivered, {failed} skipped (daily email limit reached). '
+                        f'{sent} email(s) queued for delivery, {failed} will be skipped (daily email limit reached). '
                         f'Upgrade your plan for higher email limits.'
                     )
                 else:
-                    message_text = f'Announcement sent successfully to {total} recipient(s). {sent} email(s) delivered.'
+                    message_text = f'Announcement sent successfully to {total} recipient(s). {sent} email(s) queued for delivery.'
             except Exception as e:
                 message_text = f'Announcement created but failed to send: {str(e)}'
         else:
@@ -9835,11 +8692,11 @@ def announcement_detail(request, announcement_id):
                 if failed > 0:
                     message_text = (
                         f'Announcement sent to {total} recipient(s). '
-                        f'{sent} email(s) delivered, {failed} skipped (daily email limit reached). '
+                        f'{sent} email(s) queued for delivery, {failed} will be skipped (daily email limit reached). '
                         f'Upgrade your plan for higher email limits.'
                     )
                 else:
-                    message_text = f'Announcement sent successfully to {total} recipient(s). {sent} email(s) delivered.'
+                    message_text = f'Announcement sent successfully to {total} recipient(s). {sent} email(s) queued for delivery.'
             except Exception as e:
                 message_text = f'Announcement updated but failed to send: {str(e)}'
 
@@ -10034,6 +8891,84 @@ def mark_announcement_as_read(request, announcement_id):
 # SESSION MANAGEMENT - MOVE TO NEW TERM/SESSION
 # ============================================================================
 
+def _rollover_options(request):
+    return {
+        name: request.data.get(name, True)
+        for name in ('copy_students', 'copy_teachers', 'copy_subjects', 'copy_fees', 'copy_grading_config')
+    }
+
+
+def _rollover_target(request, new_session):
+    """
+    The active configuration and the (academic year, term) a rollover moves to.
+    Returns (config, next_year, next_term, None), or an error Response in the
+    last slot when the rollover cannot run.
+    """
+    current_config = _school_grading_configs(request).filter(is_active=True).first()
+
+    if not current_config:
+        return None, None, None, Response(
+            {"detail": "No active grading configuration found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    current_term = current_config.term
+    current_year = current_config.academic_year
+
+    if new_session:
+        # Verify current term is Third Term
+        if current_term != "Third Term":
+            return None, None, None, Response(
+                {"detail": "Can only move to new session from Third Term"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Calculate next academic year (e.g., 2027/2028 -> 2028/2029)
+        years = current_year.split('/')
+        if len(years) != 2:
+            return None, None, None, Response(
+                {"detail": "Invalid academic year format. Expected format: YYYY/YYYY"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        next_year = f"{int(years[0]) + 1}/{int(years[1]) + 1}"
+        next_term = "First Term"
+    else:
+        # Determine next term
+        term_order = ["First Term", "Second Term", "Third Term"]
+        current_term_index = term_order.index(current_term)
+
+        if current_term_index >= 2:  # Third Term
+            return None, None, None, Response(
+                {"detail": "Cannot move to next term from Third Term. Use 'Move to New Session' instead."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        next_year = current_year
+        next_term = term_order[current_term_index + 1]
+
+    # Check if next term config already exists
+    if _school_grading_configs(request).filter(academic_year=next_year, term=next_term).exists():
+        return None, None, None, Response(
+            {"detail": f"Configuration for {next_term} {next_year} already exists"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return current_config, next_year, next_term, None
+
+
+def _rollover_dry_run(request, new_session):
+    """Row counts and expected duration of a rollover, without running it."""
+    from .rollover import plan_rollover
+
+    current_config, next_year, next_term, error = _rollover_target(request, new_session)
+    if error:
+        return error
+    return Response(plan_rollover(
+        request.school, current_config, next_year, next_term, _rollover_options(request), promote=new_session,
+    ))
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminRole])
 def move_to_next_term(request):
@@ -10041,58 +8976,35 @@ def move_to_next_term(request):
     Move to the next term in the same academic year.
     Copies selected data (students, teachers, subjects, fees) to the new term.
     Does NOT copy: grades, results, attendance, calendar events.
+
+    Runs as a background job: responds 202 with a job id to poll for progress and the result.
+    With dry_run=true responds straight away with the row counts and expected duration instead.
     """
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
+    if str(request.data.get('dry_run', 'false')).lower() == 'true':
+        return _rollover_dry_run(request, new_session=False)
+    job = enqueue_request_job(request, 'move_to_next_term')
+    return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
 
-    # Get options from request
-    copy_students = request.data.get('copy_students', True)
-    copy_teachers = request.data.get('copy_teachers', True)
-    copy_subjects = request.data.get('copy_subjects', True)
-    copy_fees = request.data.get('copy_fees', True)
-    copy_grading_config = request.data.get('copy_grading_config', True)
+
+def run_move_to_next_term(request):
+    """Job handler for move_to_next_term; request is a schooladmin.jobs.JobRequest."""
+    from . import rollover
+
+    options = _rollover_options(request)
+    school = getattr(request, 'school', None)
 
     try:
         with transaction.atomic():
-            # Get current active grading configuration
-            current_config = _school_grading_configs(request).filter(is_active=True).first()
-
-            if not current_config:
-                return Response(
-                    {"detail": "No active grading configuration found"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            current_config, next_year, next_term, error = _rollover_target(request, new_session=False)
+            if error:
+                return error
 
             current_term = current_config.term
             current_year = current_config.academic_year
-
-            # Determine next term
-            term_order = ["First Term", "Second Term", "Third Term"]
-            current_term_index = term_order.index(current_term)
-
-            if current_term_index >= 2:  # Third Term
-                return Response(
-                    {"detail": "Cannot move to next term from Third Term. Use 'Move to New Session' instead."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            next_term = term_order[current_term_index + 1]
-
-            # Check if next term config already exists
-            existing_config = _school_grading_configs(request).filter(
-                academic_year=current_year,
-                term=next_term
-            ).first()
-
-            if existing_config:
-                return Response(
-                    {"detail": f"Configuration for {next_term} {current_year} already exists"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            timer = rollover.RolloverTimer()
 
             # Create new grading configuration for next term
             # Copy percentage values from current config
-            school = getattr(request, 'school', None)
             new_config = GradingConfiguration.objects.create(
                 school=school,
                 academic_year=current_year,
@@ -10107,84 +9019,34 @@ def move_to_next_term(request):
             )
 
             # Copy grade components from current config if requested
-            if copy_grading_config:
-                current_components = GradeComponent.objects.filter(grading_config=current_config)
-                for component in current_components:
-                    GradeComponent.objects.create(
-                        grading_config=new_config,
-                        component_type=component.component_type,
-                        percentage_weight=component.percentage_weight,
-                        max_score=component.max_score,
-                        description=component.description
-                    )
-
-            school = getattr(request, 'school', None)
-
-            # Get all current class sessions (school-scoped)
-            current_class_sessions = ClassSession.objects.filter(
-                academic_year=current_year,
-                term=current_term,
-                classroom__school=school
-            )
+            if options['copy_grading_config']:
+                timer.add('grade_components', rollover.clone_grade_components(current_config, new_config))
 
-            class_mapping = {}  # Map old class session to new class session
-
-            # Copy class sessions
-            for old_class_session in current_class_sessions:
-                new_class_session = ClassSession.objects.create(
-                    classroom=old_class_session.classroom,
-                    academic_year=current_year,
-                    term=next_term
-                )
-                class_mapping[old_class_session.id] = new_class_session
-
-                # Copy subjects if requested
-                if copy_subjects:
-                    old_subjects = Subject.objects.filter(class_session=old_class_session)
-                    for old_subject in old_subjects:
-                        Subject.objects.create(
-                            name=old_subject.name,
-                            class_session=new_class_session,
-                            teacher=old_subject.teacher if copy_teachers else None,
-                            department=old_subject.department
-                        )
+            # Copy class sessions: old class session id -> new class session id
+            session_map = rollover.clone_class_sessions(school, current_year, current_term, current_year, next_term)
+            timer.add('class_sessions', len(session_map))
 
-            # Copy student sessions if requested
-            if copy_students:
-                current_student_sessions = StudentSession.objects.filter(
-                    class_session__academic_year=current_year,
-                    class_session__term=current_term,
-                    is_active=True
-                )
+            if options['copy_subjects']:
+                timer.add('subjects', rollover.clone_subjects(session_map, options['copy_teachers']))
 
-                for old_student_session in current_student_sessions:
-                    new_class_session = class_mapping.get(old_student_session.class_session.id)
-                    if new_class_session:
-                        StudentSession.objects.create(
-                            student=old_student_session.student,
-                            class_session=new_class_session,
-                            is_active=True
-                        )
+            # Students stay in the same class for the next term
+            moved = []
+            if options['copy_students']:
+                moved = rollover.carry_enrolments(session_map)
+                timer.add('student_sessions', len(moved))
 
-            # Copy fee structure if requested
-            if copy_fees:
-                current_fees = FeeStructure.objects.filter(
-                    academic_year=current_year,
-                    term=current_term
-                )
+            if options['copy_fees']:
+                fees, links = rollover.clone_fees(school, current_year, current_term, current_year, next_term)
+                timer.add('fee_structures', fees)
+                timer.add('fee_class_links', links)
 
-                for old_fee in current_fees:
-                    # Create new fee structure for next term
-                    new_fee = FeeStructure.objects.create(
-                        name=old_fee.name,
-                        amount=old_fee.amount,
-                        academic_year=current_year,
-                        term=next_term
-                    )
-                    # Copy the many-to-many classes relationship
-                    new_fee.classes.set(old_fee.classes.all())
+            # Deactivate old student sessions
+            retired = rollover.retire_enrolments(school, current_year, current_term)
+            timer.add('retired_enrolments', len(retired))
+            rollover.invalidate_counters_on_commit(moved + retired)
 
-            # Deactivate current configuration and activate new one
+            # Deactivate current configuration and activate new one; activating
+            # refreshes readiness for everything copied above
             current_config.is_active = False
             current_config.save()
 
@@ -10192,26 +9054,20 @@ def move_to_next_term(request):
             new_config.save()
 
             # Update school's current session to stay in sync
-            school = getattr(request, 'school', None)
             if school:
                 school.current_academic_year = current_year
                 school.current_term = next_term
                 school.save(update_fields=['current_academic_year', 'current_term'])
 
-            # Deactivate old student sessions
-            StudentSession.objects.filter(
-                class_session__academic_year=current_year,
-                class_session__term=current_term
-            ).update(is_active=False)
-
-            # Delete uploaded files from the retiring term
-            _cleanup_term_files(school, current_class_sessions.values_list('id', flat=True))
+            # Delete uploaded files from the retiring term once this commits
+            rollover.queue_term_file_purge(school, session_map, request.user)
 
             return Response({
                 "message": f"Successfully moved to {next_term} {current_year}",
                 "new_term": next_term,
                 "academic_year": current_year,
-                "config_id": new_config.id
+                "config_id": new_config.id,
+                "timing": timer.report(),
             }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -10298,16 +9154,11 @@ def graduation_email_preview(request):
             emails_needed += 1  # "all children graduated" email
 
     # Determine quota
+    from tenants.quota import remaining
     subscription = getattr(school, 'subscription', None)
-    if subscription is None or getattr(getattr(subscription, 'plan', None), 'max_daily_emails', 0) == 0:
+    quota_remaining = remaining(subscription) if subscription is not None else None
+    if quota_remaining is None:
         quota_remaining = -1  # unlimited
-    else:
-        today = timezone.now().date()
-        if subscription.email_counter_reset_date < today:
-            subscription.emails_sent_today = 0
-            subscription.email_counter_reset_date = today
-            subscription.save(update_fields=['emails_sent_today', 'email_counter_reset_date'])
-        quota_remaining = subscription.plan.max_daily_emails - subscription.emails_sent_today
 
     quota_sufficient = quota_remaining == -1 or quota_remaining >= emails_needed
     can_send_now = emails_needed if quota_remaining == -1 else min(max(quota_remaining, 0), emails_needed)
@@ -10332,74 +9183,46 @@ def move_to_next_session(request):
     Move to the next academic year's first term.
     Only available when current term is Third Term.
     Promotes students to the next class (JSS1->JSS2, etc.) and graduates SSS3 students.
+
+    Runs as a background job: responds 202 with a job id to poll for progress and the result.
+    With dry_run=true responds straight away with the row counts and expected duration instead.
     """
+    if str(request.data.get('dry_run', 'false')).lower() == 'true':
+        return _rollover_dry_run(request, new_session=True)
+    job = enqueue_request_job(request, 'move_to_next_session')
+    return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
+
+
+def run_move_to_next_session(request):
+    """Job handler for move_to_next_session; request is a schooladmin.jobs.JobRequest."""
     from django.contrib.auth import get_user_model
     from django.utils import timezone
     from logs.models import Notification
+    from . import rollover
     User = get_user_model()
 
     # Get options from request
-    copy_students = request.data.get('copy_students', True)
-    copy_teachers = request.data.get('copy_teachers', True)
-    copy_subjects = request.data.get('copy_subjects', True)
-    copy_fees = request.data.get('copy_fees', True)
-    copy_grading_config = request.data.get('copy_grading_config', True)
+    options = _rollover_options(request)
     # 'send_all' | 'send_now_queue_rest' | 'queue_all'
     graduation_email_mode = request.data.get('graduation_email_mode', 'send_all')
+    school = getattr(request, 'school', None)
 
     try:
         with transaction.atomic():
-            # Get current active grading configuration
-            current_config = _school_grading_configs(request).filter(is_active=True).first()
-
-            if not current_config:
-                return Response(
-                    {"detail": "No active grading configuration found"},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            current_config, next_year, next_term, error = _rollover_target(request, new_session=True)
+            if error:
+                return error
 
             current_term = current_config.term
             current_year = current_config.academic_year
-
-            # Verify current term is Third Term
-            if current_term != "Third Term":
-                return Response(
-                    {"detail": "Can only move to new session from Third Term"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Calculate next academic year (e.g., 2027/2028 -> 2028/2029)
-            years = current_year.split('/')
-            if len(years) != 2:
-                return Response(
-                    {"detail": "Invalid academic year format. Expected format: YYYY/YYYY"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            start_year = int(years[0]) + 1
-            end_year = int(years[1]) + 1
-            next_year = f"{start_year}/{end_year}"
-            next_term = "First Term"
-
-            # Check if next session config already exists
-            existing_config = _school_grading_configs(request).filter(
-                academic_year=next_year,
-                term=next_term
-            ).first()
-
-            if existing_config:
-                return Response(
-                    {"detail": f"Configuration for {next_term} {next_year} already exists"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            timer = rollover.RolloverTimer()
 
             # Use copy_to_session method to create new grading configuration with all required fields
-            if copy_grading_config:
+            if options['copy_grading_config']:
                 new_config = current_config.copy_to_session(next_year, next_term, request.user)
             else:
                 # If not copying config, still need to create one with required fields
                 # Use the current config values as defaults
-                school = getattr(request, 'school', None)
                 new_config = GradingConfiguration.objects.create(
                     school=school,
                     academic_year=next_year,
@@ -10414,113 +9237,38 @@ def move_to_next_session(request):
                 )
 
             # Copy grade components from current config if requested
-            if copy_grading_config:
-                current_components = GradeComponent.objects.filter(grading_config=current_config)
-                for component in current_components:
-                    # Check if component already exists (might be created by copy_to_session)
-                    if not GradeComponent.objects.filter(
-                        grading_config=new_config,
-                        component_type=component.component_type
-                    ).exists():
-                        GradeComponent.objects.create(
-                            grading_config=new_config,
-                            component_type=component.component_type,
-                            percentage_weight=component.percentage_weight,
-                            max_score=component.max_score,
-                            description=component.description
-                        )
+            if options['copy_grading_config']:
+                timer.add('grade_components', rollover.clone_grade_components(current_config, new_config))
 
-            school = getattr(request, 'school', None)
+            # Copy class sessions for the SAME classes: old class session id -> new
+            # class session id (students are promoted separately)
+            session_map = rollover.clone_class_sessions(school, current_year, current_term, next_year, next_term)
+            timer.add('class_sessions', len(session_map))
 
-            # Get all current class sessions (school-scoped)
-            current_class_sessions = ClassSession.objects.filter(
-                academic_year=current_year,
-                term=current_term,
-                classroom__school=school
-            )
+            if options['copy_subjects']:
+                timer.add('subjects', rollover.clone_subjects(session_map, options['copy_teachers']))
 
-            class_mapping = {}  # Map old class to promoted class session
             graduated_students = []  # Track graduating students
             emails_sent_names = []      # Display names of students whose emails were sent
             emails_deferred_names = []  # Display names whose emails are deferred
             emails_failed_names = []    # Display names where sending failed
 
-            # Copy class sessions and prepare for student promotion
-            for old_class_session in current_class_sessions:
-                # Create session for the SAME class (we'll promote students separately)
-                new_class_session = ClassSession.objects.create(
-                    classroom=old_class_session.classroom,
-                    academic_year=next_year,
-                    term=next_term
-                )
-                class_mapping[old_class_session.classroom.name] = new_class_session
-
-                # Copy subjects if requested
-                if copy_subjects:
-                    old_subjects = Subject.objects.filter(class_session=old_class_session)
-                    for old_subject in old_subjects:
-                        Subject.objects.create(
-                            name=old_subject.name,
-                            class_session=new_class_session,
-                            teacher=old_subject.teacher if copy_teachers else None,
-                            department=old_subject.department
-                        )
-
-            # Promote students to next class if requested
-            if copy_students:
-                current_student_sessions = StudentSession.objects.filter(
-                    class_session__academic_year=current_year,
-                    class_session__term=current_term,
-                    is_active=True
-                )
-
-                for old_student_session in current_student_sessions:
-                    current_classroom = old_student_session.class_session.classroom
-                    current_class_name = current_classroom.name
-
-                    if current_classroom.is_final_class:
-                        # Final class — graduate the student
-                        graduated_students.append(old_student_session.student)
-                        old_student_session.is_active = False
-                        old_student_session.save()
-                    elif current_classroom.next_class:
-                        # Promote to next class
-                        next_class_name = current_classroom.next_class.name
-                        if next_class_name in class_mapping:
-                            promoted_class_session = class_mapping[next_class_name]
-                            StudentSession.objects.create(
-                                student=old_student_session.student,
-                                class_session=promoted_class_session,
-                                is_active=True
-                            )
-                            old_student_session.is_active = False
-                            old_student_session.save()
-                        else:
-                            # Next class exists but no session for it — keep in same class
-                            if current_class_name in class_mapping:
-                                same_class_session = class_mapping[current_class_name]
-                                StudentSession.objects.create(
-                                    student=old_student_session.student,
-                                    class_session=same_class_session,
-                                    is_active=True
-                                )
-                                old_student_session.is_active = False
-                                old_student_session.save()
-                    else:
-                        # No progression configured — keep in same class
-                        if current_class_name in class_mapping:
-                            same_class_session = class_mapping[current_class_name]
-                            StudentSession.objects.create(
-                                student=old_student_session.student,
-                                class_session=same_class_session,
-                                is_active=True
-                            )
-                            old_student_session.is_active = False
-                            old_student_session.save()
+            # Promote students to next class if requested; final classes graduate
+            moved = []
+            if options['copy_students']:
+                targets, final_sessions = rollover.promotion_targets(session_map)
+                moved = rollover.carry_enrolments(targets)
+                timer.add('student_sessions', len(moved))
+                graduated_students = [
+                    enrolment.student
+                    for enrolment in StudentSession.objects.filter(
+                        class_session_id__in=final_sessions, is_active=True,
+                    ).select_related('student').prefetch_related('student__parents').order_by('id')
+                ]
 
             # Send graduation notifications and update student accounts
-            school = getattr(request, 'school', None)
-            parents_to_check = set()
+            notifications = []
+            parents_to_check = {}
 
             from datetime import timedelta
             from django.conf import settings as django_settings
@@ -10535,20 +9283,11 @@ def move_to_next_session(request):
             login_url = django_settings.FRONTEND_URL
 
             # ── Quota tracking for graduation_email_mode ─────────────────────
+            from tenants.quota import remaining as _quota_remaining
             subscription = getattr(school, 'subscription', None)
-            _is_unlimited = (
-                subscription is None
-                or getattr(getattr(subscription, 'plan', None), 'max_daily_emails', 0) == 0
-            )
-            if _is_unlimited:
+            _initial_quota = _quota_remaining(subscription) if subscription is not None else None
+            if _initial_quota is None:
                 _initial_quota = -1
-            else:
-                _today = timezone.now().date()
-                if subscription.email_counter_reset_date < _today:
-                    subscription.emails_sent_today = 0
-                    subscription.email_counter_reset_date = _today
-                    subscription.save(update_fields=['emails_sent_today', 'email_counter_reset_date'])
-                _initial_quota = subscription.plan.max_daily_emails - subscription.emails_sent_today
             _quota_used_this_run = 0
 
             def _send_or_defer(email_func, recipient, student_obj, email_type,
@@ -10592,7 +9331,7 @@ def move_to_next_session(request):
                 student_display = f'{student.first_name} {student.last_name}'
 
                 # In-app notification for student (always sent regardless of email quota)
-                Notification.objects.create(
+                notifications.append(Notification(
                     recipient=student,
                     school=school,
                     notification_type='graduation',
@@ -10608,7 +9347,7 @@ def move_to_next_session(request):
                     ),
                     is_read=False,
                     is_popup_shown=False
-                )
+                ))
 
                 # Graduation email to student — send or defer
                 _send_or_defer(
@@ -10621,48 +9360,48 @@ def move_to_next_session(request):
                 )
 
                 # In-app notifications and emails for parent(s)
-                if hasattr(student, 'parents'):
-                    for parent in student.parents.all():
-                        Notification.objects.create(
-                            recipient=parent,
-                            school=school,
-                            notification_type='graduation',
-                            priority='high',
-                            title=f'{student.first_name} {student.last_name} Has Graduated!',
-                            message=(
-                                f'Dear {parent.first_name}, we are pleased to inform you that your child, '
-                                f'{student.first_name} {student.last_name}, has successfully graduated '
-                                f'from our institution in the {current_year} academic year. '
-                                f'Their account will remain active for {grace_period_days} days — please remind them '
-                                f'to download their report cards before the account is deactivated. '
-                                f'Congratulations on this achievement!'
-                            ),
-                            is_read=False,
-                            is_popup_shown=False
-                        )
-                        _send_or_defer(
-                            email_func=lambda p=parent, s=student, d=deactivation_date: send_graduation_email_parent(p, s, d, login_url),
-                            recipient=parent,
-                            student_obj=student,
-                            email_type=DeferredGraduationEmail.EMAIL_TYPE_PARENT_PER_CHILD,
-                            deactivation_dt=deactivation_date,
-                            display_name=f'{parent.first_name} {parent.last_name} (re: {student_display})',
-                        )
-                        parents_to_check.add(parent)
+                for parent in student.parents.all():
+                    notifications.append(Notification(
+                        recipient=parent,
+                        school=school,
+                        notification_type='graduation',
+                        priority='high',
+                        title=f'{student.first_name} {student.last_name} Has Graduated!',
+                        message=(
+                            f'Dear {parent.first_name}, we are pleased to inform you that your child, '
+                            f'{student.first_name} {student.last_name}, has successfully graduated '
+                            f'from our institution in the {current_year} academic year. '
+                            f'Their account will remain active for {grace_period_days} days — please remind them '
+                            f'to download their report cards before the account is deactivated. '
+                            f'Congratulations on this achievement!'
+                        ),
+                        is_read=False,
+                        is_popup_shown=False
+                    ))
+                    _send_or_defer(
+                        email_func=lambda p=parent, s=student, d=deactivation_date: send_graduation_email_parent(p, s, d, login_url),
+                        recipient=parent,
+                        student_obj=student,
+                        email_type=DeferredGraduationEmail.EMAIL_TYPE_PARENT_PER_CHILD,
+                        deactivation_dt=deactivation_date,
+                        display_name=f'{parent.first_name} {parent.last_name} (re: {student_display})',
+                    )
+                    parents_to_check[parent.id] = parent
 
-                # Mark student as graduated — do NOT deactivate yet (30-day grace period)
-                student.is_graduated = True
-                student.graduation_date = graduation_date
-                student.save(update_fields=['is_graduated', 'graduation_date'])
+            # Mark students as graduated — do NOT deactivate yet (30-day grace period)
+            if graduated_students:
+                User.objects.filter(id__in=[s.id for s in graduated_students]).update(
+                    is_graduated=True, graduation_date=now,
+                )
 
             # Notify parents whose ALL children have now graduated
-            for parent in parents_to_check:
-                active_children = parent.children.filter(
-                    is_graduated=False, is_active=True
-                ).count()
-                if active_children == 0:
+            active_children = dict(User.objects.filter(id__in=parents_to_check).annotate(
+                active_children=Count('children', filter=Q(children__is_graduated=False, children__is_active=True)),
+            ).values_list('id', 'active_children'))
+            for parent in parents_to_check.values():
+                if active_children.get(parent.id) == 0:
                     parent_deactivation_date = now + timedelta(days=parent_grace_period_days)
-                    Notification.objects.create(
+                    notifications.append(Notification(
                         recipient=parent,
                         school=school,
                         notification_type='graduation',
@@ -10677,7 +9416,7 @@ def move_to_next_session(request):
                         ),
                         is_read=False,
                         is_popup_shown=False
-                    )
+                    ))
                     _send_or_defer(
                         email_func=lambda p=parent, d=parent_deactivation_date: send_parent_all_children_graduated_email(p, d, login_url),
                         recipient=parent,
@@ -10706,7 +9445,7 @@ def move_to_next_session(request):
                     )
                 summary_msg = ' '.join(summary_lines)
                 for admin_user in school.users.filter(role='admin', is_active=True):
-                    Notification.objects.create(
+                    notifications.append(Notification(
                         recipient=admin_user,
                         school=school,
                         notification_type='system',
@@ -10715,27 +9454,30 @@ def move_to_next_session(request):
                         message=summary_msg,
                         is_read=False,
                         is_popup_shown=False
-                    )
-
-            # Copy fee structure if requested
-            if copy_fees:
-                current_fees = FeeStructure.objects.filter(
-                    academic_year=current_year,
-                    term=current_term
-                )
+                    ))
+
+            # One insert for all the notifications (bulk_create doesn't trigger signals)
+            if notifications:
+                from logs.email_outbox import queue_notification_emails
+                from logs.live_events import publish_notifications
+                from logs.notification_counters import record_direct_notifications
+                created = Notification.objects.bulk_create(notifications, batch_size=500)
+                record_direct_notifications(created)
+                publish_notifications(created)
+                queue_notification_emails(created)
+
+            if options['copy_fees']:
+                fees, links = rollover.clone_fees(school, current_year, current_term, next_year, next_term)
+                timer.add('fee_structures', fees)
+                timer.add('fee_class_links', links)
 
-                for old_fee in current_fees:
-                    # Create new fee structure
-                    new_fee = FeeStructure.objects.create(
-                        name=old_fee.name,
-                        amount=old_fee.amount,
-                        academic_year=next_year,
-                        term=next_term
-                    )
-                    # Copy the ManyToMany relationship with classes
-                    new_fee.classes.set(old_fee.classes.all())
+            # Deactivate remaining old student sessions
+            retired = rollover.retire_enrolments(school, current_year, current_term)
+            timer.add('retired_enrolments', len(retired))
+            rollover.invalidate_counters_on_commit(moved + retired)
 
-            # Deactivate current configuration and activate new one
+            # Deactivate current configuration and activate new one; activating
+            # refreshes readiness for everything copied above
             current_config.is_active = False
             current_config.save()
 
@@ -10743,21 +9485,13 @@ def move_to_next_session(request):
             new_config.save()
 
             # Update school's current session to stay in sync
-            school = getattr(request, 'school', None)
             if school:
                 school.current_academic_year = next_year
                 school.current_term = next_term
                 school.save(update_fields=['current_academic_year', 'current_term'])
 
-            # Deactivate remaining old student sessions
-            StudentSession.objects.filter(
-                class_session__academic_year=current_year,
-                class_session__term=current_term,
-                is_active=True
-            ).update(is_active=False)
-
-            # Delete uploaded files from the retiring session
-            _cleanup_term_files(school, current_class_sessions.values_list('id', flat=True))
+            # Delete uploaded files from the retiring session once this commits
+            rollover.queue_term_file_purge(school, session_map, request.user)
 
             return Response({
                 "message": f"Successfully moved to {next_term} {next_year}",
@@ -10774,6 +9508,7 @@ def move_to_next_session(request):
                     "deferred_names": emails_deferred_names,
                     "failed_names": emails_failed_names,
                 },
+                "timing": timer.report(),
             }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -11112,8 +9847,8 @@ def _plan_has_ai_review(school):
 def _email_limit_reached(school):
     """
     Return True if the school has already hit their daily email limit.
-    Calls can_send_email() which handles the daily reset automatically.
-    Does NOT increment the counter — that is still done by the signal.
+    Read-only: can_send_email() only looks at today's count, and the counter
+    is charged by tenants.quota.reserve() when emails are sent.
     """
     try:
         sub = getattr(school, 'subscription', None)
@@ -11600,10 +10335,13 @@ def admin_lesson_note_ai_review(request, note_id):
 def _cleanup_term_files(school, class_session_ids):
     """
     Delete all uploaded files (and their DB records) associated with the given
-    ClassSession IDs. Called when admin moves to the next term or session.
+    ClassSession IDs. Run by the purge_term_files job queued when admin moves
+    to the next term or session.
 
-    File deletion goes through Django's storage API — works with any backend
-    (Cloudinary, S3, local disk, etc.). No backend-specific code here.
+    The records are deleted in one transaction that also records the files'
+    keys in a storage purge ledger; the files are then deleted in batches
+    (storage_purge.py), which works with any storage backend. Returns the
+    ledger entry, or None when there was nothing to delete.
 
     Deletes:
       - Lesson note files + DB records
@@ -11614,65 +10352,51 @@ def _cleanup_term_files(school, class_session_ids):
     """
     import logging
     from .models import LessonNote
-    from academics.models import SubjectContent, ContentFile, AssignmentSubmission, Question
+    from .storage_purge import file_keys, record_purge, run_purge
+    from academics.models import SubjectContent, ContentFile, AssignmentSubmission, SubmissionFile, Question
 
     logger = logging.getLogger(__name__)
 
     if not class_session_ids:
-        return
+        return None
 
     cs_ids = list(class_session_ids)
 
-    # 1. Lesson note files + DB records
-    notes = LessonNote.objects.filter(school=school, class_session_id__in=cs_ids)
-    for note in notes:
-        if note.file:
-            try:
-                note.file.delete(save=False)
-            except Exception:
-                pass
-    notes.delete()
-
-    # 2. Assignment submission files (model.delete() handles SubmissionFile cleanup)
-    for submission in AssignmentSubmission.objects.filter(
-        assignment__subject__class_session_id__in=cs_ids
-    ):
-        try:
-            submission.delete()
-        except Exception:
-            pass
-
-    # 3. ContentFile files + DB records
-    content_files = ContentFile.objects.filter(
-        content__subject__class_session_id__in=cs_ids
-    )
-    for cf in content_files:
-        if cf.file:
-            try:
-                cf.file.delete(save=False)
-            except Exception:
-                pass
-    content_files.delete()
+    with transaction.atomic():
+        notes = LessonNote.objects.filter(school=school, class_session_id__in=cs_ids)
+        submissions = AssignmentSubmission.objects.filter(assignment__subject__class_session_id__in=cs_ids)
+        contents = SubjectContent.objects.filter(subject__class_session_id__in=cs_ids)
+        questions = Question.objects.filter(
+            assessment__subject__class_session_id__in=cs_ids,
+            image__isnull=False,
+        ).exclude(image='')
+
+        purge = record_purge(
+            file_keys(notes, 'file')
+            + file_keys(SubmissionFile.objects.filter(submission__in=submissions), 'file')
+            + file_keys(ContentFile.objects.filter(content__in=contents), 'file')
+            + file_keys(questions, 'image'),
+            school=school,
+            reason=f'Term files of {len(cs_ids)} class session(s)',
+        )
 
-    # 4. SubjectContent DB records (files already removed above)
-    SubjectContent.objects.filter(subject__class_session_id__in=cs_ids).delete()
+        # 1. Lesson note DB records
+        notes.delete()
+        # 2. Assignment submissions (their SubmissionFile rows cascade)
+        submissions.delete()
+        # 3-4. SubjectContent DB records (their ContentFile rows cascade)
+        contents.delete()
+        # 5. Exam question images (keep Question + Assessment records for grade history)
+        questions.update(image=None)
 
-    # 5. Exam question images (keep Question + Assessment records for grade history)
-    for question in Question.objects.filter(
-        assessment__subject__class_session_id__in=cs_ids,
-        image__isnull=False,
-    ).exclude(image=''):
-        try:
-            question.image.delete(save=False)
-            question.image = None
-            question.save(update_fields=['image'])
-        except Exception:
-            pass
+    if purge:
+        run_purge(purge)
 
     logger.info(
         f'_cleanup_term_files: cleaned up files for school={school.id}, '
         f'class_sessions={cs_ids}'
     )
+    return purge
 
 
 def _delete_superseded_lesson_notes(approved_note):
@@ -12570,3 +11294,74 @@ def admin_notify_teacher_incomplete(request, teacher_id):
     if notified:
         return Response({'detail': f'{teacher.get_full_name() or teacher.username} has been notified.'})
     return Response({'detail': 'This teacher has submitted all required lesson notes — no notification sent.'})
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+def _visible_jobs(request):
+    """Jobs for the current school; admins see all of them, other staff only their own."""
+    from .models import BackgroundJob
+
+    jobs = BackgroundJob.objects.filter(school=getattr(request, 'school', None)).select_related('school')
+    if request.user.role != 'admin':
+        jobs = jobs.filter(requested_by=request.user)
+    return jobs
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsPrincipalOrAdmin])
+def list_background_jobs(request):
+    """
+    Recent background jobs for the current school (latest 20).
+    Optional ?status=queued|running|completed|failed and ?job_type= filters.
+    """
+    from .jobs import serialize_job
+
+    jobs = _visible_jobs(request)
+    if request.query_params.get('status'):
+        jobs = jobs.filter(status=request.query_params['status'])
+    if request.query_params.get('job_type'):
+        jobs = jobs.filter(job_type=request.query_params['job_type'])
+
+    return Response([serialize_job(job) for job in jobs.defer('upload')[:20]])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsPrincipalOrAdmin])
+def get_background_job(request, job_id):
+    """Status, progress and result of one background job (poll this after a 202 response)."""
+    from .jobs import serialize_job
+
+    job = _visible_jobs(request).defer('upload').filter(id=job_id).first()
+    if not job:
+        return Response({'detail': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(serialize_job(job))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsPrincipalOrAdmin])
+def download_background_job_file(request, job_id):
+    """Download the file produced by a completed background job."""
+    from django.http import FileResponse
+    from .jobs import open_result_file
+    from .models import BackgroundJob
+
+    job = _visible_jobs(request).defer('upload').filter(id=job_id).first()
+    if not job:
+        return Response({'detail': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != BackgroundJob.STATUS_COMPLETED or not job.result_file:
+        return Response({'detail': 'Job has no file to download yet.'}, status=status.HTTP_409_CONFLICT)
+
+    try:
+        file = open_result_file(job)
+    except Exception:
+        return Response({'detail': 'Job file has expired.'}, status=status.HTTP_410_GONE)
+
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=job.result_filename,
+        content_type=job.result_content_type or 'application/octet-stream',
+    )
@@ -0,0 +1,26 @@
+"""
+DRF authentication for tenant-scoped requests.
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that reuses the user TenantMiddleware already decoded
+    from the same Authorization header (legacy routes), and gives the user
+    the request's cached School so request.user.school costs no query.
+    """
+
+    def authenticate(self, request):
+        django_request = getattr(request, '_request', request)
+        result = getattr(django_request, '_jwt_auth', None)
+        if result is None:
+            result = super().authenticate(request)
+        if result is None:
+            return None
+
+        user = result[0]
+        school = getattr(django_request, 'school', None)
+        if school is not None and getattr(user, 'school_id', None) == school.pk:
+            user.school = school
+        return result
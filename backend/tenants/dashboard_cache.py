@@ -0,0 +1,167 @@
+"""
+Snapshot cache for the read-mostly proprietor endpoints
+(tenants/proprietor_views.py): the dashboard, sessions, staff & enrollment
+and revenue by class.
+
+Each school has a version number in Django's cache. A snapshot is stored
+under a key carrying the school's version, the endpoint and its query
+parameters, so bumping the version retires every snapshot of the school at
+once. post_save/post_delete signals on the models the snapshots read
+(tenants/signals.py) bump it once the write commits; writers that bypass
+signals (bulk_create, queryset update) call bump_on_commit themselves.
+Entries also expire after PROPRIETOR_SNAPSHOT_TTL seconds, which bounds how
+stale another worker's snapshot can be when CACHES is per process.
+
+With PROPRIETOR_SNAPSHOT_SERVE_STALE, a request that finds only a snapshot
+of an older version gets it at once while one background thread per
+snapshot recomputes the current one.
+
+Hits, misses and stale serves are counted per endpoint in the cache
+(snapshot_metrics(), manage.py proprietor_snapshot_stats) and reported in
+the X-Snapshot-Cache response header.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS = ('dashboard', 'sessions', 'staff_enrollment', 'revenue_by_class')
+OUTCOMES = ('hit', 'miss', 'stale')
+
+# A recompute that has not finished by then may be started again
+REFRESH_LOCK_SECONDS = 120
+
+
+def _ttl():
+    return getattr(settings, 'PROPRIETOR_SNAPSHOT_TTL', 300)
+
+
+def _serve_stale():
+    return getattr(settings, 'PROPRIETOR_SNAPSHOT_SERVE_STALE', False)
+
+
+def _version_key(school_id):
+    return f'proprietor:version:{school_id}'
+
+
+def _params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _snapshot_key(school_id, name, params_key, version):
+    return f'proprietor:snapshot:{school_id}:{name}:{params_key}:{version}'
+
+
+def _latest_key(school_id, name, params_key):
+    return f'proprietor:snapshot:{school_id}:{name}:{params_key}:latest'
+
+
+def _metric_key(name, outcome):
+    return f'proprietor:metrics:{name}:{outcome}'
+
+
+def school_version(school_id):
+    version = cache.get(_version_key(school_id))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(_version_key(school_id), version, None):
+            version = cache.get(_version_key(school_id), version)
+    return version
+
+
+def bump_version(school_id):
+    """Retire every snapshot of the school."""
+    cache.set(_version_key(school_id), time.time_ns(), None)
+
+
+def bump_on_commit(school_id):
+    """Retire the school's snapshots once the current transaction commits."""
+    if school_id:
+        transaction.on_commit(lambda: bump_version(school_id))
+
+
+def _count(name, outcome):
+    key = _metric_key(name, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:  # evicted between add and incr
+            cache.add(key, 1, None)
+
+
+def snapshot_metrics():
+    """{endpoint: {hit, miss, stale, hit_rate}} since the counters were last reset."""
+    counts = cache.get_many([_metric_key(name, outcome) for name in SNAPSHOTS for outcome in OUTCOMES])
+    metrics = {}
+    for name in SNAPSHOTS:
+        row = {outcome: counts.get(_metric_key(name, outcome), 0) for outcome in OUTCOMES}
+        served = sum(row.values())
+        row['hit_rate'] = round((row['hit'] + row['stale']) / served * 100, 1) if served else 0
+        metrics[name] = row
+    return metrics
+
+
+def reset_metrics():
+    cache.delete_many([_metric_key(name, outcome) for name in SNAPSHOTS for outcome in OUTCOMES])
+
+
+def _compute_and_store(school_id, name, params_key, version, compute):
+    started = time.monotonic()
+    data = compute()
+    ttl = _ttl()
+    cache.set_many({
+        _snapshot_key(school_id, name, params_key, version): data,
+        _latest_key(school_id, name, params_key): version,
+    }, ttl)
+    logger.debug(f'Proprietor {name} snapshot for school {school_id} computed in {time.monotonic() - started:.3f}s')
+    return data
+
+
+def _refresh_in_background(school_id, name, params_key, version, compute):
+    lock = f'proprietor:refreshing:{school_id}:{name}:{params_key}:{version}'
+    if not cache.add(lock, 1, REFRESH_LOCK_SECONDS):
+        return  # Another request is already recomputing it
+
+    def run():
+        try:
+            _compute_and_store(school_id, name, params_key, version, compute)
+        except Exception:
+            logger.exception(f'Recomputing the proprietor {name} snapshot for school {school_id} failed')
+        finally:
+            cache.delete(lock)
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'proprietor-snapshot-{name}', daemon=True).start()
+
+
+def snapshot(school, name, params, compute):
+    """
+    The school's cached result of compute() for this endpoint and params, and
+    whether it was a 'hit', a 'miss' (computed now) or 'stale' (an older
+    version, recomputed in the background).
+    """
+    version = school_version(school.id)
+    params_key = _params_key(params)
+    data = cache.get(_snapshot_key(school.id, name, params_key, version))
+    if data is not None:
+        _count(name, 'hit')
+        return data, 'hit'
+
+    if _serve_stale():
+        latest = cache.get(_latest_key(school.id, name, params_key))
+        stale = cache.get(_snapshot_key(school.id, name, params_key, latest)) if latest is not None else None
+        if stale is not None:
+            _count(name, 'stale')
+            _refresh_in_background(school.id, name, params_key, version, compute)
+            return stale, 'stale'
+
+    _count(name, 'miss')
+    return _compute_and_store(school.id, name, params_key, version, compute), 'miss'
@@ -1,22 +1,51 @@
 """
 Database export utilities for downloading full school data.
-Supports CSV (zipped), XLSX, and JSON formats.
+Supports CSV (zipped), XLSX, JSON and JSON Lines formats.
+
+Exports are streamed: every table is read in primary-key order, a chunk of
+DATABASE_EXPORT_CHUNK_SIZE rows at a time (keyset pagination over values_list,
+no model instances), and each chunk is written to the output before the next
+is read, so memory use stays flat however large the school is. CSV files are
+written into the ZIP entry by entry, XLSX uses openpyxl's write-only mode and
+JSON is written record by record. Row counts and timings per table are
+returned with the export.
 """
 import csv
-import json
 import io
+import json
+import logging
+import tempfile
+import time
 import zipfile
 from datetime import datetime, date
 from decimal import Decimal
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 
+from django.conf import settings
 from openpyxl import Workbook
 
+logger = logging.getLogger(__name__)
+
 
 # Fields to always exclude from exports
 GLOBAL_EXCLUDE = {'password', 'email_verification_token', 'password_reset_token',
                   'password_reset_expiry', 'avatar', 'profile_picture'}
 
+# format -> (file extension, content type)
+EXPORT_FORMATS = {
+    'csv': ('zip', 'application/zip'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'json': ('json', 'application/json'),
+    'jsonl': ('jsonl', 'application/x-ndjson'),
+}
+
+# Excel's row limit; longer tables continue on further sheets
+XLSX_MAX_ROWS = 1048576
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
 
 def get_export_tables(school):
     """
@@ -194,130 +223,289 @@ def _serialize_value(value):
     return value
 
 
-def queryset_to_rows(queryset, exclude_fields):
+def export_columns(model, exclude_fields):
     """
-    Convert a queryset to (headers, rows) tuple.
-    Returns (list[str], list[list]).
+    Returns (headers, columns, m2m_fields) for a model: the exported field
+    names, the database attributes read for them (foreign keys as their id)
+    and the many-to-many fields, exported as lists of related ids.
     """
-    if not queryset.exists():
-        return [], []
-
-    model = queryset.model
-    fields = [
-        f for f in model._meta.get_fields()
-        if hasattr(f, 'column') and f.name not in exclude_fields
-    ]
-
-    headers = [f.name for f in fields]
-    rows = []
+    fields = [f for f in model._meta.concrete_fields if f.name not in exclude_fields]
+    m2m_fields = [f for f in model._meta.many_to_many if f.name not in exclude_fields]
+    headers = [f.name for f in fields] + [f.name for f in m2m_fields]
+    return headers, [f.attname for f in fields], m2m_fields
+
+
+def _related_ids(field, ids):
+    """{row id: [related ids]} of a many-to-many field for a chunk of rows (one query)."""
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    related = defaultdict(list)
+    pairs = field.remote_field.through.objects.filter(**{f'{source}__in': ids}).values_list(
+        f'{source}_id', f'{target}_id'
+    ).order_by(f'{source}_id', f'{target}_id')
+    for source_id, target_id in pairs:
+        related[source_id].append(target_id)
+    return related
+
+
+def iter_rows(queryset, columns, m2m_fields=(), chunk_size=None):
+    """
+    Yield the rows of a queryset in chunks (lists of value lists, in primary-key
+    order). Each chunk is one "pk > last ORDER BY pk LIMIT n" query, so reading
+    deep into a large table costs no more than reading its start.
+    """
+    chunk_size = chunk_size or _setting('DATABASE_EXPORT_CHUNK_SIZE', 2000)
+    pk = queryset.model._meta.pk.attname
+    select = list(columns) if pk in columns else list(columns) + [pk]
+    pk_index = select.index(pk)
+    width = len(columns)
+    queryset = queryset.order_by(pk)
+
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page.values_list(*select)[:chunk_size].iterator())
+        if not rows:
+            return
+        last = rows[-1][pk_index]
+
+        related = []
+        if m2m_fields:
+            ids = [row[pk_index] for row in rows]
+            related = [_related_ids(field, ids) for field in m2m_fields]
+        yield [list(row[:width]) + [r.get(row[pk_index], []) for r in related] for row in rows]
+
+        if len(rows) < chunk_size:
+            return
+
+
+def _counted(table_name, chunks, stats):
+    """Pass chunks through, then record the table's row count and time in stats."""
+    started = time.monotonic()
+    rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+        yield chunk
+    stats.append({'table': table_name, 'rows': rows, 'seconds': round(time.monotonic() - started, 3)})
+
+
+def _tables(school, stats, progress=None):
+    """Yield (table_name, headers, row chunks) for every export table."""
+    tables = get_export_tables(school)
+    for index, (table_name, (qs, exclude)) in enumerate(tables.items()):
+        if progress:
+            progress(index, len(tables), table_name)
+        headers, columns, m2m_fields = export_columns(qs.model, exclude)
+        yield table_name, headers, _counted(table_name, iter_rows(qs, columns, m2m_fields), stats)
+
+
+def _school_info(school):
+    return {
+        'name': school.name,
+        'slug': school.slug,
+        'email': school.email,
+        'export_date': datetime.now().isoformat(),
+        'format_version': '1.0',
+    }
 
-    for obj in queryset.iterator(chunk_size=500):
-        row = []
-        for f in fields:
-            val = getattr(obj, f.name, None)
-            row.append(_serialize_value(val))
-        rows.append(row)
 
-    return headers, rows
+def _dumps(value):
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+# ============================================================================
+# WRITERS
+# Generators writing one format to a binary file object; they yield after
+# every chunk so a streaming caller can pass the bytes written so far on.
+# ============================================================================
+
+def _write_csv(school, fileobj, stats, progress):
+    """A ZIP of CSV files, one per non-empty table."""
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for table_name, headers, chunks in _tables(school, stats, progress):
+            text = None
+            for chunk in chunks:
+                if text is None:
+                    text = io.TextIOWrapper(
+                        zf.open(f'{table_name}.csv', 'w', force_zip64=True), encoding='utf-8', newline=''
+                    )
+                    writer = csv.writer(text)
+                    writer.writerow(headers)
+                writer.writerows([_serialize_value(v) for v in row] for row in chunk)
+                yield
+            if text is not None:
+                text.close()
+
+
+def _write_xlsx(school, fileobj, stats, progress):
+    """A single XLSX with one sheet per non-empty table (write-only mode, rows go to temp files)."""
+    wb = Workbook(write_only=True)
+
+    for table_name, headers, chunks in _tables(school, stats, progress):
+        ws, sheet_rows, part = None, 0, 0
+        for chunk in chunks:
+            for row in chunk:
+                if ws is None or sheet_rows >= XLSX_MAX_ROWS:
+                    part += 1
+                    # Excel sheet names max 31 chars
+                    suffix = f' ({part})' if part > 1 else ''
+                    ws = wb.create_sheet(title=table_name[:31 - len(suffix)] + suffix)
+                    ws.append(headers)
+                    sheet_rows = 1
+                # Lists, dicts (JSON fields, many-to-many ids) and UUIDs as text
+                values = (_serialize_value(v) for v in row)
+                ws.append([v if isinstance(v, (str, int, float)) else str(v) for v in values])
+                sheet_rows += 1
+            yield
+
+    if not wb.worksheets:
+        wb.create_sheet(title='users')
+    wb.save(fileobj)
+    yield
+
+
+def _write_json(school, fileobj, stats, progress):
+    """One JSON document: {"school": {...}, "tables": {table: [records]}}."""
+    fileobj.write(f'{{"school": {_dumps(_school_info(school))}, "tables": {{'.encode('utf-8'))
+    for index, (table_name, headers, chunks) in enumerate(_tables(school, stats, progress)):
+        fileobj.write(f'{", " if index else ""}\n{_dumps(table_name)}: ['.encode('utf-8'))
+        first = True
+        for chunk in chunks:
+            records = ',\n'.join(
+                _dumps(dict(zip(headers, (_serialize_value(v) for v in row)))) for row in chunk
+            )
+            fileobj.write((('\n' if first else ',\n') + records).encode('utf-8'))
+            first = False
+            yield
+        fileobj.write(b']')
+    fileobj.write(b'\n}}\n')
+    yield
+
+
+def _write_jsonl(school, fileobj, stats, progress):
+    """JSON Lines: a {"school": {...}} line, then one {"table": ..., "row": {...}} line per row."""
+    fileobj.write((_dumps({'school': _school_info(school)}) + '\n').encode('utf-8'))
+    for table_name, headers, chunks in _tables(school, stats, progress):
+        prefix = f'{{"table": {_dumps(table_name)}, "row": '
+        for chunk in chunks:
+            lines = ''.join(
+                prefix + _dumps(dict(zip(headers, (_serialize_value(v) for v in row)))) + '}\n' for row in chunk
+            )
+            fileobj.write(lines.encode('utf-8'))
+            yield
+
+
+_WRITERS = {
+    'csv': _write_csv,
+    'xlsx': _write_xlsx,
+    'json': _write_json,
+    'jsonl': _write_jsonl,
+}
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Unseekable sink whose contents are handed on (and dropped) after every chunk."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def export_filename(school, format_type):
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported format: {format_type}')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f'{school.slug}_database_{timestamp}.{EXPORT_FORMATS[format_type][0]}'
 
 
-def generate_database_export(school, format_type):
+def write_database_export(school, format_type, fileobj, progress=None):
     """
-    Main entry point. Returns (file_bytes, filename, content_type).
+    Write the export to a binary file object. progress(index, total, table_name)
+    is called as each table starts. Returns [{'table', 'rows', 'seconds'}].
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    slug = school.slug
-
-    if format_type == 'csv':
-        return _export_csv(school, slug, timestamp)
-    elif format_type == 'xlsx':
-        return _export_xlsx(school, slug, timestamp)
-    elif format_type == 'json':
-        return _export_json(school, slug, timestamp)
-    else:
+    if format_type not in _WRITERS:
         raise ValueError(f'Unsupported format: {format_type}')
+    stats = []
+    for _ in _WRITERS[format_type](school, fileobj, stats, progress):
+        pass
+    return stats
 
 
-def _export_csv(school, slug, timestamp):
-    """Generate a ZIP of CSV files."""
-    buf = io.BytesIO()
-    tables = get_export_tables(school)
-
-    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for table_name, (qs, exclude) in tables.items():
-            headers, rows = queryset_to_rows(qs, exclude)
-            if not headers:
-                continue
-
-            csv_buf = io.StringIO()
-            writer = csv.writer(csv_buf)
-            writer.writerow(headers)
-            writer.writerows(rows)
-            zf.writestr(f'{table_name}.csv', csv_buf.getvalue())
-
-    filename = f'{slug}_database_{timestamp}.zip'
-    return buf.getvalue(), filename, 'application/zip'
-
+def generate_database_export(school, format_type, progress=None):
+    """
+    Main entry point. Returns (file, filename, content_type, stats); file is a
+    rewound temporary file, kept in memory up to DATABASE_EXPORT_SPOOL_BYTES.
+    """
+    filename = export_filename(school, format_type)
+    spool = tempfile.SpooledTemporaryFile(max_size=_setting('DATABASE_EXPORT_SPOOL_BYTES', 16 * 1024 * 1024))
+    try:
+        stats = write_database_export(school, format_type, spool, progress)
+    except Exception:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, filename, EXPORT_FORMATS[format_type][1], stats
+
+
+def stream_database_export(school, format_type, progress=None, stats=None):
+    """
+    Returns (chunks, filename, content_type): chunks is an iterator of bytes
+    produced while the tables are read, for a StreamingHttpResponse or a pipe.
+    XLSX is assembled from its temp files at the end, so it arrives last.
+    Per-table stats are appended to stats, if given, as the tables finish.
+    """
+    filename = export_filename(school, format_type)
+    stats = stats if stats is not None else []
 
-def _export_xlsx(school, slug, timestamp):
-    """Generate a single XLSX with one sheet per table."""
-    wb = Workbook()
-    wb.remove(wb.active)
-    tables = get_export_tables(school)
+    def generate():
+        sink = _StreamBuffer()
+        for _ in _WRITERS[format_type](school, sink, stats, progress):
+            data = sink.drain()
+            if data:
+                yield data
+        data = sink.drain()
+        if data:
+            yield data
 
-    for table_name, (qs, exclude) in tables.items():
-        headers, rows = queryset_to_rows(qs, exclude)
-        if not headers:
-            continue
+    return generate(), filename, EXPORT_FORMATS[format_type][1]
 
-        # Excel sheet names max 31 chars
-        sheet_name = table_name[:31]
-        ws = wb.create_sheet(title=sheet_name)
-        ws.append(headers)
-        for row in rows:
-            ws.append([str(v) if isinstance(v, (list, dict)) else v for v in row])
 
-    xlsx_buf = io.BytesIO()
-    wb.save(xlsx_buf)
-    xlsx_buf.seek(0)
+def run_database_export(request):
+    """
+    Background job handler for the portal database download. Generates the
+    export and stores it for the job download endpoint.
+    """
+    from schooladmin.jobs import store_result_file
 
-    filename = f'{slug}_database_{timestamp}.xlsx'
-    return xlsx_buf.getvalue(), filename, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    export_format = request.data.get('format', 'csv')
 
+    def progress(index, total, table_name):
+        request.set_progress(index, total + 1, f'Exporting {table_name}')
 
-def _export_json(school, slug, timestamp):
-    """Generate structured JSON export with all data."""
-    tables = get_export_tables(school)
-    result = {
-        'school': {
-            'name': school.name,
-            'slug': school.slug,
-            'email': school.email,
-            'export_date': datetime.now().isoformat(),
-            'format_version': '1.0',
-        },
-        'tables': {},
-    }
+    started = time.monotonic()
+    export_file, filename, content_type, stats = generate_database_export(request.school, export_format, progress)
+    with export_file:
+        export_file.seek(0, io.SEEK_END)
+        size = export_file.tell()
+        export_file.seek(0)
+        store_result_file(request.job, filename, export_file, content_type)
 
-    for table_name, (qs, exclude) in tables.items():
-        headers, rows = queryset_to_rows(qs, exclude)
-        if not headers:
-            result['tables'][table_name] = []
-            continue
-
-        table_data = []
-        for row in rows:
-            record = {}
-            for i, header in enumerate(headers):
-                val = row[i]
-                # Convert non-serialisable types
-                if isinstance(val, (Decimal,)):
-                    val = str(val)
-                record[header] = val
-            table_data.append(record)
-
-        result['tables'][table_name] = table_data
-
-    json_bytes = json.dumps(result, indent=2, default=str, ensure_ascii=False).encode('utf-8')
-    filename = f'{slug}_database_{timestamp}.json'
-    return json_bytes, filename, 'application/json'
+    total_rows = sum(table['rows'] for table in stats)
+    request.set_progress(len(stats) + 1, len(stats) + 1, 'Export ready')
+    logger.info(
+        f'Database export {filename}: {total_rows} rows, {size} bytes in {time.monotonic() - started:.1f}s; '
+        + ', '.join(f"{t['table']}={t['rows']} ({t['seconds']}s)" for t in stats if t['rows'])
+    )
+    return {'filename': filename, 'size': size, 'rows': total_rows, 'tables': stats}
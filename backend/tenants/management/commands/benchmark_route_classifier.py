@@ -0,0 +1,118 @@
+"""
+Micro-benchmark of per-request path classification in the tenant middlewares.
+
+Compares the previous approach (TenantMiddleware and SubscriptionValidationMiddleware
+each looping re.match over their pattern lists) with tenants/routes.classify,
+both uncached and memoised. With --school, also times both middlewares end to
+end on a warm tenant cache.
+
+Usage:
+    python manage.py benchmark_route_classifier
+    python manage.py benchmark_route_classifier --iterations 200000
+    python manage.py benchmark_route_classifier --school greenwood-academy
+"""
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from tenants.routes import (
+    PUBLIC_ROUTES,
+    LEGACY_ROUTE_PATTERNS,
+    NON_TENANT_SLUGS,
+    SUBSCRIPTION_REQUIRED_PATTERNS,
+    SUBSCRIPTION_EXEMPT_PATTERNS,
+    classify,
+)
+
+SAMPLE_PATHS = [
+    '/api/greenwood-academy/schooladmin/analytics/overview/',
+    '/api/greenwood-academy/academics/subjects/42/grades/',
+    '/api/greenwood-academy/users/list-students/',
+    '/api/greenwood-academy/logs/notifications/unread-count/',
+    '/api/greenwood-academy/subscription/status/',
+    '/api/schooladmin/analytics/overview/',
+    '/api/users/me/',
+    '/api/portal/schools/',
+    '/api/token/refresh/',
+    '/static/admin/css/base.css',
+]
+
+
+def _previous_classification(path):
+    """The per-request matching both middlewares did before tenants/routes.py."""
+    # TenantMiddleware
+    for pattern in PUBLIC_ROUTES:
+        if re.match(pattern, path):
+            break
+    else:
+        for pattern in LEGACY_ROUTE_PATTERNS:
+            if re.match(pattern, path):
+                break
+        else:
+            match = re.match(r'^/api/([a-z0-9-]+)/', path)
+            if match:
+                match.group(1) in list(NON_TENANT_SLUGS)
+
+    # SubscriptionValidationMiddleware
+    for pattern in SUBSCRIPTION_REQUIRED_PATTERNS:
+        if re.match(pattern, path):
+            break
+    else:
+        return
+    for pattern in SUBSCRIPTION_EXEMPT_PATTERNS:
+        if re.match(pattern, path):
+            return
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request route classification in the tenant middlewares'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000, help='Requests to simulate per variant')
+        parser.add_argument('--school', help='Existing school slug; also times both middlewares end to end')
+
+    def _report(self, label, seconds, iterations):
+        self.stdout.write(f'{label:<40} {seconds / iterations * 1e6:8.2f} µs/request')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        paths = SAMPLE_PATHS
+        n_paths = len(paths)
+
+        def run(func):
+            def loop():
+                for i in range(iterations):
+                    func(paths[i % n_paths])
+            return min(timeit.repeat(loop, number=1, repeat=3))
+
+        uncached = classify.__wrapped__
+        self.stdout.write(f'{iterations} requests over {n_paths} sample paths (best of 3)')
+        self._report('before: re.match over pattern lists', run(_previous_classification), iterations)
+        self._report('after: compiled classifier', run(uncached), iterations)
+        classify.cache_clear()
+        self._report('after: compiled classifier, memoised', run(classify), iterations)
+
+        if options['school']:
+            self._benchmark_middleware(options['school'], iterations)
+
+    def _benchmark_middleware(self, slug, iterations):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from tenants.middleware import SubscriptionValidationMiddleware, TenantMiddleware
+
+        tenant = TenantMiddleware(lambda request: HttpResponse())
+        subscription = SubscriptionValidationMiddleware(lambda request: HttpResponse())
+        request_factory = RequestFactory()
+        requests = [request_factory.get(f'/api/{slug}/schooladmin/analytics/overview/') for _ in range(100)]
+
+        def loop():
+            for i in range(iterations):
+                request = requests[i % 100]
+                request.__dict__.pop('route', None)
+                tenant.process_request(request)
+                subscription.process_request(request)
+
+        loop()  # warm the tenant cache
+        seconds = min(timeit.repeat(loop, number=1, repeat=3))
+        self._report('after: both middlewares, warm cache', seconds, iterations)
@@ -0,0 +1,31 @@
+"""
+Hit, miss and stale-serve counts of the proprietor dashboard snapshot cache
+(tenants/dashboard_cache.py), per endpoint.
+
+The counters live in Django's cache: with a per-process CACHE_BACKEND they
+only cover the process running this command, so point CACHES at the shared
+backend the web workers use.
+
+Usage:
+    python manage.py proprietor_snapshot_stats
+    python manage.py proprietor_snapshot_stats --reset
+"""
+
+from django.core.management.base import BaseCommand
+
+from tenants.dashboard_cache import reset_metrics, snapshot_metrics
+
+
+class Command(BaseCommand):
+    help = 'Show (and optionally reset) the proprietor snapshot cache hit/miss counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'endpoint':<20} {'hits':>8} {'misses':>8} {'stale':>8} {'hit rate':>9}")
+        for name, row in snapshot_metrics().items():
+            self.stdout.write(f"{name:<20} {row['hit']:>8} {row['miss']:>8} {row['stale']:>8} {row['hit_rate']:>8}%")
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write('Counters reset.')
@@ -1,42 +1,10 @@
 """
 Tenant middleware for multi-tenant isolation.
 """
-import re
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from .models import School
-
-
-# Routes that don't require tenant context
-PUBLIC_ROUTES = [
-    r'^/api/public/',
-    r'^/api/webhooks/',
-    r'^/api/token/',
-    r'^/api/portal/',
-    r'^/api/superadmin/',
-    r'^/api/onboarding/',
-    r'^/admin/',
-    r'^/static/',
-    r'^/media/',
-    r'^/__debug__/',
-    # Unauthenticated routes (email verification, password reset)
-    r'^/api/users/verify-email/',
-    r'^/api/users/verify-and-change-password/',
-    r'^/api/users/token-branding/',
-    r'^/api/users/resend-verification/',
-    r'^/api/users/forgot-password/',
-    r'^/api/users/reset-password/',
-]
-
-# Legacy routes that should redirect (for backwards compatibility)
-LEGACY_ROUTE_PATTERNS = [
-    r'^/api/users/',
-    r'^/api/academics/',
-    r'^/api/attendance/',
-    r'^/api/schooladmin/',
-    r'^/api/admin/',
-    r'^/api/logs/',
-]
+from .routes import Route, get_route
+from .tenant_cache import get_school_by_id, get_school_by_slug
 
 
 class TenantMiddleware(MiddlewareMixin):
@@ -48,8 +16,8 @@ class TenantMiddleware(MiddlewareMixin):
 
     The middleware:
     1. Skips public routes that don't require tenant context
-    2. Extracts school slug from URL path
-    3. Looks up the school and attaches it to request.school
+    2. Extracts school slug from URL path (tenants/routes.py, stored on request.route)
+    3. Looks up the school (tenants/tenant_cache.py) and attaches it to request.school
     4. Verifies the school is active and subscription is valid
     """
 
@@ -58,6 +26,8 @@ class TenantMiddleware(MiddlewareMixin):
         Extract user from JWT token in Authorization header.
         This is needed because DRF authentication happens at view level,
         but we need the user's school in middleware for legacy routes.
+        The result is kept on the request for TenantJWTAuthentication, so the
+        token is decoded and the user loaded only once.
         """
         from rest_framework_simplejwt.authentication import JWTAuthentication
         from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
@@ -70,6 +40,7 @@ class TenantMiddleware(MiddlewareMixin):
             jwt_auth = JWTAuthentication()
             validated_token = jwt_auth.get_validated_token(auth_header.split(' ')[1])
             user = jwt_auth.get_user(validated_token)
+            request._jwt_auth = (user, validated_token)
             return user
         except (InvalidToken, TokenError, Exception):
             return None
@@ -79,56 +50,45 @@ class TenantMiddleware(MiddlewareMixin):
         request.school = None
         request.subscription = None
 
-        path = request.path
+        route = get_route(request)
 
         # Skip public routes
-        for pattern in PUBLIC_ROUTES:
-            if re.match(pattern, path):
-                return None
+        if route.kind == Route.PUBLIC:
+            return None
 
         # Handle legacy routes (redirect to user's school for backwards compatibility)
-        for pattern in LEGACY_ROUTE_PATTERNS:
-            if re.match(pattern, path):
-                # Try to get user from JWT token (since DRF auth happens at view level)
-                user = self._get_user_from_jwt(request)
-                if user and hasattr(user, 'school') and user.school:
-                    request.school = user.school
-                    request.subscription = getattr(user.school, 'subscription', None)
-                    return None
-
-                # Check if user is authenticated via session and has a school
-                if hasattr(request, 'user') and request.user.is_authenticated:
-                    if hasattr(request.user, 'school') and request.user.school:
-                        request.school = request.user.school
-                        request.subscription = getattr(request.school, 'subscription', None)
-                        return None
+        if route.kind == Route.LEGACY:
+            # Try to get user from JWT token (since DRF auth happens at view level)
+            user = self._get_user_from_jwt(request)
+            school = get_school_by_id(user.school_id) if user and getattr(user, 'school_id', None) else None
+            if school:
+                user.school = school
+                request.school = school
+                request.subscription = getattr(school, 'subscription', None)
+                return None
 
-                # No school found — block the request to prevent cross-tenant data leakage
-                return JsonResponse({
-                    'error': 'School context required',
-                    'message': 'Your account is not associated with a school. Please contact support.'
-                }, status=403)
+            # Check if user is authenticated via session and has a school
+            if hasattr(request, 'user') and request.user.is_authenticated:
+                if hasattr(request.user, 'school') and request.user.school:
+                    request.school = request.user.school
+                    request.subscription = getattr(request.school, 'subscription', None)
+                    return None
 
-        # Extract school slug from path: /api/<school_slug>/...
-        match = re.match(r'^/api/([a-z0-9-]+)/', path)
+            # No school found — block the request to prevent cross-tenant data leakage
+            return JsonResponse({
+                'error': 'School context required',
+                'message': 'Your account is not associated with a school. Please contact support.'
+            }, status=403)
 
-        if not match:
-            # Not a tenant-scoped route, allow through
+        # Not a tenant-scoped route (/api/<school_slug>/...), allow through
+        if route.kind != Route.TENANT:
             return None
 
-        school_slug = match.group(1)
+        school_slug = route.school_slug
 
-        # Skip if slug is a known non-tenant route
-        non_tenant_slugs = ['public', 'webhooks', 'token', 'portal', 'superadmin', 'admin', 'onboarding']
-        if school_slug in non_tenant_slugs:
-            return None
-
-        # Look up the school
-        try:
-            school = School.objects.select_related('subscription', 'subscription__plan').get(
-                slug=school_slug
-            )
-        except School.DoesNotExist:
+        # Look up the school (cached; subscription and plan preloaded)
+        school = get_school_by_slug(school_slug)
+        if school is None:
             return JsonResponse({
                 'error': 'School not found',
                 'message': f"No school found with URL '{school_slug}'"
@@ -163,42 +123,15 @@ class SubscriptionValidationMiddleware(MiddlewareMixin):
     Middleware to validate subscription status on protected routes.
 
     This should run AFTER TenantMiddleware and authentication middleware.
+    Which routes need a subscription is defined in tenants/routes.py
+    (SUBSCRIPTION_REQUIRED_PATTERNS / SUBSCRIPTION_EXEMPT_PATTERNS).
     """
 
-    # Routes that require active subscription
-    SUBSCRIPTION_REQUIRED_PATTERNS = [
-        r'^/api/[a-z0-9-]+/users/',
-        r'^/api/[a-z0-9-]+/academics/',
-        r'^/api/[a-z0-9-]+/attendance/',
-        r'^/api/[a-z0-9-]+/schooladmin/',
-        r'^/api/[a-z0-9-]+/admin/',
-        r'^/api/[a-z0-9-]+/logs/',
-    ]
-
-    # Routes exempt from subscription check (billing, viewing plans, etc.)
-    SUBSCRIPTION_EXEMPT_PATTERNS = [
-        r'^/api/[a-z0-9-]+/subscription/',
-        r'^/api/[a-z0-9-]+/billing/',
-    ]
-
     def process_request(self, request):
-        path = request.path
-
-        # Check if route requires subscription
-        requires_subscription = False
-        for pattern in self.SUBSCRIPTION_REQUIRED_PATTERNS:
-            if re.match(pattern, path):
-                requires_subscription = True
-                break
-
-        if not requires_subscription:
+        # Check if route requires subscription (classified once by TenantMiddleware)
+        if not get_route(request).requires_subscription:
             return None
 
-        # Check if route is exempt
-        for pattern in self.SUBSCRIPTION_EXEMPT_PATTERNS:
-            if re.match(pattern, path):
-                return None
-
         # Validate subscription
         subscription = getattr(request, 'subscription', None)
 
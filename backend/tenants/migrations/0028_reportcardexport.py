@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 07:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0027_seed_subscription_plans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCardExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('is_background', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_card_exports', to='tenants.portaluser')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_exports', to='tenants.school')),
+            ],
+            options={
+                'verbose_name': 'Report Card Export',
+                'verbose_name_plural': 'Report Card Exports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
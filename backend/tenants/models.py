@@ -327,6 +327,9 @@ class Subscription(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
 
+    # The daily email counter is only written by tenants/quota.py, with single UPDATEs
+    QUOTA_FIELDS = ('emails_sent_today', 'email_counter_reset_date')
+
     class Meta:
         verbose_name = 'Subscription'
         verbose_name_plural = 'Subscriptions'
@@ -334,6 +337,15 @@ class Subscription(models.Model):
     def __str__(self):
         return f"{self.school.name} - {self.plan.display_name} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        # An instance loaded before a reservation must not write its stale count back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.QUOTA_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def is_active_or_trial(self):
         """Check if subscription is in a usable state (including grace period)."""
         return self.status in ['trial', 'active', 'grace_period']
@@ -366,23 +378,10 @@ class Subscription(models.Model):
         return False
 
     def can_send_email(self):
-        """Check if the school can send more emails today."""
-        # Reset counter if it's a new day
-        today = timezone.now().date()
-        if self.email_counter_reset_date < today:
-            self.emails_sent_today = 0
-            self.email_counter_reset_date = today
-            self.save(update_fields=['emails_sent_today', 'email_counter_reset_date'])
-
-        # Check against limit (0 = unlimited)
-        if self.plan.max_daily_emails == 0:
-            return True
-        return self.emails_sent_today < self.plan.max_daily_emails
-
-    def increment_email_count(self):
-        """Increment the daily email counter."""
-        self.emails_sent_today += 1
-        self.save(update_fields=['emails_sent_today'])
+        """Check if the school can send more emails today (read-only; see tenants/quota.py)."""
+        from .quota import remaining
+        left = remaining(self)
+        return left is None or left > 0
 
     def get_admin_count(self):
         """Get the current count of admin users for this school."""
@@ -871,3 +870,50 @@ class SchoolMessage(models.Model):
     def __str__(self):
         return f"Message from {self.sender_name} ({self.onboarding_record.school.name})"
 
+
+
+class ReportCardExport(models.Model):
+    """
+    A bulk report card ZIP export requested from the school portal.
+
+    Streaming downloads and background (download token) exports both record
+    their progress here so the portal can poll it from any gunicorn worker.
+    Background exports run on the job worker and store the ZIP at file_path in job storage.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    school = models.ForeignKey(
+        School, on_delete=models.CASCADE, related_name='report_card_exports'
+    )
+    requested_by = models.ForeignKey(
+        PortalUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='report_card_exports'
+    )
+
+    # Selection (grading config ids and optional student id)
+    params = models.JSONField(default=dict, blank=True)
+    is_background = models.BooleanField(default=False)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    filename = models.CharField(max_length=255, blank=True)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Report Card Export'
+        verbose_name_plural = 'Report Card Exports'
+
+    def __str__(self):
+        return f"{self.school.name} report cards ({self.status} {self.completed}/{self.total})"
@@ -214,7 +214,7 @@ class IsSchoolStaff(permissions.BasePermission):
 
 def check_email_limit(school):
     """
-    Check if school can send more emails and increment counter.
+    Check if school can send more emails and reserve one from today's quota.
 
     Usage:
         from tenants.permissions import check_email_limit
@@ -231,11 +231,8 @@ def check_email_limit(school):
     if not subscription:
         return False
 
-    if not subscription.can_send_email():
-        return False
-
-    subscription.increment_email_count()
-    return True
+    from .quota import reserve
+    return reserve(school, 1) == 1
 
 
 def check_admin_limit(school):
@@ -293,8 +290,10 @@ def get_feature_limits(school):
         }
 
     from users.models import CustomUser
+    from .quota import sent_today, remaining
     counts = _get_user_counts(school)
     plan = subscription.plan
+    emails_remaining = remaining(subscription)
 
     return {
         'has_subscription': True,
@@ -302,11 +301,8 @@ def get_feature_limits(school):
         'max_admins': plan.max_admin_accounts,
         'current_admins': subscription.get_admin_count(),
         'max_daily_emails': plan.max_daily_emails,
-        'emails_sent_today': subscription.emails_sent_today,
-        'emails_remaining': (
-            -1 if plan.max_daily_emails == 0
-            else max(0, plan.max_daily_emails - subscription.emails_sent_today)
-        ),
+        'emails_sent_today': sent_today(subscription),
+        'emails_remaining': -1 if emails_remaining is None else emails_remaining,
         'has_import': plan.has_import_feature,
         'has_staff_management': plan.has_staff_management,
         'max_import_rows': plan.max_import_rows,
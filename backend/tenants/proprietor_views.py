@@ -24,6 +24,16 @@ class IsProprietorRole(permissions.BasePermission):
         return request.user.is_authenticated and request.user.role == 'proprietor'
 
 
+def _snapshot_response(school, name, params, compute):
+    """Serve compute()'s result from the school's snapshot cache (dashboard_cache.py)."""
+    from .dashboard_cache import snapshot
+
+    data, outcome = snapshot(school, name, params, compute)
+    response = Response(data)
+    response['X-Snapshot-Cache'] = outcome
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsProprietorRole])
 def proprietor_dashboard(request):
@@ -32,6 +42,38 @@ def proprietor_dashboard(request):
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
 
+    response = _snapshot_response(
+        school, 'dashboard',
+        {'session': school.current_academic_year, 'term': school.current_term},
+        lambda: _dashboard_snapshot(school),
+    )
+    # The activity feed changes with every logged action: read it fresh
+    response.data = {**response.data, 'recent_activities': _recent_activities(school)}
+    return response
+
+
+def _recent_activities(school):
+    recent_activities = []
+    try:
+        activities = ActivityLog.objects.filter(
+            school=school
+        ).select_related('user').order_by('-timestamp')[:10]
+
+        for activity in activities:
+            recent_activities.append({
+                'id': activity.id,
+                'action': activity.action or activity.activity_type,
+                'user': f"{activity.user.first_name} {activity.user.last_name}" if activity.user else 'System',
+                'details': activity.content_title or '',
+                'timestamp': activity.timestamp.isoformat(),
+            })
+    except Exception as e:
+        # ActivityLog might not exist or have different fields
+        pass
+    return recent_activities
+
+
+def _dashboard_snapshot(school):
     current_year = school.current_academic_year
     current_term = school.current_term
 
@@ -47,27 +89,36 @@ def proprietor_dashboard(request):
 
     # Students by department
     departments = Department.objects.filter(school=school).order_by('name')
-    dept_data = []
-    for dept in departments:
-        student_count = CustomUser.objects.filter(
-            school=school, role='student', is_active=True, department=dept.name
-        ).count()
-        dept_data.append({'name': dept.name, 'student_count': student_count})
+    dept_counts = dict(
+        CustomUser.objects.filter(school=school, role='student', is_active=True)
+        .values('department')
+        .annotate(count=Count('id'))
+        .order_by()
+        .values_list('department', 'count')
+    )
+    dept_data = [
+        {'name': dept.name, 'student_count': dept_counts.get(dept.name, 0)}
+        for dept in departments
+    ]
 
     # Students by class (current session)
     classes = Class.objects.filter(school=school).order_by('name')
+    class_counts = dict(
+        StudentSession.objects.filter(
+            class_session__classroom__school=school,
+            class_session__academic_year=current_year,
+            class_session__term=current_term,
+            is_active=True,
+        )
+        .values('class_session__classroom_id')
+        .annotate(count=Count('id'))
+        .order_by()
+        .values_list('class_session__classroom_id', 'count')
+    )
     class_data = []
     total_class_students = 0
     for cls in classes:
-        try:
-            cs = ClassSession.objects.get(
-                classroom=cls, academic_year=current_year, term=current_term
-            )
-            student_count = StudentSession.objects.filter(
-                class_session=cs, is_active=True
-            ).count()
-        except ClassSession.DoesNotExist:
-            student_count = 0
+        student_count = class_counts.get(cls.id, 0)
         class_data.append({'name': cls.name, 'student_count': student_count})
         total_class_students += student_count
 
@@ -128,16 +179,22 @@ def proprietor_dashboard(request):
             term=current_term
         ).select_related('classroom')
 
-        for cs in class_sessions:
-            # Get average score for this class
-            class_avg = GradeSummary.objects.filter(
+        # Average score of each class's active students, one grouped query
+        class_averages = dict(
+            GradeSummary.objects.filter(
                 grading_config__in=configs,
-                student__in=StudentSession.objects.filter(
-                    class_session=cs, is_active=True
-                ).values('student'),
-                total_score__isnull=False
-            ).aggregate(avg=Avg('total_score'))['avg']
+                total_score__isnull=False,
+                student__student_sessions__class_session__in=class_sessions,
+                student__student_sessions__is_active=True,
+            )
+            .values('student__student_sessions__class_session_id')
+            .annotate(avg=Avg('total_score'))
+            .order_by()
+            .values_list('student__student_sessions__class_session_id', 'avg')
+        )
 
+        for cs in class_sessions:
+            class_avg = class_averages.get(cs.id)
             if class_avg:
                 top_classes.append({
                     'name': cs.classroom.name,
@@ -166,16 +223,12 @@ def proprietor_dashboard(request):
             prev_year = current_year
 
     # Previous term enrollment
-    prev_enrollment = 0
-    prev_class_sessions = ClassSession.objects.filter(
-        classroom__school=school,
-        academic_year=prev_year,
-        term=prev_term
-    )
-    for pcs in prev_class_sessions:
-        prev_enrollment += StudentSession.objects.filter(
-            class_session=pcs, is_active=True
-        ).count()
+    prev_enrollment = StudentSession.objects.filter(
+        class_session__classroom__school=school,
+        class_session__academic_year=prev_year,
+        class_session__term=prev_term,
+        is_active=True
+    ).count()
 
     # Previous term revenue
     prev_fee_structures = FeeStructure.objects.filter(
@@ -253,26 +306,9 @@ def proprietor_dashboard(request):
             'outstanding': outstanding,
         })
 
-    # 9. Recent Activity Feed
-    recent_activities = []
-    try:
-        activities = ActivityLog.objects.filter(
-            school=school
-        ).select_related('user').order_by('-timestamp')[:10]
-
-        for activity in activities:
-            recent_activities.append({
-                'id': activity.id,
-                'action': activity.action or activity.activity_type,
-                'user': f"{activity.user.first_name} {activity.user.last_name}" if activity.user else 'System',
-                'details': activity.content_title or '',
-                'timestamp': activity.timestamp.isoformat(),
-            })
-    except Exception as e:
-        # ActivityLog might not exist or have different fields
-        pass
+    # 9. Recent Activity Feed: added by proprietor_dashboard, outside the snapshot
 
-    return Response({
+    return {
         'teachers_count': teachers_count,
         'students_count': students_count,
         'parents_count': counts.get('parent', 0),
@@ -288,10 +324,10 @@ def proprietor_dashboard(request):
         'top_performing_classes': top_classes,
         'term_comparison': term_comparison,
         'upcoming_fees': upcoming_fees,
-        'recent_activities': recent_activities,
+        'recent_activities': [],
         'current_session': current_year,
         'current_term': current_term,
-    })
+    }
 
 
 @api_view(['GET'])
@@ -302,24 +338,32 @@ def proprietor_sessions(request):
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-    sessions = (
-        ClassSession.objects.filter(classroom__school=school)
-        .values('academic_year', 'term')
-        .distinct()
-        .order_by('-academic_year', 'term')
-    )
+    def compute():
+        sessions = (
+            ClassSession.objects.filter(classroom__school=school)
+            .values('academic_year', 'term')
+            .distinct()
+            .order_by('-academic_year', 'term')
+        )
+        return {
+            'sessions': list(sessions),
+            'current_session': school.current_academic_year,
+            'current_term': school.current_term,
+        }
 
-    return Response({
-        'sessions': list(sessions),
-        'current_session': school.current_academic_year,
-        'current_term': school.current_term,
-    })
+    return _snapshot_response(
+        school, 'sessions',
+        {'session': school.current_academic_year, 'term': school.current_term},
+        compute,
+    )
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsProprietorRole])
 def proprietor_performance(request):
     """Performance comparison between terms: pass/fail rates, averages."""
+    from .term_analytics import term_analytics
+
     school = getattr(request, 'school', None)
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -333,50 +377,24 @@ def proprietor_performance(request):
         if not academic_year or not term_name:
             return None
 
-        configs = GradingConfiguration.objects.filter(
-            school=school, academic_year=academic_year, term=term_name
-        )
-        if not configs.exists():
-            return {
-                'session': academic_year, 'term': term_name,
-                'total_students': 0, 'passed': 0, 'failed': 0,
-                'average_score': 0, 'pass_rate': 0,
-            }
-
-        # Get grade summaries that are finalized
-        summaries = GradeSummary.objects.filter(
-            grading_config__in=configs,
-            student__school=school,
-            total_score__isnull=False,
-        )
-
-        # Get unique students with their average total_score
-        student_averages = (
-            summaries.values('student')
-            .annotate(avg_score=Avg('total_score'))
-        )
-
-        total_students = student_averages.count()
-        if total_students == 0:
+        analytics = term_analytics(school, academic_year, term_name)
+        if not analytics or not analytics['overall']['total_students']:
             return {
                 'session': academic_year, 'term': term_name,
                 'total_students': 0, 'passed': 0, 'failed': 0,
                 'average_score': 0, 'pass_rate': 0,
             }
 
-        # Use 40% as default pass mark
-        passed = student_averages.filter(avg_score__gte=40).count()
-        failed = total_students - passed
-        overall_avg = student_averages.aggregate(avg=Avg('avg_score'))['avg'] or 0
-
+        # Students' average total_score over their subjects; 40% is the pass mark
+        overall = analytics['overall']
         return {
             'session': academic_year,
             'term': term_name,
-            'total_students': total_students,
-            'passed': passed,
-            'failed': failed,
-            'average_score': round(overall_avg, 1),
-            'pass_rate': round((passed / total_students) * 100, 1) if total_students > 0 else 0,
+            'total_students': overall['total_students'],
+            'passed': overall['passed'],
+            'failed': overall['failed'],
+            'average_score': overall['average_score'],
+            'pass_rate': overall['pass_rate'],
         }
 
     current = get_term_stats(session, term)
@@ -404,7 +422,10 @@ def proprietor_performance_details(request):
     - Exam vs CA analysis
 
     Supports comparison with another term via compare_session and compare_term params.
+    Each term's breakdowns come from the cached term analytics cube (term_analytics.py).
     """
+    from .term_analytics import comparison_summary, term_analytics
+
     school = getattr(request, 'school', None)
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -414,263 +435,24 @@ def proprietor_performance_details(request):
     compare_session = request.query_params.get('compare_session')
     compare_term = request.query_params.get('compare_term')
 
-    configs = GradingConfiguration.objects.filter(
-        school=school, academic_year=session, term=term
-    )
-
-    empty_response = {
-        'performance_by_class': [],
-        'performance_by_subject': [],
-        'performance_by_department': [],
-        'grade_distribution': [],
-        'top_performers': [],
-        'students_at_risk': [],
-        'performance_trends': [],
-        'teacher_performance': [],
-        'exam_vs_ca': None,
-        'session': session,
-        'term': term,
-        'comparison': None,
-    }
-
-    if not configs.exists():
-        return Response(empty_response)
-
-    # Get all grade summaries for this term
-    summaries = GradeSummary.objects.filter(
-        grading_config__in=configs,
-        student__school=school,
-        total_score__isnull=False
-    ).select_related('student', 'subject', 'grading_config')
-
-    # 1. Performance by Class
-    class_sessions = ClassSession.objects.filter(
-        classroom__school=school,
-        academic_year=session,
-        term=term
-    ).select_related('classroom')
-
-    performance_by_class = []
-    for cs in class_sessions:
-        # Get students in this class
-        student_ids = StudentSession.objects.filter(
-            class_session=cs
-        ).values_list('student_id', flat=True)
-
-        if not student_ids:
-            continue
-
-        # Get their grade summaries
-        class_summaries = summaries.filter(student_id__in=student_ids)
-        if not class_summaries.exists():
-            continue
-
-        # Calculate class stats
-        student_avgs = class_summaries.values('student').annotate(avg=Avg('total_score'))
-        total = student_avgs.count()
-        passed = student_avgs.filter(avg__gte=40).count()
-        avg_score = student_avgs.aggregate(overall=Avg('avg'))['overall'] or 0
-
-        performance_by_class.append({
-            'class_name': cs.classroom.name,
-            'total_students': total,
-            'passed': passed,
-            'failed': total - passed,
-            'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-            'average_score': round(avg_score, 1),
-        })
-
-    # Sort by average score descending
-    performance_by_class.sort(key=lambda x: x['average_score'], reverse=True)
-
-    # 2. Performance by Subject
-    subjects = Subject.objects.filter(
-        class_session__classroom__school=school,
-        class_session__academic_year=session,
-        class_session__term=term
-    ).select_related('teacher')
-
-    performance_by_subject = []
-    subject_stats = {}  # To aggregate by subject name
-
-    for subject in subjects:
-        subject_summaries = summaries.filter(subject=subject)
-        if not subject_summaries.exists():
-            continue
-
-        total = subject_summaries.count()
-        passed = subject_summaries.filter(total_score__gte=40).count()
-        avg_score = subject_summaries.aggregate(avg=Avg('total_score'))['avg'] or 0
-
-        # Aggregate by subject name
-        if subject.name not in subject_stats:
-            subject_stats[subject.name] = {
-                'subject_name': subject.name,
-                'total_students': 0,
-                'passed': 0,
-                'total_score': 0,
-                'count': 0,
-            }
-        subject_stats[subject.name]['total_students'] += total
-        subject_stats[subject.name]['passed'] += passed
-        subject_stats[subject.name]['total_score'] += avg_score * total
-        subject_stats[subject.name]['count'] += total
-
-    for name, stats in subject_stats.items():
-        total = stats['total_students']
-        passed = stats['passed']
-        avg = stats['total_score'] / stats['count'] if stats['count'] > 0 else 0
-        performance_by_subject.append({
-            'subject_name': name,
-            'total_students': total,
-            'passed': passed,
-            'failed': total - passed,
-            'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-            'average_score': round(avg, 1),
-        })
-
-    performance_by_subject.sort(key=lambda x: x['average_score'], reverse=True)
-
-    # 3. Performance by Department
-    performance_by_department = []
-    departments = ['Science', 'Arts', 'Commercial']
-
-    for dept in departments:
-        dept_students = CustomUser.objects.filter(
-            school=school, role='student', is_active=True, department=dept
-        ).values_list('id', flat=True)
-
-        if not dept_students:
-            continue
-
-        dept_summaries = summaries.filter(student_id__in=dept_students)
-        if not dept_summaries.exists():
-            continue
-
-        student_avgs = dept_summaries.values('student').annotate(avg=Avg('total_score'))
-        total = student_avgs.count()
-        passed = student_avgs.filter(avg__gte=40).count()
-        avg_score = student_avgs.aggregate(overall=Avg('avg'))['overall'] or 0
-
-        performance_by_department.append({
-            'department': dept,
-            'total_students': total,
-            'passed': passed,
-            'failed': total - passed,
-            'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-            'average_score': round(avg_score, 1),
-        })
-
-    # 4. Grade Distribution
-    grade_distribution = []
-
-    # Get the grading scale from config
-    config = configs.first()
-    if config and config.grading_scale:
-        scale = config.grading_scale
-        # Build grade ranges from GradingScale model's fields
-        grade_ranges = [
-            ('A', scale.a_min_score, 100),
-            ('B', scale.b_min_score, scale.a_min_score - 1),
-            ('C', scale.c_min_score, scale.b_min_score - 1),
-            ('D', scale.d_min_score, scale.c_min_score - 1),
-            ('F', 0, scale.d_min_score - 1),
-        ]
-
-        for grade, min_s, max_s in grade_ranges:
-            count = summaries.filter(
-                total_score__gte=min_s,
-                total_score__lte=max_s
-            ).count()
-            grade_distribution.append({
-                'grade': grade,
-                'count': count,
-                'min_score': min_s,
-                'max_score': max_s,
-            })
-    else:
-        # Default grade ranges
-        default_ranges = [
-            ('A', 70, 100),
-            ('B', 60, 69),
-            ('C', 50, 59),
-            ('D', 40, 49),
-            ('F', 0, 39),
-        ]
-        for grade, min_s, max_s in default_ranges:
-            count = summaries.filter(
-                total_score__gte=min_s,
-                total_score__lte=max_s
-            ).count()
-            grade_distribution.append({
-                'grade': grade,
-                'count': count,
-                'min_score': min_s,
-                'max_score': max_s,
-            })
-
-    # 5. Top Performers (Top 20 students)
-    student_averages = (
-        summaries.values('student__id', 'student__first_name', 'student__last_name', 'student__department')
-        .annotate(avg_score=Avg('total_score'))
-        .order_by('-avg_score')[:20]
-    )
-
-    top_performers = []
-    for idx, row in enumerate(student_averages):
-        # Get student's class
-        class_name = ''
-        try:
-            ss = StudentSession.objects.filter(
-                student_id=row['student__id'],
-                class_session__academic_year=session,
-                class_session__term=term
-            ).select_related('class_session__classroom').first()
-            if ss:
-                class_name = ss.class_session.classroom.name
-        except:
-            pass
-
-        top_performers.append({
-            'rank': idx + 1,
-            'student_id': row['student__id'],
-            'name': f"{row['student__first_name']} {row['student__last_name']}",
-            'class': class_name,
-            'department': row['student__department'] or '',
-            'average_score': round(row['avg_score'], 1),
-        })
-
-    # 6. Students at Risk (scoring 40-50%)
-    at_risk_students = (
-        summaries.values('student__id', 'student__first_name', 'student__last_name', 'student__department')
-        .annotate(avg_score=Avg('total_score'))
-        .filter(avg_score__gte=40, avg_score__lt=50)
-        .order_by('avg_score')[:20]
-    )
-
-    students_at_risk = []
-    for row in at_risk_students:
-        class_name = ''
-        try:
-            ss = StudentSession.objects.filter(
-                student_id=row['student__id'],
-                class_session__academic_year=session,
-                class_session__term=term
-            ).select_related('class_session__classroom').first()
-            if ss:
-                class_name = ss.class_session.classroom.name
-        except:
-            pass
-
-        students_at_risk.append({
-            'student_id': row['student__id'],
-            'name': f"{row['student__first_name']} {row['student__last_name']}",
-            'class': class_name,
-            'department': row['student__department'] or '',
-            'average_score': round(row['avg_score'], 1),
+    analytics = term_analytics(school, session, term)
+    if not analytics:
+        return Response({
+            'performance_by_class': [],
+            'performance_by_subject': [],
+            'performance_by_department': [],
+            'grade_distribution': [],
+            'top_performers': [],
+            'students_at_risk': [],
+            'performance_trends': [],
+            'teacher_performance': [],
+            'exam_vs_ca': None,
+            'session': session,
+            'term': term,
+            'comparison': None,
         })
 
-    # 7. Performance Trends (across terms)
+    # Performance trends over the last 6 terms, each from its own cached cube
     performance_trends = []
     all_sessions = (
         ClassSession.objects.filter(classroom__school=school)
@@ -686,326 +468,37 @@ def proprietor_performance_details(request):
     )[-6:]  # Last 6 terms
 
     for sess in sorted_sessions:
-        sess_configs = GradingConfiguration.objects.filter(
-            school=school,
-            academic_year=sess['academic_year'],
-            term=sess['term']
-        )
-        if not sess_configs.exists():
+        sess_analytics = term_analytics(school, sess['academic_year'], sess['term'])
+        if not sess_analytics or not sess_analytics['overall']['total_students']:
             continue
 
-        sess_summaries = GradeSummary.objects.filter(
-            grading_config__in=sess_configs,
-            student__school=school,
-            total_score__isnull=False
-        )
-
-        student_avgs = sess_summaries.values('student').annotate(avg=Avg('total_score'))
-        total = student_avgs.count()
-        if total == 0:
-            continue
-
-        passed = student_avgs.filter(avg__gte=40).count()
-        avg_score = student_avgs.aggregate(overall=Avg('avg'))['overall'] or 0
-
+        overall = sess_analytics['overall']
         performance_trends.append({
             'session': sess['academic_year'],
             'term': sess['term'],
             'label': f"{sess['term'][:1]}T {sess['academic_year'].split('/')[0][-2:]}",
-            'pass_rate': round((passed / total) * 100, 1),
-            'average_score': round(avg_score, 1),
-            'total_students': total,
-        })
-
-    # 8. Teacher Performance
-    teacher_performance = []
-    teachers = CustomUser.objects.filter(school=school, role='teacher', is_active=True)
-
-    for teacher in teachers:
-        # Get subjects taught by this teacher
-        teacher_subjects = Subject.objects.filter(
-            teacher=teacher,
-            class_session__academic_year=session,
-            class_session__term=term
-        )
-
-        if not teacher_subjects.exists():
-            continue
-
-        teacher_summaries = summaries.filter(subject__in=teacher_subjects)
-        if not teacher_summaries.exists():
-            continue
-
-        total = teacher_summaries.count()
-        passed = teacher_summaries.filter(total_score__gte=40).count()
-        avg_score = teacher_summaries.aggregate(avg=Avg('total_score'))['avg'] or 0
-
-        teacher_performance.append({
-            'teacher_id': teacher.id,
-            'teacher_name': f"{teacher.first_name} {teacher.last_name}",
-            'subjects_count': teacher_subjects.count(),
-            'students_graded': total,
-            'passed': passed,
-            'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-            'average_score': round(avg_score, 1),
+            'pass_rate': overall['pass_rate'],
+            'average_score': overall['average_score'],
+            'total_students': overall['total_students'],
         })
 
-    teacher_performance.sort(key=lambda x: x['average_score'], reverse=True)
-
-    # 9. Exam vs CA Analysis
-    exam_vs_ca = None
-    if summaries.exists():
-        # Get average exam scores and CA scores
-        agg = summaries.aggregate(
-            avg_exam=Avg('exam_score'),
-            avg_test=Avg('test_score'),
-            avg_assignment=Avg('assignment_score'),
-            avg_attendance=Avg('attendance_score'),
-        )
-
-        # Get the config percentages
-        config = configs.first()
-        exam_pct = config.exam_percentage if config else 60
-        test_pct = config.test_percentage if config else 20
-        assignment_pct = config.assignment_percentage if config else 15
-        attendance_pct = config.attendance_percentage if config else 5
-
-        # Calculate weighted scores (normalize to 100)
-        exam_normalized = (float(agg['avg_exam'] or 0) / exam_pct * 100) if exam_pct > 0 else 0
-        ca_components = []
-        if test_pct > 0 and agg['avg_test']:
-            ca_components.append(float(agg['avg_test']))
-        if assignment_pct > 0 and agg['avg_assignment']:
-            ca_components.append(float(agg['avg_assignment']))
-        if attendance_pct > 0 and agg['avg_attendance']:
-            ca_components.append(float(agg['avg_attendance']))
-
-        ca_total_pct = test_pct + assignment_pct + attendance_pct
-        ca_avg = sum(ca_components)
-        ca_normalized = (ca_avg / ca_total_pct * 100) if ca_total_pct > 0 else 0
-
-        exam_vs_ca = {
-            'exam_average': round(exam_normalized, 1),
-            'ca_average': round(ca_normalized, 1),
-            'exam_weight': exam_pct,
-            'ca_weight': ca_total_pct,
-            'components': {
-                'test': round(float(agg['avg_test'] or 0), 1),
-                'assignment': round(float(agg['avg_assignment'] or 0), 1),
-                'attendance': round(float(agg['avg_attendance'] or 0), 1),
-            },
-            'component_weights': {
-                'test': test_pct,
-                'assignment': assignment_pct,
-                'attendance': attendance_pct,
-            }
-        }
-
-    # Calculate comparison data if comparison parameters provided
+    # Comparison data if comparison parameters provided
     comparison = None
     if compare_session and compare_term:
-        comp_configs = GradingConfiguration.objects.filter(
-            school=school, academic_year=compare_session, term=compare_term
-        )
-
-        if comp_configs.exists():
-            comp_summaries = GradeSummary.objects.filter(
-                grading_config__in=comp_configs,
-                student__school=school,
-                total_score__isnull=False
-            ).select_related('student', 'subject', 'grading_config')
-
-            # Comparison by class
-            comp_class_sessions = ClassSession.objects.filter(
-                classroom__school=school,
-                academic_year=compare_session,
-                term=compare_term
-            ).select_related('classroom')
-
-            comp_by_class = {}
-            for cs in comp_class_sessions:
-                student_ids = StudentSession.objects.filter(
-                    class_session=cs
-                ).values_list('student_id', flat=True)
-
-                if not student_ids:
-                    continue
-
-                class_summaries = comp_summaries.filter(student_id__in=student_ids)
-                if not class_summaries.exists():
-                    continue
-
-                student_avgs = class_summaries.values('student').annotate(avg=Avg('total_score'))
-                total = student_avgs.count()
-                passed = student_avgs.filter(avg__gte=40).count()
-                avg_score = student_avgs.aggregate(overall=Avg('avg'))['overall'] or 0
-
-                comp_by_class[cs.classroom.name] = {
-                    'total_students': total,
-                    'passed': passed,
-                    'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-                    'average_score': round(avg_score, 1),
-                }
-
-            # Comparison by subject
-            comp_subjects = Subject.objects.filter(
-                class_session__classroom__school=school,
-                class_session__academic_year=compare_session,
-                class_session__term=compare_term
-            )
-
-            comp_subject_stats = {}
-            for subject in comp_subjects:
-                subject_summaries = comp_summaries.filter(subject=subject)
-                if not subject_summaries.exists():
-                    continue
-
-                total = subject_summaries.count()
-                passed = subject_summaries.filter(total_score__gte=40).count()
-                avg_score = subject_summaries.aggregate(avg=Avg('total_score'))['avg'] or 0
-
-                if subject.name not in comp_subject_stats:
-                    comp_subject_stats[subject.name] = {
-                        'total_students': 0, 'passed': 0, 'total_score': 0, 'count': 0,
-                    }
-                comp_subject_stats[subject.name]['total_students'] += total
-                comp_subject_stats[subject.name]['passed'] += passed
-                comp_subject_stats[subject.name]['total_score'] += avg_score * total
-                comp_subject_stats[subject.name]['count'] += total
-
-            comp_by_subject = {}
-            for name, stats in comp_subject_stats.items():
-                total = stats['total_students']
-                passed = stats['passed']
-                avg = stats['total_score'] / stats['count'] if stats['count'] > 0 else 0
-                comp_by_subject[name] = {
-                    'total_students': total,
-                    'passed': passed,
-                    'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-                    'average_score': round(avg, 1),
-                }
-
-            # Comparison by department
-            comp_by_department = {}
-            for dept in ['Science', 'Arts', 'Commercial']:
-                dept_students = CustomUser.objects.filter(
-                    school=school, role='student', is_active=True, department=dept
-                ).values_list('id', flat=True)
-
-                if not dept_students:
-                    continue
-
-                dept_summaries = comp_summaries.filter(student_id__in=dept_students)
-                if not dept_summaries.exists():
-                    continue
-
-                student_avgs = dept_summaries.values('student').annotate(avg=Avg('total_score'))
-                total = student_avgs.count()
-                passed = student_avgs.filter(avg__gte=40).count()
-                avg_score = student_avgs.aggregate(overall=Avg('avg'))['overall'] or 0
-
-                comp_by_department[dept] = {
-                    'total_students': total,
-                    'passed': passed,
-                    'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-                    'average_score': round(avg_score, 1),
-                }
-
-            # Comparison grade distribution
-            comp_config = comp_configs.first()
-            comp_grade_dist = {}
-            if comp_config and comp_config.grading_scale:
-                scale = comp_config.grading_scale
-                grade_ranges = [
-                    ('A', scale.a_min_score, 100),
-                    ('B', scale.b_min_score, scale.a_min_score - 1),
-                    ('C', scale.c_min_score, scale.b_min_score - 1),
-                    ('D', scale.d_min_score, scale.c_min_score - 1),
-                    ('F', 0, scale.d_min_score - 1),
-                ]
-            else:
-                grade_ranges = [('A', 70, 100), ('B', 60, 69), ('C', 50, 59), ('D', 40, 49), ('F', 0, 39)]
-
-            for grade, min_s, max_s in grade_ranges:
-                count = comp_summaries.filter(total_score__gte=min_s, total_score__lte=max_s).count()
-                comp_grade_dist[grade] = count
-
-            # Comparison teacher performance
-            comp_by_teacher = {}
-            for teacher in CustomUser.objects.filter(school=school, role='teacher', is_active=True):
-                teacher_subjects = Subject.objects.filter(
-                    teacher=teacher,
-                    class_session__academic_year=compare_session,
-                    class_session__term=compare_term
-                )
-                if not teacher_subjects.exists():
-                    continue
-
-                teacher_summaries = comp_summaries.filter(subject__in=teacher_subjects)
-                if not teacher_summaries.exists():
-                    continue
-
-                total = teacher_summaries.count()
-                passed = teacher_summaries.filter(total_score__gte=40).count()
-                avg_score = teacher_summaries.aggregate(avg=Avg('total_score'))['avg'] or 0
-
-                comp_by_teacher[teacher.id] = {
-                    'pass_rate': round((passed / total) * 100, 1) if total > 0 else 0,
-                    'average_score': round(avg_score, 1),
-                }
-
-            # Comparison exam vs CA
-            comp_exam_vs_ca = None
-            if comp_summaries.exists():
-                agg = comp_summaries.aggregate(
-                    avg_exam=Avg('exam_score'),
-                    avg_test=Avg('test_score'),
-                    avg_assignment=Avg('assignment_score'),
-                    avg_attendance=Avg('attendance_score'),
-                )
-                exam_pct = comp_config.exam_percentage if comp_config else 60
-                test_pct = comp_config.test_percentage if comp_config else 20
-                assignment_pct = comp_config.assignment_percentage if comp_config else 15
-                attendance_pct = comp_config.attendance_percentage if comp_config else 5
-
-                exam_normalized = (float(agg['avg_exam'] or 0) / exam_pct * 100) if exam_pct > 0 else 0
-                ca_components = []
-                if test_pct > 0 and agg['avg_test']:
-                    ca_components.append(float(agg['avg_test']))
-                if assignment_pct > 0 and agg['avg_assignment']:
-                    ca_components.append(float(agg['avg_assignment']))
-                if attendance_pct > 0 and agg['avg_attendance']:
-                    ca_components.append(float(agg['avg_attendance']))
-                ca_total_pct = test_pct + assignment_pct + attendance_pct
-                ca_avg = sum(ca_components)
-                ca_normalized = (ca_avg / ca_total_pct * 100) if ca_total_pct > 0 else 0
-
-                comp_exam_vs_ca = {
-                    'exam_average': round(exam_normalized, 1),
-                    'ca_average': round(ca_normalized, 1),
-                }
-
-            comparison = {
-                'session': compare_session,
-                'term': compare_term,
-                'by_class': comp_by_class,
-                'by_subject': comp_by_subject,
-                'by_department': comp_by_department,
-                'grade_distribution': comp_grade_dist,
-                'by_teacher': comp_by_teacher,
-                'exam_vs_ca': comp_exam_vs_ca,
-            }
+        comp_analytics = term_analytics(school, compare_session, compare_term)
+        if comp_analytics:
+            comparison = comparison_summary(comp_analytics)
 
     return Response({
-        'performance_by_class': performance_by_class,
-        'performance_by_subject': performance_by_subject,
-        'performance_by_department': performance_by_department,
-        'grade_distribution': grade_distribution,
-        'top_performers': top_performers,
-        'students_at_risk': students_at_risk,
+        'performance_by_class': analytics['performance_by_class'],
+        'performance_by_subject': analytics['performance_by_subject'],
+        'performance_by_department': analytics['performance_by_department'],
+        'grade_distribution': analytics['grade_distribution'],
+        'top_performers': analytics['top_performers'],
+        'students_at_risk': analytics['students_at_risk'],
         'performance_trends': performance_trends,
-        'teacher_performance': teacher_performance,
-        'exam_vs_ca': exam_vs_ca,
+        'teacher_performance': analytics['teacher_performance'],
+        'exam_vs_ca': analytics['exam_vs_ca'],
         'session': session,
         'term': term,
         'comparison': comparison,
@@ -1081,6 +574,13 @@ def proprietor_revenue_by_class(request):
             'term': term,
         })
 
+    return _snapshot_response(
+        school, 'revenue_by_class', {'session': session, 'term': term},
+        lambda: _revenue_by_class_snapshot(school, session, term),
+    )
+
+
+def _revenue_by_class_snapshot(school, session, term):
     # Get all classes for this school
     classes = Class.objects.filter(school=school).order_by('name')
 
@@ -1101,7 +601,9 @@ def proprietor_revenue_by_class(request):
             continue
 
         # Get all student fee records for these structures
-        records = StudentFeeRecord.objects.filter(fee_structure__in=fee_structures)
+        records = StudentFeeRecord.objects.filter(
+            fee_structure__in=fee_structures
+        ).select_related('fee_structure')
 
         # Calculate totals
         class_total_fees = 0
@@ -1127,14 +629,14 @@ def proprietor_revenue_by_class(request):
     # Sort by total fees descending for better visualization
     class_revenue.sort(key=lambda x: x['total'], reverse=True)
 
-    return Response({
+    return {
         'classes': class_revenue,
         'total_collected': total_collected,
         'total_outstanding': total_outstanding,
         'total_fees': total_collected + total_outstanding,
         'session': session,
         'term': term,
-    })
+    }
 
 
 @api_view(['GET'])
@@ -1225,16 +727,26 @@ def proprietor_revenue_details(request):
         'unpaid': unpaid,
     }
 
-    # 2. Revenue by Class
+    # 2. Revenue by Class, grouped from the loaded records through the fee-class links
+    from collections import defaultdict
+    records_by_fee = defaultdict(list)
+    for record in records:
+        records_by_fee[record.fee_structure_id].append(record)
+
+    fees_by_class = defaultdict(list)
+    for fee_id, class_id in FeeStructure.classes.through.objects.filter(
+        feestructure__in=fee_structures
+    ).values_list('feestructure_id', 'class_id'):
+        fees_by_class[class_id].append(fee_id)
+
     classes = Class.objects.filter(school=school).order_by('name')
     revenue_by_class = []
 
     for cls in classes:
-        class_structures = fee_structures.filter(classes=cls)
-        if not class_structures.exists():
+        if cls.id not in fees_by_class:
             continue
 
-        class_records = records.filter(fee_structure__in=class_structures)
+        class_records = [r for fee_id in fees_by_class[cls.id] for r in records_by_fee[fee_id]]
         class_expected = sum(float(r.fee_structure.amount) for r in class_records)
         class_collected = sum(float(r.amount_paid) for r in class_records)
         class_outstanding = max(class_expected - class_collected, 0)
@@ -1246,7 +758,7 @@ def proprietor_revenue_details(request):
                 'collected': class_collected,
                 'outstanding': class_outstanding,
                 'collection_rate': round((class_collected / class_expected) * 100, 1),
-                'student_count': class_records.values('student').distinct().count(),
+                'student_count': len({r.student_id for r in class_records}),
             })
 
     revenue_by_class.sort(key=lambda x: x['collected'], reverse=True)
@@ -1260,7 +772,6 @@ def proprietor_revenue_details(request):
     ).order_by('transaction_date')
 
     # Group by date
-    from collections import defaultdict
     daily_collections = defaultdict(float)
     for payment in payment_history:
         date_key = payment.transaction_date.strftime('%Y-%m-%d')
@@ -1274,8 +785,8 @@ def proprietor_revenue_details(request):
     # 4. Fee Type Breakdown
     fee_type_breakdown = []
     for fs in fee_structures:
-        fs_records = records.filter(fee_structure=fs)
-        fs_expected = float(fs.amount) * fs_records.count()
+        fs_records = records_by_fee[fs.id]
+        fs_expected = float(fs.amount) * len(fs_records)
         fs_collected = sum(float(r.amount_paid) for r in fs_records)
 
         fee_type_breakdown.append({
@@ -1283,7 +794,7 @@ def proprietor_revenue_details(request):
             'expected': fs_expected,
             'collected': fs_collected,
             'outstanding': max(fs_expected - fs_collected, 0),
-            'student_count': fs_records.count(),
+            'student_count': len(fs_records),
         })
 
     fee_type_breakdown.sort(key=lambda x: x['expected'], reverse=True)
@@ -1374,7 +885,9 @@ def proprietor_revenue_details(request):
             school=school, academic_year=compare_session, term=compare_term
         )
         if comp_structures.exists():
-            comp_records = StudentFeeRecord.objects.filter(fee_structure__in=comp_structures)
+            comp_records = StudentFeeRecord.objects.filter(
+                fee_structure__in=comp_structures
+            ).select_related('fee_structure')
 
             comp_expected = 0
             comp_collected = 0
@@ -1426,6 +939,8 @@ def proprietor_revenue_details(request):
 @permission_classes([IsAuthenticated, IsProprietorRole])
 def proprietor_attendance_analytics(request):
     """Attendance analytics: average rate, at-risk students, class rankings."""
+    from schooladmin.attendance_stats import term_attendance
+
     school = getattr(request, 'school', None)
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1463,65 +978,33 @@ def proprietor_attendance_analytics(request):
             'term': term,
         })
 
-    # Calculate attendance per class
-    class_attendance = []
-    all_student_rates = []
-    students_at_risk = []
-
-    for cs in class_sessions:
-        # Get all attendance records for this class session
-        records = AttendanceRecord.objects.filter(class_session=cs)
-
-        if not records.exists():
-            continue
-
-        # Get unique students in this class session
-        student_ids = records.values_list('student_id', flat=True).distinct()
-        total_students = len(set(student_ids))
-
-        if total_students == 0:
-            continue
-
-        # Calculate attendance for each student
-        class_total_rate = 0
-        for student_id in set(student_ids):
-            student_records = records.filter(student_id=student_id)
-            total_days = student_records.count()
-            present_days = student_records.filter(is_present=True).count()
-
-            if total_days > 0:
-                rate = (present_days / total_days) * 100
-                all_student_rates.append(rate)
-                class_total_rate += rate
-
-                if rate < pass_threshold:
-                    # Get student info
-                    student = student_records.first().student
-                    students_at_risk.append({
-                        'id': student.id,
-                        'name': f"{student.first_name} {student.last_name}",
-                        'class': cs.classroom.name,
-                        'attendance_rate': round(rate, 1),
-                        'present_days': present_days,
-                        'total_days': total_days,
-                    })
-
-        # Calculate class average
-        class_avg = class_total_rate / total_students if total_students > 0 else 0
-
-        class_attendance.append({
-            'name': cs.classroom.name,
-            'attendance_rate': round(class_avg, 1),
-            'total_students': total_students,
-            'has_departments': cs.classroom.has_departments,
-        })
+    # Per-student and per-class attendance from one grouped query
+    attendance = term_attendance(class_sessions, threshold=pass_threshold)
+    all_student_rates = [s['rate'] for s in attendance['students']]
+    students_at_risk = [
+        {
+            'id': s['student_id'],
+            'name': s['name'],
+            'class': s['class_name'],
+            'attendance_rate': round(s['rate'], 1),
+            'present_days': s['present_days'],
+            'total_days': s['total_days'],
+        }
+        for s in attendance['at_risk']
+    ]
+    class_attendance = [
+        {
+            'name': c['class_session'].classroom.name,
+            'attendance_rate': round(c['rate'], 1),
+            'total_students': c['student_count'],
+            'has_departments': c['class_session'].classroom.has_departments,
+        }
+        for c in attendance['classes']
+    ]
 
     # Sort classes by attendance rate (ascending - lowest first)
     class_attendance.sort(key=lambda x: x['attendance_rate'])
 
-    # Sort at-risk students by attendance rate (ascending)
-    students_at_risk.sort(key=lambda x: x['attendance_rate'])
-
     # Calculate overall average
     overall_average = sum(all_student_rates) / len(all_student_rates) if all_student_rates else 0
 
@@ -1541,6 +1024,8 @@ def proprietor_attendance_analytics(request):
 @permission_classes([IsAuthenticated, IsProprietorRole])
 def proprietor_failed_students(request):
     """Drill-down list of failed students for a given term."""
+    from .term_analytics import term_analytics
+
     school = getattr(request, 'school', None)
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1548,48 +1033,30 @@ def proprietor_failed_students(request):
     session = request.query_params.get('session', school.current_academic_year)
     term = request.query_params.get('term', school.current_term)
 
-    configs = GradingConfiguration.objects.filter(
-        school=school, academic_year=session, term=term
-    )
-
-    if not configs.exists():
+    analytics = term_analytics(school, session, term)
+    if not analytics:
         return Response({'students': []})
 
-    # Get students with average score < 40
-    student_averages = (
-        GradeSummary.objects.filter(
-            grading_config__in=configs,
-            student__school=school,
-            total_score__isnull=False,
-        )
-        .values('student__id', 'student__first_name', 'student__last_name',
-                'student__department')
-        .annotate(avg_score=Avg('total_score'))
-        .filter(avg_score__lt=40)
-        .order_by('avg_score')
-    )
-
-    students = []
-    for row in student_averages:
-        # Get the student's class
-        student_id = row['student__id']
-        class_name = ''
-        try:
-            ss = StudentSession.objects.filter(
-                student_id=student_id, is_active=True
-            ).select_related('class_session__classroom').first()
-            if ss:
-                class_name = ss.class_session.classroom.name
-        except Exception:
-            pass
-
-        students.append({
-            'id': student_id,
-            'name': f"{row['student__first_name']} {row['student__last_name']}",
-            'class': class_name,
-            'department': row['student__department'] or '',
-            'average_score': round(row['avg_score'], 1),
-        })
+    # Students with average score < 40, lowest first
+    failing = analytics['failing_students']
+
+    # Each student's class from their active enrolment
+    active_class = {}
+    for student_id, class_name in StudentSession.objects.filter(
+        student_id__in=[row['student_id'] for row in failing], is_active=True
+    ).values_list('student_id', 'class_session__classroom__name'):
+        active_class.setdefault(student_id, class_name)
+
+    students = [
+        {
+            'id': row['student_id'],
+            'name': row['name'],
+            'class': active_class.get(row['student_id'], ''),
+            'department': row['department'],
+            'average_score': row['average_score'],
+        }
+        for row in failing
+    ]
 
     return Response({'students': students})
 
@@ -1601,6 +1068,8 @@ def proprietor_data_quality(request):
     Data quality metrics that could affect school inspections.
     Returns counts and details of data gaps.
     """
+    from schooladmin.attendance_stats import recorded_days
+
     school = getattr(request, 'school', None)
     if not school:
         return Response({'error': 'School not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1671,19 +1140,14 @@ def proprietor_data_quality(request):
         classes_missing_attendance = 0
         total_missing_days = 0
 
-        for cs in class_sessions:
-            # Get students in this class session
-            student_sessions = StudentSession.objects.filter(
-                class_session=cs, is_active=True
-            )
-            if not student_sessions.exists():
-                continue
-
-            # Check how many days have attendance recorded
-            recorded_dates = AttendanceRecord.objects.filter(
-                class_session=cs
-            ).values('date').distinct().count()
+        # Class sessions with active students, and the days each has attendance recorded
+        enrolled_sessions = set(StudentSession.objects.filter(
+            class_session__in=class_sessions, is_active=True
+        ).values_list('class_session_id', flat=True))
+        days_recorded = recorded_days(enrolled_sessions)
 
+        for cs_id in enrolled_sessions:
+            recorded_dates = days_recorded.get(cs_id, 0)
             if recorded_dates < total_school_days:
                 classes_missing_attendance += 1
                 total_missing_days += (total_school_days - recorded_dates)
@@ -1875,6 +1339,8 @@ def proprietor_attendance_details(request):
 
     from attendance.models import AttendanceCalendar, AttendanceSchoolDay
     from collections import defaultdict
+    from schooladmin.attendance_stats import daily_counts as attendance_daily_counts
+    from schooladmin.attendance_stats import term_attendance, term_totals
 
     empty_response = {
         'overview': {
@@ -1918,58 +1384,38 @@ def proprietor_attendance_details(request):
     except AttendanceCalendar.DoesNotExist:
         pass
 
-    # Calculate attendance metrics
-    all_student_data = []  # List of (student_id, name, class, rate, present, total)
-    class_attendance = []
+    # Per-student and per-class attendance from one grouped query
+    attendance = term_attendance(class_sessions)
+    all_student_data = [
+        {
+            'student_id': s['student_id'],
+            'name': s['name'],
+            'class_name': s['class_name'],
+            'rate': round(s['rate'], 1),
+            'present_days': s['present_days'],
+            'total_days': s['total_days'],
+        }
+        for s in attendance['students']
+    ]
+    class_attendance = [
+        {
+            'class_name': c['class_session'].classroom.name,
+            'attendance_rate': round(c['rate'], 1),
+            'student_count': c['student_count'],
+        }
+        for c in attendance['classes']
+    ]
+
+    # Daily and weekly patterns from per-date totals
     daily_counts = defaultdict(lambda: {'present': 0, 'total': 0})
     weekly_counts = defaultdict(lambda: {'present': 0, 'total': 0})
-
-    for cs in class_sessions:
-        records = AttendanceRecord.objects.filter(class_session=cs)
-        if not records.exists():
-            continue
-
-        student_ids = records.values_list('student_id', flat=True).distinct()
-        class_total_rate = 0
-        class_student_count = 0
-
-        for student_id in set(student_ids):
-            student_records = records.filter(student_id=student_id)
-            total_days = student_records.count()
-            present_days = student_records.filter(is_present=True).count()
-
-            if total_days > 0:
-                rate = (present_days / total_days) * 100
-                student = student_records.first().student
-                all_student_data.append({
-                    'student_id': student_id,
-                    'name': f"{student.first_name} {student.last_name}",
-                    'class_name': cs.classroom.name,
-                    'rate': round(rate, 1),
-                    'present_days': present_days,
-                    'total_days': total_days,
-                })
-                class_total_rate += rate
-                class_student_count += 1
-
-        # Daily and weekly patterns
-        for record in records:
-            date_key = record.date.strftime('%Y-%m-%d')
-            day_name = record.date.strftime('%A')
-            daily_counts[date_key]['total'] += 1
-            weekly_counts[day_name]['total'] += 1
-            if record.is_present:
-                daily_counts[date_key]['present'] += 1
-                weekly_counts[day_name]['present'] += 1
-
-        # Class average
-        if class_student_count > 0:
-            class_avg = class_total_rate / class_student_count
-            class_attendance.append({
-                'class_name': cs.classroom.name,
-                'attendance_rate': round(class_avg, 1),
-                'student_count': class_student_count,
-            })
+    for date, (present, total) in attendance_daily_counts(cs.id for cs in class_sessions).items():
+        date_key = date.strftime('%Y-%m-%d')
+        day_name = date.strftime('%A')
+        daily_counts[date_key]['total'] += total
+        daily_counts[date_key]['present'] += present
+        weekly_counts[day_name]['total'] += total
+        weekly_counts[day_name]['present'] += present
 
     # Sort classes by attendance rate
     class_attendance.sort(key=lambda x: x['attendance_rate'], reverse=True)
@@ -2039,18 +1485,9 @@ def proprietor_attendance_details(request):
         key=lambda x: (x['academic_year'], term_order.get(x['term'], 0))
     )[-6:]
 
+    totals_by_term = term_totals(school)
     for sess in sorted_sessions:
-        sess_cs = ClassSession.objects.filter(
-            classroom__school=school,
-            academic_year=sess['academic_year'],
-            term=sess['term']
-        )
-        total_present = 0
-        total_records = 0
-        for cs in sess_cs:
-            records = AttendanceRecord.objects.filter(class_session=cs)
-            total_records += records.count()
-            total_present += records.filter(is_present=True).count()
+        total_present, total_records = totals_by_term.get((sess['academic_year'], sess['term']), (0, 0))
 
         if total_records > 0:
             rate = (total_present / total_records) * 100
@@ -2069,22 +1506,9 @@ def proprietor_attendance_details(request):
             academic_year=compare_session,
             term=compare_term
         )
-        comp_total_present = 0
-        comp_total_records = 0
-        comp_student_rates = []
-
-        for cs in comp_cs:
-            records = AttendanceRecord.objects.filter(class_session=cs)
-            comp_total_records += records.count()
-            comp_total_present += records.filter(is_present=True).count()
-
-            student_ids = records.values_list('student_id', flat=True).distinct()
-            for student_id in set(student_ids):
-                student_records = records.filter(student_id=student_id)
-                total_days = student_records.count()
-                present_days = student_records.filter(is_present=True).count()
-                if total_days > 0:
-                    comp_student_rates.append((present_days / total_days) * 100)
+        comp_students = term_attendance(comp_cs.select_related('classroom'))['students']
+        comp_total_records = sum(s['total_days'] for s in comp_students)
+        comp_student_rates = [s['rate'] for s in comp_students]
 
         if comp_total_records > 0:
             comp_avg_rate = sum(comp_student_rates) / len(comp_student_rates) if comp_student_rates else 0
@@ -2139,6 +1563,14 @@ def proprietor_staff_enrollment(request):
     compare_session = request.query_params.get('compare_session')
     compare_term = request.query_params.get('compare_term')
 
+    return _snapshot_response(
+        school, 'staff_enrollment',
+        {'session': session, 'term': term, 'compare_session': compare_session, 'compare_term': compare_term},
+        lambda: _staff_enrollment_snapshot(school, session, term, compare_session, compare_term),
+    )
+
+
+def _staff_enrollment_snapshot(school, session, term, compare_session, compare_term):
     # ==================== STAFF OVERVIEW ====================
 
     # Count staff by role
@@ -2387,7 +1819,7 @@ def proprietor_staff_enrollment(request):
             'inactive_teachers': comp_inactive_teachers,
         }
 
-    return Response({
+    return {
         'staff_overview': staff_overview,
         'teacher_workload': teacher_workload[:20],
         'teachers_without_subjects': teachers_without_subjects,
@@ -2400,6 +1832,4 @@ def proprietor_staff_enrollment(request):
         'comparison': comparison,
         'session': session,
         'term': term,
-    })
-
-
+    }
@@ -0,0 +1,108 @@
+"""
+Per-school daily email quota.
+
+Subscription.emails_sent_today is only ever changed here, with single UPDATE
+statements whose conditions are on the subscription row alone (the plan's
+limit is read first), so concurrent workers cannot over-send and never hold
+the subscription row for longer than one statement. The counter rolls over to a
+new day inside the same statement that reserves. Subscription.save() leaves the
+counter fields out of its UPDATE, so saving an instance loaded earlier does not
+undo reservations made since.
+
+    from tenants.quota import reserve, release
+
+    granted = reserve(school, len(recipients))   # one round-trip for the batch
+    ...send to recipients[:granted]...
+    release(school, failed_count)                # give back what was not sent
+"""
+
+import logging
+
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _school_id(school):
+    return getattr(school, 'pk', school)
+
+
+def sent_today(subscription):
+    """Emails counted against today's quota (the stored counter may be from an earlier day)."""
+    if subscription.email_counter_reset_date != timezone.now().date():
+        return 0
+    return subscription.emails_sent_today
+
+
+def remaining(subscription):
+    """Emails the school may still send today, or None when the plan is unlimited. Read-only."""
+    plan = getattr(subscription, 'plan', None)
+    if not plan or plan.max_daily_emails == 0:
+        return None
+    return max(0, plan.max_daily_emails - sent_today(subscription))
+
+
+def reserve(school, n=1):
+    """
+    Reserve up to n emails from the school's quota for today.
+
+    Returns how many were granted (0..n); callers send that many and release()
+    any they end up not sending. Schools without a subscription are not limited.
+    """
+    from .models import Subscription
+
+    if n <= 0:
+        return 0
+
+    today = timezone.now().date()
+    rows = Subscription.objects.filter(school_id=_school_id(school))
+    subscription = rows.select_related('plan').first()
+    if subscription is None:
+        return n
+    new_day = Q(email_counter_reset_date__lt=today)
+    counted = {
+        'emails_sent_today': Case(When(new_day, then=Value(n)), default=F('emails_sent_today') + n),
+        'email_counter_reset_date': today,
+    }
+
+    # The limit is read first so the UPDATE below only has conditions on the subscription
+    # row itself: Postgres re-evaluates those against the row a concurrent reserve() left
+    # behind, which it would not do for a condition in a joined subquery.
+    limit = subscription.plan.max_daily_emails
+    if limit == 0:
+        rows.update(**counted)
+        return n
+
+    # Whole batch fits: one conditional UPDATE, including day rollover
+    if n <= limit and rows.filter(new_day | Q(emails_sent_today__lte=limit - n)).update(**counted):
+        return n
+
+    # Partial fit: grant what is left with a compare-and-swap on the counter
+    subscription.refresh_from_db(fields=['emails_sent_today', 'email_counter_reset_date'])
+    for _ in range(5):
+        current = sent_today(subscription)
+        granted = min(n, max(0, limit - current))
+        if granted == 0:
+            break
+        if rows.filter(
+            email_counter_reset_date=subscription.email_counter_reset_date,
+            emails_sent_today=subscription.emails_sent_today,
+        ).update(emails_sent_today=current + granted, email_counter_reset_date=today):
+            return granted
+        subscription.refresh_from_db(fields=['emails_sent_today', 'email_counter_reset_date'])
+
+    logger.warning(f"Email limit reached for school {_school_id(school)}: {n} email(s) not reserved")
+    return 0
+
+
+def release(school, n):
+    """Give back n reserved emails that were not sent. Reservations from an earlier day are dropped."""
+    from .models import Subscription
+
+    if n <= 0:
+        return
+    Subscription.objects.filter(
+        school_id=_school_id(school), email_counter_reset_date=timezone.now().date(),
+    ).update(emails_sent_today=Greatest(F('emails_sent_today') - n, 0))
@@ -0,0 +1,341 @@
+"""
+Bulk report card export for the school portal.
+
+Contexts are precomputed class by class with the report engine (three queries
+per class instead of hundreds per student), PDFs are rendered across a process
+pool, and finished entries are written into a ZIP as they complete, either
+streamed straight to the client or, for background exports, built by the job
+worker and picked up later with a download token. Only a bounded number of PDFs is ever held in memory, and
+progress is recorded on the ReportCardExport row for the portal to poll.
+"""
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Save progress to the database every N finished report cards
+PROGRESS_EVERY = 10
+
+# Background export files are kept this long before being swept
+EXPORT_FILE_TTL = timedelta(hours=24)
+
+
+def export_workers():
+    """Number of PDF render processes (REPORT_CARD_EXPORT_WORKERS, default up to 4)."""
+    configured = getattr(settings, 'REPORT_CARD_EXPORT_WORKERS', None)
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _entry_name(student, config):
+    return f"{student.username}_{config.academic_year}_{config.term}".replace('/', '-').replace(' ', '_') + '.pdf'
+
+
+def _class_sessions_for(school, config, student_id=None):
+    from academics.models import ClassSession
+    class_sessions = ClassSession.objects.filter(
+        classroom__school=school,
+        academic_year=config.academic_year,
+        term=config.term,
+    ).select_related('classroom')
+    if student_id:
+        class_sessions = class_sessions.filter(enrolled_students__student_id=student_id).distinct()
+    return class_sessions
+
+
+def count_report_cards(school, configs, student_id=None):
+    """Number of report cards an export will contain (one count query)."""
+    from django.db.models import Q
+    from academics.models import StudentSession
+
+    if not configs:
+        return 0
+    terms = Q()
+    for config in configs:
+        terms |= Q(class_session__academic_year=config.academic_year, class_session__term=config.term)
+    enrolments = StudentSession.objects.filter(
+        terms,
+        class_session__classroom__school=school,
+        student__school=school,
+        student__role='student',
+    )
+    if student_id:
+        enrolments = enrolments.filter(student_id=student_id)
+    return enrolments.count()
+
+
+def iter_report_card_contexts(school, configs, student_id=None):
+    """
+    Yield (zip entry name, context) for every report card in the selection,
+    computing each class once with the report engine. Photos are not fetched
+    here; render_report_card does that in the worker process.
+    """
+    from schooladmin.pdf_generator import build_student_report_context, load_logo_data_uri
+    from schooladmin.report_engine import build_class_report
+
+    logo_url = load_logo_data_uri()
+
+    for config in configs:
+        for class_session in _class_sessions_for(school, config, student_id):
+            class_report = build_class_report(class_session, config)
+            for student_report in class_report.students.values():
+                student = student_report.student
+                if student_id and str(student.id) != str(student_id):
+                    continue
+                if student.school_id != school.id or student.role != 'student':
+                    continue
+                context = build_student_report_context(
+                    school, student, config.academic_year, config.term,
+                    class_report=class_report, embed_photo=False, logo_url=logo_url,
+                )
+                if context is not None:
+                    yield _entry_name(student, config), context
+
+
+def render_report_cards(entries, workers=None):
+    """
+    Render (name, context) pairs to (name, pdf_bytes or None) as they finish.
+
+    Uses a process pool with at most 2 × workers renders in flight, so memory
+    stays bounded no matter how many report cards are exported.
+    """
+    from schooladmin.pdf_generator import render_report_card
+
+    workers = workers or export_workers()
+
+    if workers == 1:
+        for name, context in entries:
+            try:
+                yield name, render_report_card(context)
+            except Exception as e:
+                logger.warning(f'Report card render failed for {name}: {e}')
+                yield name, None
+        return
+
+    max_in_flight = workers * 2
+    entries = iter(entries)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    name, context = next(entries)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[pool.submit(render_report_card, context)] = name
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = in_flight.pop(future)
+                try:
+                    yield name, future.result()
+                except Exception as e:
+                    logger.warning(f'Report card render failed for {name}: {e}')
+                    yield name, None
+
+
+class _ZipStream:
+    """
+    Write-only file object for zipfile that hands written bytes to the caller.
+    It reports tell() but cannot seek, so zipfile writes data descriptors and
+    never needs to go back over entries it has already emitted.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _ProgressRecorder:
+    """Batches progress writes to the ReportCardExport row."""
+
+    def __init__(self, export):
+        self.export = export
+        self.pending = 0
+
+    def record(self, ok):
+        if ok:
+            self.export.completed += 1
+        else:
+            self.export.failed += 1
+        self.pending += 1
+        if self.pending >= PROGRESS_EVERY:
+            self.save()
+
+    def save(self, **extra):
+        from .models import ReportCardExport
+        self.pending = 0
+        ReportCardExport.objects.filter(id=self.export.id).update(
+            completed=self.export.completed,
+            failed=self.export.failed,
+            **extra,
+        )
+
+
+def _selection(export):
+    from schooladmin.models import GradingConfiguration
+    config_ids = export.params.get('config_ids', [])
+    configs = list(GradingConfiguration.objects.filter(id__in=config_ids).order_by('academic_year', 'term'))
+    return configs, export.params.get('student_id')
+
+
+def start_export(school, configs, student_id=None, portal_user=None, background=False):
+    """Create the ReportCardExport record for a selection and count its report cards."""
+    from .models import ReportCardExport
+
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ReportCardExport.objects.create(
+        school=school,
+        requested_by=portal_user,
+        params={'config_ids': [c.id for c in configs], 'student_id': student_id},
+        is_background=background,
+        total=count_report_cards(school, configs, student_id),
+        filename=f"{school.slug}_report_cards_{ts}.zip",
+    )
+
+
+def stream_export(export):
+    """
+    Generator of ZIP bytes for StreamingHttpResponse. Each finished PDF is
+    compressed and yielded immediately.
+    """
+    configs, student_id = _selection(export)
+    progress = _ProgressRecorder(export)
+    progress.save(status='running')
+
+    sink = _ZipStream()
+    try:
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zf:
+            entries = iter_report_card_contexts(export.school, configs, student_id)
+            for name, pdf in render_report_cards(entries):
+                if pdf is not None:
+                    zf.writestr(name, pdf)
+                progress.record(pdf is not None)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        yield sink.drain()
+        progress.save(status='completed', finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f'Report card export {export.id} failed: {e}')
+        progress.save(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+
+
+def run_export_to_file(export_id):
+    """
+    Build a background export into a temp file, then move it to private job
+    storage where the download endpoint picks it up with the export token.
+    """
+    from django.core.files import File
+    from schooladmin.jobs import result_storage
+    from .models import ReportCardExport
+
+    export = ReportCardExport.objects.select_related('school').get(id=export_id)
+    configs, student_id = _selection(export)
+    export.completed = export.failed = 0
+    progress = _ProgressRecorder(export)
+    progress.save(status='running', error='')
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            entries = iter_report_card_contexts(export.school, configs, student_id)
+            for name, pdf in render_report_cards(entries):
+                if pdf is not None:
+                    zf.writestr(name, pdf)
+                progress.record(pdf is not None)
+
+        with open(tmp_path, 'rb') as f:
+            stored = result_storage().save(f'report_cards/{export.school.slug}/{export.id}.zip', File(f))
+        progress.save(status='completed', file_path=stored, finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f'Report card export {export.id} failed: {e}')
+        progress.save(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+    finally:
+        os.remove(tmp_path)
+
+
+def run_report_card_export(request):
+    """Background job handler for mode=background exports (see schooladmin/jobs.py)."""
+    run_export_to_file(request.data['export_id'])
+    return {'export_id': request.data['export_id']}
+
+
+def start_background_export(export):
+    """Queue a background export on the job worker."""
+    from schooladmin.jobs import enqueue_job
+
+    sweep_expired_exports()
+    return enqueue_job(
+        'report_card_export',
+        export.school,
+        params={'export_id': str(export.id)},
+        portal_user=export.requested_by,
+    )
+
+
+def sweep_expired_exports():
+    """Delete export files (and records) older than EXPORT_FILE_TTL."""
+    from schooladmin.jobs import result_storage
+    from .models import ReportCardExport
+
+    cutoff = timezone.now() - EXPORT_FILE_TTL
+    expired = ReportCardExport.objects.filter(created_at__lt=cutoff)
+    storage = result_storage()
+    for name in expired.exclude(file_path='').values_list('file_path', flat=True):
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f'Could not delete report card export {name}: {e}')
+    expired.delete()
+
+
+def export_progress(export):
+    """Serialisable progress snapshot for the polling endpoint."""
+    processed = export.completed + export.failed
+    return {
+        'token': str(export.id),
+        'status': export.status,
+        'total': export.total,
+        'completed': export.completed,
+        'failed': export.failed,
+        'percent': round(processed * 100 / export.total, 1) if export.total else 100.0,
+        'is_background': export.is_background,
+        'download_ready': export.is_background and export.status == 'completed',
+        'filename': export.filename,
+        'error': export.error or None,
+        'created_at': export.created_at,
+        'finished_at': export.finished_at,
+    }
@@ -0,0 +1,120 @@
+"""
+Request path classification shared by TenantMiddleware and
+SubscriptionValidationMiddleware.
+
+Each pattern list is compiled once into a single alternation. classify()
+parses a path once, and TenantMiddleware stores the result on request.route
+so SubscriptionValidationMiddleware does not match the path again. Results
+are memoised per path, because the frontend polls the same URLs over and
+over.
+"""
+import re
+from functools import lru_cache
+
+
+# Routes that don't require tenant context
+PUBLIC_ROUTES = [
+    r'^/api/public/',
+    r'^/api/webhooks/',
+    r'^/api/token/',
+    r'^/api/portal/',
+    r'^/api/superadmin/',
+    r'^/api/onboarding/',
+    r'^/admin/',
+    r'^/static/',
+    r'^/media/',
+    r'^/__debug__/',
+    # Unauthenticated routes (email verification, password reset)
+    r'^/api/users/verify-email/',
+    r'^/api/users/verify-and-change-password/',
+    r'^/api/users/token-branding/',
+    r'^/api/users/resend-verification/',
+    r'^/api/users/forgot-password/',
+    r'^/api/users/reset-password/',
+]
+
+# Legacy routes that should redirect (for backwards compatibility)
+LEGACY_ROUTE_PATTERNS = [
+    r'^/api/users/',
+    r'^/api/academics/',
+    r'^/api/attendance/',
+    r'^/api/schooladmin/',
+    r'^/api/admin/',
+    r'^/api/logs/',
+]
+
+# First path segment after /api/ that is never a school slug
+NON_TENANT_SLUGS = frozenset(['public', 'webhooks', 'token', 'portal', 'superadmin', 'admin', 'onboarding'])
+
+# Routes that require active subscription
+SUBSCRIPTION_REQUIRED_PATTERNS = [
+    r'^/api/[a-z0-9-]+/users/',
+    r'^/api/[a-z0-9-]+/academics/',
+    r'^/api/[a-z0-9-]+/attendance/',
+    r'^/api/[a-z0-9-]+/schooladmin/',
+    r'^/api/[a-z0-9-]+/admin/',
+    r'^/api/[a-z0-9-]+/logs/',
+]
+
+# Routes exempt from subscription check (billing, viewing plans, etc.)
+SUBSCRIPTION_EXEMPT_PATTERNS = [
+    r'^/api/[a-z0-9-]+/subscription/',
+    r'^/api/[a-z0-9-]+/billing/',
+]
+
+
+def _compile_any(patterns):
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+_PUBLIC_RE = _compile_any(PUBLIC_ROUTES)
+_LEGACY_RE = _compile_any(LEGACY_ROUTE_PATTERNS)
+_TENANT_RE = re.compile(r'^/api/([a-z0-9-]+)/')
+_SUBSCRIPTION_REQUIRED_RE = _compile_any(SUBSCRIPTION_REQUIRED_PATTERNS)
+_SUBSCRIPTION_EXEMPT_RE = _compile_any(SUBSCRIPTION_EXEMPT_PATTERNS)
+
+
+class Route:
+    """What the middlewares need to know about a request path."""
+
+    PUBLIC = 'public'    # no tenant context
+    LEGACY = 'legacy'    # /api/<app>/..., school comes from the JWT user
+    TENANT = 'tenant'    # /api/<school_slug>/...
+    OTHER = 'other'      # anything else, passed through
+
+    __slots__ = ('kind', 'school_slug', 'requires_subscription')
+
+    def __init__(self, kind, school_slug=None, requires_subscription=False):
+        self.kind = kind
+        self.school_slug = school_slug
+        self.requires_subscription = requires_subscription
+
+    def __repr__(self):
+        return f'Route({self.kind}, {self.school_slug}, requires_subscription={self.requires_subscription})'
+
+
+@lru_cache(maxsize=4096)
+def classify(path):
+    """Classify a request path. The result is shared between requests, so treat it as read-only."""
+    requires_subscription = bool(
+        _SUBSCRIPTION_REQUIRED_RE.match(path) and not _SUBSCRIPTION_EXEMPT_RE.match(path)
+    )
+
+    if _PUBLIC_RE.match(path):
+        return Route(Route.PUBLIC, requires_subscription=requires_subscription)
+    if _LEGACY_RE.match(path):
+        return Route(Route.LEGACY, requires_subscription=requires_subscription)
+
+    match = _TENANT_RE.match(path)
+    if match and match.group(1) not in NON_TENANT_SLUGS:
+        return Route(Route.TENANT, match.group(1), requires_subscription)
+    return Route(Route.OTHER, requires_subscription=requires_subscription)
+
+
+def get_route(request):
+    """The request's Route, classifying the path on first use."""
+    route = getattr(request, 'route', None)
+    if route is None:
+        route = classify(request.path)
+        request.route = route
+    return route
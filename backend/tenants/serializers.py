@@ -180,9 +180,9 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return obj.can_send_email()
 
     def get_emails_remaining_today(self, obj):
-        if obj.plan.max_daily_emails == 0:
-            return -1  # Unlimited
-        return max(0, obj.plan.max_daily_emails - obj.emails_sent_today)
+        from .quota import remaining
+        left = remaining(obj)
+        return -1 if left is None else left  # -1 = unlimited
 
     def get_is_in_grace_period(self, obj):
         return obj.is_in_grace_period()
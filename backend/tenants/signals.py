@@ -1,7 +1,8 @@
 """
 Django signals for tenant-related events.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
@@ -113,22 +114,114 @@ def _handle_trial_to_active(subscription):
         pass
 
 
-@receiver(pre_save, sender=Subscription)
-def reset_email_counter(sender, instance, **kwargs):
-    """
-    Reset daily email counter if date has changed.
-    """
-    today = timezone.now().date()
-
-    # Handle case where email_counter_reset_date might be None or a datetime
-    if instance.email_counter_reset_date:
-        reset_date = instance.email_counter_reset_date
-        # Convert datetime to date if needed
-        if hasattr(reset_date, 'date'):
-            reset_date = reset_date.date()
-
-        if reset_date < today:
-            instance.emails_sent_today = 0
-            instance.email_counter_reset_date = today
-    else:
-        instance.email_counter_reset_date = today
+# ============================================================================
+# TENANT CACHE INVALIDATION (see tenants/tenant_cache.py)
+# ============================================================================
+
+def _invalidate_now_and_on_commit(func, *args):
+    # Again after commit, so a request racing the transaction cannot re-cache the old row
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def invalidate_school_cache(sender, instance, **kwargs):
+    from .tenant_cache import invalidate_school
+    _invalidate_now_and_on_commit(invalidate_school, instance.pk, instance.slug)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_cache(sender, instance, **kwargs):
+    from .tenant_cache import invalidate_school
+    _invalidate_now_and_on_commit(invalidate_school, instance.school_id)
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+def invalidate_plan_cache(sender, instance, **kwargs):
+    from .tenant_cache import invalidate_plan
+    _invalidate_now_and_on_commit(invalidate_plan, instance.pk)
+
+
+# ============================================================================
+# PROPRIETOR SNAPSHOT INVALIDATION (see tenants/dashboard_cache.py)
+# ============================================================================
+
+# CustomUser saves that touch only these fields change nothing a snapshot shows
+_SNAPSHOT_IGNORED_USER_FIELDS = frozenset({
+    'last_login', 'password', 'avatar', 'profile_picture', 'must_change_password',
+    'email_verification_token', 'email_verification_sent_at',
+    'password_reset_token', 'password_reset_sent_at',
+})
+
+
+def _bump_snapshots(school_id):
+    from .dashboard_cache import bump_on_commit
+    bump_on_commit(school_id)
+
+
+def _school_through(instance, relation, queryset):
+    """school_id of a related row: from the loaded relation when there is one, else one query."""
+    descriptor = getattr(type(instance), relation)
+    if descriptor.is_cached(instance):
+        related = getattr(instance, relation)
+        return related.school_id if related is not None else None
+    return queryset.filter(pk=getattr(instance, f'{relation}_id')).values_list('school_id', flat=True).first()
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def bump_snapshots_for_school(sender, instance, **kwargs):
+    _bump_snapshots(instance.pk)
+
+
+@receiver(post_save, sender='users.CustomUser')
+@receiver(post_delete, sender='users.CustomUser')
+def bump_snapshots_for_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= _SNAPSHOT_IGNORED_USER_FIELDS:
+        return
+    _bump_snapshots(instance.school_id)
+
+
+@receiver(post_save, sender='academics.StudentSession')
+@receiver(post_delete, sender='academics.StudentSession')
+def bump_snapshots_for_enrolment(sender, instance, **kwargs):
+    from users.models import CustomUser
+    _bump_snapshots(_school_through(instance, 'student', CustomUser.objects))
+
+
+@receiver(post_save, sender='academics.ClassSession')
+@receiver(post_delete, sender='academics.ClassSession')
+def bump_snapshots_for_class_session(sender, instance, **kwargs):
+    from academics.models import Class
+    _bump_snapshots(_school_through(instance, 'classroom', Class.objects))
+
+
+@receiver(post_save, sender='academics.Subject')
+@receiver(post_delete, sender='academics.Subject')
+def bump_snapshots_for_subject(sender, instance, **kwargs):
+    from academics.models import ClassSession
+    _bump_snapshots(
+        ClassSession.objects.filter(pk=instance.class_session_id).values_list('classroom__school_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender='schooladmin.FeeStructure')
+@receiver(post_delete, sender='schooladmin.FeeStructure')
+def bump_snapshots_for_fee_structure(sender, instance, **kwargs):
+    _bump_snapshots(instance.school_id)
+
+
+@receiver(post_save, sender='schooladmin.StudentFeeRecord')
+@receiver(post_delete, sender='schooladmin.StudentFeeRecord')
+def bump_snapshots_for_fee_record(sender, instance, **kwargs):
+    from schooladmin.models import FeeStructure
+    _bump_snapshots(_school_through(instance, 'fee_structure', FeeStructure.objects))
+
+
+@receiver(post_save, sender='schooladmin.GradeSummary')
+@receiver(post_delete, sender='schooladmin.GradeSummary')
+def bump_snapshots_for_grades(sender, instance, **kwargs):
+    from schooladmin.models import GradingConfiguration
+    _bump_snapshots(_school_through(instance, 'grading_config', GradingConfiguration.objects))
@@ -0,0 +1,116 @@
+"""
+Cache of resolved tenants for TenantMiddleware.
+
+A School is looked up with its Subscription and SubscriptionPlan on every API
+request. The resolved row is pickled once and kept in two tiers:
+
+- an in-process dict (TENANT_CACHE_LOCAL_TTL seconds), so a warm worker
+  resolves the tenant without touching the network or the database;
+- Django's cache (TENANT_CACHE_TTL seconds), shared between workers when
+  CACHES points at a shared backend.
+
+Every lookup returns a fresh unpickled instance, so a view that changes
+request.school or request.subscription cannot leak into other requests.
+post_save/post_delete signals on School, Subscription and SubscriptionPlan
+(tenants/signals.py) call invalidate_school / invalidate_plan. Other workers
+drop their in-process copy after at most TENANT_CACHE_LOCAL_TTL seconds.
+
+Subscription.emails_sent_today is changed with plain UPDATEs
+(tenants/quota.py), so the snapshot's counter can be a little stale. That is
+fine for display. The quota itself is always enforced in the database.
+"""
+
+import pickle
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+_local = {}
+_local_lock = threading.Lock()
+_LOCAL_MAX_ENTRIES = 2048
+_MISSING = b''
+
+
+def _ttl():
+    return getattr(settings, 'TENANT_CACHE_TTL', 60)
+
+
+def _local_ttl():
+    return getattr(settings, 'TENANT_CACHE_LOCAL_TTL', 5)
+
+
+def _slug_key(slug):
+    return f'tenant:school:slug:{slug}'
+
+
+def _id_key(school_id):
+    return f'tenant:school:id:{school_id}'
+
+
+def _local_get(key):
+    entry = _local.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _local_set(key, payload):
+    with _local_lock:
+        if len(_local) >= _LOCAL_MAX_ENTRIES:
+            _local.clear()
+        _local[key] = (time.monotonic() + _local_ttl(), payload)
+
+
+def _load(key, query):
+    payload = _local_get(key)
+    if payload is None:
+        payload = cache.get(key)
+        if payload is None:
+            school = query().first()
+            payload = pickle.dumps(school) if school is not None else _MISSING
+            cache.set(key, payload, _ttl())
+        _local_set(key, payload)
+    return pickle.loads(payload) if payload else None
+
+
+def _queryset():
+    from .models import School
+    return School.objects.select_related('subscription', 'subscription__plan')
+
+
+def get_school_by_slug(slug):
+    """The School for a URL slug (subscription and plan preloaded), or None."""
+    return _load(_slug_key(slug), lambda: _queryset().filter(slug=slug))
+
+
+def get_school_by_id(school_id):
+    """The School with this primary key (subscription and plan preloaded), or None."""
+    return _load(_id_key(school_id), lambda: _queryset().filter(pk=school_id))
+
+
+def invalidate_school(school_id, slug=None):
+    """Forget a school's cached snapshot (both tiers in this process, the shared tier everywhere)."""
+    if slug is None:
+        from .models import School
+        slug = School.objects.filter(pk=school_id).values_list('slug', flat=True).first()
+    keys = [_id_key(school_id)]
+    if slug:
+        keys.append(_slug_key(slug))
+    with _local_lock:
+        for key in keys:
+            _local.pop(key, None)
+    cache.delete_many(keys)
+
+
+def invalidate_plan(plan_id):
+    """Forget every school on a plan after the plan's limits change."""
+    from .models import School
+    for school_id, slug in School.objects.filter(subscription__plan_id=plan_id).values_list('id', 'slug'):
+        invalidate_school(school_id, slug)
+
+
+def clear_local():
+    with _local_lock:
+        _local.clear()
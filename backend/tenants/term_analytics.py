@@ -0,0 +1,357 @@
+"""
+Term analytics cube behind the proprietor performance dashboards
+(tenants/proprietor_views.py).
+
+All of a term's GradeSummary rows are read with one query into NumPy columns:
+student and subject codes, and one float column per score component. Student
+averages are a single bincount over the student codes; class, subject,
+department and teacher breakdowns, the grade distribution, top performers,
+at-risk and failing students and exam vs CA are masks and bincounts over the
+same arrays, instead of a query (or several) per class, subject, department
+and teacher.
+
+The computed breakdowns are cached per (school, session, term). The cache key
+carries a fingerprint of the term's grades - row count and latest
+last_calculated, which every grade writer stamps - so the next grade write
+retires the cached result in every worker; one cheap aggregate query checks it.
+Names, departments and enrolments feed the breakdowns too, so entries also
+expire after TERM_ANALYTICS_CACHE_SECONDS.
+"""
+
+import logging
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+PASS_MARK = 40
+AT_RISK_BELOW = 50
+DEPARTMENTS = ['Science', 'Arts', 'Commercial']
+DEFAULT_GRADE_RANGES = [('A', 70, 100), ('B', 60, 69), ('C', 50, 59), ('D', 40, 49), ('F', 0, 39)]
+TOP_PERFORMERS = 20
+
+# GradeSummary score columns, in the order of the score matrix
+SCORES = ['total_score', 'exam_score', 'test_score', 'assignment_score', 'attendance_score']
+TOTAL, EXAM, TEST, ASSIGNMENT, ATTENDANCE = range(len(SCORES))
+
+
+def _rate(passed, total):
+    return round((passed / total) * 100, 1) if total > 0 else 0
+
+
+def _score(value):
+    """One decimal place, ties to even as the Decimal averages of the database did."""
+    return float(Decimal(f'{float(value):.6f}').quantize(Decimal('0.1')))
+
+
+def _stats(total, passed, average):
+    return {
+        'total_students': int(total),
+        'passed': int(passed),
+        'failed': int(total - passed),
+        'pass_rate': _rate(passed, total),
+        'average_score': _score(average),
+    }
+
+
+def grade_ranges(config):
+    if config and config.grading_scale:
+        scale = config.grading_scale
+        return [
+            ('A', scale.a_min_score, 100),
+            ('B', scale.b_min_score, scale.a_min_score - 1),
+            ('C', scale.c_min_score, scale.b_min_score - 1),
+            ('D', scale.d_min_score, scale.c_min_score - 1),
+            ('F', 0, scale.d_min_score - 1),
+        ]
+    return DEFAULT_GRADE_RANGES
+
+
+def _group(codes, size, values=None):
+    """Row count (or sum of values) per code, for codes 0..size-1."""
+    return np.bincount(codes, weights=values, minlength=size)
+
+
+def _exam_vs_ca(scores, config):
+    means = scores.mean(axis=0)
+    exam_pct = config.exam_percentage if config else 60
+    test_pct = config.test_percentage if config else 20
+    assignment_pct = config.assignment_percentage if config else 15
+    attendance_pct = config.attendance_percentage if config else 5
+
+    # Calculate weighted scores (normalize to 100)
+    exam_normalized = (means[EXAM] / exam_pct * 100) if exam_pct > 0 else 0
+    ca_components = [
+        means[column]
+        for column, pct in ((TEST, test_pct), (ASSIGNMENT, assignment_pct), (ATTENDANCE, attendance_pct))
+        if pct > 0 and means[column]
+    ]
+    ca_total_pct = test_pct + assignment_pct + attendance_pct
+    ca_normalized = (sum(ca_components) / ca_total_pct * 100) if ca_total_pct > 0 else 0
+
+    return {
+        'exam_average': round(float(exam_normalized), 1),
+        'ca_average': round(float(ca_normalized), 1),
+        'exam_weight': exam_pct,
+        'ca_weight': ca_total_pct,
+        'components': {
+            'test': round(float(means[TEST]), 1),
+            'assignment': round(float(means[ASSIGNMENT]), 1),
+            'attendance': round(float(means[ATTENDANCE]), 1),
+        },
+        'component_weights': {
+            'test': test_pct,
+            'assignment': assignment_pct,
+            'attendance': attendance_pct,
+        },
+    }
+
+
+def build_term_analytics(school, configs, academic_year, term):
+    """Every breakdown of one term, from one read of its grade summaries."""
+    from academics.models import StudentSession, Subject
+    from schooladmin.models import GradeSummary
+    from users.models import CustomUser
+
+    config = configs[0]
+    rows = list(GradeSummary.objects.filter(
+        grading_config__in=configs,
+        student__school=school,
+        total_score__isnull=False,
+    ).values_list('student_id', 'subject_id', *SCORES))
+
+    n = len(rows)
+    student_col = np.fromiter((row[0] for row in rows), dtype=np.int64, count=n)
+    subject_col = np.fromiter((row[1] for row in rows), dtype=np.int64, count=n)
+    scores = np.array([row[2:] for row in rows], dtype=np.float64).reshape(n, len(SCORES))
+    totals = scores[:, TOTAL]
+    del rows
+
+    # Per-student averages over all their subjects
+    students, student_code = np.unique(student_col, return_inverse=True)
+    per_student = _group(student_code, len(students))
+    averages = _group(student_code, len(students), totals) / np.maximum(per_student, 1)
+    passing = averages >= PASS_MARK
+
+    info = {
+        row[0]: row[1:]
+        for row in CustomUser.objects.filter(id__in=students.tolist()).values_list(
+            'id', 'first_name', 'last_name', 'department', 'role', 'is_active',
+        )
+    }
+
+    # Enrolments of the term: class breakdown and each student's class
+    enrolments = list(StudentSession.objects.filter(
+        class_session__classroom__school=school,
+        class_session__academic_year=academic_year,
+        class_session__term=term,
+    ).order_by('id').values_list('student_id', 'class_session_id', 'class_session__classroom__name'))
+    term_class = {}
+    for student_id, _, class_name in enrolments:
+        term_class.setdefault(student_id, class_name)
+
+    def students_in(ids):
+        """Codes of the given student ids that have grades."""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(students, ids)
+        found = positions < len(students)
+        found[found] &= students[positions[found]] == ids[found]
+        return positions[found], found
+
+    def student_entry(code):
+        student_id = int(students[code])
+        first_name, last_name, department, _, _ = info.get(student_id, ('', '', '', '', False))
+        return {
+            'student_id': student_id,
+            'name': f"{first_name} {last_name}",
+            'class': term_class.get(student_id, ''),
+            'department': department or '',
+            'average_score': _score(averages[code]),
+        }
+
+    overall = _stats(len(students), passing.sum(), averages.mean() if len(students) else 0)
+
+    # 1. Performance by class (students enrolled in the class session, averaged over all their grades)
+    by_class = []
+    if enrolments and len(students):
+        session_ids, session_code = np.unique(
+            np.fromiter((e[1] for e in enrolments), dtype=np.int64, count=len(enrolments)), return_inverse=True,
+        )
+        class_names = {e[1]: e[2] for e in enrolments}
+        codes, found = students_in([e[0] for e in enrolments])
+        session_code = session_code[found]
+        count = _group(session_code, len(session_ids))
+        passed = _group(session_code, len(session_ids), passing[codes].astype(np.float64))
+        total_avg = _group(session_code, len(session_ids), averages[codes])
+        for i in np.flatnonzero(count):
+            by_class.append({
+                'class_name': class_names[int(session_ids[i])],
+                **_stats(count[i], passed[i], total_avg[i] / count[i]),
+            })
+        by_class.sort(key=lambda x: x['average_score'], reverse=True)
+
+    # 2. Performance by subject name, and 8. by teacher, over the term's subjects
+    term_subjects = list(Subject.objects.filter(
+        class_session__classroom__school=school,
+        class_session__academic_year=academic_year,
+        class_session__term=term,
+    ).order_by('id').values_list('id', 'name', 'teacher_id'))
+    subject_ids = np.array([s[0] for s in term_subjects], dtype=np.int64)
+    order = np.argsort(subject_ids)
+    name_index = {}
+    for subject in term_subjects:
+        name_index.setdefault(subject[1], len(name_index))
+    names = list(name_index)
+    name_of = np.array([name_index[s[1]] for s in term_subjects], dtype=np.int64)
+
+    by_subject = []
+    by_teacher = []
+    if len(subject_ids) and n:
+        positions = np.searchsorted(subject_ids, subject_col, sorter=order)
+        positions = np.minimum(positions, len(subject_ids) - 1)
+        row_subject = order[positions]
+        in_term = subject_ids[row_subject] == subject_col
+        row_subject = row_subject[in_term]
+        row_totals = totals[in_term]
+        row_passed = (row_totals >= PASS_MARK).astype(np.float64)
+
+        row_name = name_of[row_subject]
+        count = _group(row_name, len(names))
+        passed = _group(row_name, len(names), row_passed)
+        total = _group(row_name, len(names), row_totals)
+        for i in np.flatnonzero(count):
+            by_subject.append({'subject_name': names[i], **_stats(count[i], passed[i], total[i] / count[i])})
+        by_subject.sort(key=lambda x: x['average_score'], reverse=True)
+
+        teachers = list(CustomUser.objects.filter(
+            school=school, role='teacher', is_active=True,
+        ).values_list('id', 'first_name', 'last_name'))
+        teacher_index = {teacher[0]: i for i, teacher in enumerate(teachers)}
+        teacher_of = np.array([teacher_index.get(s[2], -1) for s in term_subjects], dtype=np.int64)
+        subjects_count = np.bincount(teacher_of[teacher_of >= 0], minlength=len(teachers))
+        row_teacher = teacher_of[row_subject]
+        taught = row_teacher >= 0
+        count = _group(row_teacher[taught], len(teachers))
+        passed = _group(row_teacher[taught], len(teachers), row_passed[taught])
+        total = _group(row_teacher[taught], len(teachers), row_totals[taught])
+        for i in np.flatnonzero(count):
+            teacher_id, first_name, last_name = teachers[i]
+            by_teacher.append({
+                'teacher_id': teacher_id,
+                'teacher_name': f"{first_name} {last_name}",
+                'subjects_count': int(subjects_count[i]),
+                'students_graded': int(count[i]),
+                'passed': int(passed[i]),
+                'pass_rate': _rate(passed[i], count[i]),
+                'average_score': _score(total[i] / count[i]),
+            })
+        by_teacher.sort(key=lambda x: x['average_score'], reverse=True)
+
+    # 3. Performance by department (active students of the department)
+    by_department = []
+    if len(students):
+        department = np.array([info.get(int(s), ('', '', None, '', False))[2] or '' for s in students], dtype=object)
+        eligible = np.array(
+            [info.get(int(s), ('', '', '', '', False))[3:] == ('student', True) for s in students], dtype=bool,
+        )
+        for dept in DEPARTMENTS:
+            mask = eligible & (department == dept)
+            total = int(mask.sum())
+            if total:
+                by_department.append({'department': dept, **_stats(total, passing[mask].sum(), averages[mask].mean())})
+
+    # 4. Grade distribution over every graded subject
+    grade_distribution = [
+        {
+            'grade': grade,
+            'count': int(((totals >= min_s) & (totals <= max_s)).sum()),
+            'min_score': min_s,
+            'max_score': max_s,
+        }
+        for grade, min_s, max_s in grade_ranges(config)
+    ]
+
+    # 5. Top performers, 6. students at risk and failing students, by average
+    ranked = np.argsort(-averages, kind='stable')
+    top_performers = [
+        {'rank': rank + 1, **student_entry(code)}
+        for rank, code in enumerate(ranked[:TOP_PERFORMERS])
+    ]
+    ascending = np.argsort(averages, kind='stable')
+    at_risk = ascending[(averages[ascending] >= PASS_MARK) & (averages[ascending] < AT_RISK_BELOW)]
+    students_at_risk = [student_entry(code) for code in at_risk[:TOP_PERFORMERS]]
+    failing_students = [student_entry(code) for code in ascending[averages[ascending] < PASS_MARK]]
+
+    # 9. Exam vs CA
+    exam_vs_ca = _exam_vs_ca(scores, config) if n else None
+
+    return {
+        'session': academic_year,
+        'term': term,
+        'overall': overall,
+        'performance_by_class': by_class,
+        'performance_by_subject': by_subject,
+        'performance_by_department': by_department,
+        'grade_distribution': grade_distribution,
+        'top_performers': top_performers,
+        'students_at_risk': students_at_risk,
+        'failing_students': failing_students,
+        'teacher_performance': by_teacher,
+        'exam_vs_ca': exam_vs_ca,
+    }
+
+
+def term_analytics(school, academic_year, term):
+    """The cached breakdowns of a term, or None when the term has no grading configuration."""
+    from schooladmin.models import GradeSummary, GradingConfiguration
+
+    if not academic_year or not term:
+        return None
+    configs = list(GradingConfiguration.objects.filter(
+        school=school, academic_year=academic_year, term=term,
+    ).select_related('grading_scale'))
+    if not configs:
+        return None
+
+    fingerprint = GradeSummary.objects.filter(grading_config__in=configs).aggregate(
+        rows=Count('id'), last=Max('last_calculated'),
+    )
+    last = fingerprint['last'].timestamp() if fingerprint['last'] else 0
+    key = (
+        f"term-analytics:{school.id}:{academic_year}:{term}:"
+        f"{','.join(str(c.id) for c in configs)}:{fingerprint['rows']}:{last}"
+    ).replace(' ', '_')
+
+    analytics = cache.get(key)
+    if analytics is None:
+        analytics = build_term_analytics(school, configs, academic_year, term)
+        cache.set(key, analytics, getattr(settings, 'TERM_ANALYTICS_CACHE_SECONDS', 3600))
+    return analytics
+
+
+def comparison_summary(analytics):
+    """The compare-term view of a term's breakdowns, keyed for lookup next to the current term."""
+    def brief(entry):
+        return {key: entry[key] for key in ('total_students', 'passed', 'pass_rate', 'average_score')}
+
+    exam_vs_ca = analytics['exam_vs_ca']
+    return {
+        'session': analytics['session'],
+        'term': analytics['term'],
+        'by_class': {c['class_name']: brief(c) for c in analytics['performance_by_class']},
+        'by_subject': {s['subject_name']: brief(s) for s in analytics['performance_by_subject']},
+        'by_department': {d['department']: brief(d) for d in analytics['performance_by_department']},
+        'grade_distribution': {g['grade']: g['count'] for g in analytics['grade_distribution']},
+        'by_teacher': {
+            t['teacher_id']: {'pass_rate': t['pass_rate'], 'average_score': t['average_score']}
+            for t in analytics['teacher_performance']
+        },
+        'exam_vs_ca': {
+            'exam_average': exam_vs_ca['exam_average'],
+            'ca_average': exam_vs_ca['ca_average'],
+        } if exam_vs_ca else None,
+    }
@@ -99,10 +99,16 @@ portal_urlpatterns = [
     # Database export (Standard+ plans only)
     path('database/download/', views.PortalDownloadDatabaseView.as_view(), name='portal-database-download'),
 
+    # Background jobs started from the portal
+    path('jobs/<uuid:job_id>/', views.PortalBackgroundJobView.as_view(), name='portal-background-job'),
+    path('jobs/<uuid:job_id>/download/', views.PortalBackgroundJobDownloadView.as_view(), name='portal-background-job-download'),
+
     # Report card bulk download
     path('report-cards/terms/', views.PortalAvailableTermsView.as_view(), name='portal-report-card-terms'),
     path('report-cards/students/search/', views.PortalStudentSearchView.as_view(), name='portal-student-search'),
     path('report-cards/download/', views.PortalDownloadReportCardsView.as_view(), name='portal-report-cards-download'),
+    path('report-cards/exports/<uuid:token>/', views.PortalReportCardExportStatusView.as_view(), name='portal-report-card-export-status'),
+    path('report-cards/exports/<uuid:token>/download/', views.PortalReportCardExportDownloadView.as_view(), name='portal-report-card-export-download'),
 
     # Auto-debit management
     path('billing/auto-debit/toggle/', views.ToggleAutoDebitView.as_view(), name='portal-toggle-auto-debit'),
@@ -1919,9 +1919,11 @@ class PortalUpgradeProrationPreviewView(APIView):
 
 class PortalDownloadDatabaseView(APIView):
     """
-    Download full school database in CSV, XLSX, or JSON format.
+    Download full school database in CSV, XLSX, JSON, or JSON Lines format.
     POST /api/portal/database/download/
     Available for Standard, Premium, and Custom plans only.
+    Queues a background job and responds 202 with the job id; the file is
+    served from /api/portal/jobs/<job_id>/download/ once the job completes.
     """
     authentication_classes = []
     permission_classes = [AllowAny]
@@ -1941,21 +1943,14 @@ class PortalDownloadDatabaseView(APIView):
             }, status=status.HTTP_403_FORBIDDEN)
 
         export_format = request.data.get('format', 'csv').lower()
-        if export_format not in ('csv', 'xlsx', 'json'):
-            return Response({'error': 'Invalid format. Must be csv, xlsx, or json.'}, status=status.HTTP_400_BAD_REQUEST)
+        from .database_export import EXPORT_FORMATS
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Invalid format. Must be csv, xlsx, json, or jsonl.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            from .database_export import generate_database_export
-            file_data, filename, content_type = generate_database_export(school, export_format)
-
-            from django.http import HttpResponse
-            response = HttpResponse(file_data, content_type=content_type)
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).error(f'Database export failed for {school.slug}: {e}')
-            return Response({'error': 'Failed to generate export.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # Generated by the job worker; poll the job and fetch the file from its download URL
+        from schooladmin.jobs import enqueue_job, job_accepted_payload
+        job = enqueue_job('database_export', school, params={'format': export_format}, portal_user=portal_user)
+        return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
 
 
 class PortalAvailableTermsView(APIView):
@@ -2025,6 +2020,10 @@ class PortalDownloadReportCardsView(APIView):
       academic_year: (for specific_session / specific_student with optional term filter)
       term: (for specific_student with optional term filter)
       student_id: (for specific_student)
+      mode: stream (default) | background
+    The ZIP is streamed as report cards are rendered. With mode=background the
+    export runs server-side and a token is returned for the progress and
+    download endpoints instead.
     """
     authentication_classes = []
     permission_classes = [AllowAny]
@@ -2041,11 +2040,9 @@ class PortalDownloadReportCardsView(APIView):
         student_id = request.query_params.get('student_id')
 
         from schooladmin.models import GradingConfiguration
-        from schooladmin.pdf_generator import generate_report_sheet_pdf, build_student_report_context
         from users.models import CustomUser
-        from django.http import HttpResponse
-        import zipfile, io
-        from datetime import datetime
+        from django.http import StreamingHttpResponse
+        from .report_card_export import start_export, stream_export, start_background_export
 
         # Determine grading configs (terms) to include
         if scope == 'current_term':
@@ -2070,48 +2067,171 @@ class PortalDownloadReportCardsView(APIView):
             # all_time or specific_student with no filter
             configs = list(GradingConfiguration.objects.filter(school=school).order_by('academic_year', 'term'))
 
-        # Determine students to include
+        # Validate the student (the export itself resolves enrolments per class)
         if student_id:
-            try:
-                students = [CustomUser.objects.get(id=student_id, role='student', school=school)]
-            except CustomUser.DoesNotExist:
+            if not CustomUser.objects.filter(id=student_id, role='student', school=school).exists():
                 return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
-        else:
-            students = list(CustomUser.objects.filter(role='student', school=school).order_by('last_name', 'first_name'))
-
-        # Generate PDFs into a ZIP
-        zip_buf = io.BytesIO()
-        count = 0
-        with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for cfg in configs:
-                for student in students:
-                    ctx = build_student_report_context(school, student, cfg.academic_year, cfg.term)
-                    if ctx is None:
-                        continue
-                    try:
-                        pdf = generate_report_sheet_pdf(ctx)
-                        safe = f"{student.username}_{cfg.academic_year}_{cfg.term}".replace('/', '-').replace(' ', '_')
-                        zf.writestr(f"{safe}.pdf", pdf)
-                        count += 1
-                    except Exception:
-                        pass
-
-        if count == 0:
+
+        background = request.query_params.get('mode') == 'background'
+        export = start_export(
+            school, configs, student_id=student_id, portal_user=portal_user, background=background
+        )
+
+        if export.total == 0:
+            export.delete()
             return Response(
                 {'error': 'No report cards found for the selected criteria.'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        zip_buf.seek(0)
-        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{school.slug}_report_cards_{ts}.zip"
-        zip_data = zip_buf.read()
-        response = HttpResponse(zip_data, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['Content-Length'] = len(zip_data)
+        if background:
+            job = start_background_export(export)
+            return Response({
+                'token': str(export.id),
+                'job_id': str(job.id),
+                'total': export.total,
+                'status_url': f'/api/portal/report-cards/exports/{export.id}/',
+                'download_url': f'/api/portal/report-cards/exports/{export.id}/download/',
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # Stream the ZIP while PDFs are rendered; progress is pollable with the export token
+        response = StreamingHttpResponse(stream_export(export), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+        response['X-Export-Token'] = str(export.id)
         return response
 
 
+class PortalReportCardExportStatusView(APIView):
+    """
+    Progress of a bulk report card export.
+    GET /api/portal/report-cards/exports/<token>/
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        from .models import ReportCardExport
+        from .report_card_export import export_progress
+
+        portal_user = get_portal_user_from_token(request)
+        if not portal_user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        export = ReportCardExport.objects.filter(id=token, school=portal_user.school).first()
+        if not export:
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(export_progress(export))
+
+
+class PortalReportCardExportDownloadView(APIView):
+    """
+    Download the ZIP of a finished background report card export.
+    GET /api/portal/report-cards/exports/<token>/download/
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        from django.http import FileResponse
+        from schooladmin.jobs import result_storage
+        from .models import ReportCardExport
+
+        portal_user = get_portal_user_from_token(request)
+        if not portal_user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        export = ReportCardExport.objects.filter(
+            id=token, school=portal_user.school, is_background=True
+        ).first()
+        if not export:
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if export.status != 'completed':
+            return Response(
+                {'error': 'Export is not ready yet.', 'status': export.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        storage = result_storage()
+        if not export.file_path or not storage.exists(export.file_path):
+            return Response({'error': 'Export file has expired.'}, status=status.HTTP_410_GONE)
+
+        return FileResponse(
+            storage.open(export.file_path, 'rb'),
+            as_attachment=True,
+            filename=export.filename,
+            content_type='application/zip',
+        )
+
+
+class PortalBackgroundJobView(APIView):
+    """
+    Status, progress and result of a background job started from the portal.
+    GET /api/portal/jobs/<job_id>/
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id):
+        from schooladmin.models import BackgroundJob
+        from schooladmin.jobs import serialize_job
+
+        portal_user = get_portal_user_from_token(request)
+        if not portal_user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        job = BackgroundJob.objects.filter(
+            id=job_id, school=portal_user.school
+        ).select_related('school').defer('upload').first()
+        if not job:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(serialize_job(job))
+
+
+class PortalBackgroundJobDownloadView(APIView):
+    """
+    Download the file produced by a completed background job (e.g. a database export).
+    GET /api/portal/jobs/<job_id>/download/
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id):
+        from django.http import FileResponse
+        from schooladmin.models import BackgroundJob
+        from schooladmin.jobs import open_result_file
+
+        portal_user = get_portal_user_from_token(request)
+        if not portal_user:
+            return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        job = BackgroundJob.objects.filter(
+            id=job_id, school=portal_user.school
+        ).select_related('school').defer('upload').first()
+        if not job:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if job.status != BackgroundJob.STATUS_COMPLETED or not job.result_file:
+            return Response(
+                {'error': 'Job has no file to download yet.', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            file = open_result_file(job)
+        except Exception:
+            return Response({'error': 'Export file has expired.'}, status=status.HTTP_410_GONE)
+
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=job.result_filename,
+            content_type=job.result_content_type or 'application/octet-stream',
+        )
+
+
 class PublicVerifyPaymentView(APIView):
     """
     Public payment verification after Paystack redirect (no auth required).
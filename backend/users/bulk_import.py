@@ -0,0 +1,239 @@
+"""
+Set-based account creation for the XLSX imports (import_views.py).
+
+Rows that passed validation are created together rather than one by one:
+classes and this term's class sessions are resolved once, users, enrolments
+and parent-child links are written with bulk_create in one transaction, and
+the verification emails are queued in the outbox (logs/email_outbox.py) in
+the same transaction, to be delivered in batches by the drain worker.
+
+Imported accounts get an unusable password. Their only way in is the
+verification link, which sets the password (users/verification_views.py), so
+hashing a random password nobody is told was pure cost: a full PBKDF2 run per
+row. Each phase is timed and the timings are returned with the import result.
+"""
+
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+class PhaseTimer:
+    """Wall time of each phase of an import, for the response."""
+
+    def __init__(self):
+        self.phases = []
+        self._started = time.monotonic()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases.append({'phase': name, 'seconds': round(time.monotonic() - started, 3)})
+
+    def report(self):
+        return self.phases + [{'phase': 'total', 'seconds': round(time.monotonic() - self._started, 3)}]
+
+
+def _parse_date(value):
+    from .import_views import _validate_date
+
+    valid, parsed = _validate_date(value)
+    return parsed if valid else None
+
+
+def _new_user(row, school, role, now, **fields):
+    """An unsaved account for a validated row, with its verification token set."""
+    from .models import CustomUser
+
+    user = CustomUser(
+        username=row['username'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        middle_name=row['middle_name'],
+        email=row['email'],
+        gender=row['gender'],
+        role=role,
+        school=school,
+        phone_number=row['phone_number'] or None,
+        date_of_birth=_parse_date(row['date_of_birth']) if row['date_of_birth'] else None,
+        must_change_password=True,
+        **fields,
+    )
+    user.set_unusable_password()
+    if user.email:
+        user.email_verification_token = secrets.token_urlsafe(32)
+        user.email_verification_sent_at = now
+    return user
+
+
+def _insert_users(pairs, failed):
+    """
+    bulk_create the (row, user) pairs and return the ones written. Usernames
+    taken since validation fail their rows and the rest are written again.
+    """
+    from .models import CustomUser
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create([user for _, user in pairs], batch_size=BATCH_SIZE)
+            return pairs
+        except IntegrityError:
+            if attempt:
+                raise
+            taken = set(CustomUser.objects.filter(
+                username__in=[user.username for _, user in pairs]
+            ).values_list('username', flat=True))
+            kept = []
+            for row, user in pairs:
+                if user.username in taken:
+                    failed.append({'row': row['row'], 'errors': [f'Username already exists: {user.username}']})
+                else:
+                    user.pk = None  # Earlier batches got ids before the rollback
+                    user._state.adding = True
+                    kept.append((row, user))
+            pairs = kept
+    return pairs
+
+
+def _queue_verification(users):
+    from logs.email_outbox import queue_verification_emails
+
+    return queue_verification_emails(
+        ((user, f"{settings.FRONTEND_URL}/verify-email/{user.email_verification_token}") for user in users),
+        reserve_quota=True,
+    )
+
+
+def _created_entry(row, user):
+    return {
+        'row': row['row'],
+        'username': user.username,
+        'email': user.email,
+        'name': f"{user.first_name} {user.last_name}",
+    }
+
+
+def _create_accounts(school, results, role, timer, build, after_insert=None, progress=None):
+    """
+    Shared pipeline: build(row) returns the role's extra fields for a row's
+    user, after_insert(pairs) writes related rows inside the transaction.
+    Returns the written (row, user) pairs, the failed rows and the email counts.
+    """
+    from tenants.dashboard_cache import bump_on_commit
+
+    failed = []
+    pairs = []
+    with timer.phase('build accounts'):
+        now = timezone.now()
+        for row in results:
+            if not row['valid']:
+                failed.append({'row': row['row'], 'errors': row['errors']})
+                continue
+            pairs.append((row, _new_user(row, school, role, now, **build(row))))
+
+    if progress:
+        progress(0, len(pairs), f'Creating {len(pairs)} {role} accounts')
+    emails = {'queued': 0, 'over_quota': 0, 'no_email': 0}
+    with transaction.atomic():
+        with timer.phase('write accounts'):
+            pairs = _insert_users(pairs, failed)
+            if after_insert and pairs:
+                after_insert(pairs)
+            if pairs:
+                bump_on_commit(school.id)
+        if progress:
+            progress(len(pairs), len(pairs), 'Queueing verification emails')
+        with timer.phase('queue emails'):
+            emails = _queue_verification([user for _, user in pairs])
+
+    failed.sort(key=lambda entry: entry['row'] if isinstance(entry['row'], int) else 0)
+    return pairs, failed, emails
+
+
+def import_students(school, results, academic_year, term, timer, progress=None):
+    """Create students from validated rows and enrol them in this term's class sessions."""
+    from academics.models import Class, ClassSession, StudentSession
+    from schooladmin.fee_ledger import materialise
+    from schooladmin.models import GradingConfiguration
+    from schooladmin.readiness import refresh_readiness_for
+
+    with timer.phase('resolve classes'):
+        class_map = {c.name: c for c in Class.objects.filter(school=school)}
+        sessions = {
+            session.classroom_id: session
+            for session in ClassSession.objects.filter(
+                classroom__school=school, academic_year=academic_year, term=term,
+            )
+        }
+
+    def build(row):
+        return {
+            'classroom': class_map.get(row['class']),
+            'academic_year': academic_year,
+            'term': term,
+            'department': row['department'] or None,
+        }
+
+    def enrol(pairs):
+        # Classes without a session this term are left unenrolled, as before
+        enrolments = [
+            StudentSession(student=user, class_session=sessions[user.classroom_id], is_active=True)
+            for _, user in pairs
+            if user.classroom_id in sessions
+        ]
+        StudentSession.objects.bulk_create(enrolments, batch_size=BATCH_SIZE)
+
+        # What the StudentSession post_save signals would do, once for the batch.
+        # New accounts have no notification counters to invalidate.
+        materialise(student_ids=[user.id for _, user in pairs])
+        student_ids = [enrolment.student_id for enrolment in enrolments]
+        for config_id in GradingConfiguration.objects.filter(
+            school=school, academic_year=academic_year, term=term,
+        ).values_list('id', flat=True):
+            refresh_readiness_for(config_id, student_ids)
+
+    pairs, failed, emails = _create_accounts(school, results, 'student', timer, build, enrol, progress)
+    return [_created_entry(row, user) for row, user in pairs], failed, emails
+
+
+def import_teachers(school, results, timer):
+    """Create teachers from validated rows."""
+    pairs, failed, emails = _create_accounts(school, results, 'teacher', timer, lambda row: {})
+    return [_created_entry(row, user) for row, user in pairs], failed, emails
+
+
+def import_parents(school, results, timer):
+    """Create parents from validated rows and link them to their children."""
+    from .models import CustomUser
+
+    def link_children(pairs):
+        wanted = {child_id for row, _ in pairs for child_id in row['child_ids']}
+        students = set(CustomUser.objects.filter(
+            id__in=wanted, school=school, role='student',
+        ).values_list('id', flat=True))
+        Link = CustomUser.children.through
+        Link.objects.bulk_create([
+            Link(from_customuser_id=user.id, to_customuser_id=child_id)
+            for row, user in pairs
+            for child_id in dict.fromkeys(row['child_ids'])
+            if child_id in students
+        ], batch_size=BATCH_SIZE)
+
+    pairs, failed, emails = _create_accounts(school, results, 'parent', timer, lambda row: {}, link_children)
+    return [
+        {**_created_entry(row, user), 'children': row['child_names']}
+        for row, user in pairs
+    ], failed, emails
@@ -1,21 +1,30 @@
 """
 Views for bulk import of students, teachers, and parents via XLSX.
+
+Uploads are validated twice: by the validate endpoint for the preview and
+again on confirm. The parsed rows are cached under a hash of the file, so
+confirm skips parsing a file it has just seen. Validation itself runs again
+because it checks usernames and emails against accounts that may have
+changed in between; those checks are a few batched IN queries.
 """
+import hashlib
 import re
-import secrets
+from collections import Counter
 from datetime import datetime
 
 from django.conf import settings
-from django.utils import timezone
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from academics.models import Class, ClassSession
+from academics.models import Class
 from logs.models import ActivityLog
+from schooladmin.jobs import enqueue_request_job, job_accepted_payload
 from tenants.permissions import check_import_feature
+from users.bulk_import import PhaseTimer, import_parents, import_students, import_teachers
 from users.models import CustomUser
 
 import openpyxl
@@ -27,49 +36,111 @@ VALID_GENDERS = {'Male', 'Female'}
 VALID_DEPARTMENTS = {'Science', 'Arts', 'Commercial'}
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
 
+# Values per IN query when checking uploaded usernames/emails against the database
+LOOKUP_CHUNK_SIZE = 1000
+# Spare generated usernames looked up per name, for suffixes taken by other rows of the sheet
+USERNAME_SLACK = 3
+
 
 def _parse_xlsx(file):
-    """Parse XLSX file and return list of row dicts."""
+    """Parse XLSX file and return list of row dicts (rows are streamed, not loaded at once)."""
     wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
-    ws = wb.active
-
-    rows = list(ws.iter_rows(values_only=True))
-    if not rows:
-        return [], []
-
-    # Header row
-    raw_headers = [str(h).strip().lower() if h else '' for h in rows[0]]
-    headers = raw_headers
-
-    data = []
-    for i, row in enumerate(rows[1:], start=2):
-        # Skip completely empty rows
-        if all(cell is None or str(cell).strip() == '' for cell in row):
-            continue
-        row_dict = {'_row_number': i}
-        for j, header in enumerate(headers):
-            if header and j < len(row):
-                val = row[j]
-                if val is not None:
-                    val = str(val).strip()
-                else:
-                    val = ''
-                row_dict[header] = val
-            elif header:
-                row_dict[header] = ''
-        data.append(row_dict)
-
-    wb.close()
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return [], []
+
+        headers = [str(h).strip().lower() if h else '' for h in header_row]
+        columns = [(j, header) for j, header in enumerate(headers) if header]
+
+        data = []
+        for i, row in enumerate(rows, start=2):
+            values = ['' if cell is None else str(cell).strip() for cell in row]
+            # Skip completely empty rows
+            if not any(values):
+                continue
+            row_dict = {'_row_number': i}
+            for j, header in columns:
+                row_dict[header] = values[j] if j < len(values) else ''
+            data.append(row_dict)
+    finally:
+        wb.close()
     return headers, data
 
 
-def _generate_username(first_name, last_name, existing_usernames):
-    """Generate username as firstname.lastname with number suffix if needed."""
+def _parse_upload(kind, school, file):
+    """
+    _parse_xlsx, reusing the rows parsed from the same file (by content hash)
+    by the validate step when confirm uploads it again.
+    """
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    key = f'import-rows:{kind}:{school.id}:{digest.hexdigest()}'
+
+    parsed = cache.get(key)
+    if parsed is None:
+        parsed = _parse_xlsx(file)
+        cache.set(key, parsed, getattr(settings, 'IMPORT_ROWS_CACHE_SECONDS', 900))
+    return parsed
+
+
+def _existing_values(field, values, **filters):
+    """Which of values are already taken in CustomUser.field, one IN query per chunk."""
+    values = sorted({value for value in values if value})
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        found.update(CustomUser.objects.filter(
+            **filters, **{f'{field}__in': values[start:start + LOOKUP_CHUNK_SIZE]}
+        ).values_list(field, flat=True))
+    return found
+
+
+def _existing_usernames(data, username_mode):
+    """
+    The existing usernames an import can collide with: the sheet's own in
+    "xlsx" mode, otherwise those starting with a generated firstname.lastname.
+    """
+    if username_mode == 'xlsx':
+        return _existing_values('username', (row.get('username', '').strip() for row in data))
+
+    # Generated names are base, base1, base2...: look up a window of them per
+    # base, wider than the rows sharing it, and widen again where it filled up
+    needed = Counter(
+        _username_base(row.get('first_name', '').strip(), row.get('last_name', '').strip())
+        for row in data
+    )
+    offsets = dict.fromkeys(needed, 0)
+    found = set()
+    while needed:
+        windows = {
+            base: [base if n == 0 else f'{base}{n}' for n in range(offsets[base], offsets[base] + count + USERNAME_SLACK)]
+            for base, count in needed.items()
+        }
+        taken = _existing_values('username', (name for names in windows.values() for name in names))
+        found |= taken
+        short = {}
+        for base, names in windows.items():
+            free = sum(1 for name in names if name not in taken)
+            if free < needed[base]:
+                short[base] = needed[base] - free
+                offsets[base] += len(names)
+        needed = short
+    return found
+
+
+def _username_base(first_name, last_name):
     base = f"{first_name.lower().replace(' ', '')}.{last_name.lower().replace(' ', '')}"
     # Remove non-alphanumeric except dots
     base = re.sub(r'[^a-z0-9.]', '', base)
-    if not base:
-        base = 'student'
+    return base or 'student'
+
+
+def _generate_username(first_name, last_name, existing_usernames):
+    """Generate username as firstname.lastname with number suffix if needed."""
+    base = _username_base(first_name, last_name)
 
     username = base
     counter = 1
@@ -101,17 +172,13 @@ def _validate_rows(data, school, academic_year, term, username_mode):
     classes = Class.objects.filter(school=school)
     class_map = {c.name: c for c in classes}
     class_names = set(class_map.keys())
+    class_index = _class_index(class_names)
 
-    # Fetch existing emails in this school
-    existing_emails = set(
-        CustomUser.objects.filter(school=school)
-        .values_list('email', flat=True)
-    )
-
-    # Fetch existing usernames globally
-    existing_usernames = set(
-        CustomUser.objects.values_list('username', flat=True)
+    # Emails already used in this school and usernames taken anywhere, for this sheet's values only
+    existing_emails = _existing_values(
+        'email', (row.get('email', '').strip().lower() for row in data), school=school,
     )
+    existing_usernames = _existing_usernames(data, username_mode)
 
     # Track emails/usernames within the import itself for duplicate detection
     import_emails = set()
@@ -153,7 +220,7 @@ def _validate_rows(data, school, academic_year, term, username_mode):
             errors.append('class is required')
         elif class_name not in class_names:
             # Try to suggest closest match
-            suggestion = _suggest_class(class_name, class_names)
+            suggestion = _suggest_class(class_name, class_index)
             msg = f'Class "{class_name}" not found on platform'
             if suggestion:
                 msg += f'. Did you mean "{suggestion}"?'
@@ -181,7 +248,7 @@ def _validate_rows(data, school, academic_year, term, username_mode):
                 errors.append(f'Username already exists: {username}')
         else:
             if first_name and last_name:
-                username = _generate_username(first_name, last_name, import_usernames)
+                username = _generate_username(first_name, last_name, existing_usernames)
 
         # Date of birth
         dob_str = row.get('date_of_birth', '').strip()
@@ -218,14 +285,18 @@ def _validate_rows(data, school, academic_year, term, username_mode):
     return results
 
 
-def _suggest_class(input_name, valid_names):
+def _class_key(name):
+    return name.lower().replace(' ', '').replace('.', '')
+
+
+def _class_index(valid_names):
+    """Class names by their _class_key, built once per validation for _suggest_class."""
+    return {_class_key(name): name for name in valid_names}
+
+
+def _suggest_class(input_name, class_index):
     """Simple fuzzy match: suggest a class name if one is close."""
-    input_lower = input_name.lower().replace(' ', '').replace('.', '')
-    for name in valid_names:
-        name_lower = name.lower().replace(' ', '').replace('.', '')
-        if input_lower == name_lower:
-            return name
-    return None
+    return class_index.get(_class_key(input_name))
 
 
 @api_view(['GET'])
@@ -293,7 +364,7 @@ def validate_import(request):
         return Response({'error': 'Term is required'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        headers, data = _parse_xlsx(file)
+        headers, data = _parse_upload('students', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -340,6 +411,8 @@ def confirm_import(request):
     """
     POST /api/<school_slug>/users/import-students/confirm/
     Re-validates then creates student accounts and sends verification emails.
+    The upload is checked here; parsing and account creation run as a background
+    job (responds 202 with a job id to poll).
     """
     school = getattr(request, 'school', None)
     if not school:
@@ -368,8 +441,22 @@ def confirm_import(request):
     if not academic_year or not term:
         return Response({'error': 'Academic year and term are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+    job = enqueue_request_job(request, 'confirm_import')
+    return Response(job_accepted_payload(job), status=status.HTTP_202_ACCEPTED)
+
+
+def run_confirm_import(request):
+    """Job handler for confirm_import; request is a schooladmin.jobs.JobRequest."""
+    school = request.school
+    file = request.FILES.get('file')
+    academic_year = request.data.get('academic_year', '').strip()
+    term = request.data.get('term', '').strip()
+    username_mode = request.data.get('username_mode', 'auto').strip()
+    timer = PhaseTimer()
+
     try:
-        headers, data = _parse_xlsx(file)
+        with timer.phase('parse'):
+            headers, data = _parse_upload('students', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -377,7 +464,9 @@ def confirm_import(request):
         return Response({'error': 'No data rows found'}, status=status.HTTP_400_BAD_REQUEST)
 
     # Re-validate
-    results = _validate_rows(data, school, academic_year, term, username_mode)
+    request.set_progress(0, len(data), 'Validating rows')
+    with timer.phase('validate'):
+        results = _validate_rows(data, school, academic_year, term, username_mode)
 
     # Check if valid rows would exceed student limit
     valid_count = sum(1 for r in results if r['valid'])
@@ -390,86 +479,9 @@ def confirm_import(request):
                 'error': f'This import would create {valid_count} students, but you only have room for {remaining} more on your {subscription.plan.display_name} plan.'
             }, status=status.HTTP_403_FORBIDDEN)
 
-    classes = Class.objects.filter(school=school)
-    class_map = {c.name: c for c in classes}
-
-    created = []
-    failed = []
-
-    from logs.email_service import send_verification_email
-
-    for row in results:
-        if not row['valid']:
-            failed.append({'row': row['row'], 'errors': row['errors']})
-            continue
-
-        try:
-            classroom = class_map.get(row['class'])
-
-            user = CustomUser.objects.create_user(
-                username=row['username'],
-                password=secrets.token_urlsafe(12),
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                middle_name=row['middle_name'],
-                email=row['email'],
-                gender=row['gender'],
-                role='student',
-                school=school,
-                classroom=classroom,
-                academic_year=academic_year,
-                term=term,
-                department=row['department'] if row['department'] else None,
-                phone_number=row['phone_number'] if row['phone_number'] else None,
-                must_change_password=True,
-            )
-
-            # Set date of birth if provided
-            if row['date_of_birth']:
-                valid, parsed = _validate_date(row['date_of_birth'])
-                if valid and parsed:
-                    user.date_of_birth = parsed
-                    user.save(update_fields=['date_of_birth'])
-
-            # Create StudentSession record
-            if classroom:
-                try:
-                    class_session = ClassSession.objects.get(
-                        classroom=classroom,
-                        academic_year=academic_year,
-                        term=term
-                    )
-                    from academics.models import StudentSession
-                    StudentSession.objects.get_or_create(
-                        student=user,
-                        class_session=class_session,
-                        defaults={'is_active': True}
-                    )
-                except ClassSession.DoesNotExist:
-                    pass  # Session not created yet for this class
-
-            # Send verification email
-            if user.email:
-                token = secrets.token_urlsafe(32)
-                user.email_verification_token = token
-                user.email_verification_sent_at = timezone.now()
-                user.save(update_fields=['email_verification_token', 'email_verification_sent_at'])
-
-                verification_url = f"{settings.FRONTEND_URL}/verify-email/{token}"
-                try:
-                    send_verification_email(user, verification_url)
-                except Exception:
-                    pass  # Don't fail import if email fails
-
-            created.append({
-                'row': row['row'],
-                'username': user.username,
-                'email': user.email,
-                'name': f"{user.first_name} {user.last_name}",
-            })
-
-        except Exception as e:
-            failed.append({'row': row['row'], 'errors': [str(e)]})
+    created, failed, emails = import_students(
+        school, results, academic_year, term, timer, progress=request.set_progress,
+    )
 
     # Log the import action
     ActivityLog.objects.create(
@@ -483,6 +495,8 @@ def confirm_import(request):
         'failed_count': len(failed),
         'created': created,
         'failed': failed,
+        'emails': emails,
+        'timings': timer.report(),
     })
 
 
@@ -496,10 +510,10 @@ TEACHER_OPTIONAL_COLUMNS = {'middle_name', 'phone_number', 'date_of_birth', 'use
 
 def _validate_teacher_rows(data, school, username_mode):
     """Validate teacher import rows."""
-    existing_emails = set(
-        CustomUser.objects.filter(school=school).values_list('email', flat=True)
+    existing_emails = _existing_values(
+        'email', (row.get('email', '').strip().lower() for row in data), school=school,
     )
-    existing_usernames = set(CustomUser.objects.values_list('username', flat=True))
+    existing_usernames = _existing_usernames(data, username_mode)
 
     import_emails = set()
     import_usernames = set()
@@ -542,7 +556,7 @@ def _validate_teacher_rows(data, school, username_mode):
                 errors.append(f'Username already exists: {username}')
         else:
             if first_name and last_name:
-                username = _generate_username(first_name, last_name, import_usernames)
+                username = _generate_username(first_name, last_name, existing_usernames)
 
         dob_str = row.get('date_of_birth', '').strip()
         dob_valid, _ = _validate_date(dob_str)
@@ -617,7 +631,7 @@ def validate_import_teachers(request):
     username_mode = request.data.get('username_mode', 'auto').strip()
 
     try:
-        headers, data = _parse_xlsx(file)
+        headers, data = _parse_upload('teachers', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -679,16 +693,19 @@ def confirm_import_teachers(request):
         return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
 
     username_mode = request.data.get('username_mode', 'auto').strip()
+    timer = PhaseTimer()
 
     try:
-        headers, data = _parse_xlsx(file)
+        with timer.phase('parse'):
+            headers, data = _parse_upload('teachers', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
     if not data:
         return Response({'error': 'No data rows found'}, status=status.HTTP_400_BAD_REQUEST)
 
-    results = _validate_teacher_rows(data, school, username_mode)
+    with timer.phase('validate'):
+        results = _validate_teacher_rows(data, school, username_mode)
 
     valid_count = sum(1 for r in results if r['valid'])
     subscription = getattr(school, 'subscription', None)
@@ -700,57 +717,7 @@ def confirm_import_teachers(request):
                 'error': f'This import would create {valid_count} teachers, but you only have room for {remaining} more on your {subscription.plan.display_name} plan.'
             }, status=status.HTTP_403_FORBIDDEN)
 
-    from logs.email_service import send_verification_email
-
-    created = []
-    failed = []
-
-    for row in results:
-        if not row['valid']:
-            failed.append({'row': row['row'], 'errors': row['errors']})
-            continue
-
-        try:
-            user = CustomUser.objects.create_user(
-                username=row['username'],
-                password=secrets.token_urlsafe(12),
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                middle_name=row['middle_name'],
-                email=row['email'],
-                gender=row['gender'],
-                role='teacher',
-                school=school,
-                phone_number=row['phone_number'] if row['phone_number'] else None,
-                must_change_password=True,
-            )
-
-            if row['date_of_birth']:
-                valid, parsed = _validate_date(row['date_of_birth'])
-                if valid and parsed:
-                    user.date_of_birth = parsed
-                    user.save(update_fields=['date_of_birth'])
-
-            if user.email:
-                token = secrets.token_urlsafe(32)
-                user.email_verification_token = token
-                user.email_verification_sent_at = timezone.now()
-                user.save(update_fields=['email_verification_token', 'email_verification_sent_at'])
-                verification_url = f"{settings.FRONTEND_URL}/verify-email/{token}"
-                try:
-                    send_verification_email(user, verification_url)
-                except Exception:
-                    pass
-
-            created.append({
-                'row': row['row'],
-                'username': user.username,
-                'email': user.email,
-                'name': f"{user.first_name} {user.last_name}",
-            })
-
-        except Exception as e:
-            failed.append({'row': row['row'], 'errors': [str(e)]})
+    created, failed, emails = import_teachers(school, results, timer)
 
     ActivityLog.objects.create(
         user=request.user,
@@ -763,6 +730,8 @@ def confirm_import_teachers(request):
         'failed_count': len(failed),
         'created': created,
         'failed': failed,
+        'emails': emails,
+        'timings': timer.report(),
     })
 
 
@@ -776,16 +745,26 @@ PARENT_OPTIONAL_COLUMNS = {'middle_name', 'date_of_birth', 'child_usernames', 'u
 
 def _validate_parent_rows(data, school, username_mode):
     """Validate parent import rows. child_usernames is comma-separated student usernames."""
-    existing_emails = set(
-        CustomUser.objects.filter(school=school).values_list('email', flat=True)
+    existing_emails = _existing_values(
+        'email', (row.get('email', '').strip().lower() for row in data), school=school,
     )
-    existing_usernames = set(CustomUser.objects.values_list('username', flat=True))
-
-    # Build a map of student username -> student for this school
-    students_map = {
-        u.username: u
-        for u in CustomUser.objects.filter(school=school, role='student')
-    }
+    existing_usernames = _existing_usernames(data, username_mode)
+
+    # Map the sheet's child usernames -> students of this school, one IN query per chunk
+    child_usernames = sorted({
+        part.strip()
+        for row in data
+        for part in row.get('child_usernames', '').split(',')
+        if part.strip()
+    })
+    students_map = {}
+    for start in range(0, len(child_usernames), LOOKUP_CHUNK_SIZE):
+        students_map.update(
+            (u.username, u)
+            for u in CustomUser.objects.filter(
+                school=school, role='student', username__in=child_usernames[start:start + LOOKUP_CHUNK_SIZE],
+            ).only('id', 'username', 'first_name', 'last_name')
+        )
 
     import_emails = set()
     import_usernames = set()
@@ -832,7 +811,7 @@ def _validate_parent_rows(data, school, username_mode):
                 errors.append(f'Username already exists: {username}')
         else:
             if first_name and last_name:
-                username = _generate_username(first_name, last_name, import_usernames)
+                username = _generate_username(first_name, last_name, existing_usernames)
 
         dob_str = row.get('date_of_birth', '').strip()
         dob_valid, _ = _validate_date(dob_str)
@@ -923,7 +902,7 @@ def validate_import_parents(request):
     username_mode = request.data.get('username_mode', 'auto').strip()
 
     try:
-        headers, data = _parse_xlsx(file)
+        headers, data = _parse_upload('parents', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -985,16 +964,19 @@ def confirm_import_parents(request):
         return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
 
     username_mode = request.data.get('username_mode', 'auto').strip()
+    timer = PhaseTimer()
 
     try:
-        headers, data = _parse_xlsx(file)
+        with timer.phase('parse'):
+            headers, data = _parse_upload('parents', school, file)
     except Exception as e:
         return Response({'error': f'Failed to parse XLSX file: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
     if not data:
         return Response({'error': 'No data rows found'}, status=status.HTTP_400_BAD_REQUEST)
 
-    results = _validate_parent_rows(data, school, username_mode)
+    with timer.phase('validate'):
+        results = _validate_parent_rows(data, school, username_mode)
 
     valid_count = sum(1 for r in results if r['valid'])
     subscription = getattr(school, 'subscription', None)
@@ -1006,63 +988,7 @@ def confirm_import_parents(request):
                 'error': f'This import would create {valid_count} parents, but you only have room for {remaining} more on your {subscription.plan.display_name} plan.'
             }, status=status.HTTP_403_FORBIDDEN)
 
-    from logs.email_service import send_verification_email
-
-    created = []
-    failed = []
-
-    for row in results:
-        if not row['valid']:
-            failed.append({'row': row['row'], 'errors': row['errors']})
-            continue
-
-        try:
-            user = CustomUser.objects.create_user(
-                username=row['username'],
-                password=secrets.token_urlsafe(12),
-                first_name=row['first_name'],
-                last_name=row['last_name'],
-                middle_name=row['middle_name'],
-                email=row['email'],
-                gender=row['gender'],
-                role='parent',
-                school=school,
-                phone_number=row['phone_number'] if row['phone_number'] else None,
-                must_change_password=True,
-            )
-
-            if row['date_of_birth']:
-                valid, parsed = _validate_date(row['date_of_birth'])
-                if valid and parsed:
-                    user.date_of_birth = parsed
-                    user.save(update_fields=['date_of_birth'])
-
-            # Link children
-            if row['child_ids']:
-                children = CustomUser.objects.filter(id__in=row['child_ids'], school=school, role='student')
-                user.children.set(children)
-
-            if user.email:
-                token = secrets.token_urlsafe(32)
-                user.email_verification_token = token
-                user.email_verification_sent_at = timezone.now()
-                user.save(update_fields=['email_verification_token', 'email_verification_sent_at'])
-                verification_url = f"{settings.FRONTEND_URL}/verify-email/{token}"
-                try:
-                    send_verification_email(user, verification_url)
-                except Exception:
-                    pass
-
-            created.append({
-                'row': row['row'],
-                'username': user.username,
-                'email': user.email,
-                'name': f"{user.first_name} {user.last_name}",
-                'children': row['child_names'],
-            })
-
-        except Exception as e:
-            failed.append({'row': row['row'], 'errors': [str(e)]})
+    created, failed, emails = import_parents(school, results, timer)
 
     ActivityLog.objects.create(
         user=request.user,
@@ -1075,4 +1001,6 @@ def confirm_import_parents(request):
         'failed_count': len(failed),
         'created': created,
         'failed': failed,
+        'emails': emails,
+        'timings': timer.report(),
     })
@@ -830,7 +830,7 @@ def student_attendance_report(request):
 
     Returns attendance statistics and detailed records.
     """
-    from schooladmin.models import AttendanceRecord as GradingAttendanceRecord
+    from schooladmin.attendance_stats import student_days
     from attendance.models import AttendanceCalendar, AttendanceSchoolDay, AttendanceHolidayLabel
     from django.db.models import Count, Q
     from datetime import datetime
@@ -909,44 +909,26 @@ def student_attendance_report(request):
         # No attendance calendar exists, that's okay - we'll show 0
         pass
 
-    # Get attendance records from grading system (schooladmin.AttendanceRecord)
-    attendance_records = GradingAttendanceRecord.objects.filter(
-        student=student,
-        class_session=class_session
-    ).select_related('class_session').order_by('date')
-
-    # Calculate attendance statistics
-    # Get unique dates where student was present
-    present_records = attendance_records.filter(is_present=True)
-    attended_dates = present_records.values('date').distinct()
-    days_attended = attended_dates.count()
-
-    # Get unique dates where student was absent
-    absent_records = attendance_records.filter(is_present=False)
-    absent_dates = absent_records.values('date').distinct()
-    days_not_attended = absent_dates.count()
+    # Days attended and absent from grading attendance (schooladmin.AttendanceRecord), one grouped query
+    days = student_days(student, class_session)
+    days_attended = days['days_attended']
+    days_not_attended = days['days_not_attended']
 
     # Calculate attendance percentage based on calendar school days
     attendance_percentage = (days_attended / total_school_days * 100) if total_school_days > 0 else 0
 
     # Prepare detailed attendance records by date (only show days absent)
+    # Note: Grading attendance is per class session, not per subject
     attendance_by_date = {}
-    for record in absent_records:
-        date_str = record.date.strftime('%Y-%m-%d')
-        if date_str not in attendance_by_date:
-            attendance_by_date[date_str] = {
-                'date': date_str,
-                'subjects': []
-            }
-        # Note: Grading attendance is per class session, not per subject
-        subject_info = {
-            'subject_name': f"Absent",
-            'marked_at': record.recorded_at.isoformat() if record.recorded_at else None
+    for date, recorded_at in days['absences']:
+        date_str = date.strftime('%Y-%m-%d')
+        attendance_by_date[date_str] = {
+            'date': date_str,
+            'subjects': [{
+                'subject_name': "Absent",
+                'marked_at': recorded_at.isoformat() if recorded_at else None
+            }]
         }
-        if attendance_by_date[date_str]['subjects']:
-            # If we already have an entry for this date, skip duplicate
-            continue
-        attendance_by_date[date_str]['subjects'].append(subject_info)
 
     # Get available sessions for this student
     available_sessions = StudentSession.objects.filter(
@@ -997,7 +979,7 @@ def parent_attendance_report(request):
 
     Returns attendance statistics and detailed records.
     """
-    from schooladmin.models import AttendanceRecord as GradingAttendanceRecord
+    from schooladmin.attendance_stats import student_days
     from attendance.models import AttendanceCalendar, AttendanceSchoolDay, AttendanceHolidayLabel
     from django.db.models import Count, Q
     from datetime import datetime
@@ -1099,45 +1081,26 @@ def parent_attendance_report(request):
         # No attendance calendar exists, that's okay - we'll show 0
         pass
 
-    # Get attendance records from grading system (schooladmin.AttendanceRecord)
-    attendance_records = GradingAttendanceRecord.objects.filter(
-        student=child,
-        class_session=class_session
-    ).select_related('class_session').order_by('date')
-
-    # Calculate attendance statistics
-    # Get unique dates where student was present
-    present_records = attendance_records.filter(is_present=True)
-    attended_dates = present_records.values('date').distinct()
-    days_attended = attended_dates.count()
-
-    # Get unique dates where student was absent
-    absent_records = attendance_records.filter(is_present=False)
-    absent_dates = absent_records.values('date').distinct()
-    days_not_attended = absent_dates.count()
+    # Days attended and absent from grading attendance (schooladmin.AttendanceRecord), one grouped query
+    days = student_days(child, class_session)
+    days_attended = days['days_attended']
+    days_not_attended = days['days_not_attended']
 
     # Calculate attendance percentage based on calendar school days
     attendance_percentage = (days_attended / total_school_days * 100) if total_school_days > 0 else 0
 
     # Prepare detailed attendance records by date (only show days absent)
+    # Note: Grading attendance is per class session, not per subject
     attendance_by_date = {}
-    for record in absent_records:
-        date_str = record.date.strftime('%Y-%m-%d')
-        if date_str not in attendance_by_date:
-            attendance_by_date[date_str] = {
-                'date': date_str,
-                'subjects': []
-            }
-        # Note: Grading attendance is per class session, not per subject
-        # We'll show the class session info instead
-        subject_info = {
-            'subject_name': f"Absent",
-            'marked_at': record.recorded_at.isoformat() if record.recorded_at else None
+    for date, recorded_at in days['absences']:
+        date_str = date.strftime('%Y-%m-%d')
+        attendance_by_date[date_str] = {
+            'date': date_str,
+            'subjects': [{
+                'subject_name': "Absent",
+                'marked_at': recorded_at.isoformat() if recorded_at else None
+            }]
         }
-        if attendance_by_date[date_str]['subjects']:
-            # If we already have an entry for this date, skip duplicate
-            continue
-        attendance_by_date[date_str]['subjects'].append(subject_info)
 
     # Get all children for dropdown
     children_list = [{
@@ -1197,9 +1160,8 @@ def parent_grade_report(request):
 
     Returns complete report sheet with all subjects, scores, and grades.
     """
-    from schooladmin.models import GradeSummary, GradingConfiguration
-    from academics.models import Subject
-    from django.db.models import Q
+    from schooladmin.models import GradingConfiguration
+    from schooladmin.report_engine import build_class_report, REPORT_GRADING_CONFIG
 
     parent = request.user
 
@@ -1290,39 +1252,6 @@ def parent_grade_report(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # Custom grading scale for report sheet
-    def get_report_grade(score):
-        """Return grade based on custom report sheet scale"""
-        if score >= 75:
-            return 'A1'
-        elif score >= 70:
-            return 'B2'
-        elif score >= 65:
-            return 'B3'
-        elif score >= 60:
-            return 'C4'
-        elif score >= 55:
-            return 'C5'
-        elif score >= 50:
-            return 'C6'
-        elif score >= 45:
-            return 'D7'
-        elif score >= 40:
-            return 'E8'
-        else:
-            return 'F9'
-
-    # Get all subjects for this student
-    subjects = Subject.objects.filter(
-        class_session=class_session
-    ).select_related('teacher')
-
-    # Filter by department if student has one
-    if child.department:
-        subjects = subjects.filter(
-            Q(department=child.department) | Q(department='General')
-        )
-
     # Get all children for dropdown (needed for filters even if grades incomplete)
     children_list = [{
         'id': c.id,
@@ -1344,42 +1273,13 @@ def parent_grade_report(request):
         'term': session['class_session__term']
     } for session in available_sessions]
 
-    # Check if ALL subjects have COMPLETE grades before showing report
-    # Complete means: Test 1 (attendance + assignment), Test 2 (test), Exam, and Total are all filled
-    grades_complete = True
-    for subject in subjects:
-        try:
-            grade_summary = GradeSummary.objects.get(
-                student=child,
-                subject=subject,
-                grading_config=grading_config
-            )
+    # Compute the whole class in one pass (subjects, rows, completeness, class position)
+    class_report = build_class_report(class_session, grading_config, active_only=True, scaled=False)
+    student_report = class_report.get(child.id)
 
-            # Get all score components
-            attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-            assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-            test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-            exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-            total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-            # Test 1 = attendance + assignment (must be > 0)
-            test1_complete = (attendance_score + assignment_score) > 0
-            # Test 2 = test score (must be > 0)
-            test2_complete = test_score > 0
-            # Exam (must be > 0)
-            exam_complete = exam_score > 0
-            # Total (must be > 0)
-            total_complete = total_score > 0
-
-            # If any component is missing, grades are incomplete
-            if not (test1_complete and test2_complete and exam_complete and total_complete):
-                grades_complete = False
-                break
-
-        except GradeSummary.DoesNotExist:
-            # No grade summary = grades incomplete
-            grades_complete = False
-            break
+    # Report is only shown when ALL subjects have COMPLETE grades
+    # Complete means: Test 1 (attendance + assignment), Test 2 (test), Exam, and Total are all filled
+    grades_complete = student_report.grades_complete
 
     # If grades are not complete, do not show the report
     # But still return filter data so users can check other sessions
@@ -1393,93 +1293,7 @@ def parent_grade_report(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    subjects_data = []
-
-    for subject in subjects:
-        # Get GradeSummary for this student and subject
-        try:
-            grade_summary = GradeSummary.objects.get(
-                student=child,
-                subject=subject,
-                grading_config=grading_config
-            )
-
-            # 1st Test = Attendance + Assignment
-            first_test_score = float(grade_summary.attendance_score) + float(grade_summary.assignment_score)
-
-            # 2nd Test = Test score
-            second_test_score = float(grade_summary.test_score)
-
-            # Exam = Exam score
-            exam_score = float(grade_summary.exam_score)
-
-            # Total
-            total_score = float(grade_summary.total_score)
-
-            # Get report sheet grade
-            letter_grade = get_report_grade(total_score)
-
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': round(first_test_score, 2),
-                'second_test_score': round(second_test_score, 2),
-                'exam_score': round(exam_score, 2),
-                'total_score': round(total_score, 2),
-                'letter_grade': letter_grade
-            })
-
-        except GradeSummary.DoesNotExist:
-            # If no grade summary exists, show zeros
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': 0,
-                'second_test_score': 0,
-                'exam_score': 0,
-                'total_score': 0,
-                'letter_grade': 'F9'
-            })
-
-    # Calculate grand total and average
-    grand_total = sum(s['total_score'] for s in subjects_data)
-    average = round(grand_total / len(subjects_data), 2) if subjects_data else 0
-
-    # Calculate class position
-    all_students = StudentSession.objects.filter(
-        class_session=class_session,
-        is_active=True
-    ).select_related('student')
-
-    student_averages = []
-    for ss in all_students:
-        student_subjects = Subject.objects.filter(class_session=class_session)
-        if ss.student.department:
-            student_subjects = student_subjects.filter(
-                Q(department=ss.student.department) | Q(department='General')
-            )
-
-        total = 0
-        count = 0
-        for subj in student_subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=ss.student,
-                    subject=subj,
-                    grading_config=grading_config
-                )
-                total += float(grade_summary.total_score)
-                count += 1
-            except GradeSummary.DoesNotExist:
-                pass
-
-        student_avg = total / count if count > 0 else 0
-        student_averages.append({
-            'student_id': ss.student.id,
-            'average': student_avg
-        })
-
-    # Sort by average descending and find position
-    student_averages.sort(key=lambda x: x['average'], reverse=True)
-    position = next((i + 1 for i, s in enumerate(student_averages) if s['student_id'] == child.id), None)
+    subjects_data = student_report.subjects
 
     # Student photo URL - Cloudinary URL is already absolute
     photo_url = None
@@ -1527,19 +1341,9 @@ def parent_grade_report(request):
             'academic_year': academic_year,
             'term': term
         },
-        'grading_config': {
-            'first_test_max': 20,
-            'second_test_max': 20,
-            'exam_max': 60,
-            'total_max': 100
-        },
+        'grading_config': dict(REPORT_GRADING_CONFIG),
         'subjects': subjects_data,
-        'summary': {
-            'grand_total': round(grand_total, 2),
-            'average': average,
-            'position': position,
-            'total_students': len(student_averages)
-        },
+        'summary': class_report.summary_for(child.id),
         'children': children_list,
         'available_sessions': sessions_list
     })
@@ -1556,9 +1360,8 @@ def student_grade_report(request):
 
     Returns complete report sheet with all subjects, scores, and grades.
     """
-    from schooladmin.models import GradeSummary, GradingConfiguration
-    from academics.models import Subject
-    from django.db.models import Q
+    from schooladmin.models import GradingConfiguration
+    from schooladmin.report_engine import build_class_report, REPORT_GRADING_CONFIG
 
     student = request.user
 
@@ -1704,39 +1507,6 @@ def student_grade_report(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # Custom grading scale for report sheet
-    def get_report_grade(score):
-        """Return grade based on custom report sheet scale"""
-        if score >= 75:
-            return 'A1'
-        elif score >= 70:
-            return 'B2'
-        elif score >= 65:
-            return 'B3'
-        elif score >= 60:
-            return 'C4'
-        elif score >= 55:
-            return 'C5'
-        elif score >= 50:
-            return 'C6'
-        elif score >= 45:
-            return 'D7'
-        elif score >= 40:
-            return 'E8'
-        else:
-            return 'F9'
-
-    # Get all subjects for this student
-    subjects = Subject.objects.filter(
-        class_session=class_session
-    ).select_related('teacher')
-
-    # Filter by department if student has one
-    if student.department:
-        subjects = subjects.filter(
-            Q(department=student.department) | Q(department='General')
-        )
-
     # Get available sessions for this student (needed for filters even if grades incomplete)
     available_sessions = StudentSession.objects.filter(
         student=student
@@ -1750,42 +1520,13 @@ def student_grade_report(request):
         'term': session['class_session__term']
     } for session in available_sessions]
 
-    # Check if ALL subjects have COMPLETE grades before showing report
-    # Complete means: Test 1 (attendance + assignment), Test 2 (test), Exam, and Total are all filled
-    grades_complete = True
-    for subject in subjects:
-        try:
-            grade_summary = GradeSummary.objects.get(
-                student=student,
-                subject=subject,
-                grading_config=grading_config
-            )
+    # Compute the whole class in one pass (subjects, rows, completeness, class position)
+    class_report = build_class_report(class_session, grading_config, active_only=True, scaled=False)
+    student_report = class_report.get(student.id)
 
-            # Get all score components
-            attendance_score = float(grade_summary.attendance_score) if grade_summary.attendance_score else 0
-            assignment_score = float(grade_summary.assignment_score) if grade_summary.assignment_score else 0
-            test_score = float(grade_summary.test_score) if grade_summary.test_score else 0
-            exam_score = float(grade_summary.exam_score) if grade_summary.exam_score else 0
-            total_score = float(grade_summary.total_score) if grade_summary.total_score else 0
-
-            # Test 1 = attendance + assignment (must be > 0)
-            test1_complete = (attendance_score + assignment_score) > 0
-            # Test 2 = test score (must be > 0)
-            test2_complete = test_score > 0
-            # Exam (must be > 0)
-            exam_complete = exam_score > 0
-            # Total (must be > 0)
-            total_complete = total_score > 0
-
-            # If any component is missing, grades are incomplete
-            if not (test1_complete and test2_complete and exam_complete and total_complete):
-                grades_complete = False
-                break
-
-        except GradeSummary.DoesNotExist:
-            # No grade summary = grades incomplete
-            grades_complete = False
-            break
+    # Report is only shown when ALL subjects have COMPLETE grades
+    # Complete means: Test 1 (attendance + assignment), Test 2 (test), Exam, and Total are all filled
+    grades_complete = student_report.grades_complete
 
     # If grades are not complete, do not show the report
     # But still return filter data so students can check other sessions
@@ -1798,93 +1539,7 @@ def student_grade_report(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    subjects_data = []
-
-    for subject in subjects:
-        # Get GradeSummary for this student and subject
-        try:
-            grade_summary = GradeSummary.objects.get(
-                student=student,
-                subject=subject,
-                grading_config=grading_config
-            )
-
-            # 1st Test = Attendance + Assignment
-            first_test_score = float(grade_summary.attendance_score) + float(grade_summary.assignment_score)
-
-            # 2nd Test = Test score
-            second_test_score = float(grade_summary.test_score)
-
-            # Exam = Exam score
-            exam_score = float(grade_summary.exam_score)
-
-            # Total
-            total_score = float(grade_summary.total_score)
-
-            # Get report sheet grade
-            letter_grade = get_report_grade(total_score)
-
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': round(first_test_score, 2),
-                'second_test_score': round(second_test_score, 2),
-                'exam_score': round(exam_score, 2),
-                'total_score': round(total_score, 2),
-                'letter_grade': letter_grade
-            })
-
-        except GradeSummary.DoesNotExist:
-            # If no grade summary exists, show zeros
-            subjects_data.append({
-                'subject_name': subject.name,
-                'first_test_score': 0,
-                'second_test_score': 0,
-                'exam_score': 0,
-                'total_score': 0,
-                'letter_grade': 'F9'
-            })
-
-    # Calculate grand total and average
-    grand_total = sum(s['total_score'] for s in subjects_data)
-    average = round(grand_total / len(subjects_data), 2) if subjects_data else 0
-
-    # Calculate class position
-    all_students = StudentSession.objects.filter(
-        class_session=class_session,
-        is_active=True
-    ).select_related('student')
-
-    student_averages = []
-    for ss in all_students:
-        student_subjects = Subject.objects.filter(class_session=class_session)
-        if ss.student.department:
-            student_subjects = student_subjects.filter(
-                Q(department=ss.student.department) | Q(department='General')
-            )
-
-        total = 0
-        count = 0
-        for subj in student_subjects:
-            try:
-                grade_summary = GradeSummary.objects.get(
-                    student=ss.student,
-                    subject=subj,
-                    grading_config=grading_config
-                )
-                total += float(grade_summary.total_score)
-                count += 1
-            except GradeSummary.DoesNotExist:
-                pass
-
-        student_avg = total / count if count > 0 else 0
-        student_averages.append({
-            'student_id': ss.student.id,
-            'average': student_avg
-        })
-
-    # Sort by average descending and find position
-    student_averages.sort(key=lambda x: x['average'], reverse=True)
-    position = next((i + 1 for i, s in enumerate(student_averages) if s['student_id'] == student.id), None)
+    subjects_data = student_report.subjects
 
     # Student photo URL - Cloudinary URL is already absolute
     photo_url = None
@@ -1924,19 +1579,9 @@ def student_grade_report(request):
             'academic_year': academic_year,
             'term': term
         },
-        'grading_config': {
-            'first_test_max': 20,
-            'second_test_max': 20,
-            'exam_max': 60,
-            'total_max': 100
-        },
+        'grading_config': dict(REPORT_GRADING_CONFIG),
         'subjects': subjects_data,
-        'summary': {
-            'grand_total': round(grand_total, 2),
-            'average': average,
-            'position': position,
-            'total_students': len(student_averages)
-        },
+        'summary': class_report.summary_for(student.id),
         'available_sessions': sessions_list
     })
 
@@ -2414,7 +2059,8 @@ def send_login_reminder(request):
     if subscription:
         plan = subscription.plan
         if plan.max_daily_emails > 0:
-            remaining = max(0, plan.max_daily_emails - subscription.emails_sent_today)
+            from tenants.quota import remaining as quota_remaining
+            remaining = quota_remaining(subscription)
             requested = len(users_with_email)
             if remaining == 0:
                 return Response({
@@ -2442,16 +2088,20 @@ def send_login_reminder(request):
     sent = []
     skipped = []
 
+    # Reserve quota for the whole batch in one statement; unused quota is released below
+    from tenants.quota import reserve, release
+    quota_left = reserve(school, len(users_with_email))
+
     for user in users:
         if not user.email:
             skipped.append({'id': user.id, 'name': f"{user.first_name} {user.last_name}", 'reason': 'No email address'})
             continue
 
         try:
-            from tenants.permissions import check_email_limit
-            if not check_email_limit(school):
+            if quota_left <= 0:
                 skipped.append({'id': user.id, 'name': f"{user.first_name} {user.last_name}", 'reason': 'Daily email quota reached mid-send'})
                 continue
+            quota_left -= 1
 
             token = _secrets.token_urlsafe(32)
             user.email_verification_token = token
@@ -2460,12 +2110,16 @@ def send_login_reminder(request):
             user.save(update_fields=['email_verification_token', 'email_verification_sent_at', 'must_change_password'])
 
             verification_url = f"{_settings.FRONTEND_URL}/verify-email/{token}"
-            send_verification_email(user, verification_url)
+            if not send_verification_email(user, verification_url, quota_reserved=True):
+                release(school, 1)
 
             sent.append({'id': user.id, 'name': f"{user.first_name} {user.last_name}", 'email': user.email})
         except Exception as e:
+            release(school, 1)
             skipped.append({'id': user.id, 'name': f"{user.first_name} {user.last_name}", 'reason': str(e)})
 
+    release(school, quota_left)
+
     ActivityLog.objects.create(
         user=request.user,
         role='admin',
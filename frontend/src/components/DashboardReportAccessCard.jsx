@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { FileCheck, FileX, DollarSign, AlertCircle, Send, Bell } from 'lucide-react';
 import Select from 'react-select';
+import { resolveJobResponse } from '../utils/backgroundJobs';
 import './DashboardReportAccessCard.css';
 import ReportAccessModal from './ReportAccessModal';
 import IncompleteGradesModal from './IncompleteGradesModal';
@@ -178,7 +179,7 @@ const DashboardReportAccessCard = () => {
       setSendResult(null);
       const token = localStorage.getItem('accessToken');
 
-      const response = await fetch(buildApiUrl('/schooladmin/analytics/report-access/send/'), {
+      const response = await resolveJobResponse(await fetch(buildApiUrl('/schooladmin/analytics/report-access/send/'), {
         method: 'POST',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -188,6 +189,8 @@ const DashboardReportAccessCard = () => {
           academic_year: stats.academic_year,
           term: stats.term
         })
+      }), {
+        Authorization: `Bearer ${token}`,
       });
 
       if (response.ok) {
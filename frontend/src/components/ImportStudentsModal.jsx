@@ -5,6 +5,7 @@ import {
   ChevronRight, ChevronLeft, Loader2, X, Info
 } from 'lucide-react';
 import * as XLSX from 'xlsx';
+import { resolveJobResponse } from '../utils/backgroundJobs';
 import './ImportStudentsModal.css';
 
 const TERMS = ['First Term', 'Second Term', 'Third Term'];
@@ -154,10 +155,12 @@ const ImportStudentsModal = ({ onClose, onSuccess }) => {
     formData.append('username_mode', usernameMode);
 
     try {
-      const res = await fetch(buildApiUrl('/users/import-students/confirm/'), {
+      const res = await resolveJobResponse(await fetch(buildApiUrl('/users/import-students/confirm/'), {
         method: 'POST',
         headers: { Authorization: `Bearer ${token}` },
         body: formData,
+      }), {
+        Authorization: `Bearer ${token}`,
       });
       const data = await res.json();
 
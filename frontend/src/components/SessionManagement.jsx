@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import API_BASE_URL from '../config';
 import { useSchool } from '../contexts/SchoolContext';
 
+import { resolveJobResponse } from '../utils/backgroundJobs';
 import './SessionManagement.css';
 
 const SessionManagement = () => {
@@ -124,13 +125,15 @@ const SessionManagement = () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('accessToken');
-      const response = await fetch(buildApiUrl('/schooladmin/session/move-to-next-term/'), {
+      const response = await resolveJobResponse(await fetch(buildApiUrl('/schooladmin/session/move-to-next-term/'), {
         method: 'POST',
         headers: {
           'Authorization': `Bearer ${token}`,
           'Content-Type': 'application/json'
         },
         body: JSON.stringify(moveOptions)
+      }), {
+        Authorization: `Bearer ${token}`,
       });
 
       const data = await response.json();
@@ -155,7 +158,7 @@ const SessionManagement = () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('accessToken');
-      const response = await fetch(buildApiUrl('/schooladmin/session/move-to-next-session/'), {
+      const response = await resolveJobResponse(await fetch(buildApiUrl('/schooladmin/session/move-to-next-session/'), {
         method: 'POST',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -165,6 +168,8 @@ const SessionManagement = () => {
           ...moveOptions,
           graduation_email_mode: graduationEmailMode,
         })
+      }), {
+        Authorization: `Bearer ${token}`,
       });
 
       const data = await response.json();
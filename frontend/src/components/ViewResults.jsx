@@ -2,6 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { BookOpen, Filter, AlertCircle, CheckCircle, Search, Users } from 'lucide-react';
 import GradesModal from './GradesModal';
+import { resolveJobResponse } from '../utils/backgroundJobs';
 import './ViewResults.css';
 import { useDialog } from '../contexts/DialogContext';
 import { useSchool } from '../contexts/SchoolContext';
@@ -172,7 +173,7 @@ const ViewResults = () => {
       setSyncing(true);
       const token = localStorage.getItem('accessToken');
 
-      const response = await fetch(buildApiUrl('/schooladmin/results/sync-attendance/'), {
+      const response = await resolveJobResponse(await fetch(buildApiUrl('/schooladmin/results/sync-attendance/'), {
         method: 'POST',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -182,6 +183,8 @@ const ViewResults = () => {
           academic_year: selectedYear,
           term: selectedTerm
         })
+      }), {
+        Authorization: `Bearer ${token}`,
       });
 
       if (response.ok) {
@@ -35,6 +35,7 @@ import {
 } from 'lucide-react';
 import SchoolConfiguration from '../../components/SchoolConfiguration';
 import API_BASE_URL, { getSchoolSlug } from '../../config';
+import { resolveJobResponse } from '../../utils/backgroundJobs';
 import './PortalDashboard.css';
 
 function PortalDashboard() {
@@ -1676,13 +1677,15 @@ function DatabaseDownloadTab({ subscription, openUpgradeModal }) {
 
     try {
       const token = localStorage.getItem('portalAccessToken');
-      const response = await fetch(`${API_BASE_URL}/api/portal/database/download/`, {
+      const response = await resolveJobResponse(await fetch(`${API_BASE_URL}/api/portal/database/download/`, {
         method: 'POST',
         headers: {
           Authorization: `Bearer ${token}`,
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({ format: format }),
+      }), {
+        Authorization: `Bearer ${token}`,
       });
 
       if (!response.ok) {
@@ -1785,6 +1788,19 @@ function DatabaseDownloadTab({ subscription, openUpgradeModal }) {
               <span>Structured JSON format. Ideal for importing into another database or application.</span>
             </div>
           </label>
+          <label className={`format-option ${format === 'jsonl' ? 'selected' : ''}`}>
+            <input
+              type="radio"
+              name="format"
+              value="jsonl"
+              checked={format === 'jsonl'}
+              onChange={() => setFormat('jsonl')}
+            />
+            <div className="format-option-content">
+              <strong>JSON Lines</strong>
+              <span>One JSON record per line. Best for very large schools and line-by-line processing tools.</span>
+            </div>
+          </label>
         </div>
       </div>
 
@@ -0,0 +1,58 @@
+import { API_BASE_URL } from '../config';
+
+/**
+ * Wait for a background job started by an endpoint that answered 202.
+ *
+ * Long-running admin operations (session rollover, report sending, imports,
+ * database export) are queued on the server and return a job id. This polls
+ * the job until it finishes and resolves to a Response carrying the job's
+ * result and the status code the endpoint reported, so callers can keep using
+ * response.ok / response.json(). Jobs that produce a file resolve to the file
+ * download response. Any other response is returned unchanged.
+ *
+ * Polling stops after maxWait. The job keeps running on the server, and the
+ * promise resolves to a 504 response with still_running: true and a detail
+ * telling the user to check back later, which callers show like any other
+ * non-ok response.
+ *
+ * @param {Response} response - Response from the original request
+ * @param {Object} headers - Auth headers for the status/download requests
+ * @param {Object} options - { interval: ms between polls, maxWait: ms before giving up, onProgress: fn(progress) }
+ * @returns {Promise<Response>}
+ */
+export async function resolveJobResponse(response, headers = {}, { interval = 2000, maxWait = 10 * 60 * 1000, onProgress } = {}) {
+  if (response.status !== 202) return response;
+
+  const accepted = await response.clone().json();
+  if (!accepted.job_id || !accepted.status_url) return response;
+
+  const deadline = Date.now() + maxWait;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, interval));
+
+    const res = await fetch(`${API_BASE_URL}${accepted.status_url}`, { headers });
+    if (!res.ok) return res;
+
+    const job = await res.json();
+    if (onProgress) onProgress(job.progress);
+
+    if (job.status === 'completed' && job.download_url) {
+      return fetch(`${API_BASE_URL}${job.download_url}`, { headers });
+    }
+
+    if (job.status === 'completed' || job.status === 'failed') {
+      const message = job.error || 'The operation failed. Please try again.';
+      const body = job.result ?? { detail: message, error: message };
+      return new Response(JSON.stringify(body), {
+        status: job.result_status || (job.status === 'completed' ? 200 : 500),
+        headers: { 'Content-Type': 'application/json' },
+      });
+    }
+  }
+
+  const message = 'This is still running on the server. Check back in a few minutes.';
+  return new Response(JSON.stringify({ detail: message, error: message, still_running: true, job_id: accepted.job_id }), {
+    status: 504,
+    headers: { 'Content-Type': 'application/json' },
+  });
+}